@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+'''Benchmarks the planners on a synthetic hospital. Usage:
+
+planning_benchmark.py CONFIG [--floors N] [--locations-per-floor M] [--elevators K]
+                      [--robots R] [--loads L] [--seed SEED] [--requests COUNT]
+                      [--warmup COUNT] [--kb-name NAME] [--mongomock] [--output FILE]
+
+The planners are described in a YAML configuration file (see
+config/benchmark_config.yaml). The hospital is written to the given knowledge
+base, which must not exist yet (or be empty) and is dropped afterwards, or,
+with "--mongomock", to an in-memory stand-in for MongoDB. The report is printed
+(or written to the output file) as JSON.
+'''
+
+import sys
+import json
+import logging
+import argparse
+import functools
+from unittest import mock
+
+import yaml
+
+from task_planner.knowledge_base_interface import KnowledgeBaseInterface, MongoClientPool
+from task_planner.synthetic_hospital import SyntheticHospital
+from task_planner.planning_benchmark import PlanningBenchmark
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the planners on a synthetic hospital')
+    parser.add_argument('config', help='YAML file describing the benchmarked planners')
+    parser.add_argument('--floors', type=int, default=5)
+    parser.add_argument('--locations-per-floor', type=int, default=20)
+    parser.add_argument('--elevators', type=int, default=1)
+    parser.add_argument('--robots', type=int, default=1)
+    parser.add_argument('--loads', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--kb-name', default='planning_benchmark_kb')
+    parser.add_argument('--mongomock', action='store_true',
+                        help='use an in-memory stand-in for MongoDB')
+    parser.add_argument('--output', default=None, help='file to which the report is written')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(args.config, 'r') as config_file:
+        config = yaml.safe_load(config_file)
+
+    client_patch = None
+    if args.mongomock:
+        import mongomock
+        from mongomock.store import ServerStore
+
+        # all mock clients share a store, so the planners see the populated knowledge base
+        client_patch = mock.patch('task_planner.knowledge_base_interface.pm.MongoClient',
+                                  functools.partial(mongomock.MongoClient, _store=ServerStore()))
+        client_patch.start()
+
+    kb_args = config.get('kb_args', {})
+
+    # the knowledge base is dropped after the benchmark, so existing
+    # knowledge bases (e.g. the one used by the robots) are not touched
+    if MongoClientPool.get_client(**kb_args)[args.kb_name].list_collection_names():
+        if client_patch is not None:
+            client_patch.stop()
+        parser.error('The knowledge base {0} already exists; please use a different '
+                     'name with --kb-name'.format(args.kb_name))
+
+    hospital = SyntheticHospital(args.floors, args.locations_per_floor, args.elevators,
+                                 args.robots, args.loads, args.seed)
+    kb_interface = KnowledgeBaseInterface(args.kb_name, **kb_args)
+    try:
+        hospital.populate(kb_interface)
+        planners = {name: PlanningBenchmark.get_planner(name, args.kb_name,
+                                                        dict(planner_config, **kb_args))
+                    for name, planner_config in config['planners'].items()}
+        report = PlanningBenchmark(hospital, args.requests, args.warmup).run(planners)
+    finally:
+        MongoClientPool.get_client(**kb_args).drop_database(args.kb_name)
+        MongoClientPool.close_all()
+        if client_patch is not None:
+            client_patch.stop()
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
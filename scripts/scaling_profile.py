@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+'''Profiles the problem generation and plan parsing of a planner interface on
+knowledge base snapshots of increasing size (see task_planner/scaling_profiler.py);
+the external planner is not needed. Usage:
+
+scaling_profile.py [--planner lama|metric_ff|native] [--domain-file DOMAIN]
+                   [--sizes 100,1000,10000,100000 | --snapshots FILE [FILE ...]]
+                   [--profiler cprofile|pyinstrument|none] [--profile-dir DIR]
+                   [--repetitions N] [--kb-name NAME] [--mongomock] [--output FILE]
+scaling_profile.py --record FILE [--kb-name NAME]
+
+By default, synthetic hospitals with the given numbers of assertions are
+profiled; recorded snapshots can be used instead ("--snapshots"). A snapshot of
+a knowledge base is recorded with "--record". The report is printed (or written
+to the output file) as JSON; operations and functions that grow super-linearly
+are also reported as warnings.
+'''
+
+import os
+import sys
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+import functools
+from unittest import mock
+
+from task_planner.knowledge_base_interface import KnowledgeBaseInterface, MongoClientPool
+from task_planner.planning_benchmark import PlanningBenchmark
+from task_planner.scaling_profiler import ScalingProfiler
+
+
+if __name__ == '__main__':
+    main_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description='Profiles the problem generation and plan parsing')
+    parser.add_argument('--planner', default='lama', choices=sorted(PlanningBenchmark.planner_classes))
+    parser.add_argument('--domain-file', default=os.path.join(main_dir, 'config/task_domains/agaplesion/'
+                                                                        'hospital_transportation.pddl'))
+    parser.add_argument('--sizes', default='100,1000,10000,100000',
+                        help='comma-separated numbers of assertions of the synthetic snapshots')
+    parser.add_argument('--snapshots', nargs='+', default=None,
+                        help='recorded snapshot files used instead of synthetic snapshots')
+    parser.add_argument('--record', default=None,
+                        help='records a snapshot of the knowledge base in the given file and exits')
+    parser.add_argument('--profiler', default='cprofile', choices=['cprofile', 'pyinstrument', 'none'])
+    parser.add_argument('--profile-dir', default=None, help='directory to which the profiles are written')
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--kb-name', default='scaling_profile_kb')
+    parser.add_argument('--mongomock', action='store_true',
+                        help='use an in-memory stand-in for MongoDB')
+    parser.add_argument('--output', default=None, help='file to which the report is written')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.record:
+        ScalingProfiler.write_snapshot(KnowledgeBaseInterface(args.kb_name), args.record)
+        sys.exit(0)
+
+    client_patch = None
+    if args.mongomock:
+        import mongomock
+        from mongomock.store import ServerStore
+
+        client_patch = mock.patch('task_planner.knowledge_base_interface.pm.MongoClient',
+                                  functools.partial(mongomock.MongoClient, _store=ServerStore()))
+        client_patch.start()
+
+    if args.snapshots:
+        snapshots = [ScalingProfiler.read_snapshot(snapshot_file_name)
+                     for snapshot_file_name in args.snapshots]
+    else:
+        snapshots = ScalingProfiler.get_synthetic_snapshots([int(size) for size in args.sizes.split(',')])
+
+    # the planner is not run, so no planner command is needed
+    plan_file_path = tempfile.mkdtemp()
+    planner_config = {'domain_file': args.domain_file, 'plan_file_path': plan_file_path}
+    if args.planner != 'native':
+        planner_config['planner_cmd'] = ''
+    planner = PlanningBenchmark.get_planner(args.planner, args.kb_name, planner_config)
+    try:
+        profiler = ScalingProfiler(planner, None if args.profiler == 'none' else args.profiler,
+                                   args.profile_dir, args.repetitions)
+        report = profiler.profile(snapshots)
+    finally:
+        shutil.rmtree(plan_file_path, ignore_errors=True)
+        MongoClientPool.close_all()
+        if client_patch is not None:
+            client_patch.stop()
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
@@ -0,0 +1,440 @@
+import time
+import heapq
+import itertools
+import logging
+
+from task_planner.pddl_parser import PDDLDomain, PDDLProblem, PDDLAction
+from task_planner.pddl_formulas import PDDLFormulas
+from task_planner.plan_validator import PlanValidator
+
+
+class CombinedState(object):
+    '''A read-only view of a search state together with the static atoms of
+    a problem, such that the static atoms do not have to be copied into
+    every state.
+
+    @param dynamic_atoms -- atoms whose predicates can be changed by actions
+    @param static_atoms -- atoms whose predicates are not changed by any action
+    '''
+    def __init__(self, dynamic_atoms, static_atoms):
+        self.dynamic_atoms = dynamic_atoms
+        self.static_atoms = static_atoms
+
+    def __contains__(self, atom) -> bool:
+        return atom in self.dynamic_atoms or atom in self.static_atoms
+
+    def holds(self, atom: tuple, positive: bool) -> bool:
+        '''Returns True if the given atom is in the state (regardless of
+        its polarity; see PDDLFormulas.holds).
+        '''
+        return atom in self
+
+
+class ActionSchema(object):
+    '''A domain action compiled for lazy grounding.
+
+    @param name -- name of the action
+    @param params -- a list of (variable, type) pairs (variable names start with "?")
+    @param param_types -- a dictionary mapping the parameter variables to their types
+    @param join_atoms -- the positive atoms of the precondition in the order
+                         in which they are matched with the state
+    @param conditions -- the remaining precondition formulas, which are
+                         evaluated once all parameters are bound
+    @param effect -- the compiled effect, namely a list of ("add", atom),
+                     ("delete", atom), ("when", free variables, condition,
+                     condition atoms, effect), and ("forall", variables, effect) entries
+    '''
+    def __init__(self, name: str, params: list, join_atoms: list, conditions: list, effect: list):
+        self.name = name
+        self.params = params
+        self.param_types = dict(params)
+        self.join_atoms = join_atoms
+        self.conditions = conditions
+        self.effect = effect
+
+
+class GBFSPlanner(object):
+    '''An in-process planner that runs a greedy best-first search guided by
+    the FF heuristic (the number of actions in a relaxed plan, namely a plan
+    that ignores delete effects and negative conditions).
+
+    Actions are grounded lazily: the applicable groundings of an action in a
+    state are found by matching the positive precondition atoms of the action
+    with the atoms of the state (using an index of the atoms by predicate and
+    argument), so only the groundings that are applicable in the visited
+    states (and in their relaxed explorations) are ever generated. The
+    supported formulas are those of STRIPS domains with negative preconditions,
+    equality, quantifiers, and conditional effects; numeric conditions and
+    effects are not supported.
+
+    Constructor arguments:
+    @param domain -- a parsed PDDL domain
+    @param max_expansions -- maximum number of states expanded by a search
+    @param time_limit -- maximum duration (in seconds) of a search
+                         (default None, in which case the search time is not limited)
+    '''
+    numeric_operators = ('increase', 'decrease', 'assign', 'scale-up', 'scale-down',
+                         '<', '>', '<=', '>=')
+
+    def __init__(self, domain: PDDLDomain, max_expansions: int=10000, time_limit: float=None):
+        self.domain = domain
+        self.max_expansions = max_expansions
+        self.time_limit = time_limit
+        self.validator = PlanValidator(domain)
+        self.logger = logging.getLogger('task.planner.heuristic_search')
+
+        self.dynamic_predicates = set()
+        for action in domain.actions.values():
+            self.__check_supported(action.name, action.precondition)
+            self.__check_supported(action.name, action.effect)
+            self.dynamic_predicates.update(self.__get_effect_predicates(action.effect))
+        self.action_schemas = [self.__compile_action(action) for action in domain.actions.values()]
+
+    def solve(self, problem: PDDLProblem) -> list:
+        '''Returns a plan for the given problem as a list of action strings
+        of the form "(action_name arg_1 ... arg_n)" or None if no plan is found
+        within the expansion and time limits.
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- a planning problem
+
+        '''
+        start_time = time.monotonic()
+        # the objects are sorted so that the search does not depend on the object order
+        objects_by_type = {obj_type: dict.fromkeys(sorted(objects))
+                           for obj_type, objects in PDDLFormulas.get_objects_by_type(self.domain,
+                                                                                     problem).items()}
+        static_atoms = set([atom for atom in problem.init if atom[0] not in self.dynamic_predicates])
+        static_index = self.__get_index(static_atoms)
+        context = (problem.goals, static_atoms, static_index, objects_by_type)
+
+        initial_state = frozenset([atom for atom in problem.init if atom[0] in self.dynamic_predicates])
+        initial_heuristic = self.__get_ff_heuristic(initial_state, context)
+        if initial_heuristic is None:
+            self.logger.info('The goals are not reachable in the relaxed problem')
+            return None
+
+        counter = itertools.count()
+        open_list = [(initial_heuristic, next(counter), initial_state)]
+        parents = {initial_state: None}
+        expansions = 0
+        while open_list:
+            _, _, state = heapq.heappop(open_list)
+            if all(goal in state or goal in static_atoms for goal in problem.goals):
+                plan = self.__extract_plan(state, parents)
+                self.logger.info('Plan with %d actions found after %d expansions (%.3f s)',
+                                 len(plan), expansions, time.monotonic() - start_time)
+                if not self.validator.validate(problem, plan):
+                    self.logger.error('The plan found by the search is not valid')
+                    return None
+                return plan
+
+            expansions += 1
+            if expansions > self.max_expansions:
+                self.logger.info('No plan found within %d expansions', self.max_expansions)
+                return None
+            if self.time_limit is not None and time.monotonic() - start_time > self.time_limit:
+                self.logger.info('No plan found within %.3f s', self.time_limit)
+                return None
+
+            for action_string, successor in self.__get_successors(state, context):
+                if successor in parents:
+                    continue
+                parents[successor] = (state, action_string)
+                heuristic = self.__get_ff_heuristic(successor, context)
+                if heuristic is not None:
+                    heapq.heappush(open_list, (heuristic, next(counter), successor))
+
+        self.logger.info('The search space was exhausted without finding a plan')
+        return None
+
+    def __get_successors(self, state: frozenset, context: tuple):
+        '''Yields (action string, successor state) pairs for the actions
+        that are applicable in the given state.
+        '''
+        _, static_atoms, static_index, objects_by_type = context
+        state_view = CombinedState(state, static_atoms)
+        state_index = self.__get_index(state)
+        for schema in self.action_schemas:
+            for bindings in self.__get_groundings(schema, state_view, state_index,
+                                                  static_index, objects_by_type, False):
+                added_atoms, deleted_atoms = {}, set()
+                self.__apply(schema.effect, state_view, bindings, objects_by_type,
+                             False, added_atoms, deleted_atoms)
+                successor = frozenset((state - deleted_atoms) | added_atoms.keys())
+                action_string = '({0})'.format(' '.join([schema.name] + [bindings[param]
+                                                                         for param, _ in schema.params]))
+                yield action_string, successor
+
+    def __get_ff_heuristic(self, state: frozenset, context: tuple) -> int:
+        '''Returns the number of actions in a relaxed plan from the given state
+        or None if the goals are not reachable in the relaxed problem.
+        '''
+        goals, static_atoms, static_index, objects_by_type = context
+        open_goals = [goal for goal in goals if goal not in state and goal not in static_atoms]
+        if not open_goals:
+            return 0
+
+        # relaxed exploration: the atoms reached in each layer are added to
+        # the relaxed state together with the action that first achieved them
+        # and the atoms on which that achievement relied
+        reached_atoms = set(state)
+        achievers = {}
+        while not all(goal in reached_atoms for goal in open_goals):
+            state_view = CombinedState(reached_atoms, static_atoms)
+            reached_index = self.__get_index(reached_atoms)
+            new_atoms = {}
+            for schema in self.action_schemas:
+                for bindings in self.__get_groundings(schema, state_view, reached_index,
+                                                      static_index, objects_by_type, True):
+                    added_atoms = {}
+                    self.__apply(schema.effect, state_view, bindings, objects_by_type,
+                                 True, added_atoms, set())
+                    action_key = None
+                    for atom, condition_atoms in added_atoms.items():
+                        if atom in reached_atoms or atom in new_atoms:
+                            continue
+                        if action_key is None:
+                            action_key = (schema.name,) + tuple([bindings[param] for param, _ in schema.params])
+                            precondition_atoms = [PDDLFormulas.ground(atom_pattern, bindings)
+                                                  for atom_pattern in schema.join_atoms]
+                        new_atoms[atom] = (action_key, precondition_atoms + condition_atoms)
+            if not new_atoms:
+                return None
+            reached_atoms.update(new_atoms.keys())
+            achievers.update(new_atoms)
+
+        # relaxed plan extraction
+        relaxed_plan = set()
+        supported_atoms = set()
+        atoms_to_support = list(open_goals)
+        while atoms_to_support:
+            atom = atoms_to_support.pop()
+            if atom in supported_atoms or atom in state or atom in static_atoms:
+                continue
+            supported_atoms.add(atom)
+            action_key, supporting_atoms = achievers[atom]
+            relaxed_plan.add(action_key)
+            atoms_to_support.extend(supporting_atoms)
+        return len(relaxed_plan)
+
+    def __get_groundings(self, schema: ActionSchema, state_view: CombinedState,
+                         state_index: dict, static_index: dict,
+                         objects_by_type: dict, relaxed: bool):
+        '''Yields the parameter bindings under which the given action is applicable;
+        in relaxed mode, negative conditions (except inequalities) are ignored.
+        '''
+        def join(atom_idx, bindings):
+            if atom_idx == len(schema.join_atoms):
+                for complete_bindings in self.__bind_remaining_params(schema, bindings,
+                                                                      objects_by_type):
+                    if all(PDDLFormulas.holds(condition, state_view.holds, complete_bindings,
+                                              objects_by_type, relaxed)
+                           for condition in schema.conditions):
+                        yield complete_bindings
+                return
+
+            atom_pattern = schema.join_atoms[atom_idx]
+            index = state_index if atom_pattern[0] in self.dynamic_predicates else static_index
+            for candidate in self.__get_candidates(index, atom_pattern, bindings):
+                extended_bindings = self.__unify(atom_pattern, candidate, bindings,
+                                                 schema.param_types, objects_by_type)
+                if extended_bindings is not None:
+                    for result in join(atom_idx+1, extended_bindings):
+                        yield result
+
+        for bindings in join(0, {}):
+            yield bindings
+
+    def __bind_remaining_params(self, schema: ActionSchema, bindings: dict, objects_by_type: dict):
+        '''Yields copies of "bindings" extended with all type-consistent
+        assignments of the parameters that are not bound by the join.
+        '''
+        unbound_params = [(param, param_type) for param, param_type in schema.params
+                          if param not in bindings]
+        return PDDLFormulas.get_assignments(unbound_params, bindings, objects_by_type)
+
+    def __apply(self, effect: list, state_view: CombinedState, bindings: dict,
+                objects_by_type: dict, relaxed: bool, added_atoms: dict,
+                deleted_atoms: set, condition_atoms: list=None) -> None:
+        '''Collects the atoms added and deleted by a compiled effect; "added_atoms"
+        maps each added atom to the (grounded) atoms of the effect conditions
+        under which it is added. In relaxed mode, delete effects are ignored.
+        '''
+        condition_atoms = condition_atoms or []
+        for effect_entry in effect:
+            effect_type = effect_entry[0]
+            if effect_type == 'add':
+                added_atoms[PDDLFormulas.ground(effect_entry[1], bindings)] = condition_atoms
+            elif effect_type == 'delete':
+                if not relaxed:
+                    deleted_atoms.add(PDDLFormulas.ground(effect_entry[1], bindings))
+            elif effect_type == 'when':
+                _, free_variables, condition, condition_patterns, sub_effect = effect_entry
+                for conditional_bindings in PDDLFormulas.get_assignments(free_variables, bindings,
+                                                                         objects_by_type):
+                    if PDDLFormulas.holds(condition, state_view.holds, conditional_bindings,
+                                          objects_by_type, relaxed):
+                        self.__apply(sub_effect, state_view, conditional_bindings,
+                                     objects_by_type, relaxed, added_atoms, deleted_atoms,
+                                     condition_atoms + [PDDLFormulas.ground(atom_pattern, conditional_bindings)
+                                                        for atom_pattern in condition_patterns])
+            elif effect_type == 'forall':
+                _, variables, sub_effect = effect_entry
+                for quantified_bindings in PDDLFormulas.get_assignments(variables, bindings, objects_by_type):
+                    self.__apply(sub_effect, state_view, quantified_bindings, objects_by_type,
+                                 relaxed, added_atoms, deleted_atoms, condition_atoms)
+
+    def __compile_action(self, action: PDDLAction) -> ActionSchema:
+        '''Splits the precondition of an action into positive atoms (ordered for
+        matching) and other conditions and compiles the effect of the action.
+        '''
+        params = [('?' + name, param_type) for name, param_type in action.params]
+        conjuncts = self.__get_conjuncts(action.precondition)
+        atoms = [tuple(conjunct) for conjunct in conjuncts
+                 if conjunct[0] not in ('and', 'or', 'not', 'imply', '=', 'forall', 'exists')]
+        conditions = [conjunct for conjunct in conjuncts
+                      if conjunct[0] in ('or', 'not', 'imply', '=', 'forall', 'exists')]
+
+        # the atoms are matched greedily such that atoms with more bound
+        # arguments (and dynamic atoms, of which there are usually fewer)
+        # are matched first
+        join_atoms = []
+        bound_variables = set()
+        while atoms:
+            atom = max(atoms, key=lambda atom: (sum([not arg.startswith('?') or arg in bound_variables
+                                                     for arg in atom[1:]]),
+                                                atom[0] in self.dynamic_predicates))
+            atoms.remove(atom)
+            join_atoms.append(atom)
+            bound_variables.update([arg for arg in atom[1:] if arg.startswith('?')])
+
+        effect = self.__compile_effect(action.effect, set([param for param, _ in params]))
+        return ActionSchema(action.name, params, join_atoms, conditions, effect)
+
+    def __compile_effect(self, effect: list, bound_variables: set) -> list:
+        '''Compiles an effect formula into a list of effect entries (see ActionSchema).
+        Variables that appear in conditional effects without being bound are treated
+        as universally quantified over the type with which they appear in the
+        predicate declarations.
+        '''
+        if not effect:
+            return []
+
+        operator = effect[0]
+        if operator == 'and':
+            return [entry for sub_effect in effect[1:]
+                    for entry in self.__compile_effect(sub_effect, bound_variables)]
+        if operator == 'not':
+            return [('delete', tuple(effect[1]))]
+        if operator == 'forall':
+            variables = PDDLFormulas.get_variables(effect[1])
+            return [('forall', variables,
+                     self.__compile_effect(effect[2], bound_variables | set([variable for variable, _ in variables])))]
+        if operator == 'when':
+            free_variables = dict(PDDLFormulas.get_free_variables(effect, bound_variables,
+                                                                  self.domain.predicates))
+            condition_patterns = [tuple(atom) for atom in self.__get_conjuncts(effect[1])
+                                  if atom[0] not in ('and', 'or', 'not', 'imply', '=', 'forall', 'exists')]
+            return [('when', list(free_variables.items()), effect[1], condition_patterns,
+                     self.__compile_effect(effect[2], bound_variables | set(free_variables.keys())))]
+        return [('add', tuple(effect))]
+
+    def __check_supported(self, action_name: str, formula) -> None:
+        '''Raises a ValueError if the given formula contains numeric conditions or effects.
+        '''
+        if not isinstance(formula, list) or not formula:
+            return
+        if formula[0] in self.numeric_operators:
+            raise ValueError('Action {0} uses the unsupported numeric operator {1}'.format(action_name,
+                                                                                          formula[0]))
+        for sub_formula in formula[1:]:
+            self.__check_supported(action_name, sub_formula)
+
+    def __get_effect_predicates(self, effect) -> set:
+        '''Returns the names of the predicates that are added or deleted by an effect.
+        '''
+        if not isinstance(effect, list) or not effect:
+            return set()
+        if effect[0] == 'and':
+            return set().union(*[self.__get_effect_predicates(sub_effect) for sub_effect in effect[1:]])
+        if effect[0] == 'not':
+            return {effect[1][0]}
+        if effect[0] in ('forall', 'when'):
+            return self.__get_effect_predicates(effect[2])
+        return {effect[0]}
+
+    def __extract_plan(self, state: frozenset, parents: dict) -> list:
+        '''Returns the actions leading from the initial state to the given state.
+        '''
+        plan = []
+        while parents[state] is not None:
+            state, action_string = parents[state]
+            plan.append(action_string)
+        plan.reverse()
+        return plan
+
+    @staticmethod
+    def __get_conjuncts(formula: list) -> list:
+        '''Returns the conjuncts of a (possibly nested) conjunction.
+        '''
+        if not formula:
+            return []
+        if formula[0] == 'and':
+            return [conjunct for sub_formula in formula[1:]
+                    for conjunct in GBFSPlanner.__get_conjuncts(sub_formula)]
+        return [formula]
+
+    @staticmethod
+    def __get_index(atoms) -> dict:
+        '''Returns a dictionary mapping predicate names to the given atoms
+        with that predicate and (predicate, argument position, argument)
+        triples to the atoms with that argument.
+        '''
+        index = {}
+        for atom in atoms:
+            index.setdefault(atom[0], []).append(atom)
+            for arg_idx, arg in enumerate(atom[1:], 1):
+                index.setdefault((atom[0], arg_idx, arg), []).append(atom)
+        return index
+
+    @staticmethod
+    def __get_candidates(index: dict, atom_pattern: tuple, bindings: dict) -> list:
+        '''Returns the indexed atoms that can match the given atom pattern,
+        using the most selective bound argument of the pattern.
+        '''
+        candidates = None
+        for arg_idx, arg in enumerate(atom_pattern[1:], 1):
+            value = bindings.get(arg) if arg.startswith('?') else arg
+            if value is not None:
+                arg_candidates = index.get((atom_pattern[0], arg_idx, value), [])
+                if candidates is None or len(arg_candidates) < len(candidates):
+                    candidates = arg_candidates
+        if candidates is None:
+            return index.get(atom_pattern[0], [])
+        return candidates
+
+    @staticmethod
+    def __unify(atom_pattern: tuple, atom: tuple, bindings: dict,
+                param_types: dict, objects_by_type: dict) -> dict:
+        '''Returns "bindings" extended such that the pattern matches the given atom
+        or None if the pattern cannot match the atom.
+        '''
+        if len(atom_pattern) != len(atom):
+            return None
+
+        extended_bindings = dict(bindings)
+        for arg, obj in zip(atom_pattern[1:], atom[1:]):
+            if not arg.startswith('?'):
+                if arg != obj:
+                    return None
+                continue
+
+            bound_obj = extended_bindings.get(arg)
+            if bound_obj is None:
+                if obj not in objects_by_type.get(param_types.get(arg, 'object'), ()):
+                    return None
+                extended_bindings[arg] = obj
+            elif bound_obj != obj:
+                return None
+        return extended_bindings
@@ -0,0 +1,251 @@
+import os
+import time
+import threading
+import logging
+from typing import Callable
+import pymongo as pm
+
+
+class KnowledgeBaseCache(object):
+    '''An in-process snapshot of a knowledge base collection, indexed by
+    assertion type and key and by assertion type and name.
+
+    The cache is patched with the interface's own writes. Writes made by
+    other processes are received through a MongoDB change stream; if change
+    streams are not available (e.g. on a standalone server), the version
+    stamp of the collection is polled instead and the snapshot is reloaded
+    whenever it changes.
+
+    Constructor arguments:
+    @param get_collection -- a function returning the cached pymongo collection
+    @param get_version -- a function returning the current version stamp of the collection
+    @param poll_interval -- minimum time (in seconds) between two version checks
+                            when change streams are not available
+    '''
+    def __init__(self, get_collection: Callable[[], pm.collection.Collection],
+                 get_version: Callable[[], int], poll_interval: float=1.):
+        self.__get_collection = get_collection
+        self.__get_version = get_version
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger('task.planner.kb.cache')
+
+        self.__lock = threading.RLock()
+        self.__assertions = {}
+        self.__assertion_ids = {}
+        self.__keys_by_name = {}
+        self.__version = None
+        self.__last_version_check = 0.
+        self.__stale = True
+
+        self.__pid = None
+        self.__watcher = None
+        self.__watching = False
+        self.__stop_event = threading.Event()
+
+    def get(self, assertion_type: str, key: str) -> dict:
+        '''Returns the document of the assertion with the given type and key
+        or None if the assertion is not in the knowledge base.
+
+        Keyword arguments:
+        @param assertion_type: str -- an AssertionTypes string
+        @param key: str -- a canonical assertion key
+
+        '''
+        with self.__lock:
+            self.__refresh()
+            return self.__assertions.get((assertion_type, key))
+
+    def get_assertions(self, assertion_type: str=None, name: str=None) -> list:
+        '''Returns the documents of all cached assertions of the given type and name.
+
+        Keyword arguments:
+        @param assertion_type: str -- an AssertionTypes string (default None,
+                                      in which case assertions of all types are returned)
+        @param name: str -- name of a predicate or fluent (default None,
+                            in which case assertions with any name are returned)
+
+        '''
+        with self.__lock:
+            self.__refresh()
+            assertions = []
+            for (item_type, item_name), keys in self.__keys_by_name.items():
+                if (assertion_type is None or item_type == assertion_type) and\
+                   (name is None or item_name == name):
+                    assertions.extend([self.__assertions[(item_type, key)] for key in keys])
+            return assertions
+
+    def get_names(self, assertion_type: str) -> list:
+        '''Returns the names of all cached assertions of the given type.
+
+        Keyword arguments:
+        @param assertion_type: str -- an AssertionTypes string
+
+        '''
+        with self.__lock:
+            self.__refresh()
+            return [name for (item_type, name) in self.__keys_by_name
+                    if item_type == assertion_type]
+
+    def update(self, inserted_items: list, removed_items: list, version: int) -> None:
+        '''Patches the cache with the result of a write made by the knowledge base interface.
+
+        Keyword arguments:
+        @param inserted_items: list -- documents that were inserted or replaced
+        @param removed_items: list -- documents of removed assertions
+        @param version: int -- version stamp of the collection after the write
+
+        '''
+        with self.__lock:
+            if self.__stale:
+                return
+
+            for item in inserted_items:
+                self.__put(item)
+            for item in removed_items:
+                self.__remove(item['type'], item['key'])
+
+            # if the version has advanced by more than our own write,
+            # another process has written in the meantime; unless the
+            # change stream takes care of that, we reload the snapshot
+            if self.__version is not None and version != self.__version + 1\
+               and not self.__watching:
+                self.__stale = True
+            self.__version = version
+
+    def invalidate(self) -> None:
+        '''Marks the snapshot as stale so that it is reloaded on the next read.
+        '''
+        with self.__lock:
+            self.__stale = True
+
+    def close(self) -> None:
+        '''Stops listening to the change stream of the collection.
+        '''
+        self.__stop_event.set()
+        if self.__watcher is not None and self.__watcher.is_alive():
+            self.__watcher.join()
+        self.__watcher = None
+        self.__watching = False
+
+    def __refresh(self) -> None:
+        '''Makes sure that the snapshot reflects the current state of the collection.
+        The change stream watcher is (re)started if it is not running in the current
+        process; without a change stream, the version stamp is checked at most
+        once per poll interval.
+        '''
+        if self.__pid != os.getpid():
+            self.__pid = os.getpid()
+            self.__stale = True
+            self.__start_watcher()
+
+        if not self.__stale and not self.__watching:
+            current_time = time.time()
+            if current_time - self.__last_version_check >= self.poll_interval:
+                self.__last_version_check = current_time
+                if self.__get_version() != self.__version:
+                    self.__stale = True
+
+        if self.__stale:
+            self.__reload()
+
+    def __reload(self) -> None:
+        '''Loads a new snapshot of the collection.
+        '''
+        version = self.__get_version()
+        self.__assertions = {}
+        self.__assertion_ids = {}
+        self.__keys_by_name = {}
+        for item in self.__get_collection().find({}):
+            self.__put(item)
+        self.__version = version
+        self.__last_version_check = time.time()
+        self.__stale = False
+        self.logger.debug('Loaded %d assertions', len(self.__assertions))
+
+    def __put(self, item: dict) -> None:
+        '''Adds or replaces an assertion document in the cache.
+        '''
+        item_id = (item['type'], item['key'])
+        if item_id in self.__assertions:
+            # our own writes do not return the document ids, so we keep
+            # the id of the stored document for matching deletion events
+            cached_item = self.__assertions[item_id]
+            if '_id' not in item and '_id' in cached_item:
+                item = dict(item, _id=cached_item['_id'])
+            self.__remove(*item_id)
+        self.__assertions[item_id] = item
+        if '_id' in item:
+            self.__assertion_ids[item['_id']] = item_id
+
+        name_id = (item['type'], item['name'])
+        if name_id not in self.__keys_by_name:
+            self.__keys_by_name[name_id] = {}
+        self.__keys_by_name[name_id][item['key']] = None
+
+    def __remove(self, assertion_type: str, key: str) -> None:
+        '''Removes an assertion from the cache if it is cached.
+        '''
+        item = self.__assertions.pop((assertion_type, key), None)
+        if item is None:
+            return
+
+        self.__assertion_ids.pop(item.get('_id'), None)
+        name_id = (assertion_type, item['name'])
+        self.__keys_by_name[name_id].pop(key, None)
+        if not self.__keys_by_name[name_id]:
+            del self.__keys_by_name[name_id]
+
+    def __start_watcher(self) -> None:
+        '''Starts a thread that listens to the change stream of the collection.
+        '''
+        self.__stop_event = threading.Event()
+        self.__watching = False
+        self.__watcher = threading.Thread(target=self.__watch, daemon=True)
+        self.__watcher.start()
+
+    def __watch(self) -> None:
+        '''Applies the changes received through the change stream of the collection.
+        Falls back to version polling if change streams are not supported.
+        '''
+        try:
+            collection = self.__get_collection()
+            with collection.watch(full_document='updateLookup',
+                                  max_await_time_ms=500) as change_stream:
+                with self.__lock:
+                    # changes made before the stream was opened are
+                    # only visible through a reload of the snapshot
+                    self.__watching = True
+                    self.__stale = True
+                while not self.__stop_event.is_set() and change_stream.alive:
+                    change = change_stream.try_next()
+                    if change is not None:
+                        self.__apply_change(change)
+        except Exception as exc:
+            self.logger.info('Change streams unavailable (%s); polling the knowledge base version', exc)
+        finally:
+            # changes may have been missed since the stream was closed; a snapshot
+            # loaded without the stream is already kept up to date by polling
+            with self.__lock:
+                if self.__watching:
+                    self.__watching = False
+                    self.__stale = True
+
+    def __apply_change(self, change: dict) -> None:
+        '''Patches the cache with a change stream event.
+        '''
+        with self.__lock:
+            if self.__stale:
+                return
+
+            operation = change['operationType']
+            if operation in ('insert', 'replace', 'update'):
+                item = change.get('fullDocument')
+                if item is not None and 'key' in item:
+                    self.__put(item)
+            elif operation == 'delete':
+                item_id = self.__assertion_ids.get(change['documentKey']['_id'])
+                if item_id is not None:
+                    self.__remove(*item_id)
+            else:
+                # drops, renames, and invalidations
+                self.__stale = True
@@ -1,8 +1,11 @@
+import os
+import threading
 from typing import Tuple
 import pymongo as pm
-from bson.objectid import ObjectId
 import logging
 
+from task_planner.knowledge_base_cache import KnowledgeBaseCache
+
 
 class AssertionTypes(object):
     PREDICATE = 'predicate'
@@ -97,13 +100,21 @@ class Predicate(object):
                     break
         return equal
 
+    def get_key(self) -> str:
+        '''Returns a canonical string identifying the predicate assertion
+        (see Predicate.get_assertion_key).
+        '''
+        return Predicate.get_assertion_key(self.name, self.params)
+
     def to_dict(self) -> dict:
         '''Converts the object to a dictionary with two keys - "name" and "params".
         The value of "params" is a list of PredicateParams dictionaries.
+        The dictionary additionally contains the assertion type and key.
         '''
         dict_predicate = {}
         dict_predicate['name'] = self.name
         dict_predicate['type'] = AssertionTypes.PREDICATE
+        dict_predicate['key'] = self.get_key()
         dict_predicate['params'] = []
         for param_data in self.params:
             dict_params = param_data.to_dict()
@@ -117,6 +128,22 @@ class Predicate(object):
         '''
         return (self.name, [param.to_tuple() for param in self.params])
 
+    @staticmethod
+    def get_assertion_key(name: str, params: list) -> str:
+        '''Returns a canonical string of the form "name(param_1=value_1,...)"
+        identifying an assertion of a predicate or fluent. The parameters are
+        sorted by name, so the key does not depend on the parameter order.
+
+        Keyword arguments:
+        @param name: str -- name of a predicate or fluent
+        @param params: list -- a list of PredicateParams objects
+
+        '''
+        sorted_params = sorted((str(param.name), str(param.value)) for param in params)
+        param_str = ','.join(['{0}={1}'.format(param_name, param_value)
+                              for param_name, param_value in sorted_params])
+        return '{0}({1})'.format(name, param_str)
+
     @staticmethod
     def from_tuple(tuple_predicate: Tuple[str, list]):
         '''Returns a Predicate object created from the input tuple.
@@ -190,13 +217,22 @@ class Fluent(object):
                     break
         return equal
 
+    def get_key(self) -> str:
+        '''Returns a canonical string identifying the fluent assertion
+        (see Predicate.get_assertion_key). The key does not include
+        the fluent value.
+        '''
+        return Predicate.get_assertion_key(self.name, self.params)
+
     def to_dict(self) -> dict:
         '''Converts the object to a dictionary with three keys - "name", "params", and "value".
         The value of "params" is a list of PredicateParams dictionaries.
+        The dictionary additionally contains the assertion type and key.
         '''
         dict_fluent = {}
         dict_fluent['name'] = self.name
         dict_fluent['type'] = AssertionTypes.FLUENT
+        dict_fluent['key'] = self.get_key()
         dict_fluent['value'] = self.value
         dict_fluent['params'] = []
         for param_data in self.params:
@@ -263,39 +299,151 @@ class Fluent(object):
     def __repr__(self) -> str:
         return "Fluent(" + str(self.to_dict()) + ")"
 
+class MongoClientPool(object):
+    '''A process-wide registry of pymongo clients. pymongo clients maintain
+    their own (thread-safe) connection pools, so all knowledge base interfaces
+    that connect to the same server share a single client instead of opening
+    a new connection on every request. Clients are never shared between
+    processes; after a fork, the child creates its own clients on demand.
+    '''
+    __clients = {}
+    __lock = threading.Lock()
+    __pid = os.getpid()
+
+    @classmethod
+    def get_client(cls, host: str='localhost', port: int=27017,
+                   max_pool_size: int=100) -> pm.MongoClient:
+        '''Returns a pymongo client connected to the given server, creating
+        the client if one does not exist in the current process yet.
+
+        Keyword arguments:
+        @param host: str -- host name of the MongoDB server (default "localhost")
+        @param port: int -- port of the MongoDB server (default 27017)
+        @param max_pool_size: int -- maximum number of connections in the
+                                     client's connection pool (default 100)
+
+        '''
+        with cls.__lock:
+            cls.__discard_inherited_clients()
+            client_key = (host, port, max_pool_size)
+            client = cls.__clients.get(client_key)
+            if client is None:
+                client = pm.MongoClient(host=host, port=port,
+                                        maxPoolSize=max_pool_size,
+                                        connect=False)
+                cls.__clients[client_key] = client
+            return client
+
+    @classmethod
+    def close_all(cls) -> None:
+        '''Closes all clients created by the current process.
+        '''
+        with cls.__lock:
+            cls.__discard_inherited_clients()
+            for client in cls.__clients.values():
+                client.close()
+            cls.__clients = {}
+
+    @classmethod
+    def _reset_after_fork(cls) -> None:
+        '''Forgets the clients inherited from the parent process;
+        the lock is recreated since it might have been held by
+        another thread at the time of the fork.
+        '''
+        cls.__lock = threading.Lock()
+        cls.__clients = {}
+        cls.__pid = os.getpid()
+
+    @classmethod
+    def __discard_inherited_clients(cls) -> None:
+        '''Clears the client registry if it was inherited from a parent
+        process (pymongo clients are not fork-safe, so they have to be
+        recreated rather than closed in the child).
+        '''
+        if cls.__pid != os.getpid():
+            cls.__clients = {}
+            cls.__pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=MongoClientPool._reset_after_fork)
+
+
 class KnowledgeBaseInterface(object):
     '''Defines an interface for interacting with a robot knowledge base.
 
     Constructor arguments:
     @param __kb_database_name -- name of a database in which the knowledge base will be stored
+    @param host -- host name of the MongoDB server (default "localhost")
+    @param port -- port of the MongoDB server (default 27017)
+    @param max_pool_size -- maximum number of connections to the MongoDB server
+                            shared by all interfaces in the process (default 100)
+    @param cached -- whether to serve reads from an in-process snapshot of the
+                     knowledge base instead of querying MongoDB (default False)
+    @param cache_poll_interval -- minimum time (in seconds) between two checks of
+                                  the knowledge base version if the cache cannot
+                                  use a MongoDB change stream (default 1.0)
 
     @author Alex Mitrevski
     @contact aleksandar.mitrevski@h-brs.de
 
     '''
-    def __init__(self, __kb_database_name='robot_store'):
+    __indexed_collections = set()
+    __index_lock = threading.Lock()
+
+    def __init__(self, __kb_database_name='robot_store', host='localhost',
+                 port=27017, max_pool_size=100, cached=False, cache_poll_interval=1.):
         self.__kb_database_name = __kb_database_name
+        self.__host = host
+        self.__port = port
+        self.__max_pool_size = max_pool_size
         self.__kb_collection_name = 'knowledge_base'
         self.__goal_collection_name = 'goals'
+        self.__metadata_collection_name = 'kb_metadata'
         self.logger = logging.getLogger('task.planner.kb.interface')
 
+        self.__cache = None
+        if cached:
+            self.__cache = KnowledgeBaseCache(lambda: self.__get_kb_collection(self.__kb_collection_name),
+                                              self.get_kb_version,
+                                              cache_poll_interval)
+
+    def get_kb_version(self, assertion_names: list=None) -> int:
+        '''Returns the version stamp of the knowledge base, which is
+        incremented with every write made through a knowledge base interface.
+        If a list of assertion names is given, the returned stamp only changes
+        when assertions with one of these names are written.
+
+        Keyword arguments:
+        @param assertion_names: list -- names of predicates and fluents (default None,
+                                        in which case the stamp of the whole knowledge
+                                        base is returned)
+
+        '''
+        return self.__get_collection_version(self.__kb_collection_name, assertion_names)
+
     def get_predicate_names(self) -> list:
         '''Returns a list of all stored predicate names in the knowledge base.
         '''
+        if self.__cache is not None:
+            return self.__cache.get_names(AssertionTypes.PREDICATE)
+
         collection = self.__get_kb_collection(self.__kb_collection_name)
-        predicate_cursor = collection.find({'type': AssertionTypes.PREDICATE})
-        names = list({p['name'] for p in predicate_cursor})
+        names = collection.distinct('name', {'type': AssertionTypes.PREDICATE})
         return names
 
     def get_fluent_names(self) -> list:
         '''Returns a list of all stored fluent names in the knowledge base.
         '''
+        if self.__cache is not None:
+            return self.__cache.get_names(AssertionTypes.FLUENT)
+
         collection = self.__get_kb_collection(self.__kb_collection_name)
-        fluent_cursor = collection.find({'type': AssertionTypes.FLUENT})
-        names = list({f['name'] for f in fluent_cursor})
+        names = collection.distinct('name', {'type': AssertionTypes.FLUENT})
         return names
 
-    def get_predicate_assertions(self, predicate_name: str=None) -> list:
+    def get_predicate_assertions(self, predicate_name: str=None,
+                                 excluded_names: list=None) -> list:
         '''Returns a list of Predicate objects representing all assertions
         of the given predicate in the knowledge base. If "predicate_name" is None,
         returns all predicate assertions in the knowledge base.
@@ -304,32 +452,66 @@ class KnowledgeBaseInterface(object):
         @param predicate_name: str -- name of a predicate in the knowledge base
                                       (default None, in which case all assertions
                                        are retrieved)
+        @param excluded_names: list -- names of predicates whose assertions
+                                       should not be retrieved (default None)
 
         '''
-        instances = []
-        collection = self.__get_kb_collection(self.__kb_collection_name)
-        if predicate_name:
-            pred_instance_count = collection.count_documents({'name': predicate_name})
-            if pred_instance_count == 0:
-                return []
-
-            pred_instance_cursor = collection.find({'name': predicate_name})
-            instances = [Predicate.from_dict(p) for p in pred_instance_cursor]
-        else:
-            assertion_cursor = collection.find({'type': AssertionTypes.PREDICATE})
-            instances = [Predicate.from_dict(p) for p in assertion_cursor]
+        instances = list(self.iter_predicate_assertions(predicate_name, excluded_names))
         return instances
 
-    def get_fluent_assertions(self) -> list:
-        '''Returns a list of Fluent objects representing all fluent assertions
-        in the knowledge base.
+    def get_fluent_assertions(self, fluent_name: str=None,
+                              excluded_names: list=None) -> list:
+        '''Returns a list of Fluent objects representing all assertions
+        of the given fluent in the knowledge base. If "fluent_name" is None,
+        returns all fluent assertions in the knowledge base.
+
+        Keyword arguments:
+        @param fluent_name: str -- name of a fluent in the knowledge base
+                                   (default None, in which case all assertions
+                                    are retrieved)
+        @param excluded_names: list -- names of fluents whose assertions
+                                       should not be retrieved (default None)
+
         '''
-        instances = []
-        collection = self.__get_kb_collection(self.__kb_collection_name)
-        assertion_cursor = collection.find({'type': AssertionTypes.FLUENT})
-        instances = [Fluent.from_dict(p) for p in assertion_cursor]
+        instances = list(self.iter_fluent_assertions(fluent_name, excluded_names))
         return instances
 
+    def iter_predicate_assertions(self, predicate_name: str=None,
+                                  excluded_names: list=None):
+        '''Yields Predicate objects representing the assertions of the given
+        predicate while walking the knowledge base cursor, such that the
+        assertions do not need to be held in memory at the same time.
+
+        Keyword arguments:
+        @param predicate_name: str -- name of a predicate in the knowledge base
+                                      (default None, in which case all assertions
+                                       are retrieved)
+        @param excluded_names: list -- names of predicates whose assertions
+                                       should not be retrieved (default None)
+
+        '''
+        for assertion in self.__get_assertions(AssertionTypes.PREDICATE,
+                                               predicate_name, excluded_names):
+            yield Predicate.from_dict(assertion)
+
+    def iter_fluent_assertions(self, fluent_name: str=None,
+                               excluded_names: list=None):
+        '''Yields Fluent objects representing the assertions of the given
+        fluent while walking the knowledge base cursor, such that the
+        assertions do not need to be held in memory at the same time.
+
+        Keyword arguments:
+        @param fluent_name: str -- name of a fluent in the knowledge base
+                                   (default None, in which case all assertions
+                                    are retrieved)
+        @param excluded_names: list -- names of fluents whose assertions
+                                       should not be retrieved (default None)
+
+        '''
+        for assertion in self.__get_assertions(AssertionTypes.FLUENT,
+                                               fluent_name, excluded_names):
+            yield Fluent.from_dict(assertion)
+
     def get_fluent_value(self, fluent: Tuple[str, list]) -> list:
         '''Returns the value of the given fluent in the knowledge base.
         Returns None if an assertion for the fluent is not found.
@@ -342,29 +524,56 @@ class KnowledgeBaseInterface(object):
         '''
         fluent_value = None
 
-        # we add a dummy fluent value so that we can create a fluent dictionary
+        # we add a dummy fluent value so that we can create a fluent object
         fluent_full = (fluent[0], fluent[1], -1)
-        fluent_dict = Fluent.from_tuple(fluent_full).to_dict()
-
-        collection = self.__get_kb_collection(self.__kb_collection_name)
-        fluent_cursor = collection.find({'name': fluent_dict['name']})
-        fluent_assertion = None
-        for f in fluent_cursor:
-            found = True
-            for param in f['params']:
-                if param not in fluent_dict['params']:
-                    found = False
-                    break
-            if found:
-                fluent_assertion = f
-                break
+        fluent_key = Fluent.from_tuple(fluent_full).get_key()
 
+        if self.__cache is not None:
+            fluent_assertion = self.__cache.get(AssertionTypes.FLUENT, fluent_key)
+        else:
+            collection = self.__get_kb_collection(self.__kb_collection_name)
+            fluent_assertion = collection.find_one({'key': fluent_key,
+                                                    'type': AssertionTypes.FLUENT},
+                                                   {'value': 1})
         if fluent_assertion:
             fluent_value = fluent_assertion['value']
         else:
-            self.logger.warning('Fluent %s not found', fluent_dict['name'])
+            self.logger.warning('Fluent %s not found', fluent[0])
         return fluent_value
 
+    def get_fluent_values(self, fluent_name: str, fluent_params: list) -> list:
+        '''Returns the values of several assertions of the given fluent, which are
+        retrieved from the knowledge base with a single query. The values are returned
+        in the order of the parameter lists; None is returned for fluents whose
+        assertions are not found.
+
+        Keyword arguments:
+        @param fluent_name: str -- name of a fluent
+        @param fluent_params: list -- a list of fluent parameter lists, each of which
+                                      is a list of ("name", "value") pairs
+
+        '''
+        fluent_keys = [Fluent.from_tuple((fluent_name, params, -1)).get_key()
+                       for params in fluent_params]
+
+        values = {}
+        if self.__cache is not None:
+            for key in fluent_keys:
+                fluent_assertion = self.__cache.get(AssertionTypes.FLUENT, key)
+                if fluent_assertion:
+                    values[key] = fluent_assertion['value']
+        elif fluent_keys:
+            collection = self.__get_kb_collection(self.__kb_collection_name)
+            fluent_cursor = collection.find({'key': {'$in': list(set(fluent_keys))},
+                                             'type': AssertionTypes.FLUENT},
+                                            {'key': 1, 'value': 1})
+            values = {f['key']: f['value'] for f in fluent_cursor}
+
+        missing_keys = [key for key in fluent_keys if key not in values]
+        if missing_keys:
+            self.logger.warning('Fluents %s not found', ', '.join(missing_keys))
+        return [values.get(key) for key in fluent_keys]
+
     def update_kb(self, facts_to_add: list, facts_to_remove: list) -> bool:
         '''Inserts a list of facts into the knowledge base and removes
         a list of facts from it.
@@ -441,9 +650,10 @@ class KnowledgeBaseInterface(object):
             predicate_dict = predicate_obj.to_dict()
 
             collection = self.__get_kb_collection(self.__kb_collection_name)
-            collection.replace_one({'name': predicate_name,
+            collection.replace_one({'key': predicate_dict['key'],
                                     'type': AssertionTypes.PREDICATE},
                                    predicate_dict, upsert=True)
+            self.__register_write(self.__kb_collection_name, [predicate_dict], [])
             return True
         except Exception as exc:
             self.logger.error('[update_predicate] Predicate {0} could not be updated'.format(predicate_name), exc_info=True)
@@ -505,9 +715,10 @@ class KnowledgeBaseInterface(object):
             fluent_dict = fluent_obj.to_dict()
 
             collection = self.__get_kb_collection(self.__kb_collection_name)
-            collection.replace_one({'name': fluent_name,
+            collection.replace_one({'key': fluent_dict['key'],
                                     'type': AssertionTypes.FLUENT},
                                    fluent_dict, upsert=True)
+            self.__register_write(self.__kb_collection_name, [fluent_dict], [])
             return True
         except Exception as exc:
             self.logger.error('[update_fluent] Fluent {0} could not be updated'.format(fluent_name), exc_info=True)
@@ -554,51 +765,178 @@ class KnowledgeBaseInterface(object):
         @param collection_name: str -- name of a MongoDB collection
 
         '''
-        client = pm.MongoClient()
-        db = client[self.__kb_database_name]
-        collection = db[collection_name]
+        collection = self.__get_db()[collection_name]
+
+        collection_id = (self.__host, self.__port, self.__kb_database_name, collection_name)
+        if collection_id not in KnowledgeBaseInterface.__indexed_collections:
+            with KnowledgeBaseInterface.__index_lock:
+                if collection_id not in KnowledgeBaseInterface.__indexed_collections:
+                    self.__create_indexes(collection)
+                    KnowledgeBaseInterface.__indexed_collections.add(collection_id)
         return collection
 
-    def __item_exists(self, item: dict, item_type: str, collection_name: str) -> ObjectId:
-        '''Returns True if the given predicate or fluent exists in the knowledge base.
+    def __get_db(self) -> pm.database.Database:
+        '''Returns the knowledge base database.
+        '''
+        client = MongoClientPool.get_client(self.__host, self.__port,
+                                            self.__max_pool_size)
+        return client[self.__kb_database_name]
+
+    def __get_assertions(self, assertion_type: str, name: str=None,
+                         excluded_names: list=None):
+        '''Returns an iterable over the dictionaries of all knowledge base
+        assertions of the given type (a cursor if the cache is not used).
 
         Keyword arguments:
-        @param item: dict -- a dictionary representation of a Predicate or a Fluent object
-        @param item_type: str -- an AssertionTypes string indicating whether
-                                 the item is a predicate or a fluent
+        @param assertion_type: str -- an AssertionTypes string
+        @param name: str -- name of the assertions to retrieve (default None,
+                            in which case assertions with any name are retrieved)
+        @param excluded_names: list -- names of assertions that should not
+                                       be retrieved (default None)
 
         '''
-        collection = self.__get_kb_collection(collection_name)
-        item_cursor = collection.find({'name': item['name'], 'type': item_type})
-        exists = False
-        object_id = None
-        for kb_item in item_cursor:
-            exists = True
-            for param in kb_item['params']:
-                if param not in item['params']:
-                    exists = False
-                    break
-            if exists:
-                object_id = kb_item['_id']
-                break
-        return object_id
+        if self.__cache is not None:
+            assertions = self.__cache.get_assertions(assertion_type, name)
+            if excluded_names:
+                excluded_names = set(excluded_names)
+                assertions = [a for a in assertions if a['name'] not in excluded_names]
+            return assertions
+
+        query = {'type': assertion_type}
+        if name:
+            query['name'] = name
+        elif excluded_names:
+            query['name'] = {'$nin': list(excluded_names)}
+        collection = self.__get_kb_collection(self.__kb_collection_name)
+        return collection.find(query)
+
+    def __get_collection_version(self, collection_name: str,
+                                 assertion_names: list=None) -> int:
+        '''Returns the version stamp of the given collection. Each write increments
+        both the collection version and the versions of the written assertion names;
+        the stamp of a set of assertion names is the sum of their versions.
+
+        Keyword arguments:
+        @param collection_name: str -- name of a MongoDB collection
+        @param assertion_names: list -- names of predicates and fluents (default None,
+                                        in which case the stamp of the whole
+                                        collection is returned)
+
+        '''
+        metadata_collection = self.__get_db()[self.__metadata_collection_name]
+        metadata = metadata_collection.find_one({'_id': collection_name})
+        if metadata is None:
+            return 0
+
+        if assertion_names is None:
+            return metadata['version']
+        name_versions = metadata.get('name_versions', {})
+        return sum([name_versions.get(name, 0) for name in set(assertion_names)])
+
+    def __register_write(self, collection_name: str, inserted_items: list,
+                         removed_items: list) -> None:
+        '''Increments the version stamp of a collection after a write
+        and patches the knowledge base cache with the written assertions.
+
+        Keyword arguments:
+        @param collection_name: str -- name of the written MongoDB collection
+        @param inserted_items: list -- dictionaries of the inserted or replaced assertions
+        @param removed_items: list -- dictionaries of the removed assertions
+
+        '''
+        version_increments = {'version': 1}
+        for item in inserted_items + removed_items:
+            version_increments['name_versions.{0}'.format(item['name'])] = 1
+
+        metadata_collection = self.__get_db()[self.__metadata_collection_name]
+        metadata = metadata_collection.find_one_and_update({'_id': collection_name},
+                                                           {'$inc': version_increments},
+                                                           upsert=True,
+                                                           return_document=pm.ReturnDocument.AFTER)
+        if self.__cache is not None and collection_name == self.__kb_collection_name:
+            self.__cache.update(inserted_items, removed_items, metadata['version'])
+
+    def __create_indexes(self, collection: pm.collection.Collection) -> None:
+        '''Creates the indexes used for querying the given collection: a unique
+        index on the assertion type and key, which turns existence checks,
+        upserts, and deletions into point queries, and an index on the assertion
+        name and type for retrieving all assertions of a predicate or fluent.
+        Documents stored before the introduction of assertion keys are assigned
+        keys first; such documents are removed if they repeat another keyless
+        document or an assertion that already has a key (since the index
+        could not be created otherwise).
+
+        Keyword arguments:
+        @param collection: pm.collection.Collection -- a MongoDB collection
+
+        '''
+        legacy_items = []
+        for item in collection.find({'key': {'$exists': False}}):
+            params = [PredicateParams.from_dict(param) for param in item['params']]
+            legacy_items.append((item['_id'], item.get('type'),
+                                 Predicate.get_assertion_key(item['name'], params)))
+
+        # assertions written after the introduction of keys take precedence
+        # over keyless copies, as they reflect the most recent writes
+        existing_keys = set()
+        if legacy_items:
+            legacy_keys = list({key for _, _, key in legacy_items})
+            existing_keys = {(item.get('type'), item['key'])
+                             for item in collection.find({'key': {'$in': legacy_keys}},
+                                                         {'key': 1, 'type': 1})}
+
+        key_updates = []
+        duplicate_ids = []
+        for object_id, assertion_type, key in legacy_items:
+            if (assertion_type, key) in existing_keys:
+                duplicate_ids.append(object_id)
+            else:
+                existing_keys.add((assertion_type, key))
+                key_updates.append(pm.UpdateOne({'_id': object_id},
+                                                {'$set': {'key': key}}))
+
+        if duplicate_ids:
+            self.logger.warning('Removing %d repeated assertions from %s',
+                                len(duplicate_ids), collection.name)
+            collection.delete_many({'_id': {'$in': duplicate_ids}})
+        if key_updates:
+            self.logger.info('Adding assertion keys to %d documents in %s',
+                             len(key_updates), collection.name)
+            collection.bulk_write(key_updates, ordered=False)
+
+        collection.create_index([('type', pm.ASCENDING), ('key', pm.ASCENDING)],
+                                unique=True)
+        collection.create_index([('name', pm.ASCENDING), ('type', pm.ASCENDING)])
 
     def __insert_predicates(self, predicate_list: list, collection_name: str) -> bool:
-        '''Inserts a list of predicates into the given collection.
+        '''Inserts a list of predicates into the given collection using a single
+        bulk write; predicates that already exist are not inserted again.
 
         Keyword arguments:
         @param predicate_list: list -- tuple representations of Predicate objects
         @param collection_name: pm.collection.Collection -- a MongoDB collection
 
         '''
-        for predicate_tuple in predicate_list:
-            predicate = Predicate.from_tuple(predicate_tuple)
-            predicate_dict = predicate.to_dict()
-            if not self.__item_exists(predicate_dict, AssertionTypes.PREDICATE, collection_name):
-                collection = self.__get_kb_collection(collection_name)
-                collection.insert_one(predicate_dict)
-            else:
-                self.logger.warning('Predicate %s already exists', predicate.name)
+        predicates = [Predicate.from_tuple(predicate_tuple) for predicate_tuple in predicate_list]
+        predicate_dicts = self.__get_unique_assertion_dicts(predicates, keep_last=False)
+        if not predicate_dicts:
+            return
+
+        requests = [pm.UpdateOne({'key': predicate_dict['key'],
+                                  'type': AssertionTypes.PREDICATE},
+                                 {'$setOnInsert': predicate_dict},
+                                 upsert=True)
+                    for predicate_dict in predicate_dicts]
+        collection = self.__get_kb_collection(collection_name)
+        result = collection.bulk_write(requests, ordered=False)
+        for i, predicate_dict in enumerate(predicate_dicts):
+            if i not in result.upserted_ids:
+                self.logger.warning('Predicate %s already exists', predicate_dict['name'])
+
+        if result.upserted_ids:
+            inserted_dicts = [dict(predicate_dicts[i], _id=object_id)
+                              for i, object_id in result.upserted_ids.items()]
+            self.__register_write(collection_name, inserted_dicts, [])
 
     def __remove_predicates(self, predicate_list: list, collection_name: str) -> bool:
         '''Removes a list of predicates from the given collection.
@@ -608,36 +946,39 @@ class KnowledgeBaseInterface(object):
         @param collection_name: pm.collection.Collection -- a MongoDB collection
 
         '''
-        collection = self.__get_kb_collection(collection_name)
-        for predicate_tuple in predicate_list:
-            predicate = Predicate.from_tuple(predicate_tuple)
-            predicate_dict = predicate.to_dict()
-            object_id = self.__item_exists(predicate_dict, AssertionTypes.PREDICATE, collection_name)
-            if object_id:
-                collection.delete_one({'_id': object_id})
-            else:
-                self.logger.warning('Predicate %s does not exist', predicate.name)
+        predicates = [Predicate.from_tuple(predicate_tuple) for predicate_tuple in predicate_list]
+        missing_names = self.__remove_assertions(predicates, AssertionTypes.PREDICATE,
+                                                 collection_name)
+        for predicate_name in missing_names:
+            self.logger.warning('Predicate %s does not exist', predicate_name)
 
     def __insert_fluents(self, fluent_list: list, collection_name: str) -> bool:
-        '''Inserts a list of fluents into the given collection.
-        If a fluent already exists, its value is updated.
+        '''Inserts a list of fluents into the given collection using a single
+        bulk write. If a fluent already exists, its value is updated.
 
         Keyword arguments:
         @param fluent_list: list -- tuple representations of Fluent objects
         @param collection_name: pm.collection.Collection -- a MongoDB collection
 
         '''
-        for fluent_tuple in fluent_list:
-            fluent = Fluent.from_tuple(fluent_tuple)
-            fluent_dict = fluent.to_dict()
-            collection = self.__get_kb_collection(collection_name)
-            if not self.__item_exists(fluent_dict, AssertionTypes.FLUENT, collection_name):
-                collection.insert_one(fluent_dict)
+        fluents = [Fluent.from_tuple(fluent_tuple) for fluent_tuple in fluent_list]
+        fluent_dicts = self.__get_unique_assertion_dicts(fluents, keep_last=True)
+        if not fluent_dicts:
+            return
+
+        requests = [pm.ReplaceOne({'key': fluent_dict['key'],
+                                   'type': AssertionTypes.FLUENT},
+                                  fluent_dict, upsert=True)
+                    for fluent_dict in fluent_dicts]
+        collection = self.__get_kb_collection(collection_name)
+        result = collection.bulk_write(requests, ordered=False)
+        for i, fluent_dict in enumerate(fluent_dicts):
+            if i not in result.upserted_ids:
+                self.logger.warning('Fluent %s already exists; updating the value',
+                                    fluent_dict['name'])
             else:
-                self.logger.warning('Fluent %s already exists; updating the value', fluent.name)
-                collection.replace_one({'name': fluent_dict['name'],
-                                        'params': fluent_dict['params']},
-                                       fluent_dict)
+                fluent_dict['_id'] = result.upserted_ids[i]
+        self.__register_write(collection_name, fluent_dicts, [])
 
     def __remove_fluents(self, fluent_list: list, collection_name: str) -> bool:
         '''Removes a list of fluents from the given collection.
@@ -647,12 +988,64 @@ class KnowledgeBaseInterface(object):
         @param collection_name: pm.collection.Collection -- a MongoDB collection
 
         '''
+        fluents = [Fluent.from_tuple(fluent_tuple) for fluent_tuple in fluent_list]
+        missing_names = self.__remove_assertions(fluents, AssertionTypes.FLUENT,
+                                                 collection_name)
+        for fluent_name in missing_names:
+            self.logger.warning('Fluent %s does not exist; nothing to remove', fluent_name)
+
+    def __remove_assertions(self, assertions: list, assertion_type: str,
+                            collection_name: str) -> list:
+        '''Removes the given assertions from a collection with one query
+        for the existing assertions and one deletion request. Returns
+        the names of the assertions that were not found in the collection.
+
+        Keyword arguments:
+        @param assertions: list -- a list of Predicate or Fluent objects
+        @param assertion_type: str -- an AssertionTypes string indicating whether
+                                      the assertions are predicates or fluents
+        @param collection_name: str -- name of a MongoDB collection
+
+        '''
+        assertion_dicts = [assertion.to_dict() for assertion in assertions]
+        assertion_keys = [assertion_dict['key'] for assertion_dict in assertion_dicts]
+        if not assertion_keys:
+            return []
+
         collection = self.__get_kb_collection(collection_name)
-        for fluent_tuple in fluent_list:
-            fluent = Fluent.from_tuple(fluent_tuple)
-            fluent_dict = fluent.to_dict()
-            object_id = self.__item_exists(fluent_dict, AssertionTypes.FLUENT, collection_name)
-            if object_id:
-                collection.delete_one({'_id': object_id})
-            else:
-                self.logger.warning('Fluent %s does not exist; nothing to remove', fluent.name)
+        existing_keys = {item['key'] for item in collection.find({'key': {'$in': assertion_keys},
+                                                                  'type': assertion_type},
+                                                                 {'key': 1})}
+        if existing_keys:
+            collection.delete_many({'key': {'$in': list(existing_keys)},
+                                    'type': assertion_type})
+            removed_dicts = {assertion_dict['key']: assertion_dict
+                             for assertion_dict in assertion_dicts
+                             if assertion_dict['key'] in existing_keys}
+            self.__register_write(collection_name, [], list(removed_dicts.values()))
+
+        missing_names = [assertion.name for assertion, key in zip(assertions, assertion_keys)
+                         if key not in existing_keys]
+        return missing_names
+
+    def __get_unique_assertion_dicts(self, assertions: list, keep_last: bool) -> list:
+        '''Returns dictionary representations of the given assertions such
+        that each assertion key appears only once. A warning is logged for
+        repeated assertions.
+
+        Keyword arguments:
+        @param assertions: list -- a list of Predicate or Fluent objects
+        @param keep_last: bool -- whether the last (rather than the first)
+                                  occurrence of a repeated assertion should be kept
+
+        '''
+        unique_dicts = {}
+        for assertion in assertions:
+            assertion_dict = assertion.to_dict()
+            if assertion_dict['key'] in unique_dicts:
+                self.logger.warning('%s is repeated in the list of assertions',
+                                    assertion_dict['key'])
+                if not keep_last:
+                    continue
+            unique_dicts[assertion_dict['key']] = assertion_dict
+        return list(unique_dicts.values())
@@ -1,213 +1,413 @@
-from typing import Tuple
+from typing import Tuple, Sequence
 
+from task_planner.pddl_parser import PDDLDomain
 
-class PDDLKnowledgeUtils(object):
-    @staticmethod
-    def get_ordered_param_list(params: list, param_order: dict, obj_types: dict) -> Tuple[list, dict]:
-        param_list = []
-        param_count = 0
-        updated_obj_types = dict(obj_types)
-        while param_count < len(params):
-            for param in params:
-                param_name = param_order[param_count][0]
-                param_type = param_order[param_count][1]
-                if param.name == param_name:
-                    param_list.append(param.value)
-                    param_count += 1
-                    if param_type not in updated_obj_types:
-                        updated_obj_types[param_type] = []
-
-                    if param.value not in updated_obj_types[param_type]:
-                        updated_obj_types[param_type].append(param.value)
-                    break
-        return param_list, updated_obj_types
 
+class ObjectTypeRegistry(object):
+    '''An accumulator of the objects that appear in a set of assertions,
+    grouped by object type. The objects of each type are kept in an ordered set,
+    such that membership checks and insertions take constant time, while the
+    insertion order (and thus the generated problem description) is deterministic.
+    '''
+    def __init__(self):
+        self.__objects = {}
 
-class PDDLPredicateLibrary(object):
-    @staticmethod
-    def get_assertion_param_list(predicate_name: str, predicate_params: list, obj_types: dict) -> Tuple[list, dict]:
-        ordered_param_list, updated_obj_types = getattr(PDDLPredicateLibrary, predicate_name)(predicate_params, obj_types)
-        return ordered_param_list, updated_obj_types
+    def add(self, obj_type: str, obj: str) -> None:
+        '''Registers an object of the given type (if it is not already registered).
 
-    @staticmethod
-    def empty_gripper(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: ('bot', 'robot')}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+        Keyword arguments:
+        @param obj_type: str -- an object type
+        @param obj: str -- name of an object
 
-    @staticmethod
-    def holding(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: 'bot', 1: 'load'}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+        '''
+        if obj_type not in self.__objects:
+            self.__objects[obj_type] = {}
+        self.__objects[obj_type][obj] = None
 
-    @staticmethod
-    def requested(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: ('bot', 'robot'), 1: ('elevator', 'elevator')}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+    def contains(self, obj_type: str, obj: str) -> bool:
+        '''Returns True if the given object is registered under the given type.
 
-    @staticmethod
-    def arrived(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: ('elevator', 'elevator')}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+        Keyword arguments:
+        @param obj_type: str -- an object type
+        @param obj: str -- name of an object
 
-    @staticmethod
-    def elevator_at(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: ('elevator', 'elevator'), 1: ('loc', 'location')}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+        '''
+        return obj_type in self.__objects and obj in self.__objects[obj_type]
 
-class PDDLFluentLibrary(object):
-    @staticmethod
-    def get_assertion_param_list(fluent_name: str, fluent_params: list,
-                                 fluent_value: str, obj_types: dict) -> Tuple[list, dict]:
-        ordered_param_list, obj_types = getattr(PDDLFluentLibrary, fluent_name)(fluent_params,
-                                                                                obj_types,
-                                                                                fluent_value)
-        return ordered_param_list, obj_types
+    def get_objects(self, obj_type: str) -> list:
+        '''Returns the objects of the given type in insertion order.
 
-    @staticmethod
-    def robot_at(params: list, obj_types: dict, fluent_value: str) -> Tuple[list, dict]:
-        param_order = {0: ('bot', 'robot')}
-        ordered_param_list, updated_obj_types = PDDLKnowledgeUtils.get_ordered_param_list(params,
-                                                                                          param_order,
-                                                                                          obj_types)
-        if 'location' in updated_obj_types:
-            if fluent_value not in updated_obj_types['location']:
-                updated_obj_types['location'].append(fluent_value)
-        else:
-            updated_obj_types['location'] = [fluent_value]
-        return ordered_param_list, updated_obj_types
+        Keyword arguments:
+        @param obj_type: str -- an object type
 
-    @staticmethod
-    def robot_in(params: list, obj_types: dict, fluent_value: str) -> Tuple[list, dict]:
-        param_order = {0: ('bot', 'robot')}
-        ordered_param_list, updated_obj_types = PDDLKnowledgeUtils.get_ordered_param_list(params,
-                                                                                          param_order,
-                                                                                          obj_types)
-        if 'elevator' in updated_obj_types:
-            if fluent_value not in updated_obj_types['elevator']:
-                updated_obj_types['elevator'].append(fluent_value)
-        else:
-            updated_obj_types['elevator'] = [fluent_value]
-        return ordered_param_list, updated_obj_types
+        '''
+        return list(self.__objects.get(obj_type, {}))
 
-    @staticmethod
-    def load_at(params: list, obj_types: dict, fluent_value: str) -> Tuple[list, dict]:
-        param_order = {0: ('load', 'load')}
-        ordered_param_list, updated_obj_types = PDDLKnowledgeUtils.get_ordered_param_list(params,
-                                                                                          param_order,
-                                                                                          obj_types)
-        if 'location' in updated_obj_types:
-            if fluent_value not in updated_obj_types['location']:
-                updated_obj_types['location'].append(fluent_value)
-        else:
-            updated_obj_types['location'] = [fluent_value]
-        return ordered_param_list, updated_obj_types
+    def items(self):
+        '''Yields (object type, list of objects) pairs in insertion order.
+        '''
+        for obj_type, objects in self.__objects.items():
+            yield obj_type, list(objects)
 
-    @staticmethod
-    def load_in(params: list, obj_types: dict, fluent_value: str) -> Tuple[list, dict]:
-        param_order = {0: ('load', 'load')}
-        ordered_param_list, updated_obj_types = PDDLKnowledgeUtils.get_ordered_param_list(params,
-                                                                                          param_order,
-                                                                                          obj_types)
-        if 'elevator' in updated_obj_types:
-            if fluent_value not in updated_obj_types['elevator']:
-                updated_obj_types['elevator'].append(fluent_value)
-        else:
-            updated_obj_types['elevator'] = [fluent_value]
-        return ordered_param_list, updated_obj_types
+    def __contains__(self, obj_type: str) -> bool:
+        return obj_type in self.__objects
 
-    @staticmethod
-    def robot_floor(params: list, obj_types: dict, fluent_value: str) -> Tuple[list, dict]:
-        param_order = {0: ('bot', 'robot')}
-        ordered_param_list, updated_obj_types = PDDLKnowledgeUtils.get_ordered_param_list(params,
-                                                                                          param_order,
-                                                                                          obj_types)
-        if 'floor' in updated_obj_types:
-            if fluent_value not in updated_obj_types['floor']:
-                updated_obj_types['floor'].append(fluent_value)
-        else:
-            updated_obj_types['floor'] = [fluent_value]
-        return ordered_param_list, updated_obj_types
+    def __len__(self) -> int:
+        return sum([len(objects) for objects in self.__objects.values()])
 
-    @staticmethod
-    def load_floor(params: list, obj_types: dict, fluent_value: str) -> Tuple[list, dict]:
-        param_order = {0: ('load', 'load')}
-        ordered_param_list, updated_obj_types = PDDLKnowledgeUtils.get_ordered_param_list(params,
-                                                                                          param_order,
-                                                                                          obj_types)
-        if 'floor' in updated_obj_types:
-            if fluent_value not in updated_obj_types['floor']:
-                updated_obj_types['floor'].append(fluent_value)
-        else:
-            updated_obj_types['floor'] = [fluent_value]
-        return ordered_param_list, updated_obj_types
 
-    @staticmethod
-    def location_floor(params: list, obj_types: dict, fluent_value: str) -> Tuple[list, dict]:
-        param_order = {0: ('loc', 'location')}
-        ordered_param_list, updated_obj_types = PDDLKnowledgeUtils.get_ordered_param_list(params,
-                                                                                          param_order,
-                                                                                          obj_types)
-        if 'floor' in updated_obj_types:
-            if fluent_value not in updated_obj_types['floor']:
-                updated_obj_types['floor'].append(fluent_value)
-        else:
-            updated_obj_types['floor'] = [fluent_value]
-        return ordered_param_list, updated_obj_types
+class AssertionTemplate(object):
+    '''A precompiled description of how the assertions with a given name
+    are rendered in a PDDL problem. The parameter slots are resolved once
+    (when the template is created), such that rendering an assertion
+    only requires one lookup per parameter.
+
+    Constructor arguments:
+    @param name -- name of the predicate or fluent
+    @param params -- a list of (parameter name, parameter type) pairs
+                     in the order in which the parameters appear in the domain
+    @param value_type -- type of the fluent value if the value is an object
+                         (default None, in which case the value is not registered
+                         as an object)
+    @param numeric -- whether the assertion is a numeric fluent, namely
+                      whether it is rendered as "(= (name params) value)"
+    '''
+    __slots__ = ('name', 'param_count', 'param_names', 'param_types', 'slots', 'value_type', 'numeric')
+
+    def __init__(self, name: str, params: Sequence[Tuple[str, str]],
+                 value_type: str=None, numeric: bool=False):
+        self.name = name
+        self.param_count = len(params)
+        self.param_names = tuple([param_name for param_name, _ in params])
+        self.param_types = tuple([param_type for _, param_type in params])
+        self.value_type = value_type
+        self.numeric = numeric
+
+        # parameters are looked up by name; if the knowledge base uses the
+        # parameter type as a name instead (e.g. "robot" instead of "bot"),
+        # the type can be used for the lookup as long as it is unambiguous
+        self.slots = {}
+        for slot_idx, (param_name, param_type) in enumerate(params):
+            if self.param_types.count(param_type) == 1:
+                self.slots[param_type] = slot_idx
+        for slot_idx, (param_name, _) in enumerate(params):
+            self.slots[param_name] = slot_idx
+
+    def get_ordered_param_list(self, params: list, obj_types: ObjectTypeRegistry) -> list:
+        '''Returns the values of the given parameters in the order defined by
+        the template and registers each value under its type in "obj_types"
+        (which is modified in place). Raises a ValueError if any of the
+        parameters defined by the template is not given.
+
+        Keyword arguments:
+        @param params: list -- a list of PredicateParams objects
+        @param obj_types: ObjectTypeRegistry -- object type accumulator
+
+        '''
+        param_list = [None] * self.param_count
+        for param in params:
+            slot_idx = self.slots[param.name]
+            param_list[slot_idx] = param.value
+            obj_types.add(self.param_types[slot_idx], param.value)
+
+        if None in param_list:
+            given_params = ','.join(['{0}={1}'.format(param.name, param.value) for param in params])
+            missing_params = [param_name for param_name, param_value
+                              in zip(self.param_names, param_list)
+                              if param_value is None]
+            raise ValueError('Assertion {0}({1}) is missing the parameter(s) {2}'.format(self.name,
+                                                                                        given_params,
+                                                                                        ', '.join(missing_params)))
+        return param_list
+
+    def get_typed_args(self, params: list, value: str=None) -> list:
+        '''Returns the objects appearing in an assertion with the given parameters
+        as (type, object) pairs; the parameters are ordered as in the template and
+        the value of an object-valued fluent is appended as the last pair.
+
+        Keyword arguments:
+        @param params: list -- a list of PredicateParams objects
+        @param value: str -- value of a fluent (default None for predicates)
+
+        '''
+        typed_args = [None] * self.param_count
+        for param in params:
+            slot_idx = self.slots[param.name]
+            typed_args[slot_idx] = (self.param_types[slot_idx], param.value)
+        if value is not None and self.value_type is not None and not self.numeric:
+            typed_args.append((self.value_type, value))
+        return typed_args
+
+    def get_atom(self, params: list, obj_types: ObjectTypeRegistry, value: str=None) -> tuple:
+        '''Returns the atom of an assertion with the given parameters as a tuple
+        of the form (name, param_1, ..., param_n); the value of an object-valued
+        fluent is appended as the last argument, while the atom of a numeric
+        fluent does not include the value.
+
+        Keyword arguments:
+        @param params: list -- a list of PredicateParams objects
+        @param obj_types: ObjectTypeRegistry -- object type accumulator
+        @param value: str -- value of a fluent (default None for predicates)
+
+        '''
+        atom = [self.name] + self.get_ordered_param_list(params, obj_types)
+        if value is not None and not self.numeric:
+            if self.value_type is not None:
+                obj_types.add(self.value_type, value)
+            atom.append(value)
+        return tuple(atom)
+
+    def render(self, params: list, obj_types: ObjectTypeRegistry, value: str=None) -> str:
+        '''Returns an :init entry for an assertion with the given parameters;
+        predicates (without a value) are rendered as "(name param_1 ... param_n)",
+        object fluents as "(name param_1 ... param_n value)", and numeric fluents
+        as "(= (name param_1 ... param_n) value)".
+
+        Keyword arguments:
+        @param params: list -- a list of PredicateParams objects
+        @param obj_types: ObjectTypeRegistry -- object type accumulator
+        @param value: str -- value of a fluent (default None for predicates)
+
+        '''
+        param_str = ' '.join(self.get_ordered_param_list(params, obj_types))
+        if value is None:
+            return '        ({0} {1})\n'.format(self.name, param_str)
+
+        if self.numeric:
+            return '        (= ({0} {1}) {2})\n'.format(self.name, param_str, value)
+
+        if self.value_type is not None:
+            obj_types.add(self.value_type, value)
+        return '        ({0} {1} {2})\n'.format(self.name, param_str, value)
 
     @staticmethod
-    def elevator_floor(params: list, obj_types: dict, fluent_value: str) -> Tuple[list, dict]:
-        param_order = {0: ('elevator', 'elevator')}
-        ordered_param_list, updated_obj_types = PDDLKnowledgeUtils.get_ordered_param_list(params,
-                                                                                          param_order,
-                                                                                          obj_types)
-        if 'floor' in updated_obj_types:
-            if fluent_value not in updated_obj_types['floor']:
-                updated_obj_types['floor'].append(fluent_value)
-        else:
-            updated_obj_types['floor'] = [fluent_value]
-        return ordered_param_list, updated_obj_types
+    def compile_table(param_orders: dict, value_types: dict=None, numeric: bool=False) -> dict:
+        '''Returns a dictionary mapping assertion names to AssertionTemplate objects.
+
+        Keyword arguments:
+        @param param_orders: dict -- a dictionary mapping assertion names to lists
+                                     of (parameter name, parameter type) pairs
+        @param value_types: dict -- a dictionary mapping fluent names to value types (default None)
+        @param numeric: bool -- whether the assertions are numeric fluents (default False)
+
+        '''
+        value_types = value_types or {}
+        return {name: AssertionTemplate(name, params, value_types.get(name), numeric)
+                for name, params in param_orders.items()}
 
     @staticmethod
-    def destination_floor(params: list, obj_types: dict, fluent_value: str) -> Tuple[list, dict]:
-        param_order = {0: ('elevator', 'elevator')}
-        ordered_param_list, updated_obj_types = PDDLKnowledgeUtils.get_ordered_param_list(params,
-                                                                                          param_order,
-                                                                                          obj_types)
-        if 'floor' in updated_obj_types:
-            if fluent_value not in updated_obj_types['floor']:
-                updated_obj_types['floor'].append(fluent_value)
-        else:
-            updated_obj_types['floor'] = [fluent_value]
-        return ordered_param_list, updated_obj_types
+    def compile_fluent_table(predicates: dict) -> dict:
+        '''Returns a dictionary mapping predicate names to templates of object-valued
+        fluents, namely fluents whose value takes the last slot of the predicate.
 
+        Keyword arguments:
+        @param predicates: dict -- a dictionary mapping predicate names to lists
+                                   of (parameter name, parameter type) pairs
+
+        '''
+        return {name: AssertionTemplate(name, params[:-1], value_type=params[-1][1])
+                for name, params in predicates.items() if params}
+
+
+class PDDLKnowledgeModel(object):
+    '''A mapping between knowledge base assertions and the predicates and
+    functions of a PDDL domain. The rendering templates are generated once
+    from the domain description:
+    * predicate assertions are rendered through the domain predicates
+    * fluent assertions whose name is a domain predicate are object-valued,
+      such that their value takes the last slot of the predicate
+    * fluent assertions whose name is a domain function are numeric
+
+    Constructor arguments:
+    @param predicate_templates -- a dictionary mapping predicate names to AssertionTemplate objects
+    @param fluent_templates -- a dictionary mapping fluent names to AssertionTemplate objects
+    '''
+    def __init__(self, predicate_templates: dict, fluent_templates: dict):
+        self.predicate_templates = predicate_templates
+        self.fluent_templates = fluent_templates
 
-class PDDLNumericFluentLibrary(object):
     @staticmethod
-    def get_assertion_param_list(fluent_name: str, fluent_params: list, obj_types: dict) -> Tuple[list, dict]:
-        ordered_param_list, obj_types = getattr(PDDLNumericFluentLibrary, fluent_name)(fluent_params, obj_types)
-        return ordered_param_list, obj_types
+    def from_domain(domain: PDDLDomain):
+        '''Returns a knowledge model for the given domain; assertions that
+        are not defined in the domain are rendered using the default tables
+        of PDDLPredicateLibrary, PDDLFluentLibrary, and PDDLNumericFluentLibrary.
+
+        Keyword arguments:
+        @param domain: PDDLDomain -- a parsed domain description
+
+        '''
+        predicates = dict(PDDLPredicateLibrary.param_orders)
+        predicates.update(domain.predicates)
+
+        predicate_templates = AssertionTemplate.compile_table(predicates)
+        fluent_templates = dict(PDDLNumericFluentLibrary.templates)
+        fluent_templates.update(PDDLFluentLibrary.templates)
+        fluent_templates.update(AssertionTemplate.compile_table(domain.functions, numeric=True))
+        fluent_templates.update(AssertionTemplate.compile_fluent_table(predicates))
+        return PDDLKnowledgeModel(predicate_templates, fluent_templates)
 
     @staticmethod
-    def robot_floor(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: ('bot', 'robot')}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+    def from_domain_file(domain_file_name: str):
+        '''Returns a knowledge model for the domain described in the given file.
+
+        Keyword arguments:
+        @param domain_file_name: str -- path of a PDDL domain file
+
+        '''
+        return PDDLKnowledgeModel.from_domain(PDDLDomain.from_file(domain_file_name))
 
     @staticmethod
-    def load_floor(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: ('load', 'load')}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+    def get_default():
+        '''Returns a knowledge model that only uses the default tables.
+        '''
+        return PDDLKnowledgeModel.from_domain(PDDLDomain())
+
+    def get_predicate_args(self, assertion) -> list:
+        '''Returns the objects of the given predicate assertion as (type, object)
+        pairs (see AssertionTemplate.get_typed_args).
+
+        Keyword arguments:
+        @param assertion -- a Predicate object
+
+        '''
+        return self.predicate_templates[assertion.name].get_typed_args(assertion.params)
+
+    def get_fluent_args(self, assertion) -> list:
+        '''Returns the objects of the given fluent assertion (including
+        the value of an object-valued fluent) as (type, object) pairs
+        (see AssertionTemplate.get_typed_args).
+
+        Keyword arguments:
+        @param assertion -- a Fluent object
+
+        '''
+        return self.fluent_templates[assertion.name].get_typed_args(assertion.params,
+                                                                 assertion.value)
+
+    def get_predicate_atom(self, assertion, obj_types: ObjectTypeRegistry) -> tuple:
+        '''Returns the atom of the given predicate assertion
+        (see AssertionTemplate.get_atom).
+
+        Keyword arguments:
+        @param assertion -- a Predicate object
+        @param obj_types: ObjectTypeRegistry -- object type accumulator
+
+        '''
+        return self.predicate_templates[assertion.name].get_atom(assertion.params, obj_types)
+
+    def get_fluent_atom(self, assertion, obj_types: ObjectTypeRegistry) -> tuple:
+        '''Returns the atom of the given fluent assertion
+        (see AssertionTemplate.get_atom).
+
+        Keyword arguments:
+        @param assertion -- a Fluent object
+        @param obj_types: ObjectTypeRegistry -- object type accumulator
+
+        '''
+        return self.fluent_templates[assertion.name].get_atom(assertion.params, obj_types,
+                                                           assertion.value)
+
+    def is_numeric_fluent(self, fluent_name: str) -> bool:
+        '''Returns True if the fluent with the given name is numeric.
+
+        Keyword arguments:
+        @param fluent_name: str -- name of a fluent
+
+        '''
+        return self.fluent_templates[fluent_name].numeric
+
+    def render_predicate(self, assertion, obj_types: ObjectTypeRegistry) -> str:
+        '''Returns an :init entry for the given predicate assertion.
+
+        Keyword arguments:
+        @param assertion -- a Predicate object
+        @param obj_types: ObjectTypeRegistry -- object type accumulator
+
+        '''
+        return self.predicate_templates[assertion.name].render(assertion.params, obj_types)
+
+    def render_fluent(self, assertion, obj_types: ObjectTypeRegistry) -> str:
+        '''Returns an :init entry for the given fluent assertion.
+
+        Keyword arguments:
+        @param assertion -- a Fluent object
+        @param obj_types: ObjectTypeRegistry -- object type accumulator
+
+        '''
+        return self.fluent_templates[assertion.name].render(assertion.params, obj_types,
+                                                         assertion.value)
+
+
+class PDDLPredicateLibrary(object):
+    '''Default parameter orders of predicate assertions; used for
+    assertions that are not defined in the planning domain.
+    '''
+    param_orders = {
+        'empty_gripper': [('bot', 'robot')],
+        'holding': [('bot', 'robot'), ('load', 'load')],
+        'requested': [('bot', 'robot'), ('elevator', 'elevator')],
+        'arrived': [('elevator', 'elevator')],
+        'elevator_at': [('elevator', 'elevator'), ('loc', 'location')]
+    }
+    templates = AssertionTemplate.compile_table(param_orders)
 
     @staticmethod
-    def location_floor(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: ('loc', 'location')}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+    def get_assertion_param_list(predicate_name: str, predicate_params: list, obj_types: ObjectTypeRegistry) -> Tuple[list, ObjectTypeRegistry]:
+        template = PDDLPredicateLibrary.templates[predicate_name]
+        return template.get_ordered_param_list(predicate_params, obj_types), obj_types
+
+
+class PDDLFluentLibrary(object):
+    '''Default parameter orders and value types of object-valued fluent
+    assertions; used for assertions that are not defined in the planning domain.
+    '''
+    param_orders = {
+        'robot_at': [('bot', 'robot')],
+        'robot_in': [('bot', 'robot')],
+        'load_at': [('load', 'load')],
+        'load_in': [('load', 'load')],
+        'robot_floor': [('bot', 'robot')],
+        'load_floor': [('load', 'load')],
+        'location_floor': [('loc', 'location')],
+        'elevator_floor': [('elevator', 'elevator')],
+        'destination_floor': [('elevator', 'elevator')]
+    }
+    value_types = {
+        'robot_at': 'location',
+        'robot_in': 'elevator',
+        'load_at': 'location',
+        'load_in': 'elevator',
+        'robot_floor': 'floor',
+        'load_floor': 'floor',
+        'location_floor': 'floor',
+        'elevator_floor': 'floor',
+        'destination_floor': 'floor'
+    }
+    templates = AssertionTemplate.compile_table(param_orders, value_types)
 
     @staticmethod
-    def elevator_floor(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: ('elevator', 'elevator')}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+    def get_assertion_param_list(fluent_name: str, fluent_params: list,
+                                 fluent_value: str, obj_types: ObjectTypeRegistry) -> Tuple[list, ObjectTypeRegistry]:
+        template = PDDLFluentLibrary.templates[fluent_name]
+        ordered_param_list = template.get_ordered_param_list(fluent_params, obj_types)
+        obj_types.add(template.value_type, fluent_value)
+        return ordered_param_list, obj_types
+
+
+class PDDLNumericFluentLibrary(object):
+    '''Default parameter orders of numeric fluent assertions; used for
+    assertions that are not defined in the planning domain.
+    '''
+    param_orders = {
+        'robot_floor': [('bot', 'robot')],
+        'load_floor': [('load', 'load')],
+        'location_floor': [('loc', 'location')],
+        'elevator_floor': [('elevator', 'elevator')],
+        'destination_floor': [('elevator', 'elevator')]
+    }
+    templates = AssertionTemplate.compile_table(param_orders, numeric=True)
 
     @staticmethod
-    def destination_floor(params: list, obj_types: dict) -> Tuple[list, dict]:
-        param_order = {0: ('elevator', 'elevator')}
-        return PDDLKnowledgeUtils.get_ordered_param_list(params, param_order, obj_types)
+    def get_assertion_param_list(fluent_name: str, fluent_params: list, obj_types: ObjectTypeRegistry) -> Tuple[list, ObjectTypeRegistry]:
+        template = PDDLNumericFluentLibrary.templates[fluent_name]
+        return template.get_ordered_param_list(fluent_params, obj_types), obj_types
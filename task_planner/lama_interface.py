@@ -1,9 +1,10 @@
 import os
 from os import listdir
 from os.path import join
-from typing import Tuple, Sequence
+from typing import Tuple, Sequence, Callable
 import uuid
-import subprocess
+import time
+import asyncio
 import numpy as np
 import logging
 
@@ -14,18 +15,44 @@ from ropod.structs.area import Area
 from task_planner.planner_interface import TaskPlannerInterface
 from task_planner.knowledge_base_interface import Predicate
 from task_planner.action_models import ActionModelLibrary
-from task_planner.knowledge_models import PDDLPredicateLibrary, PDDLFluentLibrary,\
-                                          PDDLNumericFluentLibrary
+from task_planner.translation_cache import TranslationCache
+from task_planner.plan_result import PlanResult, ResourceUsage, PlanStatistics
 
 
 class LAMAInterface(TaskPlannerInterface):
+    '''An interface to Fast Downward (LAMA).
+
+    Constructor arguments:
+    @param kb_database_name -- name of the knowledge base database
+    @param domain_file -- path of the planning domain file
+    @param planner_cmd -- planner command (see the README)
+    @param plan_file_path -- directory under which the request directories are created
+    @param debug -- whether to run the planner in debug mode
+    @param io_backend -- one of the names in "io_backends"
+    @param translation_cache -- a TranslationCache object; if given, the translation
+                                of the problem is run separately from the search and
+                                reused for problems that only differ in their goals
+                                (default None, in which case the planner command is
+                                run as is)
+    @param kb_args -- further TaskPlannerInterface arguments, e.g. "planner_timeout"
+                      (in seconds) and "planner_memory_limit" (in bytes)
+    '''
     _plan_file_name = 'plan.txt'
+    _sas_file_name = 'output.sas'
+    engine_name = 'lama'
+
+    # interval (in seconds) at which the request directory
+    # is polled for new plans in anytime mode
+    anytime_poll_interval = 0.05
 
     def __init__(self, kb_database_name, domain_file,
-                 planner_cmd, plan_file_path, debug=False):
+                 planner_cmd, plan_file_path, debug=False,
+                 io_backend='disk', translation_cache: TranslationCache=None,
+                 **kb_args):
         super(LAMAInterface, self).__init__(kb_database_name, domain_file,
                                             planner_cmd, plan_file_path,
-                                            debug)
+                                            debug, io_backend, **kb_args)
+        self.translation_cache = translation_cache
         self.logger = logging.getLogger('task.planner')
 
     def plan(self, task_request: TaskRequest, robot: str, task_goals: list=None):
@@ -38,191 +65,337 @@ class LAMAInterface(TaskPlannerInterface):
         # TODO: check if there are already goals in the knowledge base and,
         # if yes, add them to the task_goals list
 
-        predicate_task_goals = []
-        for task_goal in task_goals:
-            if isinstance(task_goal, Predicate):
-                predicate_task_goals.append(task_goal)
-            elif isinstance(task_goal, tuple):
-                predicate_task_goals.append(Predicate.from_tuple(task_goal))
-            elif isinstance(task_goal, dict):
-                predicate_task_goals.append(Predicate.from_dict(task_goal))
-            else:
-                raise Exception('Invalid type to task_goal encountered')
-
-        kb_predicate_assertions = self.kb_interface.get_predicate_assertions()
-        kb_fluent_assertions = self.kb_interface.get_fluent_assertions()
-
-        self.logger.info('Generating problem file')
-        problem_file = self.generate_problem_file(kb_predicate_assertions,
-                                                  kb_fluent_assertions,
-                                                  predicate_task_goals)
+        predicate_task_goals = self.get_goal_predicates(task_goals)
+        statistics = PlanStatistics()
 
-        planner_cmd = self.planner_cmd.replace('PROBLEM', problem_file)
-        planner_cmd = planner_cmd.replace('PLAN-FILE', join(self.plan_file_path,
-                                                            self._plan_file_name))
-        planner_cmd_elements = planner_cmd.split()
+        # the problem and plan files are written to a private directory,
+        # which is removed once the plans have been parsed
+        request_dir = self.create_request_dir()
+        try:
+            self.logger.info('Generating problem file')
+            problem_file = self.__write_request_problem(predicate_task_goals, request_dir,
+                                                        robot, statistics)
 
-        self.logger.info('Planning task...')
-        subprocess.run(planner_cmd_elements)
-        self.logger.info('Planning finished')
+            cache_key, plan = self.get_cached_plan(problem_file)
+            if plan is not None:
+                self.logger.info('Plan for task %s and robot %s found in the plan cache',
+                                 task_request.load_type, robot)
+                return self.export_result(self.get_plan_result(True, plan, statistics))
 
-        self.logger.info('Parsing plans...')
-        plan_found, plan = self.parse_plan(task_request.load_type, robot)
+            with statistics.time_stage('search'):
+                problem, action_strings = self.get_template_plan(problem_file)
+            if action_strings is not None:
+                self.logger.info('Plan for task %s and robot %s instantiated from a plan template',
+                                 task_request.load_type, robot)
+                plan = self.__get_plan(action_strings, statistics)
+                self.cache_plan(cache_key, True, plan)
+                return self.export_result(self.get_plan_result(True, plan, statistics,
+                                                               plan_cost=len(action_strings)))
 
-        self.logger.info('Removing problem file...')
-        os.remove(problem_file)
+            # the planner is run in the request directory since Fast Downward
+            # writes intermediate files (e.g. output.sas) to its working directory
+            self.logger.info('Planning task...')
+            planner_cmd_elements, translation_usage = self.__prepare_planner(problem_file, request_dir,
+                                                                             statistics)
+            search_usage = self.run_planner(planner_cmd_elements, cwd=request_dir)
+            statistics.add_planner_usage(search_usage)
+            self.logger.info('Planning finished')
+
+            self.logger.info('Parsing plans...')
+            plan_found, plan, action_strings, plan_cost = self.__parse_plans(task_request.load_type,
+                                                                             robot, request_dir,
+                                                                             statistics)
+            self.cache_plan(cache_key, plan_found, plan)
+            self.add_plan_template(problem, plan_found, action_strings)
+        finally:
+            self.logger.info('Removing request directory...')
+            self.remove_request_dir(request_dir)
         self.logger.info('Planner done')
 
-        return plan_found, plan
+        return self.export_result(self.get_plan_result(plan_found, plan, statistics,
+                                                       ResourceUsage.combine([translation_usage,
+                                                                              search_usage]),
+                                                       plan_cost))
+
+    async def plan_async(self, task_request: TaskRequest, robot: str, task_goals: list=None):
+        '''Asynchronous version of "plan". The knowledge base is read in
+        the default executor of the event loop and the planner is run as
+        an asyncio subprocess; if the calling task is cancelled, the planner
+        process tree is killed and the request directory removed.
+        '''
+        predicate_task_goals = self.get_goal_predicates(task_goals)
+        statistics = PlanStatistics()
+
+        request_dir = self.create_request_dir()
+        try:
+            self.logger.info('Generating problem file')
+            problem_file = await self.run_in_executor(self.__write_request_problem,
+                                                      predicate_task_goals, request_dir,
+                                                      robot, statistics)
+
+            cache_key, plan = await self.run_in_executor(self.get_cached_plan, problem_file)
+            if plan is not None:
+                self.logger.info('Plan for task %s and robot %s found in the plan cache',
+                                 task_request.load_type, robot)
+                return self.export_result(self.get_plan_result(True, plan, statistics))
+
+            with statistics.time_stage('search'):
+                problem, action_strings = await self.run_in_executor(self.get_template_plan,
+                                                                     problem_file)
+            if action_strings is not None:
+                self.logger.info('Plan for task %s and robot %s instantiated from a plan template',
+                                 task_request.load_type, robot)
+                plan = await self.run_in_executor(self.__get_plan, action_strings, statistics)
+                self.cache_plan(cache_key, True, plan)
+                return self.export_result(self.get_plan_result(True, plan, statistics,
+                                                               plan_cost=len(action_strings)))
+
+            self.logger.info('Planning task...')
+            planner_cmd_elements, translation_usage = await self.__prepare_planner_async(problem_file,
+                                                                                         request_dir,
+                                                                                         statistics)
+            search_usage = await self.run_planner_async(planner_cmd_elements, cwd=request_dir)
+            statistics.add_planner_usage(search_usage)
+            self.logger.info('Planning finished')
+
+            self.logger.info('Parsing plans...')
+            plan_found, plan, action_strings, plan_cost = await self.run_in_executor(self.__parse_plans,
+                                                                                     task_request.load_type,
+                                                                                     robot, request_dir,
+                                                                                     statistics)
+            self.cache_plan(cache_key, plan_found, plan)
+            await self.run_in_executor(self.add_plan_template, problem,
+                                       plan_found, action_strings)
+        finally:
+            self.logger.info('Removing request directory...')
+            self.remove_request_dir(request_dir)
+        self.logger.info('Planner done')
+
+        return self.export_result(self.get_plan_result(plan_found, plan, statistics,
+                                                       ResourceUsage.combine([translation_usage,
+                                                                              search_usage]),
+                                                       plan_cost))
+
+    def plan_anytime(self, task_request: TaskRequest, robot: str, task_goals: list=None,
+                     stop_condition: Callable[[list, float, float], bool]=None,
+                     plan_callback: Callable[[list, float], None]=None) -> PlanResult:
+        '''Blocking version of "plan_anytime_async".
+        '''
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.plan_anytime_async(task_request, robot, task_goals,
+                                                                   stop_condition, plan_callback))
+        finally:
+            loop.close()
+
+    async def plan_anytime_async(self, task_request: TaskRequest, robot: str, task_goals: list=None,
+                                 stop_condition: Callable[[list, float, float], bool]=None,
+                                 plan_callback: Callable[[list, float], None]=None) -> PlanResult:
+        '''Plans in anytime mode and returns the cheapest plan found before
+        the planner was stopped as a PlanResult (with the cost of the plan).
+
+        Every plan written by the planner is passed to "plan_callback" as soon
+        as it has been written; "stop_condition" then decides whether the planner
+        should be stopped (in which case the planner process tree is killed)
+        or allowed to look for a better plan. By default, the planner is
+        stopped as soon as the first plan has been found.
+
+        Keyword arguments:
+        @param task_request: TaskRequest -- a task request
+        @param robot: str -- name of the robot for which a plan is requested
+        @param task_goals: list -- planning goals (as for "plan")
+        @param stop_condition: Callable[[list, float, float], bool] -- a function that takes
+                               the latest plan, its cost, and the time (in seconds) since the
+                               planner was started and returns True if the planner should be stopped
+                               (default None, in which case the first plan is returned)
+        @param plan_callback: Callable[[list, float], None] -- a function that is called
+                              with every plan that is found and its cost (default None)
+
+        '''
+        start_time = time.monotonic()
+        best_plan, best_cost = None, None
+        usages = []
+        plans = self.iter_plans_async(task_request, robot, task_goals, usages)
+        try:
+            async for plan_cost, plan in plans:
+                if best_cost is None or plan_cost < best_cost:
+                    best_plan, best_cost = plan, plan_cost
+                if plan_callback is not None:
+                    plan_callback(plan, plan_cost)
+
+                elapsed_time = time.monotonic() - start_time
+                if stop_condition is None or stop_condition(plan, plan_cost, elapsed_time):
+                    self.logger.info('Stopping the planner after %.3f s (plan cost %s)',
+                                     elapsed_time, plan_cost)
+                    break
+        finally:
+            await plans.aclose()
+
+        resource_usage = ResourceUsage.combine(usages)
+        if best_plan is None:
+            self.logger.error('Plan for task %s and robot %s not found', task_request.load_type, robot)
+            return self.export_result(self.get_plan_result(False, [], resource_usage=resource_usage))
+        return self.export_result(self.get_plan_result(True, best_plan, resource_usage=resource_usage,
+                                                       plan_cost=best_cost))
+
+    async def iter_plans_async(self, task_request: TaskRequest, robot: str, task_goals: list=None,
+                               usages: list=None):
+        '''Runs the planner and yields a (plan cost, plan) tuple for each plan
+        as soon as the planner has written it (LAMA writes improving plans to
+        numbered plan files while it searches). The request directory is polled
+        every "anytime_poll_interval" seconds. When the generator is closed
+        or the planner runs for longer than "planner_timeout", the planner
+        process tree is killed and the request directory removed.
+
+        Keyword arguments:
+        @param task_request: TaskRequest -- a task request
+        @param robot: str -- name of the robot for which a plan is requested
+        @param task_goals: list -- planning goals (as for "plan")
+        @param usages: list -- a list to which the ResourceUsage objects of the translator
+                               (if it is run) and of the planner are appended once the
+                               planner has exited (default None)
+
+        '''
+        predicate_task_goals = self.get_goal_predicates(task_goals)
+
+        usages = usages if usages is not None else []
+        request_dir = self.create_request_dir()
+        process = None
+        planner_run = None
+        try:
+            self.logger.info('Generating problem file')
+            problem_file = await self.run_in_executor(self.__write_request_problem,
+                                                      predicate_task_goals, request_dir, robot)
+
+            self.logger.info('Planning task in anytime mode...')
+            planner_cmd_elements, translation_usage = await self.__prepare_planner_async(problem_file,
+                                                                                         request_dir,
+                                                                                         PlanStatistics())
+            if translation_usage is not None:
+                usages.append(translation_usage)
+
+            # the planner is waited for (and killed after "planner_timeout")
+            # in a separate task while the plan files are polled
+            start_time = time.monotonic()
+            process = await self.start_planner_async(planner_cmd_elements, cwd=request_dir)
+            startup_time = time.monotonic() - start_time
+            planner_run = asyncio.ensure_future(self.wait_for_planner_async(process))
+            plan_idx = 1
+            while True:
+                planner_finished = planner_run.done()
+                plan_file_name = '{0}.{1}'.format(self._plan_file_name, plan_idx)
+                action_strings, plan_cost = self.__read_plan_file(join(request_dir, plan_file_name))
+
+                # planners that do not search in anytime mode only write an unnumbered plan file
+                if action_strings is None and planner_finished and plan_idx == 1:
+                    action_strings, plan_cost = self.__read_plan_file(join(request_dir,
+                                                                           self._plan_file_name))
+
+                if action_strings is not None:
+                    self.logger.info('Plan %d for task %s and robot %s found (cost %s)',
+                                     plan_idx, task_request.load_type, robot, plan_cost)
+                    plan = await self.run_in_executor(self.__get_plan, action_strings)
+                    yield plan_cost, plan
+                    plan_idx += 1
+                elif planner_finished:
+                    break
+                else:
+                    await asyncio.wait([planner_run], timeout=self.anytime_poll_interval)
+            self.logger.info('Planning finished')
+        finally:
+            try:
+                if planner_run is not None:
+                    if not planner_run.done():
+                        self.kill_process_group(process.pid)
+                    usage = await planner_run
+                    usage.startup_time = startup_time
+                    usages.append(usage)
+            finally:
+                self.logger.info('Removing request directory...')
+                self.remove_request_dir(request_dir)
+
+    async def solve_problem_async(self, problem_file: str, work_dir: str,
+                                  task: str, robot: str,
+                                  statistics: PlanStatistics=None) -> PlanResult:
+        statistics = statistics if statistics is not None else PlanStatistics()
+        planner_cmd_elements, translation_usage = await self.__prepare_planner_async(problem_file,
+                                                                                     work_dir, statistics)
+        search_usage = await self.run_planner_async(planner_cmd_elements, cwd=work_dir)
+        statistics.add_planner_usage(search_usage)
+        plan_found, plan, _, plan_cost = await self.run_in_executor(self.__parse_plans, task,
+                                                                    robot, work_dir, statistics)
+        return self.get_plan_result(plan_found, plan, statistics,
+                                    ResourceUsage.combine([translation_usage, search_usage]),
+                                    plan_cost)
 
     def generate_problem_file(self, predicate_assertions: list,
                               fluent_assertions: list,
                               task_goals: Sequence[Predicate]) -> str:
-        obj_types = {}
-        init_state_str = ''
-
-        # we generate strings from the predicate assertions of the form
-        # (predicate_name param_1 param_2 ... param_n)
-        for assertion in predicate_assertions:
-            ordered_param_list, obj_types = PDDLPredicateLibrary.get_assertion_param_list(assertion.name,
-                                                                                          assertion.params,
-                                                                                          obj_types)
-            assertion_str = '        ({0} {1})\n'.format(assertion.name, ' '.join(ordered_param_list))
-            init_state_str += assertion_str
-
-
-        # for numeric fluents, we generate strings of the form
-        # (= (fluent_name param_1 param_2 ... param_n) fluent_value); otherwise,
-        # we generate strings just like for predicate assertions
-        for assertion in fluent_assertions:
-            if hasattr(PDDLPredicateLibrary, assertion.name):
-                ordered_param_list, obj_types = PDDLPredicateLibrary.get_assertion_param_list(assertion.name,
-                                                                                              assertion.params,
-                                                                                              obj_types)
-                assertion_str = '        ({0} {1} {2})\n'.format(assertion.name,
-                                                                 ' '.join(ordered_param_list),
-                                                                 assertion.value)
-            elif hasattr(PDDLFluentLibrary, assertion.name):
-                ordered_param_list, obj_types = PDDLFluentLibrary.get_assertion_param_list(assertion.name,
-                                                                                           assertion.params,
-                                                                                           assertion.value,
-                                                                                           obj_types)
-                assertion_str = '        ({0} {1} {2})\n'.format(assertion.name,
-                                                                 ' '.join(ordered_param_list),
-                                                                 assertion.value)
-            else:
-                ordered_param_list, obj_types = PDDLNumericFluentLibrary.get_assertion_param_list(assertion.name,
-                                                                                                  assertion.params,
-                                                                                                  obj_types)
-                assertion_str = '        (= ({0} {1}) {2})\n'.format(assertion.name,
-                                                                     ' '.join(ordered_param_list),
-                                                                     assertion.value)
-            init_state_str += assertion_str
-
-        # we combine the assertion strings into an initial state string of the form
-        # (:init
-        #     assertions
-        # )
-        init_state_str = '    (:init\n{0}\n    )\n\n'.format(init_state_str)
-
-        # we generate a string with the object types of the form
-        # (:objects
-        #     obj_11 obj_12 - type_1
-        #     ...
-        #     obj_n1 - type_n
-        # )
-        obj_type_str = ''
-        for obj_type in obj_types:
-            obj_type_str += '        {0} - {1}\n'.format(' '.join(obj_types[obj_type]), obj_type)
-        obj_type_str = '    (:objects\n{0}    )\n\n'.format(obj_type_str)
-
-        # we generate a string with the planning goals of the form
-        # (:goals
-        #     (and
-        #         (predicate_1_name param_1 param_2 ... param_n)
-        #         ...
-        #         (predicate_n_name param_1 param_2 ... param_n)
-        #     )
-        # )
-        goal_str = ''
-        for task_goal in task_goals:
-            goal_predicate, goal_params = task_goal.name, task_goal.params
-            goal_str += '            ({0} {1})\n'.format(goal_predicate,
-                                                         ' '.join([param.value for param in goal_params]))
-        goal_str = '    (:goal\n        (and\n{0}        )\n    )\n'.format(goal_str)
-
-        # we finally write the problem file, which will be in the format
-        # (define (problem problem-name)
-        #     (:domain domain-name)
-        #     (:objects
-        #         ...
-        #     )
-        #     (:objects
-        #         ...
-        #     )
-        #     (:goals
-        #         ...
-        #     )
-        # )
-        problem_file_name = 'problem_{0}.pddl'.format(str(uuid.uuid4()))
-        problem_file_abs_path = join(self.plan_file_path, problem_file_name)
         self.logger.info('Generating planning problem...')
-        with open(problem_file_abs_path, 'w') as problem_file:
-            header = '(define (problem ropod)\n'
-            header += '    (:domain {0})\n'.format(self.domain_name)
-            problem_file.write(header)
-            problem_file.write(obj_type_str)
-            problem_file.write(init_state_str)
-            problem_file.write(goal_str)
-            problem_file.write(')\n')
-        return problem_file_abs_path
-
-    def parse_plan(self, task: str, robot: str) -> Tuple[bool, list]:
-        plan_files = [f for f in listdir(self.plan_file_path)
-                      if f.find(self._plan_file_name) != -1]
-        if not plan_files:
-            self.logger.error('Plan for task %s and robot %s not found', task, robot)
-            return False, []
-
-        plans = []
-        action_strings_per_plan = []
-        for plan_file_name in plan_files:
-            plan = []
-            plan_action_strings = []
-            current_plan_file_path = join(self.plan_file_path, plan_file_name)
-            with open(current_plan_file_path, 'r') as plan_file:
-                while True:
-                    line = plan_file.readline()
-                    if line.find(';') != -1:
-                        break
-                    else:
-                        action_line = line.strip()[1:-1]
-                        action = self.process_action_str(action_line)
-                        for i in range(len(action.areas)):
-                            # we capitalise the area name since the planner writes
-                            # all areas with small letters, while the OSM convention
-                            # is to have all letters in the name capitalised
-                            action.areas[i].name = action.areas[i].name.upper()
-
-                            floor_fluent = ('location_floor', [('loc', action.areas[i].name)])
-                            floor = self.kb_interface.get_fluent_value(floor_fluent)
-
-                            # "floor" is either a string of the form "floorX"
-                            # or the "unknown" string; we thus throw away the word
-                            # "floor" to get the actual floor number - or catch an
-                            # exception and set a default unreasonable floor
-                            # if the floor is not known
-                            try:
-                                floor_number = int(floor[5:])
-                            except ValueError:
-                                floor_number = -100
-                            action.areas[i].floor_number = floor_number
-                        plan.append(action)
-                        plan_action_strings.append(action_line)
-                        self.logger.debug(action_line)
-                plans.append(plan)
+        problem_file_name = 'problem_{0}.pddl'.format(str(uuid.uuid4()))
+        return self.write_problem_file(problem_file_name, task_goals,
+                                       predicate_assertions, fluent_assertions)
+
+    def parse_plan(self, task: str, robot: str, plan_dir: str=None) -> Tuple[bool, list]:
+        plan_found, plan, _, _ = self.__parse_plans(task, robot, plan_dir)
+        return plan_found, plan
+
+    def process_action_str(self, action_line: str) -> Action:
+        action_data = action_line.split()
+        action_name = action_data[0].upper()
+        action_params = action_data[1:]
+        action = ActionModelLibrary.get_action_model(action_name, action_params)
+        return action
+
+    def __parse_plans(self, task: str, robot: str, plan_dir: str=None,
+                      statistics: PlanStatistics=None) -> Tuple[bool, list, list, float]:
+        '''Parses the plans written by the planner and returns a tuple
+        (plan_found, shortest plan, action strings of the shortest plan,
+        cost of the shortest plan). The plan files are removed once they
+        have been parsed; incomplete plan files without a cost line are skipped.
+
+        Keyword arguments:
+        @param task: str -- task for which the plans were found
+        @param robot: str -- name of the robot for which the plans were found
+        @param plan_dir: str -- directory with the plan files
+                                (default None, in which case plan_file_path is used)
+        @param statistics: PlanStatistics -- statistics in which the parsing
+                                             is recorded (default None)
+
+        '''
+        statistics = statistics if statistics is not None else PlanStatistics()
+        with statistics.time_stage('plan_parsing'):
+            plan_dir = plan_dir or self.plan_file_path
+            plan_files = [f for f in listdir(plan_dir) if self.__is_plan_file(f)]
+            if not plan_files:
+                self.logger.error('Plan for task %s and robot %s not found', task, robot)
+                return False, [], [], None
+
+            plans = []
+            action_strings_per_plan = []
+            plan_costs = []
+            for plan_file_name in plan_files:
+                current_plan_file_path = join(plan_dir, plan_file_name)
+                plan_action_strings, plan_cost = self.__read_plan_file(current_plan_file_path)
+                if os.path.exists(current_plan_file_path):
+                    os.remove(current_plan_file_path)
+                if plan_action_strings is None:
+                    self.logger.warning('Skipping incomplete plan file %s', plan_file_name)
+                    continue
+
+                for action_string in plan_action_strings:
+                    self.logger.debug(action_string[1:-1])
+                plans.append(self.__create_actions(plan_action_strings))
                 action_strings_per_plan.append(plan_action_strings)
-            os.remove(current_plan_file_path)
+                plan_costs.append(plan_cost)
+
+            if not plans:
+                self.logger.error('Plan for task %s and robot %s not found', task, robot)
+                return False, [], [], None
+
+            # the floors of all areas in all plans are retrieved at once
+            with statistics.time_stage('floor_resolution'):
+                self.__assign_floors(plans)
 
         plan_lengths = [len(plan) for plan in plans]
         shortest_plan_idx = np.argmin(plan_lengths)
@@ -231,13 +404,284 @@ class LAMAInterface(TaskPlannerInterface):
         self.logger.debug('Action sequence:')
         self.logger.debug('-------------------------------')
         for action_string in action_strings_per_plan[shortest_plan_idx]:
-            self.logger.debug(action_string)
+            self.logger.debug(action_string[1:-1])
         self.logger.debug('-------------------------------')
-        return True, plans[shortest_plan_idx]
+        return True, plans[shortest_plan_idx], action_strings_per_plan[shortest_plan_idx], \
+            plan_costs[shortest_plan_idx]
 
-    def process_action_str(self, action_line: str) -> Action:
-        action_data = action_line.split()
-        action_name = action_data[0].upper()
-        action_params = action_data[1:]
-        action = ActionModelLibrary.get_action_model(action_name, action_params)
-        return action
+    def __read_plan_file(self, plan_file_name: str) -> Tuple[list, float]:
+        '''Returns the action strings and the cost of the plan in the given file
+        or (None, None) if the file does not exist or has not been completely
+        written yet (the cost line is the last line of a plan file).
+
+        Keyword arguments:
+        @param plan_file_name: str -- absolute path of a plan file
+
+        '''
+        try:
+            with open(plan_file_name, 'r') as plan_file:
+                lines = plan_file.readlines()
+        except FileNotFoundError:
+            return None, None
+
+        action_strings = []
+        for line in lines:
+            if line.startswith(';'):
+                return action_strings, self.__get_plan_cost(line, len(action_strings))
+            if line.strip():
+                action_strings.append(line.strip())
+        return None, None
+
+    @staticmethod
+    def __get_plan_cost(cost_line: str, action_count: int) -> float:
+        '''Returns the cost given in the cost line of a plan file, which has
+        the form "; cost = 3 (unit cost)", or the number of actions of the plan
+        if the line cannot be parsed.
+
+        Keyword arguments:
+        @param cost_line: str -- the last line of a plan file
+        @param action_count: int -- number of actions of the plan
+
+        '''
+        try:
+            return float(cost_line.split('=')[1].split()[0])
+        except (IndexError, ValueError):
+            return float(action_count)
+
+    def __get_plan(self, action_strings: Sequence[str], statistics: PlanStatistics=None) -> list:
+        '''Returns a list of Action objects (with the floors of their areas set)
+        representing the given plan.
+
+        Keyword arguments:
+        @param action_strings: Sequence[str] -- grounded actions of the form
+                                                "(action_name arg_1 ... arg_n)"
+        @param statistics: PlanStatistics -- statistics in which the parsing
+                                             is recorded (default None)
+
+        '''
+        statistics = statistics if statistics is not None else PlanStatistics()
+        with statistics.time_stage('plan_parsing'):
+            plan = self.__create_actions(action_strings)
+            with statistics.time_stage('floor_resolution'):
+                self.__assign_floors([plan])
+        return plan
+
+    def __create_actions(self, action_strings: Sequence[str]) -> list:
+        '''Returns a list of Action objects representing the given plan.
+
+        Keyword arguments:
+        @param action_strings: Sequence[str] -- grounded actions of the form
+                                                "(action_name arg_1 ... arg_n)"
+
+        '''
+        plan = []
+        for action_string in action_strings:
+            action = self.process_action_str(action_string.strip()[1:-1])
+            for area in action.areas:
+                # we capitalise the area name since the planner writes
+                # all areas with small letters, while the OSM convention
+                # is to have all letters in the name capitalised
+                area.name = area.name.upper()
+            plan.append(action)
+        return plan
+
+    def __assign_floors(self, plans: Sequence[list]) -> None:
+        '''Sets the floor numbers of the areas of the actions in the given plans;
+        the floors of all areas are retrieved with a single knowledge base query.
+
+        Keyword arguments:
+        @param plans: Sequence[list] -- lists of Action objects
+
+        '''
+        area_names = [area.name for plan in plans for action in plan for area in action.areas]
+        area_floors = self.get_location_floors(area_names)
+        for plan in plans:
+            for action in plan:
+                for area in action.areas:
+                    # the floor is either a string of the form "floorX"
+                    # or the "unknown" string; we thus throw away the word
+                    # "floor" to get the actual floor number - or catch an
+                    # exception and set a default unreasonable floor
+                    # if the floor is not known
+                    try:
+                        area.floor_number = int(area_floors[area.name][5:])
+                    except (ValueError, TypeError):
+                        area.floor_number = -100
+
+    def __write_request_problem(self, task_goals: Sequence[Predicate],
+                                request_dir: str, robot: str,
+                                statistics: PlanStatistics=None) -> str:
+        '''Writes the problem file of a planning request and returns its path.
+        The problem is generated incrementally, namely only the assertions
+        that are not part of the (cached) static building description
+        are read and streamed to the problem file.
+
+        Keyword arguments:
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param request_dir: str -- request directory
+        @param robot: str -- name of the robot for which a plan is requested
+        @param statistics: PlanStatistics -- statistics in which the problem
+                                             generation is recorded (default None)
+
+        '''
+        return self.write_problem_file('problem.pddl', task_goals, problem_dir=request_dir,
+                                       robot=robot, statistics=statistics)
+
+    def __get_planner_cmd_elements(self, problem_file: str, request_dir: str) -> list:
+        '''Returns the planner command for the given problem as a list of arguments.
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+        @param request_dir: str -- request directory to which the plans are written
+
+        '''
+        planner_cmd = self.planner_cmd.replace('PROBLEM', problem_file)
+        planner_cmd = planner_cmd.replace('PLAN-FILE', join(request_dir,
+                                                            self._plan_file_name))
+        return planner_cmd.split()
+
+    def __prepare_planner(self, problem_file: str, request_dir: str,
+                          statistics: PlanStatistics) -> Tuple[list, ResourceUsage]:
+        '''Returns the command that should be run for solving the given problem
+        and the resource usage of the translator (None if the translator was not run).
+        If a translation cache is used, the problem is translated first (unless
+        a translation of a problem with the same initial state is cached), so
+        that only the search has to be run; otherwise, the planner command
+        is returned as is.
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+        @param request_dir: str -- request directory to which the plans are written
+        @param statistics: PlanStatistics -- statistics in which the translation is recorded
+
+        '''
+        if self.translation_cache is None:
+            return self.__get_planner_cmd_elements(problem_file, request_dir), None
+
+        with statistics.time_stage('translation'):
+            key, goal_atoms, sas_file = self.__get_cached_translation(problem_file, request_dir)
+            translation_usage = None
+            if not os.path.isfile(sas_file):
+                self.logger.info('Translating problem...')
+                translation_usage = self.run_planner(self.__get_translator_cmd_elements(problem_file,
+                                                                                        sas_file),
+                                                     cwd=request_dir)
+                if not self.__cache_translation(key, goal_atoms, sas_file, translation_usage.exit_status):
+                    return self.__get_planner_cmd_elements(problem_file, request_dir), translation_usage
+        return self.__get_search_cmd_elements(problem_file, request_dir, sas_file), translation_usage
+
+    async def __prepare_planner_async(self, problem_file: str, request_dir: str,
+                                      statistics: PlanStatistics) -> Tuple[list, ResourceUsage]:
+        '''Asynchronous version of "__prepare_planner"; the translator
+        is run as an asyncio subprocess.
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+        @param request_dir: str -- request directory to which the plans are written
+        @param statistics: PlanStatistics -- statistics in which the translation is recorded
+
+        '''
+        if self.translation_cache is None:
+            return self.__get_planner_cmd_elements(problem_file, request_dir), None
+
+        with statistics.time_stage('translation'):
+            key, goal_atoms, sas_file = await self.run_in_executor(self.__get_cached_translation,
+                                                                   problem_file, request_dir)
+            translation_usage = None
+            if not os.path.isfile(sas_file):
+                self.logger.info('Translating problem...')
+                translation_usage = await self.run_planner_async(self.__get_translator_cmd_elements(problem_file,
+                                                                                                    sas_file),
+                                                                 cwd=request_dir)
+                translated = await self.run_in_executor(self.__cache_translation, key, goal_atoms,
+                                                        sas_file, translation_usage.exit_status)
+                if not translated:
+                    return self.__get_planner_cmd_elements(problem_file, request_dir), translation_usage
+        return self.__get_search_cmd_elements(problem_file, request_dir, sas_file), translation_usage
+
+    def __get_cached_translation(self, problem_file: str, request_dir: str) -> Tuple[str, list, str]:
+        '''Writes the cached translation of the given problem (with the goals
+        of the problem) to the request directory if there is one. Returns
+        a (translation key, goal atoms, SAS+ file path) tuple; the SAS+ file
+        only exists if a cached translation was found.
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+        @param request_dir: str -- request directory
+
+        '''
+        key, goal_atoms = self.translation_cache.get_problem_key(self.domain_file, problem_file)
+        sas_file = join(request_dir, self._sas_file_name)
+        if self.translation_cache.write_task(key, goal_atoms, sas_file):
+            self.logger.info('Reusing a cached translation of the problem')
+        return key, goal_atoms, sas_file
+
+    def __cache_translation(self, key: str, goal_atoms: list,
+                            sas_file: str, return_code: int) -> bool:
+        '''Caches the translation in the given SAS+ file. Returns False
+        (and removes the file) if the translation has failed.
+
+        Keyword arguments:
+        @param key: str -- translation key of the problem
+        @param goal_atoms: list -- goal atoms of the problem
+        @param sas_file: str -- path of the SAS+ file written by the translator
+        @param return_code: int -- exit code of the translator
+
+        '''
+        if return_code != 0 or not os.path.isfile(sas_file):
+            self.logger.warning('Translation failed with exit code %s; running the full planner',
+                                return_code)
+            if os.path.isfile(sas_file):
+                os.remove(sas_file)
+            return False
+
+        self.translation_cache.put(key, goal_atoms, sas_file)
+        return True
+
+    def __get_search_cmd_elements(self, problem_file: str, request_dir: str, sas_file: str) -> list:
+        '''Returns the planner command for running only the search on the
+        given SAS+ file (the Fast Downward driver only runs the search if
+        it is given a SAS+ file instead of a domain and a problem file).
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+        @param request_dir: str -- request directory to which the plans are written
+        @param sas_file: str -- path of the SAS+ file
+
+        '''
+        return [sas_file if element == problem_file else element
+                for element in self.__get_planner_cmd_elements(problem_file, request_dir)
+                if element != self.domain_file]
+
+    def __get_translator_cmd_elements(self, problem_file: str, sas_file: str) -> list:
+        '''Returns the command for only translating the given problem, namely
+        the planner driver (i.e. all elements of the planner command preceding
+        the first option) with the translator options of the translation cache.
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+        @param sas_file: str -- path of the SAS+ file to which the translation is written
+
+        '''
+        driver_elements = []
+        for element in self.planner_cmd.split():
+            if element.startswith('--'):
+                break
+            driver_elements.append(element)
+        return driver_elements + ['--sas-file', sas_file, '--translate',
+                                  self.domain_file, problem_file,
+                                  '--translate-options'] + TranslationCache.translate_options
+
+    def __is_plan_file(self, file_name: str) -> bool:
+        '''Returns True if the given file is a plan file written by the planner,
+        namely if its name is either the plan file name or the plan file name
+        followed by a plan number (e.g. "plan.txt.1").
+
+        Keyword arguments:
+        @param file_name: str -- name of a file in a request directory
+
+        '''
+        if file_name == self._plan_file_name:
+            return True
+        prefix = self._plan_file_name + '.'
+        return file_name.startswith(prefix) and file_name[len(prefix):].isdigit()
@@ -1,7 +1,9 @@
 from os.path import join
 import uuid
+import time
+import contextlib
 import subprocess
-from typing import Tuple, Sequence
+from typing import Tuple, Sequence, Iterable, Callable, TextIO
 import logging
 
 from ropod.structs.task import TaskRequest
@@ -11,16 +13,94 @@ from ropod.structs.area import Area
 from task_planner.planner_interface import TaskPlannerInterface
 from task_planner.knowledge_base_interface import Predicate
 from task_planner.action_models import ActionModelLibrary
-from task_planner.knowledge_models import PDDLPredicateLibrary, PDDLFluentLibrary,\
-                                          PDDLNumericFluentLibrary
+from task_planner.plan_result import PlanResult, ResourceUsage, PlanStatistics
+
+
+class MetricFFOutputParser(object):
+    '''An incremental parser of the standard output of Metric-FF, which
+    prints the plan in the form
+
+    ff: found legal plan as follows
+
+    step    0: ACTION_NAME PARAM_1 ... PARAM_N
+            1: ACTION_NAME PARAM_1 ... PARAM_N
+            ...
+
+    followed by planning statistics. The output is fed line by line (e.g. while
+    it is read from a pipe), such that the actions are parsed as soon as
+    the planner prints them. The time spent parsing is accumulated in "parse_time".
+
+    Constructor arguments:
+    @param process_action_str -- a function converting an action line to an Action object
+    '''
+    def __init__(self, process_action_str: Callable[[str], Action]):
+        self.process_action_str = process_action_str
+        self.plan_found = False
+        self.plan_complete = False
+        self.plan = []
+        self.parse_time = 0.
+        self.logger = logging.getLogger('task.planner')
+        self.__processing_plan = False
+
+    def feed(self, line: str) -> None:
+        '''Parses a line of the planner output.
+
+        Keyword arguments:
+        @param line: str -- a line of the planner output (including the line break)
+
+        '''
+        start_time = time.monotonic()
+        self.__parse_line(line)
+        self.parse_time += time.monotonic() - start_time
+
+    def __parse_line(self, line: str) -> None:
+        '''Parses a line of the planner output (see "feed").
+
+        Keyword arguments:
+        @param line: str -- a line of the planner output (including the line break)
+
+        '''
+        if self.__processing_plan:
+            if line == '\n':
+                self.__processing_plan = False
+                self.plan_complete = True
+                self.logger.debug('-------------------------------')
+            else:
+                action = self.process_action_str(line.strip())
+                self.plan.append(action)
+                self.logger.debug(line.strip())
+
+        if 'found legal plan' in line.lower():
+            self.plan_found = True
+            self.logger.debug('Action sequence:')
+            self.logger.debug('-------------------------------')
+
+        if 'step' in line.lower():
+            line = line[4:]
+            self.__processing_plan = True
+            action = self.process_action_str(line.strip())
+            self.plan.append(action)
+            self.logger.debug(line.strip())
 
 
 class MetricFFInterface(TaskPlannerInterface):
+    '''An interface to Metric-FF. The planner output is read from a pipe
+    and parsed while the planner is running; in debug mode, the output is also
+    written to a plan file in the request directory (which is not removed
+    in debug mode), while no plan file is written otherwise.
+
+    If the planner is killed because it exceeds "planner_timeout", a plan is
+    only returned if the planner has printed it completely before being killed.
+    '''
+    _plan_file_name = 'plan.txt'
+    engine_name = 'metric_ff'
+
     def __init__(self, kb_database_name, domain_file,
-                 planner_cmd, plan_file_path, debug=False):
+                 planner_cmd, plan_file_path, debug=False,
+                 io_backend='disk', **kb_args):
         super(MetricFFInterface, self).__init__(kb_database_name, domain_file,
                                                 planner_cmd, plan_file_path,
-                                                debug)
+                                                debug, io_backend, **kb_args)
         self.logger = logging.getLogger('task.planner')
 
     def plan(self, task_request: TaskRequest, robot: str, task_goals: list=None):
@@ -33,184 +113,120 @@ class MetricFFInterface(TaskPlannerInterface):
         # TODO: check if there are already goals in the knowledge base and,
         # if yes, add them to the task_goals list
 
-        predicate_task_goals = []
-        for task_goal in task_goals:
-            if isinstance(task_goal, Predicate):
-                predicate_task_goals.append(task_goal)
-            elif isinstance(task_goal, tuple):
-                predicate_task_goals.append(Predicate.from_tuple(task_goal))
-            elif isinstance(task_goal, dict):
-                predicate_task_goals.append(Predicate.from_dict(task_goal))
-            else:
-                raise Exception('Invalid type to task_goal encountered')
-
-        kb_predicate_assertions = self.kb_interface.get_predicate_assertions()
-        kb_fluent_assertions = self.kb_interface.get_fluent_assertions()
+        predicate_task_goals = self.get_goal_predicates(task_goals)
+        statistics = PlanStatistics()
 
-        self.logger.info('Generating problem file')
-        problem_file = self.generate_problem_file(kb_predicate_assertions,
-                                                  kb_fluent_assertions,
-                                                  predicate_task_goals)
+        # the problem and plan files are written to a private directory,
+        # which is removed once the plan has been parsed
+        request_dir = self.create_request_dir()
+        try:
+            self.logger.info('Generating problem file')
+            problem_file = self.__write_request_problem(predicate_task_goals, request_dir,
+                                                        robot, statistics)
 
-        planner_cmd = self.planner_cmd.replace('PROBLEM', problem_file)
-        planner_cmd_elements = planner_cmd.split()
+            cache_key, plan = self.get_cached_plan(problem_file)
+            if plan is not None:
+                self.logger.info('Plan for task %s and robot %s found in the plan cache',
+                                 task_request.load_type, robot)
+                return self.export_result(self.get_plan_result(True, plan, statistics))
 
-        plan_file_name = 'plan_{0}.txt'.format(str(uuid.uuid4()))
-        plan_file_abs_path = join(self.plan_file_path, plan_file_name)
-        self.logger.info('Planning task...')
-        with open(plan_file_abs_path, 'w') as plan_file:
-            subprocess.run(planner_cmd_elements, stdout=plan_file)
+            self.logger.info('Planning task...')
+            parser = MetricFFOutputParser(self.process_action_str)
+            with self.__open_output_copy(request_dir) as output_copy:
+                usage = self.run_planner(self.__get_planner_cmd_elements(problem_file),
+                                         cwd=request_dir, stdout=subprocess.PIPE,
+                                         output_callback=self.__get_output_callback(parser,
+                                                                                    output_copy))
             self.logger.info('Planning finished')
+            self.__add_run_statistics(statistics, parser, usage)
+
+            plan_found, plan = self.__get_plan(parser, usage, task_request.load_type,
+                                               robot, statistics)
+            self.cache_plan(cache_key, plan_found, plan)
+        finally:
+            self.remove_request_dir(request_dir)
+        return self.export_result(self.get_plan_result(plan_found, plan, statistics,
+                                                       usage, len(plan)))
+
+    async def plan_async(self, task_request: TaskRequest, robot: str, task_goals: list=None):
+        '''Asynchronous version of "plan". The knowledge base is read in
+        the default executor of the event loop and the planner is run as
+        an asyncio subprocess; if the calling task is cancelled, the planner
+        process tree is killed and the request directory removed.
+        '''
+        predicate_task_goals = self.get_goal_predicates(task_goals)
+        statistics = PlanStatistics()
 
-        plan_found, plan = self.parse_plan(plan_file_abs_path, task_request.load_type, robot)
-        return plan_found, plan
+        request_dir = self.create_request_dir()
+        try:
+            self.logger.info('Generating problem file')
+            problem_file = await self.run_in_executor(self.__write_request_problem,
+                                                      predicate_task_goals, request_dir,
+                                                      robot, statistics)
+
+            cache_key, plan = await self.run_in_executor(self.get_cached_plan, problem_file)
+            if plan is not None:
+                self.logger.info('Plan for task %s and robot %s found in the plan cache',
+                                 task_request.load_type, robot)
+                return self.export_result(self.get_plan_result(True, plan, statistics))
+
+            self.logger.info('Planning task...')
+            result = await self.solve_problem_async(problem_file, request_dir,
+                                                    task_request.load_type, robot, statistics)
+            self.cache_plan(cache_key, result.plan_found, result.plan)
+        finally:
+            self.remove_request_dir(request_dir)
+        return self.export_result(result)
+
+    async def solve_problem_async(self, problem_file: str, work_dir: str,
+                                  task: str, robot: str,
+                                  statistics: PlanStatistics=None) -> PlanResult:
+        '''Runs the planner on the given problem and parses its output
+        while it is read from a pipe; if the calling task is cancelled,
+        the planner process tree is killed.
+        '''
+        statistics = statistics if statistics is not None else PlanStatistics()
+        parser = MetricFFOutputParser(self.process_action_str)
+        with self.__open_output_copy(work_dir) as output_copy:
+            usage = await self.run_planner_async(self.__get_planner_cmd_elements(problem_file),
+                                                 cwd=work_dir, stdout=subprocess.PIPE,
+                                                 output_callback=self.__get_output_callback(parser,
+                                                                                            output_copy))
+        self.logger.info('Planning finished')
+        self.__add_run_statistics(statistics, parser, usage)
+        plan_found, plan = await self.run_in_executor(self.__get_plan, parser, usage,
+                                                      task, robot, statistics)
+        return self.get_plan_result(plan_found, plan, statistics, usage, len(plan))
 
     def generate_problem_file(self, predicate_assertions: list,
                               fluent_assertions: list,
                               task_goals: Sequence[Predicate]) -> str:
-        obj_types = {}
-        init_state_str = ''
-
-        # we generate strings from the predicate assertions of the form
-        # (predicate_name param_1 param_2 ... param_n)
-        for assertion in predicate_assertions:
-            ordered_param_list, obj_types = PDDLPredicateLibrary.get_assertion_param_list(assertion.name,
-                                                                                          assertion.params,
-                                                                                          obj_types)
-            assertion_str = '        ({0} {1})\n'.format(assertion.name, ' '.join(ordered_param_list))
-            init_state_str += assertion_str
-
-
-        # for numeric fluents, we generate strings of the form
-        # (= (fluent_name param_1 param_2 ... param_n) fluent_value); otherwise,
-        # we generate strings just like for predicate assertions
-        for assertion in fluent_assertions:
-            if hasattr(PDDLPredicateLibrary, assertion.name):
-                ordered_param_list, obj_types = PDDLPredicateLibrary.get_assertion_param_list(assertion.name,
-                                                                                              assertion.params,
-                                                                                              obj_types)
-                assertion_str = '        ({0} {1} {2})\n'.format(assertion.name,
-                                                                 ' '.join(ordered_param_list),
-                                                                 assertion.value)
-            elif hasattr(PDDLFluentLibrary, assertion.name):
-                ordered_param_list, obj_types = PDDLFluentLibrary.get_assertion_param_list(assertion.name,
-                                                                                           assertion.params,
-                                                                                           assertion.value,
-                                                                                           obj_types)
-                assertion_str = '        ({0} {1} {2})\n'.format(assertion.name,
-                                                                 ' '.join(ordered_param_list),
-                                                                 assertion.value)
-            else:
-                ordered_param_list, obj_types = PDDLNumericFluentLibrary.get_assertion_param_list(assertion.name,
-                                                                                                  assertion.params,
-                                                                                                  obj_types)
-                assertion_str = '        (= ({0} {1}) {2})\n'.format(assertion.name,
-                                                                     ' '.join(ordered_param_list),
-                                                                     assertion.value)
-            init_state_str += assertion_str
-
-        # we combine the assertion strings into an initial state string of the form
-        # (:init
-        #     assertions
-        # )
-        init_state_str = '    (:init\n{0}\n    )\n\n'.format(init_state_str)
-
-        # we generate a string with the object types of the form
-        # (:objects
-        #     obj_11 obj_12 - type_1
-        #     ...
-        #     obj_n1 - type_n
-        # )
-        obj_type_str = ''
-        for obj_type in obj_types:
-            obj_type_str += '        {0} - {1}\n'.format(' '.join(obj_types[obj_type]), obj_type)
-        obj_type_str = '    (:objects\n{0}    )\n\n'.format(obj_type_str)
-
-        # we generate a string with the planning goals of the form
-        # (:goals
-        #     (and
-        #         (predicate_1_name param_1 param_2 ... param_n)
-        #         ...
-        #         (predicate_n_name param_1 param_2 ... param_n)
-        #     )
-        # )
-        goal_str = ''
-        for task_goal in task_goals:
-            goal_predicate, goal_params = task_goal.name, task_goal.params
-            goal_str += '            ({0} {1})\n'.format(goal_predicate,
-                                                         ' '.join([param.value for param in goal_params]))
-        goal_str = '    (:goal\n        (and\n{0}        )\n    )\n'.format(goal_str)
-
-        # we finally write the problem file, which will be in the format
-        # (define (problem problem-name)
-        #     (:domain domain-name)
-        #     (:objects
-        #         ...
-        #     )
-        #     (:objects
-        #         ...
-        #     )
-        #     (:goals
-        #         ...
-        #     )
-        # )
-        problem_file_name = 'problem_{0}.txt'.format(str(uuid.uuid4()))
-        problem_file_abs_path = join(self.plan_file_path, problem_file_name)
         self.logger.info('Generating planning problem...')
-        with open(problem_file_abs_path, 'w') as problem_file:
-            header = '(define (problem ropod)\n'
-            header += '    (:domain {0})\n'.format(self.domain_name)
-            problem_file.write(header)
-            problem_file.write(obj_type_str)
-            problem_file.write(init_state_str)
-            problem_file.write(goal_str)
-            problem_file.write(')\n')
-        return problem_file_abs_path
+        problem_file_name = 'problem_{0}.txt'.format(str(uuid.uuid4()))
+        return self.write_problem_file(problem_file_name, task_goals,
+                                       predicate_assertions, fluent_assertions)
 
     def parse_plan(self, plan_file_abs_path: str, task: str, robot: str) -> Tuple[bool, list]:
-        plan_found = False
-        processing_plan = False
-        plan = []
+        '''Parses a file with the output of the planner
+        (e.g. a plan file written in debug mode).
+        '''
         with open(plan_file_abs_path, 'r') as plan_file:
-            while True:
-                line = plan_file.readline()
-                if not line:
-                    break
-
-                if processing_plan:
-                    if line == '\n':
-                        processing_plan = False
-                        self.logger.debug('-------------------------------')
-                    else:
-                        action = self.process_action_str(line.strip())
-                        for i in range(len(action.areas)):
-                            floor_fluent = ('location_floor', [('loc', action.areas[i].name)])
-                            floor_number = self.kb_interface.get_fluent_value(floor_fluent)
-                            action.areas[i].floor_number = floor_number
-                        plan.append(action)
-                        self.logger.debug(line.strip())
-
-                if 'found legal plan' in line.lower():
-                    plan_found = True
-                    self.logger.info('Plan for task %s and robot %s found', task, robot)
-
-                    self.logger.debug('Action sequence:')
-                    self.logger.debug('-------------------------------')
-
-                if 'step' in line.lower():
-                    line = line[4:]
-                    processing_plan = True
-                    action = self.process_action_str(line.strip())
-                    for i in range(len(action.areas)):
-                        floor_fluent = ('location_floor', [('loc', action.areas[i].name)])
-                        floor_number = self.kb_interface.get_fluent_value(floor_fluent)
-                        action.areas[i].floor_number = floor_number
-                    plan.append(action)
-                    self.logger.debug(line.strip())
-
-        if not plan_found:
-            self.logger.error('Plan for task %s and robot %s not found', task, robot)
-        return plan_found, plan
+            return self.parse_plan_output(plan_file, task, robot)
+
+    def parse_plan_output(self, output_lines: Iterable[str], task: str, robot: str) -> Tuple[bool, list]:
+        '''Parses the given lines of planner output and returns
+        a (plan_found, plan) tuple.
+
+        Keyword arguments:
+        @param output_lines: Iterable[str] -- lines of planner output (e.g. an open file)
+        @param task: str -- task for which a plan is requested
+        @param robot: str -- name of the robot for which a plan is requested
+
+        '''
+        parser = MetricFFOutputParser(self.process_action_str)
+        for line in output_lines:
+            parser.feed(line)
+        return self.__get_plan(parser, None, task, robot)
 
     def process_action_str(self, action_line: str) -> Action:
         action_data = action_line[action_line.find(':')+2:].split()
@@ -218,3 +234,115 @@ class MetricFFInterface(TaskPlannerInterface):
         action_params = action_data[1:]
         action = ActionModelLibrary.get_action_model(action_name, action_params)
         return action
+
+    def __write_request_problem(self, task_goals: Sequence[Predicate],
+                                request_dir: str, robot: str,
+                                statistics: PlanStatistics=None) -> str:
+        '''Writes the problem file of a planning request and returns its path.
+        The problem is generated incrementally, namely only the assertions
+        that are not part of the (cached) static building description
+        are read and streamed to the problem file.
+
+        Keyword arguments:
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param request_dir: str -- request directory
+        @param robot: str -- name of the robot for which a plan is requested
+        @param statistics: PlanStatistics -- statistics in which the problem
+                                             generation is recorded (default None)
+
+        '''
+        return self.write_problem_file('problem.txt', task_goals, problem_dir=request_dir,
+                                       robot=robot, statistics=statistics)
+
+    def __get_plan(self, parser: MetricFFOutputParser, usage: ResourceUsage,
+                   task: str, robot: str, statistics: PlanStatistics=None) -> Tuple[bool, list]:
+        '''Assigns floors to the areas of the plan parsed by the given parser
+        and returns a (plan_found, plan) tuple.
+
+        Keyword arguments:
+        @param parser: MetricFFOutputParser -- a parser that has been fed the planner output
+        @param usage: ResourceUsage -- resource usage of the planner run
+                                       (None if the output was not read from a planner run)
+        @param task: str -- task for which a plan is requested
+        @param robot: str -- name of the robot for which a plan is requested
+        @param statistics: PlanStatistics -- statistics in which the floor
+                                             resolution is recorded (default None)
+
+        '''
+        if parser.plan_found and usage is not None and usage.timed_out and not parser.plan_complete:
+            self.logger.error('Plan for task %s and robot %s incomplete (the planner was killed)',
+                              task, robot)
+            return False, []
+
+        plan = parser.plan
+
+        # the floors of all areas in the plan are retrieved at once
+        statistics = statistics if statistics is not None else PlanStatistics()
+        with statistics.time_stage('floor_resolution'):
+            area_floors = self.get_location_floors([area.name for action in plan
+                                                    for area in action.areas])
+        for action in plan:
+            for area in action.areas:
+                area.floor_number = area_floors[area.name]
+
+        if parser.plan_found:
+            self.logger.info('Plan for task %s and robot %s found', task, robot)
+        else:
+            self.logger.error('Plan for task %s and robot %s not found', task, robot)
+        return parser.plan_found, plan
+
+    @staticmethod
+    def __add_run_statistics(statistics: PlanStatistics, parser: MetricFFOutputParser,
+                             usage: ResourceUsage) -> None:
+        '''Adds the stages of a planner run to the given statistics; since the
+        output is parsed while the planner is running, the parsing time
+        is subtracted from the run time of the planner.
+
+        Keyword arguments:
+        @param statistics: PlanStatistics -- statistics of the request
+        @param parser: MetricFFOutputParser -- the parser of the planner output
+        @param usage: ResourceUsage -- resource usage of the planner run
+
+        '''
+        statistics.add_stage_time('planner_startup', usage.startup_time)
+        statistics.add_stage_time('search', max(usage.wall_time - parser.parse_time, 0.))
+        statistics.add_stage_time('plan_parsing', parser.parse_time)
+
+    @staticmethod
+    def __get_output_callback(parser: MetricFFOutputParser,
+                              output_copy: TextIO) -> Callable[[str], None]:
+        '''Returns a function that passes a line of planner output
+        to the given parser and writes it to the output copy.
+
+        Keyword arguments:
+        @param parser: MetricFFOutputParser -- a parser of the planner output
+        @param output_copy: TextIO -- a file to which the output is copied (None if
+                                      the output should not be copied)
+
+        '''
+        def process_output_line(line):
+            parser.feed(line)
+            if output_copy is not None:
+                output_copy.write(line)
+        return process_output_line
+
+    def __open_output_copy(self, request_dir: str) -> TextIO:
+        '''Returns a context manager for the file to which the planner output is
+        copied in debug mode (a null context, which returns None, otherwise).
+
+        Keyword arguments:
+        @param request_dir: str -- request directory
+
+        '''
+        if self.debug:
+            return open(join(request_dir, self._plan_file_name), 'w')
+        return contextlib.nullcontext()
+
+    def __get_planner_cmd_elements(self, problem_file: str) -> list:
+        '''Returns the planner command for the given problem as a list of arguments.
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+
+        '''
+        return self.planner_cmd.replace('PROBLEM', problem_file).split()
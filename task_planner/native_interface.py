@@ -0,0 +1,189 @@
+import uuid
+import logging
+from typing import Tuple, Sequence
+
+from ropod.structs.task import TaskRequest
+from ropod.structs.action import Action
+
+from task_planner.planner_interface import TaskPlannerInterface
+from task_planner.knowledge_base_interface import Predicate
+from task_planner.action_models import ActionModelLibrary
+from task_planner.pddl_parser import PDDLDomain, PDDLProblem
+from task_planner.heuristic_search import GBFSPlanner
+from task_planner.plan_result import PlanResult, PlanStatistics
+
+
+class NativePlannerInterface(TaskPlannerInterface):
+    '''A planner that searches for plans in-process (see GBFSPlanner) instead
+    of running an external planner. The problem is generated from the knowledge
+    base in memory, so no problem or plan files are written. If no plan is
+    found within the search limits, the request is passed on to the fallback
+    planner (e.g. a LAMAInterface), if one is given.
+
+    Constructor arguments:
+    @param kb_database_name -- name of the knowledge base database
+    @param domain_file -- path of the planning domain file
+    @param plan_file_path -- directory for problem files written by "generate_problem_file"
+    @param fallback_planner -- a TaskPlannerInterface used if the search does not find a plan
+                               (default None, in which case no plan is returned in that case)
+    @param max_expansions -- maximum number of states expanded by a search
+    @param time_limit -- maximum duration (in seconds) of a search (default None)
+    @param debug -- whether to run the planner in debug mode
+    @param io_backend -- one of the names in "io_backends"
+    '''
+    engine_name = 'native'
+
+    def __init__(self, kb_database_name, domain_file, plan_file_path,
+                 fallback_planner=None, max_expansions=10000, time_limit=None,
+                 debug=False, io_backend='disk', **kb_args):
+        super(NativePlannerInterface, self).__init__(kb_database_name, domain_file, '',
+                                                     plan_file_path, debug, io_backend,
+                                                     **kb_args)
+        self.fallback_planner = fallback_planner
+        self.search = GBFSPlanner(PDDLDomain.from_file(self.domain_file),
+                                  max_expansions, time_limit)
+        self.logger = logging.getLogger('task.planner')
+
+    def plan(self, task_request: TaskRequest, robot: str, task_goals: list=None):
+        '''
+        task_goals can be a list of any of the following variation of Predicate object
+            - Object itself
+            - tuple
+            - dict
+        '''
+        predicate_task_goals = self.get_goal_predicates(task_goals)
+        statistics = PlanStatistics()
+
+        self.logger.info('Generating problem')
+        problem = self.__get_problem(predicate_task_goals, robot, statistics)
+        result = self.__solve(problem, task_request.load_type, robot, statistics)
+        if not result.plan_found and self.fallback_planner is not None:
+            self.logger.info('Passing the request on to the fallback planner')
+            fallback_result = self.fallback_planner.plan(task_request, robot, task_goals)
+            return self.__add_stage_timings(fallback_result, statistics)
+        return self.export_result(result)
+
+    async def plan_async(self, task_request: TaskRequest, robot: str, task_goals: list=None):
+        '''Asynchronous version of "plan"; the search is run in
+        the default executor of the event loop, while the fallback
+        planner is called through its "plan_async" method.
+        '''
+        predicate_task_goals = self.get_goal_predicates(task_goals)
+        statistics = PlanStatistics()
+
+        self.logger.info('Generating problem')
+        problem = await self.run_in_executor(self.__get_problem, predicate_task_goals,
+                                             robot, statistics)
+        result = await self.run_in_executor(self.__solve, problem, task_request.load_type,
+                                            robot, statistics)
+        if not result.plan_found and self.fallback_planner is not None:
+            self.logger.info('Passing the request on to the fallback planner')
+            fallback_result = await self.fallback_planner.plan_async(task_request, robot, task_goals)
+            return self.__add_stage_timings(fallback_result, statistics)
+        return self.export_result(result)
+
+    async def solve_problem_async(self, problem_file: str, work_dir: str,
+                                  task: str, robot: str,
+                                  statistics: PlanStatistics=None) -> PlanResult:
+        statistics = statistics if statistics is not None else PlanStatistics()
+        with statistics.time_stage('problem_generation'):
+            problem = await self.run_in_executor(PDDLProblem.from_file, problem_file)
+        return await self.run_in_executor(self.__solve, problem, task, robot, statistics)
+
+    def generate_problem_file(self, predicate_assertions: list,
+                              fluent_assertions: list,
+                              task_goals: Sequence[Predicate]) -> str:
+        self.logger.info('Generating planning problem...')
+        problem_file_name = 'problem_{0}.pddl'.format(str(uuid.uuid4()))
+        return self.write_problem_file(problem_file_name, task_goals,
+                                       predicate_assertions, fluent_assertions)
+
+    def parse_plan(self, action_strings: Sequence[str], task: str, robot: str,
+                   statistics: PlanStatistics=None) -> Tuple[bool, list]:
+        '''Converts a plan found by the search to a list of Action objects;
+        the plan is given as a list of "(action_name arg_1 ... arg_n)" strings.
+        '''
+        statistics = statistics if statistics is not None else PlanStatistics()
+        with statistics.time_stage('plan_parsing'):
+            plan = []
+            for action_string in action_strings:
+                action = self.process_action_str(action_string.strip()[1:-1])
+                for area in action.areas:
+                    # area names are capitalised since the problem parser
+                    # converts all names to small letters, while the OSM convention
+                    # is to have all letters in the name capitalised
+                    area.name = area.name.upper()
+                plan.append(action)
+
+        # the floors of all areas in the plan are retrieved at once
+        with statistics.time_stage('floor_resolution'):
+            area_floors = self.get_location_floors([area.name for action in plan
+                                                    for area in action.areas])
+        for action in plan:
+            for area in action.areas:
+                # the floor is either a string of the form "floorX" or the
+                # "unknown" string, in which case an unreasonable floor is set
+                try:
+                    area.floor_number = int(area_floors[area.name][5:])
+                except (ValueError, TypeError):
+                    area.floor_number = -100
+
+        self.logger.info('Plan for task %s and robot %s found', task, robot)
+        return True, plan
+
+    def process_action_str(self, action_line: str) -> Action:
+        action_data = action_line.split()
+        action_name = action_data[0].upper()
+        action_params = action_data[1:]
+        action = ActionModelLibrary.get_action_model(action_name, action_params)
+        return action
+
+    def __get_problem(self, task_goals: Sequence[Predicate], robot: str,
+                      statistics: PlanStatistics) -> PDDLProblem:
+        '''Generates the problem for the given goals from the knowledge base
+        (without writing it to a file) and returns it as a PDDLProblem.
+
+        Keyword arguments:
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param robot: str -- name of the robot for which a plan is requested
+        @param statistics: PlanStatistics -- statistics of the request
+
+        '''
+        return self.problem_builder.get_problem(task_goals, robot, statistics)
+
+    def __solve(self, problem: PDDLProblem, task: str, robot: str,
+                statistics: PlanStatistics) -> PlanResult:
+        '''Searches for a plan for the given problem and returns a PlanResult
+        (which is not passed to the result exporters).
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- a planning problem
+        @param task: str -- task for which a plan is requested
+        @param robot: str -- name of the robot for which a plan is requested
+        @param statistics: PlanStatistics -- statistics of the request
+
+        '''
+        self.logger.info('Planning task...')
+        with statistics.time_stage('search'):
+            action_strings = self.search.solve(problem)
+        if action_strings is None:
+            self.logger.warning('Plan for task %s and robot %s not found by the native planner',
+                                task, robot)
+            return self.get_plan_result(False, [], statistics)
+        plan_found, plan = self.parse_plan(action_strings, task, robot, statistics)
+        return self.get_plan_result(plan_found, plan, statistics, plan_cost=len(plan))
+
+    @staticmethod
+    def __add_stage_timings(result: PlanResult, statistics: PlanStatistics) -> PlanResult:
+        '''Adds the stage durations of the native search to the stage
+        durations of a result of the fallback planner and returns the result,
+        such that the result accounts for the whole duration of the request.
+
+        Keyword arguments:
+        @param result: PlanResult -- result of the fallback planner
+        @param statistics: PlanStatistics -- statistics of the native search
+
+        '''
+        for stage, duration in statistics.stage_timings.items():
+            result.stage_timings[stage] = result.stage_timings.get(stage, 0.) + duration
+        return result
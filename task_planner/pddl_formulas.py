@@ -0,0 +1,178 @@
+import itertools
+from typing import Callable
+
+from task_planner.pddl_parser import PDDLParser, PDDLDomain, PDDLProblem
+
+
+class PDDLFormulas(object):
+    '''Functions for evaluating the formulas of a parsed PDDL domain
+    (nested lists of tokens) under variable bindings, as used by the
+    plan validator and the in-process search.
+
+    The supported formulas are those of STRIPS domains with negative
+    conditions, equality, quantifiers, and conditional effects (and, or,
+    not, imply, =, forall, exists, and when). Variables are bound in
+    dictionaries mapping variable names (including the question marks)
+    to objects; the objects of each type are given as a dictionary mapping
+    the type to an ordered collection of objects (see "get_objects_by_type").
+    '''
+    @staticmethod
+    def get_objects_by_type(domain: PDDLDomain, problem: PDDLProblem) -> dict:
+        '''Returns a dictionary mapping each type to the objects of the type
+        and its subtypes (all objects are of type "object").
+
+        Keyword arguments:
+        @param domain: PDDLDomain -- the domain of the problem
+        @param problem: PDDLProblem -- a planning problem
+
+        '''
+        # the objects of each type are stored in an ordered set
+        # (a dictionary) for constant-time membership checks
+        objects_by_type = {'object': {}}
+        for obj, obj_type in problem.objects.items():
+            current_type = obj_type
+            visited_types = set()
+            while current_type not in visited_types:
+                visited_types.add(current_type)
+                objects_by_type.setdefault(current_type, {})[obj] = None
+                if current_type == 'object':
+                    break
+                current_type = domain.types.get(current_type, 'object')
+        return objects_by_type
+
+    @staticmethod
+    def holds(formula: list, atom_holds: Callable[[tuple, bool], bool], bindings: dict,
+              objects_by_type: dict, relaxed: bool=False, positive: bool=True) -> bool:
+        '''Evaluates a formula under the given bindings.
+
+        Keyword arguments:
+        @param formula: list -- a parsed formula
+        @param atom_holds: Callable[[tuple, bool], bool] -- a function that takes a grounded
+                                                            atom and its polarity in the formula
+                                                            and returns True if the atom holds
+        @param bindings: dict -- bindings of the free variables of the formula
+        @param objects_by_type: dict -- the objects of each type (for the quantifiers)
+        @param relaxed: bool -- whether negative conditions (except inequalities) are
+                                considered to hold, as in a delete relaxation (default False)
+        @param positive: bool -- polarity of the formula (default True)
+
+        '''
+        if not formula:
+            return True
+
+        operator = formula[0]
+        if operator == 'and':
+            return all(PDDLFormulas.holds(sub_formula, atom_holds, bindings,
+                                          objects_by_type, relaxed, positive)
+                       for sub_formula in formula[1:])
+        if operator == 'or':
+            return any(PDDLFormulas.holds(sub_formula, atom_holds, bindings,
+                                          objects_by_type, relaxed, positive)
+                       for sub_formula in formula[1:])
+        if operator == 'not':
+            if relaxed and formula[1][0] != '=':
+                return True
+            return not PDDLFormulas.holds(formula[1], atom_holds, bindings,
+                                          objects_by_type, relaxed, not positive)
+        if operator == 'imply':
+            return (relaxed or not PDDLFormulas.holds(formula[1], atom_holds, bindings,
+                                                      objects_by_type, relaxed, not positive)) or\
+                   PDDLFormulas.holds(formula[2], atom_holds, bindings,
+                                      objects_by_type, relaxed, positive)
+        if operator == '=':
+            return bindings.get(formula[1], formula[1]) == bindings.get(formula[2], formula[2])
+        if operator in ('forall', 'exists'):
+            quantifier = all if operator == 'forall' else any
+            variables = PDDLFormulas.get_variables(formula[1])
+            return quantifier(PDDLFormulas.holds(formula[2], atom_holds, quantified_bindings,
+                                                 objects_by_type, relaxed, positive)
+                              for quantified_bindings in PDDLFormulas.get_assignments(variables, bindings,
+                                                                                      objects_by_type))
+        return atom_holds(PDDLFormulas.ground(formula, bindings), positive)
+
+    @staticmethod
+    def ground(atom_pattern, bindings: dict) -> tuple:
+        '''Returns the atom obtained by replacing the variables of the given
+        atom pattern with the objects bound to them (constants are kept).
+
+        Keyword arguments:
+        @param atom_pattern -- an atom as a list or tuple of the form
+                               [predicate, arg_1, ..., arg_n]
+        @param bindings: dict -- variable bindings
+
+        '''
+        return tuple([atom_pattern[0]] + [bindings.get(arg, arg) for arg in atom_pattern[1:]])
+
+    @staticmethod
+    def iterate_atoms(formula: list):
+        '''Yields the atoms appearing in the given formula.
+
+        Keyword arguments:
+        @param formula: list -- a parsed formula
+
+        '''
+        if not formula or not isinstance(formula, list):
+            return
+        if formula[0] in ('and', 'or', 'not', 'imply', 'when'):
+            for sub_formula in formula[1:]:
+                for atom in PDDLFormulas.iterate_atoms(sub_formula):
+                    yield atom
+        elif formula[0] in ('forall', 'exists'):
+            for atom in PDDLFormulas.iterate_atoms(formula[2]):
+                yield atom
+        elif formula[0] != '=':
+            yield formula
+
+    @staticmethod
+    def get_free_variables(formula: list, bound_variables, predicates: dict) -> list:
+        '''Returns (variable, type) pairs for the variables of the given formula
+        that are not bound; the types are taken from the predicate declarations
+        in which the variables appear ("object" if they cannot be determined).
+
+        Keyword arguments:
+        @param formula: list -- a parsed formula
+        @param bound_variables -- a collection of bound variable names
+        @param predicates: dict -- the predicate declarations of a domain
+
+        '''
+        free_variables = {}
+        for atom in PDDLFormulas.iterate_atoms(formula):
+            params = predicates.get(atom[0], [])
+            for arg_idx, arg in enumerate(atom[1:]):
+                if arg.startswith('?') and arg not in bound_variables and arg not in free_variables:
+                    free_variables[arg] = params[arg_idx][1] if arg_idx < len(params) else 'object'
+        return list(free_variables.items())
+
+    @staticmethod
+    def get_assignments(variables: list, bindings: dict, objects_by_type: dict):
+        '''Yields copies of "bindings" extended with all assignments of
+        objects to the given (variable, type) pairs.
+
+        Keyword arguments:
+        @param variables: list -- (variable, type) pairs
+        @param bindings: dict -- variable bindings
+        @param objects_by_type: dict -- the objects of each type
+
+        '''
+        if not variables:
+            yield bindings
+            return
+
+        domains = [objects_by_type.get(variable_type, ()) for _, variable_type in variables]
+        for assignment in itertools.product(*domains):
+            extended_bindings = dict(bindings)
+            for (variable, _), obj in zip(variables, assignment):
+                extended_bindings[variable] = obj
+            yield extended_bindings
+
+    @staticmethod
+    def get_variables(variable_list: list) -> list:
+        '''Returns (variable, type) pairs for a quantifier variable list
+        (with the question marks of the variable names preserved).
+
+        Keyword arguments:
+        @param variable_list: list -- tokens of a typed variable list
+
+        '''
+        return [('?' + name, variable_type)
+                for name, variable_type in PDDLParser.parse_typed_list(variable_list)]
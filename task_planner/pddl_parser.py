@@ -0,0 +1,236 @@
+class PDDLParser(object):
+    '''A parser of PDDL expressions into nested lists of (lowercase) tokens.
+    '''
+    @staticmethod
+    def parse(pddl_str: str) -> list:
+        '''Returns a list of the top-level expressions in the given string.
+        Comments (starting with ";") are ignored.
+
+        Keyword arguments:
+        @param pddl_str: str -- a PDDL description
+
+        '''
+        lines = [line.split(';', 1)[0] for line in pddl_str.lower().split('\n')]
+        tokens = ' '.join(lines).replace('(', ' ( ').replace(')', ' ) ').split()
+
+        expression_stack = [[]]
+        for token in tokens:
+            if token == '(':
+                expression_stack.append([])
+            elif token == ')':
+                if len(expression_stack) == 1:
+                    raise ValueError('Unbalanced parentheses in PDDL description')
+                expression = expression_stack.pop()
+                expression_stack[-1].append(expression)
+            else:
+                expression_stack[-1].append(token)
+
+        if len(expression_stack) != 1:
+            raise ValueError('Unbalanced parentheses in PDDL description')
+        return expression_stack[0]
+
+    @staticmethod
+    def parse_typed_list(tokens: list) -> list:
+        '''Returns a list of (name, type) pairs for a PDDL typed list
+        of the form "?a ?b - type_1 ?c - type_2 ?d". Names without
+        an explicit type are assigned the type "object". Leading question
+        marks are removed from variable names.
+
+        Keyword arguments:
+        @param tokens: list -- tokens of a typed list
+
+        '''
+        typed_list = []
+        untyped_names = []
+        token_idx = 0
+        while token_idx < len(tokens):
+            token = tokens[token_idx]
+            if token == '-':
+                item_type = tokens[token_idx+1]
+                typed_list.extend([(name, item_type) for name in untyped_names])
+                untyped_names = []
+                token_idx += 2
+            else:
+                untyped_names.append(token.lstrip('?'))
+                token_idx += 1
+        typed_list.extend([(name, 'object') for name in untyped_names])
+        return typed_list
+
+
+class PDDLAction(object):
+    '''A (lifted) PDDL action.
+
+    @param name -- name of the action (lowercase)
+    @param params -- a list of (parameter name, parameter type) pairs
+    @param precondition -- the precondition formula as a nested list of tokens
+                           (an empty list if the action has no precondition)
+    @param effect -- the effect formula as a nested list of tokens
+    '''
+    def __init__(self, name: str, params: list, precondition: list, effect: list):
+        self.name = name
+        self.params = params
+        self.precondition = precondition
+        self.effect = effect
+
+    @staticmethod
+    def from_expression(action_expression: list):
+        '''Returns a PDDLAction object for the given parsed ":action" expression.
+
+        Keyword arguments:
+        @param action_expression: list -- a parsed action definition
+
+        '''
+        fields = {}
+        for field_idx in range(2, len(action_expression)-1, 2):
+            fields[action_expression[field_idx]] = action_expression[field_idx+1]
+        return PDDLAction(action_expression[1],
+                          PDDLParser.parse_typed_list(fields.get(':parameters', [])),
+                          fields.get(':precondition', []),
+                          fields.get(':effect', []))
+
+
+class PDDLDomain(object):
+    '''A representation of the parts of a PDDL domain description
+    that are needed for working with knowledge base assertions.
+
+    @param name -- name of the domain
+    @param requirements -- a list of the domain requirements
+    @param types -- a dictionary mapping type names to their parent types
+    @param predicates -- a dictionary mapping predicate names to lists
+                         of (parameter name, parameter type) pairs
+    @param functions -- a dictionary mapping function (numeric fluent) names
+                        to lists of (parameter name, parameter type) pairs
+    @param actions -- a dictionary mapping action names to PDDLAction objects
+    '''
+    def __init__(self):
+        self.name = ''
+        self.requirements = []
+        self.types = {}
+        self.predicates = {}
+        self.functions = {}
+        self.actions = {}
+
+    @staticmethod
+    def from_file(domain_file_name: str):
+        '''Returns a PDDLDomain object representing the given domain file.
+
+        Keyword arguments:
+        @param domain_file_name: str -- path of a PDDL domain file
+
+        '''
+        with open(domain_file_name, 'r') as domain_file:
+            return PDDLDomain.from_str(domain_file.read())
+
+    @staticmethod
+    def from_str(domain_str: str):
+        '''Returns a PDDLDomain object representing the given domain description.
+
+        Keyword arguments:
+        @param domain_str: str -- a PDDL domain description
+
+        '''
+        expressions = PDDLParser.parse(domain_str)
+        if not expressions or expressions[0][0] != 'define':
+            raise ValueError('Domain descriptions are expected to start with "define"')
+
+        domain = PDDLDomain()
+        for section in expressions[0][1:]:
+            section_name = section[0]
+            if section_name == 'domain':
+                domain.name = section[1]
+            elif section_name == ':requirements':
+                domain.requirements = section[1:]
+            elif section_name == ':types':
+                domain.types = dict(PDDLParser.parse_typed_list(section[1:]))
+            elif section_name == ':predicates':
+                for predicate in section[1:]:
+                    domain.predicates[predicate[0]] = PDDLParser.parse_typed_list(predicate[1:])
+            elif section_name == ':functions':
+                domain.functions.update(PDDLDomain.__parse_functions(section[1:]))
+            elif section_name == ':action':
+                action = PDDLAction.from_expression(section)
+                domain.actions[action.name] = action
+        return domain
+
+    @staticmethod
+    def __parse_functions(function_tokens: list) -> dict:
+        '''Returns a dictionary mapping function names to their parameters,
+        skipping the optional function types (e.g. "- number").
+
+        Keyword arguments:
+        @param function_tokens: list -- entries of a :functions section
+
+        '''
+        functions = {}
+        for function in function_tokens:
+            if isinstance(function, list):
+                functions[function[0]] = PDDLParser.parse_typed_list(function[1:])
+        return functions
+
+
+class PDDLProblem(object):
+    '''A grounded PDDL problem.
+
+    @param name -- name of the problem
+    @param domain_name -- name of the domain of the problem
+    @param objects -- a dictionary mapping object names to object types
+    @param init -- a set of atoms (tuples of the form (predicate, arg_1, ..., arg_n))
+                   that hold in the initial state
+    @param numeric_init -- a dictionary mapping numeric fluent atoms to their initial values
+    @param goals -- a list of goal atoms (the goal is their conjunction)
+    '''
+    def __init__(self):
+        self.name = ''
+        self.domain_name = ''
+        self.objects = {}
+        self.init = set()
+        self.numeric_init = {}
+        self.goals = []
+
+    @staticmethod
+    def from_file(problem_file_name: str):
+        '''Returns a PDDLProblem object representing the given problem file.
+
+        Keyword arguments:
+        @param problem_file_name: str -- path of a PDDL problem file
+
+        '''
+        with open(problem_file_name, 'r') as problem_file:
+            return PDDLProblem.from_str(problem_file.read())
+
+    @staticmethod
+    def from_str(problem_str: str):
+        '''Returns a PDDLProblem object representing the given problem description.
+        Only conjunctive goals of atoms are supported.
+
+        Keyword arguments:
+        @param problem_str: str -- a PDDL problem description
+
+        '''
+        expressions = PDDLParser.parse(problem_str)
+        if not expressions or expressions[0][0] != 'define':
+            raise ValueError('Problem descriptions are expected to start with "define"')
+
+        problem = PDDLProblem()
+        for section in expressions[0][1:]:
+            section_name = section[0]
+            if section_name == 'problem':
+                problem.name = section[1]
+            elif section_name == ':domain':
+                problem.domain_name = section[1]
+            elif section_name == ':objects':
+                problem.objects.update(PDDLParser.parse_typed_list(section[1:]))
+            elif section_name == ':init':
+                for atom in section[1:]:
+                    if atom[0] == '=':
+                        problem.numeric_init[tuple(atom[1])] = atom[2]
+                    else:
+                        problem.init.add(tuple(atom))
+            elif section_name == ':goal':
+                goal = section[1]
+                goal_atoms = goal[1:] if goal and goal[0] == 'and' else [goal]
+                for atom in goal_atoms:
+                    if not atom or atom[0] in ('not', 'or', 'forall', 'exists', 'imply'):
+                        raise ValueError('Only conjunctions of atoms are supported as goals')
+                    problem.goals.append(tuple(atom))
+        return problem
@@ -0,0 +1,290 @@
+import os
+import copy
+import time
+import uuid
+import atexit
+import pickle
+import hashlib
+import tempfile
+import threading
+import logging
+import weakref
+from collections import OrderedDict
+
+
+class DomainHashes(object):
+    '''Hashes of the contents of domain files, as used in the keys of the plan
+    and translation caches; the hash of a file is only recomputed if the
+    modification time or size of the file change.
+    '''
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__hashes = {}
+
+    def get(self, domain_file_name: str) -> str:
+        '''Returns a hash of the contents of the given domain file.
+
+        Keyword arguments:
+        @param domain_file_name: str -- path of a PDDL domain file
+
+        '''
+        file_stat = os.stat(domain_file_name)
+        file_version = (file_stat.st_mtime_ns, file_stat.st_size)
+        with self.__lock:
+            cached_version, domain_hash = self.__hashes.get(domain_file_name, (None, None))
+            if cached_version != file_version:
+                with open(domain_file_name, 'rb') as domain_file:
+                    domain_hash = hashlib.sha256(domain_file.read()).hexdigest()
+                self.__hashes[domain_file_name] = (file_version, domain_hash)
+            return domain_hash
+
+
+class PlanCache(object):
+    '''A cache of plans keyed by a hash of the planning problem and domain.
+
+    Problems are canonicalised before they are hashed, namely the entries
+    of the :objects, :init, and :goal sections are sorted, such that problems
+    that only differ in the order of their assertions share a key. Plans are
+    evicted in least-recently-used order once the cache holds "max_size" plans
+    and are considered expired "ttl" seconds after they were stored.
+    If a persistence file is given, the cache is loaded from it when the cache
+    is created; stored plans are written to it in batches by a background
+    thread (at most once per "save_interval" seconds and at exit), such that
+    storing a plan does not block the caller while the cache is pickled.
+    The caches are only weakly referenced by the exit handler; "close" saves
+    a cache, cancels its scheduled save, and stops saving it at exit.
+
+    Constructor arguments:
+    @param max_size -- maximum number of cached plans
+    @param ttl -- time (in seconds) after which cached plans expire
+                  (default None, in which case plans do not expire)
+    @param persistence_file -- path of a file in which the cache is persisted
+                               (default None, in which case the cache only lives in memory)
+    @param save_interval -- time (in seconds) after a plan is stored in which
+                            further plans are collected before the cache is saved
+    '''
+    problem_sections = ('(:objects', '(:init', '(:goal')
+
+    # persisted caches that are saved at exit (by a single exit handler)
+    __persisted_caches = weakref.WeakSet()
+    __persisted_caches_lock = threading.Lock()
+    __exit_handler_registered = False
+
+    def __init__(self, max_size: int=1000, ttl: float=None, persistence_file: str=None,
+                 save_interval: float=5.):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persistence_file = persistence_file
+        self.save_interval = save_interval
+        self.logger = logging.getLogger('task.planner.plan_cache')
+
+        self.__lock = threading.Lock()
+        self.__save_lock = threading.Lock()
+        self.__save_timer = None
+        self.__unsaved = False
+        self.__plans = OrderedDict()
+        self.__domain_hashes = DomainHashes()
+        self.hits = 0
+        self.misses = 0
+
+        if self.persistence_file:
+            if os.path.isfile(self.persistence_file):
+                self.__load()
+            PlanCache.__register_persisted_cache(self)
+
+    def get_domain_hash(self, domain_file_name: str) -> str:
+        '''Returns a hash of the contents of the given domain file (see DomainHashes).
+
+        Keyword arguments:
+        @param domain_file_name: str -- path of a PDDL domain file
+
+        '''
+        return self.__domain_hashes.get(domain_file_name)
+
+    def get_problem_key(self, domain_hash: str, problem_file_name: str) -> str:
+        '''Returns a key for the given problem file, namely a hash of the domain
+        hash and the canonicalised problem description.
+
+        Keyword arguments:
+        @param domain_hash: str -- a hash returned by "get_domain_hash"
+        @param problem_file_name: str -- path of a problem file
+
+        '''
+        sections = {section: [] for section in self.problem_sections}
+        current_section = None
+        with open(problem_file_name, 'r') as problem_file:
+            for line in problem_file:
+                line = line.strip()
+                if line in self.problem_sections:
+                    current_section = line
+                elif current_section == '(:objects':
+                    if line and line != ')':
+                        # the objects of a type can be listed in any order
+                        objects, _, obj_type = line.rpartition(' - ')
+                        sections[current_section].append('{0} - {1}'.format(' '.join(sorted(objects.split())),
+                                                                            obj_type))
+                elif current_section is not None and line.startswith('(') and line != '(and':
+                    sections[current_section].append(line)
+
+        problem_hash = hashlib.sha256(domain_hash.encode('utf-8'))
+        for section in self.problem_sections:
+            problem_hash.update(section.encode('utf-8'))
+            for entry in sorted(sections[section]):
+                problem_hash.update(entry.encode('utf-8'))
+                problem_hash.update(b'\n')
+        return problem_hash.hexdigest()
+
+    def get(self, key: str) -> list:
+        '''Returns a copy of the plan stored under the given key (with newly
+        generated action IDs) or None if no unexpired plan is stored under the key.
+
+        Keyword arguments:
+        @param key: str -- a key returned by "get_problem_key"
+
+        '''
+        with self.__lock:
+            entry = self.__plans.get(key)
+            if entry is not None and self.__is_expired(entry):
+                del self.__plans[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.__plans.move_to_end(key)
+            self.hits += 1
+            plan = copy.deepcopy(entry[1])
+
+        for action in plan:
+            action.id = str(uuid.uuid4())
+        return plan
+
+    def put(self, key: str, plan: list) -> None:
+        '''Stores a copy of the given plan under the given key; if the cache
+        is persisted, a save is scheduled in the background.
+
+        Keyword arguments:
+        @param key: str -- a key returned by "get_problem_key"
+        @param plan: list -- a list of ropod.structs.action.Action objects
+
+        '''
+        with self.__lock:
+            self.__plans[key] = (time.time(), copy.deepcopy(plan))
+            self.__plans.move_to_end(key)
+            while len(self.__plans) > self.max_size:
+                self.__plans.popitem(last=False)
+
+            self.__unsaved = True
+            if self.persistence_file and self.__save_timer is None:
+                self.__save_timer = threading.Timer(self.save_interval, self.flush)
+                self.__save_timer.daemon = True
+                self.__save_timer.start()
+
+    def clear(self) -> None:
+        '''Removes all plans from the cache (and from the persistence file).
+        '''
+        with self.__lock:
+            self.__plans.clear()
+            self.__unsaved = True
+        if self.persistence_file:
+            self.flush()
+
+    def flush(self) -> None:
+        '''Writes the cached plans to the persistence file (if the cache is persisted
+        and has changed since the last save) and cancels the scheduled save.
+        '''
+        if not self.persistence_file:
+            return
+
+        # saves are serialised so that an older snapshot cannot replace a newer one
+        with self.__save_lock:
+            with self.__lock:
+                if self.__save_timer is not None:
+                    self.__save_timer.cancel()
+                    self.__save_timer = None
+                if not self.__unsaved:
+                    return
+                self.__unsaved = False
+                # the entries are not modified once stored, so a shallow
+                # copy is enough for pickling them outside the lock
+                entries = list(self.__plans.items())
+            self.__save(entries)
+
+    def close(self) -> None:
+        '''Saves the cache (if it is persisted), cancels the scheduled save,
+        and removes the cache from the caches that are saved at exit.
+        '''
+        self.flush()
+        with PlanCache.__persisted_caches_lock:
+            PlanCache.__persisted_caches.discard(self)
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__plans)
+
+    @classmethod
+    def __register_persisted_cache(self, plan_cache) -> None:
+        '''Adds the given cache to the caches that are saved at exit;
+        the exit handler is registered with the first persisted cache.
+
+        Keyword arguments:
+        @param plan_cache: PlanCache -- a persisted cache
+
+        '''
+        with self.__persisted_caches_lock:
+            if not PlanCache.__exit_handler_registered:
+                atexit.register(PlanCache.__flush_persisted_caches)
+                PlanCache.__exit_handler_registered = True
+            self.__persisted_caches.add(plan_cache)
+
+    @classmethod
+    def __flush_persisted_caches(self) -> None:
+        '''Saves the persisted caches that are still alive.
+        '''
+        with self.__persisted_caches_lock:
+            plan_caches = list(self.__persisted_caches)
+        for plan_cache in plan_caches:
+            plan_cache.flush()
+
+    def __is_expired(self, entry: tuple) -> bool:
+        '''Returns True if the given (storage time, plan) entry has expired.
+        '''
+        return self.ttl is not None and time.time() - entry[0] > self.ttl
+
+    def __save(self, entries: list) -> None:
+        '''Writes the given cache entries to the persistence file; the file is
+        replaced atomically so that a crash cannot leave a partial cache behind.
+
+        Keyword arguments:
+        @param entries: list -- (key, (storage time, plan)) pairs
+
+        '''
+        cache_dir = os.path.dirname(os.path.abspath(self.persistence_file))
+        temp_file_name = None
+        try:
+            file_descriptor, temp_file_name = tempfile.mkstemp(dir=cache_dir)
+            with os.fdopen(file_descriptor, 'wb') as cache_file:
+                pickle.dump(entries, cache_file)
+            os.replace(temp_file_name, self.persistence_file)
+        except Exception as exc:
+            self.logger.error('Could not save the plan cache: %s', exc)
+            if temp_file_name is not None and os.path.exists(temp_file_name):
+                os.remove(temp_file_name)
+
+    def __load(self) -> None:
+        '''Loads the unexpired plans from the persistence file.
+        '''
+        try:
+            with open(self.persistence_file, 'rb') as cache_file:
+                entries = pickle.load(cache_file)
+        except Exception as exc:
+            self.logger.error('Could not load the plan cache: %s', exc)
+            return
+
+        for key, entry in entries:
+            if not self.__is_expired(entry):
+                self.__plans[key] = entry
+        while len(self.__plans) > self.max_size:
+            self.__plans.popitem(last=False)
+        self.logger.info('Loaded %d cached plans', len(self.__plans))
@@ -0,0 +1,163 @@
+import time
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+from task_planner.plan_result import PlanResult
+
+
+class PrometheusExporter(object):
+    '''Exports plan results (see PlanResult) as Prometheus metrics, namely
+    * "<namespace>_plan_requests_total": a counter of the planning requests
+      labelled by engine and by whether a plan was found
+    * "<namespace>_planner_timeouts_total": a counter of the planner runs
+      killed because of the planner time limit, labelled by engine
+    * "<namespace>_plan_stage_seconds": a histogram of the stage durations
+      labelled by engine and stage
+    * "<namespace>_plan_problem_objects" and "<namespace>_plan_problem_init_atoms":
+      histograms of the problem sizes
+    * "<namespace>_plan_cost": a histogram of the costs of the found plans
+    * "<namespace>_planner_cpu_seconds_total": a counter of the user and system
+      CPU time of the planners, labelled by engine
+    * "<namespace>_planner_peak_rss_bytes": a histogram of the peak resident
+      set sizes of the planners
+    The metrics can then be exposed with the usual prometheus_client functions
+    (e.g. "start_http_server"). Requires the "prometheus_client" package.
+
+    Constructor arguments:
+    @param registry -- a prometheus_client.CollectorRegistry (default None,
+                       in which case the default registry is used)
+    @param namespace -- prefix of the metric names
+    '''
+    stage_buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1., 5., 10., 30., 60.)
+    size_buckets = (10, 100, 1000, 10000, 100000, 1000000)
+    cost_buckets = (1, 2, 5, 10, 20, 50, 100)
+    memory_buckets = (2**24, 2**26, 2**28, 2**30, 2**32)
+
+    def __init__(self, registry=None, namespace: str='task_planner'):
+        if prometheus_client is None:
+            raise ImportError('The PrometheusExporter requires the prometheus_client package')
+
+        registry = registry if registry is not None else prometheus_client.REGISTRY
+        self.requests = prometheus_client.Counter('plan_requests', 'Planning requests',
+                                                  ['engine', 'plan_found'],
+                                                  namespace=namespace, registry=registry)
+        self.timeouts = prometheus_client.Counter('planner_timeouts',
+                                                  'Planner runs killed after exceeding the time limit',
+                                                  ['engine'], namespace=namespace, registry=registry)
+        self.stage_durations = prometheus_client.Histogram('plan_stage_seconds',
+                                                           'Durations of the stages of planning requests',
+                                                           ['engine', 'stage'], buckets=self.stage_buckets,
+                                                           namespace=namespace, registry=registry)
+        self.problem_objects = prometheus_client.Histogram('plan_problem_objects',
+                                                           'Number of objects of the planning problems',
+                                                           buckets=self.size_buckets,
+                                                           namespace=namespace, registry=registry)
+        self.problem_init_atoms = prometheus_client.Histogram('plan_problem_init_atoms',
+                                                              'Number of initial state atoms of the planning problems',
+                                                              buckets=self.size_buckets,
+                                                              namespace=namespace, registry=registry)
+        self.plan_costs = prometheus_client.Histogram('plan_cost', 'Costs of the found plans',
+                                                      buckets=self.cost_buckets,
+                                                      namespace=namespace, registry=registry)
+        self.planner_cpu_time = prometheus_client.Counter('planner_cpu_seconds',
+                                                          'User and system CPU time of the planners',
+                                                          ['engine'], namespace=namespace,
+                                                          registry=registry)
+        self.planner_peak_rss = prometheus_client.Histogram('planner_peak_rss_bytes',
+                                                            'Peak resident set sizes of the planners',
+                                                            buckets=self.memory_buckets,
+                                                            namespace=namespace, registry=registry)
+
+    def export(self, result: PlanResult) -> None:
+        '''Updates the metrics with the given plan result.
+
+        Keyword arguments:
+        @param result: PlanResult -- result of a planning request
+
+        '''
+        engine = str(result.engine)
+        self.requests.labels(engine=engine, plan_found=str(result.plan_found).lower()).inc()
+        for stage, duration in result.stage_timings.items():
+            self.stage_durations.labels(engine=engine, stage=stage).observe(duration)
+        if 'objects' in result.problem_size:
+            self.problem_objects.observe(result.problem_size['objects'])
+        if 'init_atoms' in result.problem_size:
+            self.problem_init_atoms.observe(result.problem_size['init_atoms'])
+        if result.plan_cost is not None:
+            self.plan_costs.observe(result.plan_cost)
+
+        usage = result.resource_usage
+        if usage is not None:
+            if usage.timed_out:
+                self.timeouts.labels(engine=engine).inc()
+            self.planner_cpu_time.labels(engine=engine).inc(usage.user_time + usage.system_time)
+            self.planner_peak_rss.observe(usage.peak_rss)
+
+
+class OpenTelemetryExporter(object):
+    '''Exports plan results (see PlanResult) as OpenTelemetry spans: a "plan"
+    span with the engine, the outcome, the plan cost and length, the problem
+    size, and the resource usage of the planner as attributes and a child span
+    for each stage of the request. Only the durations of the stages are recorded,
+    so the stage spans are laid out one after another, ending when the result
+    is exported. Requires the "opentelemetry-api" package (and an SDK for
+    actually collecting the spans).
+
+    Constructor arguments:
+    @param tracer -- an opentelemetry.trace.Tracer (default None, in which case
+                     a tracer is obtained from the global tracer provider)
+    '''
+    def __init__(self, tracer=None):
+        if otel_trace is None:
+            raise ImportError('The OpenTelemetryExporter requires the opentelemetry-api package')
+        self.tracer = tracer if tracer is not None else otel_trace.get_tracer('task_planner')
+
+    def export(self, result: PlanResult) -> None:
+        '''Creates the spans of the given plan result.
+
+        Keyword arguments:
+        @param result: PlanResult -- result of a planning request
+
+        '''
+        end_time = time.time_ns()
+        start_time = end_time - int(sum(result.stage_timings.values()) * 1e9)
+
+        span = self.tracer.start_span('plan', start_time=start_time,
+                                      attributes=self.__get_attributes(result))
+        context = otel_trace.set_span_in_context(span)
+        stage_start_time = start_time
+        for stage, duration in result.stage_timings.items():
+            stage_end_time = min(stage_start_time + int(duration * 1e9), end_time)
+            stage_span = self.tracer.start_span(stage, context=context,
+                                                start_time=stage_start_time)
+            stage_span.end(end_time=stage_end_time)
+            stage_start_time = stage_end_time
+        span.end(end_time=end_time)
+
+    @staticmethod
+    def __get_attributes(result: PlanResult) -> dict:
+        '''Returns the span attributes of the given plan result.
+
+        Keyword arguments:
+        @param result: PlanResult -- result of a planning request
+
+        '''
+        attributes = {'planner.engine': str(result.engine),
+                      'planner.plan_found': result.plan_found,
+                      'planner.plan_length': len(result.plan)}
+        if result.plan_cost is not None:
+            attributes['planner.plan_cost'] = float(result.plan_cost)
+        for size_name, size in result.problem_size.items():
+            attributes['planner.problem.{0}'.format(size_name)] = size
+        if result.resource_usage is not None:
+            for usage_name, value in result.resource_usage.to_dict().items():
+                attributes['planner.{0}'.format(usage_name)] = value
+        return attributes
@@ -0,0 +1,205 @@
+import time
+import contextlib
+from typing import Sequence, Iterable
+
+
+class ResourceUsage(object):
+    '''Resources used by a planner run (including the processes
+    started by the planner, such as the Fast Downward translator and search).
+
+    Constructor arguments:
+    @param exit_status -- exit status of the planner (the negated signal number
+                          if the planner was killed by a signal)
+    @param timed_out -- whether the planner was killed because it exceeded its time limit
+    @param wall_time -- wall-clock run time (in seconds)
+    @param user_time -- user CPU time (in seconds)
+    @param system_time -- system CPU time (in seconds)
+    @param peak_rss -- peak resident set size (in bytes) of the planner
+                       or of the largest process started by it
+    @param startup_time -- time (in seconds) taken to start the planner process
+    '''
+    def __init__(self, exit_status: int, timed_out: bool=False, wall_time: float=0.,
+                 user_time: float=0., system_time: float=0., peak_rss: int=0,
+                 startup_time: float=0.):
+        self.exit_status = exit_status
+        self.timed_out = timed_out
+        self.wall_time = wall_time
+        self.user_time = user_time
+        self.system_time = system_time
+        self.peak_rss = peak_rss
+        self.startup_time = startup_time
+
+    @staticmethod
+    def combine(usages: Sequence['ResourceUsage']) -> 'ResourceUsage':
+        '''Returns the resource usage of a sequence of planner runs (e.g. of the
+        translator and search runs of a request), namely the summed times,
+        the maximum peak RSS, and the exit status of the last run.
+        Returns None if the sequence contains no runs.
+
+        Keyword arguments:
+        @param usages: Sequence[ResourceUsage] -- resource usages (None entries are ignored)
+
+        '''
+        usages = [usage for usage in usages if usage is not None]
+        if not usages:
+            return None
+        return ResourceUsage(usages[-1].exit_status,
+                             any([usage.timed_out for usage in usages]),
+                             sum([usage.wall_time for usage in usages]),
+                             sum([usage.user_time for usage in usages]),
+                             sum([usage.system_time for usage in usages]),
+                             max([usage.peak_rss for usage in usages]),
+                             sum([usage.startup_time for usage in usages]))
+
+    def to_dict(self) -> dict:
+        return {'exit_status': self.exit_status,
+                'timed_out': self.timed_out,
+                'wall_time': self.wall_time,
+                'user_time': self.user_time,
+                'system_time': self.system_time,
+                'peak_rss': self.peak_rss,
+                'startup_time': self.startup_time}
+
+    def __repr__(self) -> str:
+        return 'ResourceUsage({0})'.format(self.to_dict())
+
+
+class PlanStatistics(object):
+    '''Collects the durations of the stages of a planning request and
+    the size of the generated problem while the request is processed.
+
+    The stages are usually (in this order) "kb_read", "problem_generation",
+    "translation" (only for LAMA with a translation cache), "planner_startup",
+    "search", "plan_parsing", and "floor_resolution". Stages can be nested
+    (e.g. the knowledge base is read while the problem is generated);
+    the duration of a stage then excludes the time spent in nested stages,
+    so that the durations of all stages add up to the duration of the request.
+    '''
+    stages = ('kb_read', 'problem_generation', 'translation', 'planner_startup',
+              'search', 'plan_parsing', 'floor_resolution')
+
+    def __init__(self):
+        self.stage_timings = {}
+        self.problem_size = {}
+        self.__nested_times = []
+
+    def add_stage_time(self, stage: str, duration: float) -> None:
+        '''Adds the given duration to the duration of a stage.
+
+        Keyword arguments:
+        @param stage: str -- name of a stage
+        @param duration: float -- duration (in seconds)
+
+        '''
+        self.stage_timings[stage] = self.stage_timings.get(stage, 0.) + duration
+
+    @contextlib.contextmanager
+    def time_stage(self, stage: str):
+        '''A context manager that adds the time spent in its
+        body (excluding nested stages) to the duration of a stage.
+
+        Keyword arguments:
+        @param stage: str -- name of a stage
+
+        '''
+        self.__nested_times.append(0.)
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            duration = time.monotonic() - start_time
+            nested_time = self.__nested_times.pop()
+            if self.__nested_times:
+                self.__nested_times[-1] += duration
+            self.add_stage_time(stage, duration - nested_time)
+
+    def time_iterable(self, stage: str, iterable: Iterable) -> Iterable:
+        '''Yields the items of the given iterable and adds the time spent
+        retrieving them (e.g. reading a database cursor) to the duration
+        of a stage; the time spent processing the items is not included.
+
+        Keyword arguments:
+        @param stage: str -- name of a stage
+        @param iterable: Iterable -- an iterable whose items are retrieved lazily
+
+        '''
+        iterator = iter(iterable)
+        while True:
+            with self.time_stage(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def add_planner_usage(self, usage: 'ResourceUsage', stage: str='search') -> None:
+        '''Adds the startup time of a planner run to the "planner_startup"
+        stage and the remaining run time to the given stage.
+
+        Keyword arguments:
+        @param usage: ResourceUsage -- resource usage of a planner run (ignored if None)
+        @param stage: str -- stage of the planner run (default "search")
+
+        '''
+        if usage is None:
+            return
+        self.add_stage_time('planner_startup', usage.startup_time)
+        self.add_stage_time(stage, usage.wall_time)
+
+
+class PlanResult(object):
+    '''The result of a planning request. For compatibility with the
+    (plan_found, plan) tuples returned by the planners, a PlanResult
+    can be unpacked and indexed like such a tuple.
+
+    Constructor arguments:
+    @param plan_found -- whether a plan was found
+    @param plan -- a list of ropod.structs.action.Action objects
+    @param resource_usage -- a ResourceUsage object describing the planner run
+                             (None if no planner was run, e.g. for cached plans)
+    @param engine -- name of the planner that produced the result (e.g. "lama")
+    @param plan_cost -- cost of the plan as reported by the planner
+                        (None if no plan was found or the cost is not known)
+    @param stage_timings -- a dictionary mapping the stages of the request
+                            to their durations in seconds (see PlanStatistics)
+    @param problem_size -- a dictionary with the number of "objects"
+                           and "init_atoms" of the generated problem
+    '''
+    def __init__(self, plan_found: bool, plan: list, resource_usage: ResourceUsage=None,
+                 engine: str=None, plan_cost: float=None, stage_timings: dict=None,
+                 problem_size: dict=None):
+        self.plan_found = plan_found
+        self.plan = plan
+        self.resource_usage = resource_usage
+        self.engine = engine
+        self.plan_cost = plan_cost
+        self.stage_timings = stage_timings if stage_timings is not None else {}
+        self.problem_size = problem_size if problem_size is not None else {}
+
+    def to_dict(self) -> dict:
+        '''Returns the result (without the plan itself) as a dictionary,
+        e.g. for logging or serialising it.
+        '''
+        return {'plan_found': self.plan_found,
+                'plan_length': len(self.plan),
+                'plan_cost': self.plan_cost,
+                'engine': self.engine,
+                'stage_timings': dict(self.stage_timings),
+                'problem_size': dict(self.problem_size),
+                'resource_usage': self.resource_usage.to_dict() if self.resource_usage is not None else None}
+
+    def __iter__(self):
+        yield self.plan_found
+        yield self.plan
+
+    def __getitem__(self, idx):
+        return (self.plan_found, self.plan)[idx]
+
+    def __len__(self) -> int:
+        return 2
+
+    def __repr__(self) -> str:
+        return 'PlanResult(plan_found={0}, engine={1}, plan_cost={2}, plan={3})'.format(self.plan_found,
+                                                                                       self.engine,
+                                                                                       self.plan_cost,
+                                                                                       self.plan)
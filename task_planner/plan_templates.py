@@ -0,0 +1,283 @@
+import threading
+import logging
+from typing import Sequence
+
+from task_planner.pddl_parser import PDDLDomain, PDDLProblem
+from task_planner.plan_validator import PlanValidator
+
+
+class PlanTemplate(object):
+    '''A lifted plan, namely a plan in which the objects are replaced by variables.
+
+    @param goals -- lifted goal atoms of the problem for which the plan was found
+    @param actions -- lifted actions of the plan
+    @param required_atoms -- lifted atoms of the initial state on which the plan relies
+    @param variable_types -- a dictionary mapping the template variables to object types
+    '''
+    def __init__(self, goals: list, actions: list, required_atoms: list, variable_types: dict):
+        self.goals = goals
+        self.actions = actions
+        self.required_atoms = required_atoms
+        self.variable_types = variable_types
+
+    def get_signature(self) -> tuple:
+        '''Returns the goal predicate names of the template (in sorted order);
+        a template can only be instantiated for problems with the same signature.
+        '''
+        return PlanTemplate.get_goal_signature(self.goals)
+
+    @staticmethod
+    def get_goal_signature(goals: Sequence[tuple]) -> tuple:
+        '''Returns the sorted goal predicate names of the given goal atoms.
+
+        Keyword arguments:
+        @param goals: Sequence[tuple] -- goal atoms
+
+        '''
+        return tuple(sorted([goal[0] for goal in goals]))
+
+    @staticmethod
+    def lift(problem: PDDLProblem, actions: Sequence[tuple], required_atoms: set):
+        '''Returns a PlanTemplate in which each object of the given plan,
+        goals, and required atoms is replaced by a variable.
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- the problem for which the plan was found
+        @param actions: Sequence[tuple] -- grounded actions as (name, arg_1, ..., arg_n) tuples
+        @param required_atoms: set -- atoms of the initial state on which the plan relies
+
+        '''
+        variables = {}
+        variable_types = {}
+
+        def lift_atom(atom):
+            lifted_args = []
+            for obj in atom[1:]:
+                if obj not in variables:
+                    variable = '?v{0}'.format(len(variables))
+                    variables[obj] = variable
+                    variable_types[variable] = problem.objects.get(obj, 'object')
+                lifted_args.append(variables[obj])
+            return tuple([atom[0]] + lifted_args)
+
+        # the variables are introduced in the order goals, actions,
+        # required atoms so that goal variables are bound first
+        goals = [lift_atom(goal) for goal in problem.goals]
+        lifted_actions = [lift_atom(action) for action in actions]
+        lifted_required_atoms = [lift_atom(atom) for atom in sorted(required_atoms)]
+        return PlanTemplate(goals, lifted_actions, lifted_required_atoms, variable_types)
+
+    def __eq__(self, other) -> bool:
+        return self.goals == other.goals and self.actions == other.actions and\
+               self.required_atoms == other.required_atoms
+
+
+class PlanTemplateLibrary(object):
+    '''A library of plan templates, namely of plans in which the concrete
+    robots, loads, locations, etc. are replaced by variables.
+
+    A found plan is lifted into a template together with the atoms of
+    the initial state on which the plan relies (those read by the action
+    preconditions). To reuse a template for a new problem, the template
+    goals are matched with the problem goals and the remaining variables
+    are bound by matching the required atoms with the initial state of
+    the problem; the instantiated plan is then validated by simulating it
+    on the problem (preconditions and goals). The planner thus only needs
+    to be invoked if no template can be instantiated.
+
+    Constructor arguments:
+    @param domain -- the planning domain
+    @param max_templates_per_signature -- maximum number of templates stored
+                                          for the same goal predicates
+    @param max_binding_steps -- maximum number of partial variable bindings
+                                explored when instantiating a template
+    '''
+    def __init__(self, domain: PDDLDomain, max_templates_per_signature: int=10,
+                 max_binding_steps: int=10000):
+        self.domain = domain
+        self.validator = PlanValidator(domain)
+        self.max_templates_per_signature = max_templates_per_signature
+        self.max_binding_steps = max_binding_steps
+        self.logger = logging.getLogger('task.planner.plan_templates')
+
+        self.__lock = threading.Lock()
+        self.__templates = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def from_domain_file(domain_file_name: str, **kwargs):
+        '''Returns a template library for the domain described in the given file.
+
+        Keyword arguments:
+        @param domain_file_name: str -- path of a PDDL domain file
+        @param kwargs -- additional constructor arguments
+
+        '''
+        return PlanTemplateLibrary(PDDLDomain.from_file(domain_file_name), **kwargs)
+
+    def add(self, problem: PDDLProblem, action_strings: Sequence[str]) -> bool:
+        '''Lifts the given plan into a template and adds it to the library.
+        Returns False if the plan is not valid for the problem.
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- the problem for which the plan was found
+        @param action_strings: Sequence[str] -- grounded actions of the form
+                                                "(action_name arg_1 ... arg_n)"
+
+        '''
+        if not self.validator.validate(problem, action_strings):
+            self.logger.warning('Plan is not valid for the problem; not creating a template')
+            return False
+
+        required_atoms = self.validator.get_required_atoms(problem, action_strings)
+        actions = [self.__get_action_tuple(action_string) for action_string in action_strings]
+        template = PlanTemplate.lift(problem, actions, required_atoms)
+
+        with self.__lock:
+            templates = self.__templates.setdefault(template.get_signature(), [])
+            if template in templates:
+                templates.remove(template)
+            templates.insert(0, template)
+            del templates[self.max_templates_per_signature:]
+        return True
+
+    def instantiate(self, problem: PDDLProblem) -> list:
+        '''Returns a plan (as a list of "(action_name arg_1 ... arg_n)" strings)
+        for the given problem obtained from one of the stored templates
+        or None if no template can be instantiated for the problem.
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- a planning problem
+
+        '''
+        with self.__lock:
+            templates = list(self.__templates.get(PlanTemplate.get_goal_signature(problem.goals), []))
+
+        if templates:
+            init_index = self.__get_init_index(problem)
+            for template in templates:
+                for bindings in self.__get_bindings(template, problem, init_index):
+                    action_strings = ['({0})'.format(' '.join([action[0]] + [bindings[arg] for arg in action[1:]]))
+                                      for action in template.actions]
+                    if self.validator.validate(problem, action_strings):
+                        with self.__lock:
+                            self.hits += 1
+                        return action_strings
+
+        with self.__lock:
+            self.misses += 1
+        return None
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return sum([len(templates) for templates in self.__templates.values()])
+
+    def __get_bindings(self, template: PlanTemplate, problem: PDDLProblem, init_index: dict):
+        '''Yields injective assignments of problem objects to the template variables
+        under which the template goals are the problem goals and the required atoms
+        of the template hold in the initial state of the problem.
+        '''
+        steps = [0]
+        objects_by_type = {}
+        for obj, obj_type in problem.objects.items():
+            objects_by_type.setdefault(obj_type, []).append(obj)
+
+        def bind(bindings, used_objects, atom, candidate):
+            # returns the bindings and used objects extended such that "atom"
+            # is mapped to "candidate" or None if the extension is inconsistent
+            if len(atom) != len(candidate) or atom[0] != candidate[0]:
+                return None
+            new_bindings = dict(bindings)
+            new_used_objects = set(used_objects)
+            for variable, obj in zip(atom[1:], candidate[1:]):
+                bound_obj = new_bindings.get(variable)
+                if bound_obj is not None:
+                    if bound_obj != obj:
+                        return None
+                    continue
+                if obj in new_used_objects or problem.objects.get(obj) != template.variable_types[variable]:
+                    return None
+                new_bindings[variable] = obj
+                new_used_objects.add(obj)
+            return new_bindings, new_used_objects
+
+        def match_goals(goal_idx, bindings, used_objects, matched_goals):
+            if goal_idx == len(template.goals):
+                yield bindings, used_objects
+                return
+            for problem_goal_idx, problem_goal in enumerate(problem.goals):
+                if problem_goal_idx in matched_goals:
+                    continue
+                extension = bind(bindings, used_objects, template.goals[goal_idx], problem_goal)
+                if extension is not None:
+                    for result in match_goals(goal_idx+1, extension[0], extension[1],
+                                              matched_goals | {problem_goal_idx}):
+                        yield result
+
+        def match_atoms(remaining_atoms, bindings, used_objects):
+            steps[0] += 1
+            if steps[0] > self.max_binding_steps:
+                return
+            if not remaining_atoms:
+                for result in bind_free_variables(bindings, used_objects):
+                    yield result
+                return
+
+            # the atom with the most bound variables is matched first
+            atom_idx = max(range(len(remaining_atoms)),
+                           key=lambda idx: sum([arg in bindings for arg in remaining_atoms[idx][1:]]))
+            atom = remaining_atoms[atom_idx]
+            other_atoms = remaining_atoms[:atom_idx] + remaining_atoms[atom_idx+1:]
+            if all(arg in bindings for arg in atom[1:]):
+                grounded_atom = tuple([atom[0]] + [bindings[arg] for arg in atom[1:]])
+                if grounded_atom in problem.init:
+                    for result in match_atoms(other_atoms, bindings, used_objects):
+                        yield result
+                return
+
+            for candidate in init_index.get((atom[0], len(atom)), []):
+                extension = bind(bindings, used_objects, atom, candidate)
+                if extension is not None:
+                    for result in match_atoms(other_atoms, extension[0], extension[1]):
+                        yield result
+
+        def bind_free_variables(bindings, used_objects):
+            # variables that are not constrained by goals or required atoms
+            # are bound to the first unused object of their type
+            bindings = dict(bindings)
+            used_objects = set(used_objects)
+            for variable, variable_type in template.variable_types.items():
+                if variable in bindings:
+                    continue
+                unused_objects = [obj for obj in objects_by_type.get(variable_type, [])
+                                  if obj not in used_objects]
+                if not unused_objects:
+                    return
+                bindings[variable] = unused_objects[0]
+                used_objects.add(unused_objects[0])
+            yield bindings
+
+        for bindings, used_objects in match_goals(0, {}, set(), frozenset()):
+            for result in match_atoms(template.required_atoms, bindings, used_objects):
+                yield result
+            if steps[0] > self.max_binding_steps:
+                self.logger.debug('Giving up template instantiation after %d steps', steps[0])
+                return
+
+    @staticmethod
+    def __get_init_index(problem: PDDLProblem) -> dict:
+        '''Returns a dictionary mapping (predicate name, atom length) pairs
+        to the atoms of the initial state of the given problem.
+        '''
+        init_index = {}
+        for atom in problem.init:
+            init_index.setdefault((atom[0], len(atom)), []).append(atom)
+        return init_index
+
+    @staticmethod
+    def __get_action_tuple(action_string: str) -> tuple:
+        '''Returns a (name, arg_1, ..., arg_n) tuple for an action string
+        of the form "(action_name arg_1 ... arg_n)".
+        '''
+        return tuple(action_string.strip().strip('()').lower().split())
@@ -0,0 +1,146 @@
+from typing import Tuple, Sequence
+
+from task_planner.pddl_parser import PDDLDomain, PDDLProblem
+from task_planner.pddl_formulas import PDDLFormulas
+
+
+class PlanValidator(object):
+    '''Validates plans by simulating them on a PDDL problem.
+
+    The validator supports the formulas that appear in STRIPS domains with
+    negative preconditions, equality, quantifiers, and conditional effects
+    (and, or, not, imply, =, forall, exists, and when). Variables that appear
+    in conditional effects without being declared as action parameters are
+    treated as universally quantified (over the objects of the type with
+    which they appear in the predicate declarations).
+
+    Constructor arguments:
+    @param domain -- a parsed PDDL domain
+    '''
+    def __init__(self, domain: PDDLDomain):
+        self.domain = domain
+
+    def validate(self, problem: PDDLProblem, action_strings: Sequence[str]) -> bool:
+        '''Returns True if the given plan is applicable in the initial state
+        of the problem and achieves the problem goals.
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- a planning problem
+        @param action_strings: Sequence[str] -- grounded actions of the form
+                                                "(action_name arg_1 ... arg_n)"
+
+        '''
+        valid, state, _ = self.simulate(problem, action_strings)
+        return valid and all(goal in state for goal in problem.goals)
+
+    def get_required_atoms(self, problem: PDDLProblem, action_strings: Sequence[str]) -> set:
+        '''Returns the atoms of the initial state on which the given plan relies,
+        namely the atoms that are read by the (positive) preconditions and
+        effect conditions of the actions before they are produced by the plan.
+        Returns None if the plan is not applicable.
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- a planning problem
+        @param action_strings: Sequence[str] -- grounded actions of the form
+                                                "(action_name arg_1 ... arg_n)"
+
+        '''
+        valid, _, required_atoms = self.simulate(problem, action_strings)
+        if not valid:
+            return None
+        return required_atoms
+
+    def simulate(self, problem: PDDLProblem,
+                 action_strings: Sequence[str]) -> Tuple[bool, set, set]:
+        '''Applies the given plan to the initial state of the problem and returns
+        a tuple (applicable, final state, atoms of the initial state read by the plan).
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- a planning problem
+        @param action_strings: Sequence[str] -- grounded actions of the form
+                                                "(action_name arg_1 ... arg_n)"
+
+        '''
+        objects_by_type = self.get_objects_by_type(problem)
+        state = set(problem.init)
+        produced_atoms = set()
+        required_atoms = set()
+
+        for action_string in action_strings:
+            action_tokens = action_string.strip().strip('()').lower().split()
+            action = self.domain.actions.get(action_tokens[0])
+            if action is None or len(action.params) != len(action_tokens) - 1:
+                return False, state, required_atoms
+
+            bindings = {}
+            for (param_name, param_type), obj in zip(action.params, action_tokens[1:]):
+                if obj not in objects_by_type.get(param_type, ()):
+                    return False, state, required_atoms
+                bindings['?' + param_name] = obj
+
+            read_atoms = set()
+            if not self.__evaluate(action.precondition, state, bindings,
+                                   objects_by_type, read_atoms):
+                return False, state, required_atoms
+
+            added_atoms, deleted_atoms = set(), set()
+            self.__apply(action.effect, state, bindings, objects_by_type,
+                         added_atoms, deleted_atoms, read_atoms)
+
+            required_atoms.update(read_atoms - produced_atoms)
+            state.difference_update(deleted_atoms)
+            state.update(added_atoms)
+            produced_atoms.update(added_atoms)
+        return True, state, required_atoms
+
+    def get_objects_by_type(self, problem: PDDLProblem) -> dict:
+        '''Returns a dictionary mapping each type to the objects of the type
+        and its subtypes (see PDDLFormulas.get_objects_by_type).
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- a planning problem
+
+        '''
+        return PDDLFormulas.get_objects_by_type(self.domain, problem)
+
+    def __evaluate(self, formula: list, state: set, bindings: dict,
+                   objects_by_type: dict, read_atoms: set) -> bool:
+        '''Evaluates a formula in the given state; the atoms that are true and
+        appear with a positive polarity are added to "read_atoms".
+        '''
+        def atom_holds(atom: tuple, positive: bool) -> bool:
+            holds = atom in state
+            if holds and positive:
+                read_atoms.add(atom)
+            return holds
+        return PDDLFormulas.holds(formula, atom_holds, bindings, objects_by_type)
+
+    def __apply(self, effect: list, state: set, bindings: dict, objects_by_type: dict,
+                added_atoms: set, deleted_atoms: set, read_atoms: set) -> None:
+        '''Collects the atoms added and deleted by an effect in the given state.
+        '''
+        if not effect:
+            return
+
+        operator = effect[0]
+        if operator == 'and':
+            for sub_effect in effect[1:]:
+                self.__apply(sub_effect, state, bindings, objects_by_type,
+                             added_atoms, deleted_atoms, read_atoms)
+        elif operator == 'forall':
+            variables = PDDLFormulas.get_variables(effect[1])
+            for quantified_bindings in PDDLFormulas.get_assignments(variables, bindings, objects_by_type):
+                self.__apply(effect[2], state, quantified_bindings, objects_by_type,
+                             added_atoms, deleted_atoms, read_atoms)
+        elif operator == 'when':
+            free_variables = PDDLFormulas.get_free_variables(effect, bindings, self.domain.predicates)
+            for conditional_bindings in PDDLFormulas.get_assignments(free_variables, bindings,
+                                                                     objects_by_type):
+                if self.__evaluate(effect[1], state, conditional_bindings,
+                                   objects_by_type, read_atoms):
+                    self.__apply(effect[2], state, conditional_bindings, objects_by_type,
+                                 added_atoms, deleted_atoms, read_atoms)
+        elif operator == 'not':
+            deleted_atoms.add(PDDLFormulas.ground(effect[1], bindings))
+        else:
+            added_atoms.add(PDDLFormulas.ground(effect, bindings))
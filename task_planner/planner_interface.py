@@ -1,27 +1,122 @@
+import os
+import sys
+import time
+import signal
+import shutil
+import asyncio
+import functools
+import tempfile
+import threading
+import subprocess
+import resource
+import logging
 from abc import abstractmethod
-from typing import Tuple
+from os.path import join
+from typing import Tuple, Sequence, Callable
 from ropod.structs.task import TaskRequest
 from ropod.structs.action import Action
-from task_planner.knowledge_base_interface import KnowledgeBaseInterface
+from task_planner.knowledge_base_interface import KnowledgeBaseInterface, Predicate
+from task_planner.knowledge_models import PDDLKnowledgeModel
+from task_planner.problem_builder import PDDLProblemBuilder
+from task_planner.problem_pruner import ProblemPruner
+from task_planner.pddl_parser import PDDLProblem
+from task_planner.plan_result import ResourceUsage, PlanStatistics, PlanResult
 
 
 class TaskPlannerInterface(object):
-    def __init__(self, kb_database_name, domain_file, planner_cmd, plan_file_path, debug=False):
-        self.kb_interface = KnowledgeBaseInterface(kb_database_name)
-        self.domain_file = domain_file
+    # I/O backends for problem and plan files; with the "disk" backend,
+    # the files are written to plan_file_path, while the "memory" backend
+    # uses a RAM-backed file system (shared memory if available)
+    io_backends = ('disk', 'memory')
+    shared_memory_path = '/dev/shm'
+
+    # name of the planner reported in the plan results
+    engine_name = None
+
+    # used instead of prlimit if it is not available; sets the address space limit
+    # given as the first argument and executes the command given by the remaining arguments
+    memory_limit_shim = ('import os, sys, resource; limit = int(sys.argv[1]); '
+                         'resource.setrlimit(resource.RLIMIT_AS, (limit, limit)); '
+                         'os.execvp(sys.argv[2], sys.argv[2:])')
+
+    # user and system time of the reaped child processes that are already
+    # accounted for (see "__get_children_usage"); shared by all interfaces,
+    # since the usage of the child processes is only known per process
+    __accounted_children_usage = list(resource.getrusage(resource.RUSAGE_CHILDREN)[:2])
+    __children_usage_lock = threading.Lock()
+
+    def __init__(self, kb_database_name, domain_file, planner_cmd, plan_file_path,
+                 debug=False, io_backend='disk', plan_cache=None,
+                 plan_templates=None, prune_problems=False,
+                 planner_timeout=None, planner_memory_limit=None,
+                 result_exporters=None, **kb_args):
+        self.kb_interface = KnowledgeBaseInterface(kb_database_name, **kb_args)
+        self.domain_file = os.path.abspath(domain_file)
         self.domain_name = self.__get_domain_name(self.domain_file)
-        self.planner_cmd = planner_cmd.replace('DOMAIN', self.domain_file)
+        self.planner_cmd = self.__get_planner_cmd(planner_cmd)
         self.plan_file_path = plan_file_path
         self.debug = debug
+        self.io_dir = self.__get_io_dir(io_backend)
+        self.io_backend = io_backend
+        self.plan_cache = plan_cache
+        self.plan_templates = plan_templates
+        self.planner_timeout = planner_timeout
+        self.planner_memory_limit = planner_memory_limit
+        self.result_exporters = list(result_exporters or [])
+        self.knowledge_model = PDDLKnowledgeModel.from_domain_file(self.domain_file)
+        problem_pruner = ProblemPruner(self.knowledge_model) if prune_problems else None
+        self.problem_builder = PDDLProblemBuilder(self.domain_name, self.kb_interface,
+                                                  knowledge_model=self.knowledge_model,
+                                                  problem_pruner=problem_pruner)
 
     @abstractmethod
     def plan(self, task_request: TaskRequest,
              robot: str, plan_goals: list=None):
         pass
 
+    async def plan_async(self, task_request: TaskRequest,
+                         robot: str, plan_goals: list=None):
+        '''Asynchronous version of "plan"; the default implementation
+        runs "plan" in the default executor of the event loop.
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.plan, task_request,
+                                                                  robot, plan_goals))
+
+    @abstractmethod
+    async def solve_problem_async(self, problem_file: str, work_dir: str,
+                                  task: str, robot: str,
+                                  statistics: PlanStatistics=None) -> PlanResult:
+        '''Runs the planner on an existing problem file and returns the parsed
+        plan as a PlanResult (which can be unpacked as a (plan_found, plan) tuple);
+        the result is not passed to the result exporters.
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+        @param work_dir: str -- directory in which the planner is run
+                                and to which the plan files are written
+        @param task: str -- task for which a plan is requested
+        @param robot: str -- name of the robot for which a plan is requested
+        @param statistics: PlanStatistics -- statistics of the request to which the
+                                             stages of the planner run are added (default None)
+
+        '''
+        pass
+
     @abstractmethod
     def generate_problem_file(self, predicate_assertions: list,
                               fluent_assertions: list, task_goals: list) -> str:
+        '''Writes a problem description generated from the given assertions and
+        goals to a new file in the directory of the configured I/O backend (see
+        "io_backends"; plan_file_path for the "disk" backend) and returns the
+        absolute path of the file, which is to be removed by the caller.
+
+        Keyword arguments:
+        @param predicate_assertions: list -- a list of Predicate objects
+        @param fluent_assertions: list -- a list of Fluent objects
+        @param task_goals: list -- a list of Predicate objects representing the planning goals
+
+        '''
         pass
 
     @abstractmethod
@@ -33,6 +128,498 @@ class TaskPlannerInterface(object):
                    robot: str) -> Tuple[bool, list]:
         pass
 
+    def get_goal_predicates(self, task_goals: list) -> list:
+        '''Returns a list of Predicate objects representing the given goals.
+
+        Keyword arguments:
+        @param task_goals: list -- planning goals; each goal can be a Predicate object,
+                                   a tuple, or a dictionary
+
+        '''
+        predicate_task_goals = []
+        for task_goal in task_goals:
+            if isinstance(task_goal, Predicate):
+                predicate_task_goals.append(task_goal)
+            elif isinstance(task_goal, tuple):
+                predicate_task_goals.append(Predicate.from_tuple(task_goal))
+            elif isinstance(task_goal, dict):
+                predicate_task_goals.append(Predicate.from_dict(task_goal))
+            else:
+                raise Exception('Invalid type to task_goal encountered')
+        return predicate_task_goals
+
+    async def run_in_executor(self, func, *args, **kwargs):
+        '''Runs the given (blocking) function in the default executor
+        of the event loop and returns its result.
+
+        Keyword arguments:
+        @param func -- a function
+        @param args -- positional arguments of the function
+        @param kwargs -- keyword arguments of the function
+
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    def run_planner(self, planner_cmd_elements: Sequence[str], cwd: str, stdout=None,
+                    output_callback: Callable[[str], None]=None) -> ResourceUsage:
+        '''Runs the planner in its own session and returns its resource usage.
+        The address space of the planner (and of the processes it starts) is
+        limited to "planner_memory_limit" bytes and the whole process group
+        of the planner is killed if the planner runs for longer than
+        "planner_timeout" seconds.
+
+        Keyword arguments:
+        @param planner_cmd_elements: Sequence[str] -- the planner command and its arguments
+        @param cwd: str -- working directory of the planner
+        @param stdout -- a file to which the output of the planner is redirected or
+                         subprocess.PIPE if the output should be read line by line
+                         (default None, in which case the output is not redirected)
+        @param output_callback: Callable[[str], None] -- a function called with every
+                                line of the planner output if stdout is subprocess.PIPE
+                                (default None)
+
+        '''
+        start_time = time.monotonic()
+        process = self.__start_planner(planner_cmd_elements, cwd, stdout)
+        startup_time = time.monotonic() - start_time
+
+        usage = self.__wait_for_planner(process, output_callback)
+        usage.startup_time = startup_time
+        return usage
+
+    async def run_planner_async(self, planner_cmd_elements: Sequence[str], cwd: str, stdout=None,
+                                output_callback: Callable[[str], None]=None) -> ResourceUsage:
+        '''Asynchronous version of "run_planner"; the planner is run as an asyncio
+        subprocess (see "start_planner_async" and "wait_for_planner_async").
+        If the calling task is cancelled, the whole process group of the planner
+        (e.g. the translator and search processes started by Fast Downward)
+        is killed before the cancellation is propagated.
+
+        Keyword arguments:
+        @param planner_cmd_elements: Sequence[str] -- the planner command and its arguments
+        @param cwd: str -- working directory of the planner
+        @param stdout -- a file to which the output of the planner is redirected or
+                         subprocess.PIPE (default None)
+        @param output_callback: Callable[[str], None] -- a function called with every
+                                line of the planner output if stdout is subprocess.PIPE
+                                (default None)
+
+        '''
+        start_time = time.monotonic()
+        process = await self.start_planner_async(planner_cmd_elements, cwd, stdout)
+        startup_time = time.monotonic() - start_time
+
+        usage = await self.wait_for_planner_async(process, output_callback)
+        usage.startup_time = startup_time
+        return usage
+
+    async def start_planner_async(self, planner_cmd_elements: Sequence[str],
+                                  cwd: str, stdout=None) -> asyncio.subprocess.Process:
+        '''Starts the planner as an asyncio subprocess in its own session
+        (so that its process group can be killed) and returns the process;
+        the address space of the planner is limited to "planner_memory_limit" bytes.
+        The process is to be waited for with "wait_for_planner_async".
+
+        Keyword arguments:
+        @param planner_cmd_elements: Sequence[str] -- the planner command and its arguments
+        @param cwd: str -- working directory of the planner
+        @param stdout -- a file to which the output of the planner is redirected or
+                         subprocess.PIPE (default None, in which case the output is not redirected)
+
+        '''
+        return await asyncio.create_subprocess_exec(*self.__get_limit_prefix(), *planner_cmd_elements,
+                                                    cwd=cwd, stdout=stdout,
+                                                    start_new_session=True)
+
+    async def wait_for_planner_async(self, process: asyncio.subprocess.Process,
+                                     output_callback: Callable[[str], None]=None) -> ResourceUsage:
+        '''Waits for a planner started by "start_planner_async" (passing its output
+        to "output_callback" if the output is piped) and returns its resource usage.
+        The process group of the planner is killed once the planner exits, if the
+        planner exceeds "planner_timeout", or if the calling task is cancelled.
+
+        The planner is reaped by the event loop, so (unlike in "run_planner")
+        its usage is taken from the usage of all reaped child processes: the
+        CPU times are those accumulated since the last planner run finished,
+        which only include other processes if planner runs finish at the same
+        time, while the peak resident set size is the largest one of all
+        planner processes run so far.
+
+        Keyword arguments:
+        @param process: asyncio.subprocess.Process -- a process started by "start_planner_async"
+        @param output_callback: Callable[[str], None] -- a function called with every
+                                line of the planner output (default None)
+
+        '''
+        start_time = time.monotonic()
+        timed_out = asyncio.Event()
+        timer = None
+        if self.planner_timeout is not None:
+            def stop_planner():
+                timed_out.set()
+                self.kill_process_group(process.pid)
+            timer = asyncio.get_running_loop().call_later(self.planner_timeout, stop_planner)
+
+        try:
+            if process.stdout is not None:
+                async for line in process.stdout:
+                    if output_callback is not None:
+                        output_callback(line.decode())
+            await process.wait()
+        except BaseException:
+            self.kill_process_group(process.pid)
+            await process.wait()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self.kill_process_group(process.pid)
+            user_time, system_time, peak_rss = self.__get_children_usage()
+
+        usage = ResourceUsage(process.returncode, timed_out.is_set(),
+                              time.monotonic() - start_time,
+                              user_time, system_time, peak_rss)
+        if usage.timed_out:
+            logging.getLogger('task.planner').warning('Planner killed after %.1f s', usage.wall_time)
+        return usage
+
+    @staticmethod
+    def kill_process_group(pid: int) -> None:
+        '''Kills the process group led by the process with the given ID.
+
+        Keyword arguments:
+        @param pid: int -- ID of a process that was started in its own session
+
+        '''
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def __start_planner(self, planner_cmd_elements: Sequence[str],
+                        cwd: str, stdout=None) -> subprocess.Popen:
+        '''Starts the planner in its own session (so that its process group
+        can be killed) and returns the process; the address space of the
+        planner is limited to "planner_memory_limit" bytes.
+
+        Keyword arguments:
+        @param planner_cmd_elements: Sequence[str] -- the planner command and its arguments
+        @param cwd: str -- working directory of the planner
+        @param stdout -- a file to which the output of the planner is redirected or
+                         subprocess.PIPE (default None)
+
+        '''
+        return subprocess.Popen(self.__get_limit_prefix() + list(planner_cmd_elements),
+                                cwd=cwd, stdout=stdout,
+                                universal_newlines=stdout == subprocess.PIPE,
+                                start_new_session=True)
+
+    def __wait_for_planner(self, process: subprocess.Popen,
+                           output_callback: Callable[[str], None]=None) -> ResourceUsage:
+        '''Waits for the given planner process (passing its output to "output_callback"
+        if the output is piped) and returns its resource usage. The process group of
+        the planner is killed once the planner exits, so that no planner processes
+        are left behind, or if the planner exceeds "planner_timeout".
+
+        Keyword arguments:
+        @param process: subprocess.Popen -- a process started by "__start_planner"
+        @param output_callback: Callable[[str], None] -- a function called with every
+                                line of the planner output (default None)
+
+        '''
+        start_time = time.monotonic()
+        timed_out = threading.Event()
+        timer = None
+        if self.planner_timeout is not None:
+            def stop_planner():
+                timed_out.set()
+                self.kill_process_group(process.pid)
+            timer = threading.Timer(self.planner_timeout, stop_planner)
+            timer.daemon = True
+            timer.start()
+
+        try:
+            if process.stdout is not None:
+                for line in process.stdout:
+                    if output_callback is not None:
+                        output_callback(line)
+        except BaseException:
+            self.kill_process_group(process.pid)
+            raise
+        finally:
+            if process.stdout is not None:
+                process.stdout.close()
+
+            # os.wait4 (instead of Popen.wait) provides the resource usage of the
+            # planner, which includes the usage of the processes it has waited for
+            _, status, rusage = os.wait4(process.pid, 0)
+            if timer is not None:
+                timer.cancel()
+            self.kill_process_group(process.pid)
+            self.__exclude_children_usage(rusage)
+
+        process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        usage = ResourceUsage(process.returncode, timed_out.is_set(),
+                              time.monotonic() - start_time,
+                              rusage.ru_utime, rusage.ru_stime,
+                              rusage.ru_maxrss * 1024)
+        if usage.timed_out:
+            logging.getLogger('task.planner').warning('Planner killed after %.1f s', usage.wall_time)
+        return usage
+
+    @classmethod
+    def __get_children_usage(self) -> Tuple[float, float, int]:
+        '''Returns the user and system time of the child processes reaped since
+        the last call (excluding the processes passed to "__exclude_children_usage")
+        and the largest peak resident set size (in bytes) of all reaped child processes.
+        '''
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        with self.__children_usage_lock:
+            accounted_usage = self.__accounted_children_usage
+            user_time = max(0., usage.ru_utime - accounted_usage[0])
+            system_time = max(0., usage.ru_stime - accounted_usage[1])
+            accounted_usage[0] = max(accounted_usage[0], usage.ru_utime)
+            accounted_usage[1] = max(accounted_usage[1], usage.ru_stime)
+
+        # ru_maxrss is given in kilobytes on Linux
+        return user_time, system_time, usage.ru_maxrss * 1024
+
+    @classmethod
+    def __exclude_children_usage(self, rusage) -> None:
+        '''Marks the usage of a child process reaped with os.wait4 as accounted
+        for, so that it is not included in the usage of asynchronous planner runs.
+
+        Keyword arguments:
+        @param rusage -- the resource usage returned by os.wait4
+
+        '''
+        with self.__children_usage_lock:
+            self.__accounted_children_usage[0] += rusage.ru_utime
+            self.__accounted_children_usage[1] += rusage.ru_stime
+
+    def __get_limit_prefix(self) -> list:
+        '''Returns a command prefix that limits the address space of the
+        planner to "planner_memory_limit" bytes (an empty list if there is no limit).
+        The limit is set by prlimit (or by "memory_limit_shim" if prlimit is
+        not available), which then executes the planner in the same process;
+        unlike a preexec_fn, this is safe if planners are started from several threads.
+        '''
+        if self.planner_memory_limit is None:
+            return []
+        memory_limit = int(self.planner_memory_limit)
+        prlimit_cmd = shutil.which('prlimit')
+        if prlimit_cmd is not None:
+            return [prlimit_cmd, '--as={0}'.format(memory_limit), '--']
+        return [sys.executable, '-c', self.memory_limit_shim, str(memory_limit)]
+
+    def get_cached_plan(self, problem_file: str) -> Tuple[str, list]:
+        '''Returns the plan cache key of the given problem and the cached plan
+        for the problem (None if no plan is cached). Returns (None, None)
+        if the planner does not use a plan cache.
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+
+        '''
+        if self.plan_cache is None:
+            return None, None
+
+        domain_hash = self.plan_cache.get_domain_hash(self.domain_file)
+        key = self.plan_cache.get_problem_key(domain_hash, problem_file)
+        return key, self.plan_cache.get(key)
+
+    def cache_plan(self, key: str, plan_found: bool, plan: list) -> None:
+        '''Stores the given plan in the plan cache (if the planner uses one);
+        only found plans are cached.
+
+        Keyword arguments:
+        @param key: str -- plan cache key returned by "get_cached_plan"
+        @param plan_found: bool -- whether a plan was found
+        @param plan: list -- a list of ropod.structs.action.Action objects
+
+        '''
+        if self.plan_cache is not None and key is not None and plan_found:
+            self.plan_cache.put(key, plan)
+
+    def get_template_plan(self, problem_file: str) -> Tuple[PDDLProblem, list]:
+        '''Returns the parsed problem and a plan for the problem instantiated from
+        the plan template library (as a list of "(action_name arg_1 ... arg_n)"
+        strings; None if no template can be instantiated for the problem).
+        Returns (None, None) if the planner does not use a template library.
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+
+        '''
+        if self.plan_templates is None:
+            return None, None
+
+        problem = PDDLProblem.from_file(problem_file)
+        return problem, self.plan_templates.instantiate(problem)
+
+    def add_plan_template(self, problem: PDDLProblem, plan_found: bool,
+                          action_strings: Sequence[str]) -> None:
+        '''Adds a template of the given plan to the plan template library
+        (if the planner uses one); only found plans are added.
+
+        Keyword arguments:
+        @param problem: PDDLProblem -- problem returned by "get_template_plan"
+        @param plan_found: bool -- whether a plan was found
+        @param action_strings: Sequence[str] -- grounded actions of the form
+                                                "(action_name arg_1 ... arg_n)"
+
+        '''
+        if self.plan_templates is not None and problem is not None and plan_found:
+            self.plan_templates.add(problem, action_strings)
+
+    def create_request_dir(self) -> str:
+        '''Creates a private directory for the problem and plan files
+        of a single planning request and returns its absolute path.
+        '''
+        return tempfile.mkdtemp(prefix='request_', dir=self.io_dir)
+
+    def remove_request_dir(self, request_dir: str) -> None:
+        '''Removes the given request directory with all its files;
+        the directory is kept in debug mode for inspection.
+
+        Keyword arguments:
+        @param request_dir: str -- absolute path of a request directory
+
+        '''
+        if self.debug:
+            logging.getLogger('task.planner').debug('Keeping request directory %s', request_dir)
+            return
+        shutil.rmtree(request_dir, ignore_errors=True)
+
+    def write_problem_file(self, problem_file_name: str, task_goals: list,
+                           predicate_assertions: list=None,
+                           fluent_assertions: list=None,
+                           problem_dir: str=None, robot: str=None,
+                           statistics: PlanStatistics=None) -> str:
+        '''Writes a problem description for the given goals to a file and returns
+        the absolute path of the file. The problem is streamed to the file while
+        the assertions are rendered; if no assertions are given, the current
+        state of the knowledge base is used.
+
+        Keyword arguments:
+        @param problem_file_name: str -- name of the problem file
+        @param task_goals: list -- a list of Predicate objects representing the planning goals
+        @param predicate_assertions: list -- a list of Predicate objects (default None)
+        @param fluent_assertions: list -- a list of Fluent objects (default None)
+        @param problem_dir: str -- directory in which the file is created (default None,
+                                   in which case the directory of the I/O backend is used)
+        @param robot: str -- name of the robot for which a plan is requested
+                             (only used for pruning the problem; default None)
+        @param statistics: PlanStatistics -- statistics in which the problem generation
+                                             is recorded (default None)
+
+        '''
+        problem_file_abs_path = join(problem_dir or self.io_dir, problem_file_name)
+        with open(problem_file_abs_path, 'w') as problem_file:
+            if predicate_assertions is None and fluent_assertions is None:
+                self.problem_builder.write_problem(problem_file, task_goals, robot, statistics)
+            else:
+                self.problem_builder.write_full_problem(problem_file,
+                                                        predicate_assertions or [],
+                                                        fluent_assertions or [],
+                                                        task_goals, robot, statistics)
+        return problem_file_abs_path
+
+    def get_plan_result(self, plan_found: bool, plan: list, statistics: PlanStatistics=None,
+                        resource_usage: ResourceUsage=None, plan_cost: float=None,
+                        engine: str=None) -> PlanResult:
+        '''Returns a PlanResult with the given plan and the collected statistics.
+
+        Keyword arguments:
+        @param plan_found: bool -- whether a plan was found
+        @param plan: list -- a list of ropod.structs.action.Action objects
+        @param statistics: PlanStatistics -- statistics of the request (default None)
+        @param resource_usage: ResourceUsage -- resource usage of the planner (default None)
+        @param plan_cost: float -- cost of the plan (default None)
+        @param engine: str -- name of the planner that found the plan
+                              (default None, in which case "engine_name" is used)
+
+        '''
+        return PlanResult(plan_found, plan, resource_usage, engine or self.engine_name,
+                          plan_cost if plan_found else None,
+                          statistics.stage_timings if statistics is not None else None,
+                          statistics.problem_size if statistics is not None else None)
+
+    def export_result(self, result: PlanResult) -> PlanResult:
+        '''Passes the result of a planning request to the result exporters
+        of the planner (see plan_metrics) and returns it; exceptions raised
+        by the exporters are logged, but not propagated.
+
+        Keyword arguments:
+        @param result: PlanResult -- result of a planning request
+
+        '''
+        for exporter in self.result_exporters:
+            try:
+                exporter.export(result)
+            except Exception as exc:
+                logging.getLogger('task.planner').error('Could not export the plan result: %s', exc)
+        return result
+
+    def get_location_floors(self, location_names: list) -> dict:
+        '''Returns a dictionary mapping the given location names to the values
+        of their "location_floor" fluents (None for locations whose floor is
+        not in the knowledge base). All floors are retrieved with a single
+        knowledge base query.
+
+        Keyword arguments:
+        @param location_names: list -- names of locations (may contain duplicates)
+
+        '''
+        unique_location_names = list(dict.fromkeys(location_names))
+        floors = self.kb_interface.get_fluent_values('location_floor',
+                                                     [[('loc', location_name)]
+                                                      for location_name in unique_location_names])
+        return dict(zip(unique_location_names, floors))
+
+    def __get_io_dir(self, io_backend: str) -> str:
+        '''Returns the directory in which the request directories are created.
+
+        Keyword arguments:
+        @param io_backend: str -- one of the names in "io_backends"
+
+        '''
+        if io_backend not in self.io_backends:
+            raise ValueError('Unknown I/O backend {0}; expected one of {1}'.format(io_backend,
+                                                                                 self.io_backends))
+
+        if io_backend == 'disk':
+            return os.path.abspath(self.plan_file_path)
+
+        if os.path.isdir(self.shared_memory_path) and os.access(self.shared_memory_path, os.W_OK):
+            return self.shared_memory_path
+        logging.getLogger('task.planner').warning('%s is not available; using %s for the "memory" I/O backend',
+                                                  self.shared_memory_path, tempfile.gettempdir())
+        return tempfile.gettempdir()
+
+    def __get_planner_cmd(self, planner_cmd: str) -> str:
+        '''Returns the given planner command with the domain file path filled in
+        and with an absolute path of the planner executable. The planners run
+        in their request directories, so an executable given relative
+        to the current working directory would not be found otherwise.
+
+        Keyword arguments:
+        @param planner_cmd: str -- planner command (see the README)
+
+        '''
+        planner_cmd = planner_cmd.replace('DOMAIN', self.domain_file)
+        cmd_elements = planner_cmd.split(maxsplit=1)
+        if not cmd_elements:
+            return planner_cmd
+
+        executable = cmd_elements[0]
+        if os.sep in executable:
+            executable = os.path.abspath(executable)
+        else:
+            executable = shutil.which(executable) or executable
+        return ' '.join([executable] + cmd_elements[1:])
+
     def __get_domain_name(self, domain_file_name: str) -> str:
         '''Extracts the name of the planning domain from the given file
         by looking for the first line that contains the words "define" and
@@ -0,0 +1,253 @@
+import time
+import queue
+import asyncio
+import itertools
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+
+
+class DeadlineExceededError(TimeoutError):
+    '''Raised (through the future of a planning request) if a request
+    could not be completed before its deadline.
+    '''
+    pass
+
+
+class PlanningRequest(object):
+    '''A planning request waiting in (or taken from) the queue of a PlannerPool.
+
+    @param priority -- request priority (lower values are served first)
+    @param deadline -- time (as returned by time.monotonic) by which the request
+                       has to be completed (None if the request has no deadline)
+    @param task_request -- the task request passed to the planner
+    @param robot -- name of the robot for which the plan is requested
+    @param task_goals -- planning goals
+    @param future -- future through which the result of the request is returned
+    @param submit_time -- time (as returned by time.monotonic) at which the request was submitted
+    '''
+    def __init__(self, priority, deadline, task_request, robot, task_goals):
+        self.priority = priority
+        self.deadline = deadline
+        self.task_request = task_request
+        self.robot = robot
+        self.task_goals = task_goals
+        self.future = Future()
+        self.submit_time = time.monotonic()
+
+    def get_remaining_time(self) -> float:
+        '''Returns the time (in seconds) until the deadline of the request
+        or None if the request has no deadline.
+        '''
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+
+class PlannerPool(object):
+    '''Runs planning requests with a bounded number of concurrent planner processes.
+
+    Requests are submitted with "submit", which returns a
+    concurrent.futures.Future whose result is the (plan_found, plan) tuple
+    returned by the planner. Pending requests are kept in a priority queue
+    (requests with lower priority values are served first; requests with
+    equal priorities are served in submission order) and are served by
+    "max_concurrency" worker threads, each of which runs the asynchronous
+    planning API of the planner in its own event loop. A request whose
+    deadline expires while it is queued fails without being planned;
+    if the deadline expires while the planner is running, the planner
+    is cancelled (which kills the planner process tree). In both cases,
+    the future raises a DeadlineExceededError.
+
+    Constructor arguments:
+    @param planner -- a TaskPlannerInterface used for planning (any object
+                      with a "plan_async" coroutine method can be used)
+    @param max_concurrency -- maximum number of concurrently running planner processes
+    @param metrics_window_size -- number of most recent requests over which
+                                  queue-wait and run-time statistics are computed
+    '''
+    def __init__(self, planner, max_concurrency: int=2,
+                 metrics_window_size: int=1000):
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency has to be at least 1')
+
+        self.planner = planner
+        self.max_concurrency = max_concurrency
+        self.logger = logging.getLogger('task.planner.pool')
+
+        self.__queue = queue.PriorityQueue()
+        self.__sequence = itertools.count()
+        self.__shutdown = False
+        self.__lock = threading.Lock()
+
+        self.__counters = {'submitted': 0, 'completed': 0, 'failed': 0,
+                           'expired': 0, 'cancelled': 0}
+        self.__running_count = 0
+        self.__queue_wait_times = deque(maxlen=metrics_window_size)
+        self.__run_times = deque(maxlen=metrics_window_size)
+
+        self.__workers = [threading.Thread(target=self.__serve_requests, daemon=True,
+                                           name='planner-pool-{0}'.format(i))
+                          for i in range(max_concurrency)]
+        for worker in self.__workers:
+            worker.start()
+
+    def submit(self, task_request, robot: str, task_goals: list,
+               priority: int=0, timeout: float=None) -> Future:
+        '''Queues a planning request and returns a future whose result
+        is the (plan_found, plan) tuple returned by the planner.
+
+        Keyword arguments:
+        @param task_request -- a task request
+        @param robot: str -- name of the robot for which a plan is requested
+        @param task_goals: list -- planning goals
+        @param priority: int -- request priority; requests with lower values
+                                are served first (default 0)
+        @param timeout: float -- time (in seconds from now) within which the
+                                 request has to be completed (default None,
+                                 in which case the request has no deadline)
+
+        '''
+        deadline = None
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        request = PlanningRequest(priority, deadline, task_request, robot, task_goals)
+
+        with self.__lock:
+            if self.__shutdown:
+                raise RuntimeError('Cannot submit requests to a pool that has been shut down')
+            self.__counters['submitted'] += 1
+            self.__queue.put((priority, next(self.__sequence), request))
+        return request.future
+
+    def get_metrics(self) -> dict:
+        '''Returns a dictionary with the following pool metrics:
+        * "queued": number of requests waiting in the queue
+        * "running": number of requests that are currently being planned
+        * "submitted", "completed", "failed", "expired", "cancelled":
+          number of requests submitted to the pool, completed by the planner,
+          failed due to a planner exception, expired due to their deadline,
+          and cancelled before they were planned
+        * "queue_wait_time" and "run_time": dictionaries with the "mean" and
+          "max" queue waiting time and planner run time (in seconds)
+          over the most recent requests
+        '''
+        with self.__lock:
+            metrics = dict(self.__counters)
+            metrics['queued'] = self.__queue.qsize()
+            metrics['running'] = self.__running_count
+            metrics['queue_wait_time'] = self.__get_statistics(self.__queue_wait_times)
+            metrics['run_time'] = self.__get_statistics(self.__run_times)
+        return metrics
+
+    def shutdown(self, wait: bool=True, cancel_pending: bool=False) -> None:
+        '''Stops accepting new requests and stops the workers once
+        the queued requests have been served.
+
+        Keyword arguments:
+        @param wait: bool -- whether to wait for the workers to finish (default True)
+        @param cancel_pending: bool -- whether to cancel the requests that are
+                                       still waiting in the queue (default False)
+
+        '''
+        with self.__lock:
+            self.__shutdown = True
+            if cancel_pending:
+                while True:
+                    try:
+                        _, _, request = self.__queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if request is not None and request.future.cancel():
+                        self.__counters['cancelled'] += 1
+
+            # one sentinel per worker; sentinels are served after all queued requests
+            for _ in self.__workers:
+                self.__queue.put((float('inf'), next(self.__sequence), None))
+
+        if wait:
+            for worker in self.__workers:
+                worker.join()
+
+    def __serve_requests(self) -> None:
+        '''Serves queued requests until a shutdown sentinel is received.
+        '''
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                _, _, request = self.__queue.get()
+                if request is None:
+                    break
+                self.__serve_request(loop, request)
+        finally:
+            loop.close()
+
+    def __serve_request(self, loop: asyncio.AbstractEventLoop, request: PlanningRequest) -> None:
+        '''Runs the planner for the given request and sets the result of its future.
+
+        Keyword arguments:
+        @param loop: asyncio.AbstractEventLoop -- event loop of the worker thread
+        @param request: PlanningRequest -- a planning request
+
+        '''
+        if not request.future.set_running_or_notify_cancel():
+            with self.__lock:
+                self.__counters['cancelled'] += 1
+            return
+
+        queue_wait_time = time.monotonic() - request.submit_time
+        remaining_time = request.get_remaining_time()
+        if remaining_time is not None and remaining_time <= 0.:
+            self.logger.warning('Request for robot %s expired after waiting for %.3f s',
+                                request.robot, queue_wait_time)
+            with self.__lock:
+                self.__counters['expired'] += 1
+                self.__queue_wait_times.append(queue_wait_time)
+            request.future.set_exception(DeadlineExceededError('Deadline expired while the request was queued'))
+            return
+
+        with self.__lock:
+            self.__running_count += 1
+            self.__queue_wait_times.append(queue_wait_time)
+
+        start_time = time.monotonic()
+        result, exception, counter = None, None, 'completed'
+        try:
+            planning_coroutine = self.planner.plan_async(request.task_request,
+                                                         request.robot,
+                                                         request.task_goals)
+            result = loop.run_until_complete(asyncio.wait_for(planning_coroutine,
+                                                              remaining_time))
+        except asyncio.TimeoutError:
+            exception = DeadlineExceededError('Deadline expired while the planner was running')
+            counter = 'expired'
+        except Exception as exc:
+            self.logger.error('Planning for robot %s failed: %s', request.robot, exc)
+            exception = exc
+            counter = 'failed'
+        run_time = time.monotonic() - start_time
+
+        with self.__lock:
+            self.__running_count -= 1
+            self.__counters[counter] += 1
+            self.__run_times.append(run_time)
+        self.logger.debug('Request for robot %s: waited %.3f s, planned in %.3f s',
+                          request.robot, queue_wait_time, run_time)
+
+        if exception is None:
+            request.future.set_result(result)
+        else:
+            request.future.set_exception(exception)
+
+    @staticmethod
+    def __get_statistics(samples: deque) -> dict:
+        '''Returns the mean and maximum of the given samples (0 if there are no samples).
+
+        Keyword arguments:
+        @param samples: deque -- a collection of time measurements
+
+        '''
+        if not samples:
+            return {'mean': 0., 'max': 0.}
+        return {'mean': sum(samples) / len(samples), 'max': max(samples)}
@@ -0,0 +1,176 @@
+import time
+import logging
+import importlib
+from typing import Dict, Sequence
+
+from task_planner.planner_interface import TaskPlannerInterface
+from task_planner.plan_result import PlanResult
+from task_planner.synthetic_hospital import SyntheticHospital
+
+
+class PlanningBenchmark(object):
+    '''Measures the planning performance of one or more planners on the
+    requests of a synthetic hospital (see SyntheticHospital). For each planner,
+    the requests are sent one after another (after the given number of warm-up
+    requests, whose results are discarded) and a report with the success rate,
+    the latency percentiles, the plan lengths and costs, the mean stage timings,
+    and the peak memory usage of the planner processes (which is only known
+    for external planners) is created; the reports
+    only contain numbers and strings, so that they can be stored as JSON and
+    compared across versions.
+
+    The knowledge base of the planners is expected to contain the assertions
+    of the hospital (see SyntheticHospital.populate).
+
+    Constructor arguments:
+    @param hospital -- a SyntheticHospital object
+    @param request_count -- number of measured requests per planner
+    @param warmup_count -- number of unmeasured requests per planner
+    '''
+    percentiles = (50, 90, 99)
+
+    # planner names that can be used instead of class paths in "get_planner"
+    planner_classes = {'lama': 'task_planner.lama_interface.LAMAInterface',
+                       'metric_ff': 'task_planner.metric_ff_interface.MetricFFInterface',
+                       'native': 'task_planner.native_interface.NativePlannerInterface'}
+
+    def __init__(self, hospital: SyntheticHospital, request_count: int=20,
+                 warmup_count: int=1):
+        self.hospital = hospital
+        self.request_count = request_count
+        self.warmup_count = warmup_count
+        self.logger = logging.getLogger('task.planner')
+
+    def run(self, planners: Dict[str, TaskPlannerInterface]) -> dict:
+        '''Runs the benchmark for the given planners and returns a report
+        with the parameters of the hospital and a report for each planner.
+
+        Keyword arguments:
+        @param planners: Dict[str, TaskPlannerInterface] -- a dictionary mapping
+                         planner names to planners
+
+        '''
+        report = {'hospital': self.hospital.to_dict(),
+                  'request_count': self.request_count,
+                  'planners': {}}
+        for name, planner in planners.items():
+            self.logger.info('Benchmarking planner %s', name)
+            report['planners'][name] = self.run_planner(planner)
+        return report
+
+    def run_planner(self, planner: TaskPlannerInterface) -> dict:
+        '''Sends the requests of the benchmark to the given planner
+        and returns a report of the results.
+
+        Keyword arguments:
+        @param planner: TaskPlannerInterface -- the planner to benchmark
+
+        '''
+        requests = self.hospital.get_requests(self.warmup_count + self.request_count)
+        for task_request, robot, task_goals in requests[:self.warmup_count]:
+            planner.plan(task_request, robot, task_goals)
+
+        latencies = []
+        results = []
+        for task_request, robot, task_goals in requests[self.warmup_count:]:
+            start_time = time.perf_counter()
+            result = planner.plan(task_request, robot, task_goals)
+            latencies.append(time.perf_counter() - start_time)
+
+            # planners outside this package may still return (plan_found, plan) tuples
+            if not isinstance(result, PlanResult):
+                result = PlanResult(*result)
+            results.append(result)
+        return self.get_report(latencies, results)
+
+    def get_report(self, latencies: Sequence[float],
+                   results: Sequence[PlanResult]) -> dict:
+        '''Returns a report of the given request latencies and plan results.
+
+        Keyword arguments:
+        @param latencies: Sequence[float] -- request latencies (in seconds)
+        @param results: Sequence[PlanResult] -- results of the requests
+
+        '''
+        found_results = [result for result in results if result.plan_found]
+        plan_lengths = [len(result.plan) for result in found_results]
+        plan_costs = [result.plan_cost for result in found_results
+                      if result.plan_cost is not None]
+        usages = [result.resource_usage for result in results
+                  if result.resource_usage is not None]
+
+        stage_timings = {}
+        for result in results:
+            for stage, duration in result.stage_timings.items():
+                stage_timings[stage] = stage_timings.get(stage, 0.) + duration
+
+        report = {'engines': sorted(set([str(result.engine) for result in results])),
+                  'success_rate': len(found_results) / len(results) if results else 0.,
+                  'timeouts': len([usage for usage in usages if usage.timed_out]),
+                  'latency': self.__get_summary(latencies),
+                  'plan_length': self.__get_summary(plan_lengths),
+                  'plan_cost': self.__get_summary(plan_costs),
+                  'stage_timings': {stage: duration / len(results)
+                                    for stage, duration in stage_timings.items()},
+                  'problem_init_atoms': self.__get_summary([result.problem_size['init_atoms']
+                                                            for result in results
+                                                            if 'init_atoms' in result.problem_size]),
+                  'planner_peak_rss': max([usage.peak_rss for usage in usages]) if usages else None,
+                  'planner_cpu_time': self.__get_summary([usage.user_time + usage.system_time
+                                                          for usage in usages])}
+        return report
+
+    @staticmethod
+    def get_percentile(values: Sequence[float], percentile: float) -> float:
+        '''Returns the given percentile of a sequence of values
+        (using linear interpolation between the closest ranks).
+
+        Keyword arguments:
+        @param values: Sequence[float] -- a non-empty sequence of values
+        @param percentile: float -- a percentile between 0 and 100
+
+        '''
+        sorted_values = sorted(values)
+        rank = (len(sorted_values) - 1) * percentile / 100.
+        lower_idx = int(rank)
+        upper_idx = min(lower_idx + 1, len(sorted_values) - 1)
+        return sorted_values[lower_idx] + (sorted_values[upper_idx] - sorted_values[lower_idx]) * (rank - lower_idx)
+
+    @staticmethod
+    def get_planner(name: str, kb_database_name: str, config: dict) -> TaskPlannerInterface:
+        '''Creates a planner from a configuration dictionary. The planner class
+        is given by "planner_name" (either one of the names in "planner_classes"
+        or the full path of a TaskPlannerInterface class, e.g. for new backends);
+        the remaining entries are passed on to the constructor of the planner.
+
+        Keyword arguments:
+        @param name: str -- name of the planner in the benchmark (used if the
+                            configuration does not contain a "planner_name")
+        @param kb_database_name: str -- name of the knowledge base database
+        @param config: dict -- planner configuration
+
+        '''
+        config = dict(config)
+        planner_name = config.pop('planner_name', name)
+        class_path = PlanningBenchmark.planner_classes.get(planner_name.lower().replace('-', '_'),
+                                                           planner_name)
+        module_name, class_name = class_path.rsplit('.', 1)
+        planner_class = getattr(importlib.import_module(module_name), class_name)
+        return planner_class(kb_database_name, **config)
+
+    @staticmethod
+    def __get_summary(values: Sequence[float]) -> dict:
+        '''Returns the mean, the percentiles, and the maximum of the given values
+        (None if there are no values).
+
+        Keyword arguments:
+        @param values: Sequence[float] -- a sequence of values
+
+        '''
+        if not values:
+            return None
+        summary = {'mean': sum(values) / len(values)}
+        for percentile in PlanningBenchmark.percentiles:
+            summary['p{0}'.format(percentile)] = PlanningBenchmark.get_percentile(values, percentile)
+        summary['max'] = max(values)
+        return summary
@@ -0,0 +1,248 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+import logging
+from typing import Sequence
+
+from ropod.structs.task import TaskRequest
+
+from task_planner.planner_interface import TaskPlannerInterface
+from task_planner.knowledge_base_interface import Predicate
+from task_planner.plan_result import PlanResult, PlanStatistics
+
+
+class PortfolioPlanner(TaskPlannerInterface):
+    '''A planner that runs a portfolio of planners (e.g. LAMA and Metric-FF)
+    in parallel on the same problem.
+
+    The problem is generated once per request and every planner in the
+    portfolio is run on it in its own subdirectory of the request directory.
+    By default, the first plan that is found is returned; if "best_plan_timeout"
+    is given, the planners are given that many seconds (counted from the start
+    of the request) to find a plan and the shortest plan found in that time is
+    returned (if no plan has been found by then, the first plan found afterwards
+    is returned). The planners that are still running once a plan has been
+    chosen are cancelled, which kills their process trees. The number of runs,
+    found plans, and wins of each planner are reported by "get_engine_statistics".
+    The engine of the returned PlanResult is the name of the winning planner, and
+    the stage timings of its run are added to those of the portfolio request.
+
+    All planners in the portfolio are expected to use the domain of the portfolio.
+
+    Constructor arguments:
+    @param kb_database_name -- name of the knowledge base database
+    @param domain_file -- path of the planning domain file
+    @param planners -- a dictionary mapping planner names to TaskPlannerInterface
+                       objects (any object with a "solve_problem_async" coroutine
+                       method can be used)
+    @param plan_file_path -- directory in which the request directories are created
+    @param best_plan_timeout -- time (in seconds) for which the planners are allowed
+                                to look for plans (default None, in which case the
+                                first plan that is found is returned)
+    @param debug -- whether to keep the request directories for inspection
+    @param io_backend -- one of the names in "io_backends"
+    '''
+    _problem_file_name = 'problem.pddl'
+
+    def __init__(self, kb_database_name, domain_file, planners: dict,
+                 plan_file_path, best_plan_timeout: float=None,
+                 debug=False, io_backend='disk', **kb_args):
+        if not planners:
+            raise ValueError('A portfolio needs at least one planner')
+
+        super(PortfolioPlanner, self).__init__(kb_database_name, domain_file, '',
+                                               plan_file_path, debug, io_backend,
+                                               **kb_args)
+        self.planners = dict(planners)
+        self.best_plan_timeout = best_plan_timeout
+        self.logger = logging.getLogger('task.planner.portfolio')
+
+        self.__lock = threading.Lock()
+        self.__engine_statistics = {name: {'runs': 0, 'plans_found': 0, 'wins': 0,
+                                           'cancelled': 0, 'failed': 0, 'run_time': 0.}
+                                    for name in self.planners}
+
+    def plan(self, task_request: TaskRequest, robot: str, task_goals: list=None):
+        '''
+        task_goals can be a list of any of the following variation of Predicate object
+            - Object itself
+            - tuple
+            - dict
+        '''
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.plan_async(task_request, robot, task_goals))
+        finally:
+            loop.close()
+
+    async def plan_async(self, task_request: TaskRequest, robot: str, task_goals: list=None):
+        '''Asynchronous version of "plan"; the knowledge base is read in the
+        default executor of the event loop and the planners are run as asyncio
+        subprocesses. If the calling task is cancelled, all planner process
+        trees are killed and the request directory removed.
+        '''
+        predicate_task_goals = self.get_goal_predicates(task_goals)
+        statistics = PlanStatistics()
+
+        request_dir = self.create_request_dir()
+        try:
+            self.logger.info('Generating problem file')
+            problem_file = await self.run_in_executor(self.write_problem_file,
+                                                      self._problem_file_name,
+                                                      predicate_task_goals,
+                                                      problem_dir=request_dir,
+                                                      robot=robot,
+                                                      statistics=statistics)
+
+            cache_key, plan = await self.run_in_executor(self.get_cached_plan, problem_file)
+            if plan is not None:
+                self.logger.info('Plan for task %s and robot %s found in the plan cache',
+                                 task_request.load_type, robot)
+                return self.export_result(self.get_plan_result(True, plan, statistics))
+
+            result = await self.solve_problem_async(problem_file, request_dir,
+                                                    task_request.load_type, robot, statistics)
+            self.cache_plan(cache_key, result.plan_found, result.plan)
+        finally:
+            self.remove_request_dir(request_dir)
+        return self.export_result(result)
+
+    async def solve_problem_async(self, problem_file: str, work_dir: str,
+                                  task: str, robot: str,
+                                  statistics: PlanStatistics=None) -> PlanResult:
+        '''Runs all planners of the portfolio on the given problem and returns
+        the result of the winning planner (including the resource usage of its
+        run if the planner reports it).
+
+        Keyword arguments:
+        @param problem_file: str -- absolute path of a problem file
+        @param work_dir: str -- directory in which the planner directories are created
+        @param task: str -- task for which a plan is requested
+        @param robot: str -- name of the robot for which a plan is requested
+        @param statistics: PlanStatistics -- statistics of the request to which the
+                                             stages of the winning run are added (default None)
+
+        '''
+        statistics = statistics if statistics is not None else PlanStatistics()
+        loop = asyncio.get_running_loop()
+        deadline = None
+        if self.best_plan_timeout is not None:
+            deadline = loop.time() + self.best_plan_timeout
+
+        planner_names = {}
+        for name, planner in self.planners.items():
+            planner_dir = os.path.join(work_dir, name)
+            os.makedirs(planner_dir, exist_ok=True)
+            planner_task = asyncio.ensure_future(self.__run_planner(name, planner, problem_file,
+                                                                    planner_dir, task, robot))
+            planner_names[planner_task] = name
+
+        # results with plans in the order in which they were found
+        results = {}
+        pending = set(planner_names)
+        try:
+            while pending:
+                timeout = None
+                if deadline is not None and results:
+                    timeout = max(deadline - loop.time(), 0.)
+                done, pending = await asyncio.wait(pending, timeout=timeout,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for planner_task in done:
+                    result = planner_task.result()
+                    if result[0]:
+                        results[planner_names[planner_task]] = result
+
+                if results and (deadline is None or not done or loop.time() >= deadline):
+                    break
+        finally:
+            # the planners that are still running lose the race
+            for planner_task in pending:
+                planner_task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+
+        if not results:
+            self.logger.error('Plan for task %s and robot %s not found by any planner', task, robot)
+            return self.get_plan_result(False, [], statistics)
+
+        winner = min(results, key=lambda name: len(results[name][1]))
+        with self.__lock:
+            self.__engine_statistics[winner]['wins'] += 1
+        self.logger.info('Plan for task %s and robot %s found by %s (%d plans found)',
+                         task, robot, winner, len(results))
+
+        # planners that return (plan_found, plan) tuples only report the plan
+        winner_result = results[winner]
+        if not isinstance(winner_result, PlanResult):
+            winner_result = PlanResult(*winner_result)
+        for stage, duration in winner_result.stage_timings.items():
+            statistics.add_stage_time(stage, duration)
+        return self.get_plan_result(True, winner_result.plan, statistics,
+                                    winner_result.resource_usage,
+                                    winner_result.plan_cost, winner)
+
+    def get_engine_statistics(self) -> dict:
+        '''Returns a dictionary mapping the names of the planners in the portfolio
+        to dictionaries with the number of "runs", "plans_found", "wins",
+        "cancelled" runs (of planners that lost the race), and "failed" runs
+        (that raised an exception), as well as the "mean_run_time" (in seconds)
+        of the runs that were not cancelled.
+        '''
+        statistics = {}
+        with self.__lock:
+            for name, engine_statistics in self.__engine_statistics.items():
+                statistics[name] = dict(engine_statistics)
+                finished_runs = engine_statistics['runs'] - engine_statistics['cancelled']
+                run_time = statistics[name].pop('run_time')
+                statistics[name]['mean_run_time'] = run_time / finished_runs if finished_runs else 0.
+        return statistics
+
+    def generate_problem_file(self, predicate_assertions: list,
+                              fluent_assertions: list,
+                              task_goals: Sequence[Predicate]) -> str:
+        self.logger.info('Generating planning problem...')
+        problem_file_name = 'problem_{0}.pddl'.format(str(uuid.uuid4()))
+        return self.write_problem_file(problem_file_name, task_goals,
+                                       predicate_assertions, fluent_assertions)
+
+    async def __run_planner(self, name: str, planner, problem_file: str,
+                            planner_dir: str, task: str, robot: str):
+        '''Runs a single planner of the portfolio and updates its statistics;
+        exceptions raised by the planner are logged and reported as a failure
+        to find a plan.
+
+        Keyword arguments:
+        @param name: str -- name of the planner in the portfolio
+        @param planner -- a TaskPlannerInterface object
+        @param problem_file: str -- absolute path of a problem file
+        @param planner_dir: str -- directory in which the planner is run
+        @param task: str -- task for which a plan is requested
+        @param robot: str -- name of the robot for which a plan is requested
+
+        '''
+        with self.__lock:
+            self.__engine_statistics[name]['runs'] += 1
+
+        start_time = time.monotonic()
+        result, counter = (False, []), None
+        try:
+            result = await planner.solve_problem_async(problem_file, planner_dir, task, robot)
+            if result[0]:
+                counter = 'plans_found'
+        except asyncio.CancelledError:
+            with self.__lock:
+                self.__engine_statistics[name]['cancelled'] += 1
+            raise
+        except Exception as exc:
+            self.logger.error('Planner %s failed: %s', name, exc)
+            counter = 'failed'
+        run_time = time.monotonic() - start_time
+
+        with self.__lock:
+            self.__engine_statistics[name]['run_time'] += run_time
+            if counter is not None:
+                self.__engine_statistics[name][counter] += 1
+        self.logger.debug('Planner %s finished in %.3f s (plan found: %s)', name, run_time, result[0])
+        return result
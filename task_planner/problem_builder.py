@@ -0,0 +1,468 @@
+import io
+import shutil
+import tempfile
+import threading
+import contextlib
+from typing import Tuple, Sequence, Iterable, TextIO
+
+from task_planner.knowledge_base_interface import KnowledgeBaseInterface, Predicate, Fluent
+from task_planner.knowledge_models import ObjectTypeRegistry, PDDLKnowledgeModel
+from task_planner.pddl_parser import PDDLProblem
+from task_planner.problem_pruner import ProblemPruner
+from task_planner.plan_result import PlanStatistics
+
+
+class PDDLProblemBuilder(object):
+    '''Generates PDDL problem descriptions from knowledge base assertions.
+
+    Most of a problem describes the (rarely changing) building topology,
+    so the assertions whose names are listed in "static_assertion_names"
+    are rendered only when their knowledge base version stamp changes;
+    the rendered block and the object types appearing in it are cached
+    and reused for subsequent problems, such that only the remaining
+    (dynamic) assertions and the goals are rendered for each problem.
+    Problems are written to text streams, such that the dynamic assertions
+    are rendered while walking the knowledge base cursor.
+
+    If a problem pruner is given, the assertions that are irrelevant for
+    a request are removed before the problem is rendered; since the pruned
+    static part depends on the goals, only the static assertions themselves
+    (rather than their rendered block) are then reused.
+
+    If a PlanStatistics object is passed when writing a problem, the time
+    spent reading the knowledge base ("kb_read") and rendering the problem
+    ("problem_generation") and the size of the problem are recorded in it.
+
+    Constructor arguments:
+    @param domain_name -- name of the planning domain
+    @param kb_interface -- interface to the knowledge base from which assertions are read
+    @param static_assertion_names -- names of predicates and fluents describing
+                                     the static part of the planning problem
+    @param knowledge_model -- mapping between assertions and domain predicates
+                              (default None, in which case the default mapping is used)
+    @param problem_pruner -- a ProblemPruner object (default None, in which
+                             case all assertions are included in the problems)
+    '''
+    default_static_assertion_names = ('location_floor', 'elevator_at')
+
+    # maximum number of characters of rendered :init entries
+    # that are buffered in memory while a problem is written
+    init_buffer_size = 1 << 20
+
+    def __init__(self, domain_name: str, kb_interface: KnowledgeBaseInterface,
+                 static_assertion_names: Sequence[str]=default_static_assertion_names,
+                 knowledge_model: PDDLKnowledgeModel=None,
+                 problem_pruner: ProblemPruner=None):
+        self.domain_name = domain_name
+        self.kb_interface = kb_interface
+        self.knowledge_model = knowledge_model or PDDLKnowledgeModel.get_default()
+        self.static_assertion_names = list(static_assertion_names)
+        self.problem_pruner = problem_pruner
+
+        self.__lock = threading.Lock()
+        self.__static_version = None
+        self.__static_init_str = ''
+        self.__static_obj_types = ObjectTypeRegistry()
+        self.__static_obj_type_str = ''
+        self.__static_init_count = 0
+        self.__static_assertions = ([], [])
+
+    def get_problem_str(self, task_goals: Sequence[Predicate], robot: str=None,
+                        statistics: PlanStatistics=None) -> str:
+        '''Returns a PDDL problem description for the given goals and the current
+        state of the knowledge base, reusing the rendered static assertions
+        if they have not changed since the last call.
+
+        Keyword arguments:
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param robot: str -- name of the robot for which the problem is generated
+                             (only used for pruning the problem; default None)
+        @param statistics: PlanStatistics -- statistics of the request (default None)
+
+        '''
+        problem_buffer = io.StringIO()
+        self.write_problem(problem_buffer, task_goals, robot, statistics)
+        return problem_buffer.getvalue()
+
+    def get_problem(self, task_goals: Sequence[Predicate], robot: str=None,
+                    statistics: PlanStatistics=None) -> PDDLProblem:
+        '''Returns a PDDLProblem for the given goals and the current state of
+        the knowledge base; the problem is built directly from the assertions
+        (without rendering and parsing a problem description), reusing the
+        static assertions if they have not changed since the last call.
+        As in parsed problems, all names are converted to small letters.
+
+        Keyword arguments:
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param robot: str -- name of the robot for which the problem is generated
+                             (only used for pruning the problem; default None)
+        @param statistics: PlanStatistics -- statistics of the request (default None)
+
+        '''
+        with self.__time_stage(statistics, 'problem_generation'):
+            self.__get_static_block(statistics)
+            static_predicate_assertions, static_fluent_assertions = self.__get_static_assertions()
+
+            predicate_assertions = self.kb_interface.iter_predicate_assertions(excluded_names=self.static_assertion_names)
+            fluent_assertions = self.kb_interface.iter_fluent_assertions(excluded_names=self.static_assertion_names)
+            predicate_assertions = static_predicate_assertions + \
+                list(self.__time_iterable(statistics, predicate_assertions))
+            fluent_assertions = static_fluent_assertions + \
+                list(self.__time_iterable(statistics, fluent_assertions))
+
+            if self.problem_pruner is not None:
+                predicate_assertions, fluent_assertions = self.problem_pruner.prune(predicate_assertions,
+                                                                                    fluent_assertions,
+                                                                                    task_goals, robot)
+            return self.__build_problem(predicate_assertions, fluent_assertions,
+                                        task_goals, statistics)
+
+    def generate_problem_str(self, predicate_assertions: Iterable[Predicate],
+                             fluent_assertions: Iterable[Fluent],
+                             task_goals: Sequence[Predicate],
+                             robot: str=None) -> str:
+        '''Returns a PDDL problem description generated from the given
+        assertions and goals (without using any cached assertions).
+
+        Keyword arguments:
+        @param predicate_assertions: Iterable[Predicate] -- predicate assertions
+        @param fluent_assertions: Iterable[Fluent] -- fluent assertions
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param robot: str -- name of the robot for which the problem is generated
+                             (only used for pruning the problem; default None)
+
+        '''
+        problem_buffer = io.StringIO()
+        self.write_full_problem(problem_buffer, predicate_assertions,
+                                fluent_assertions, task_goals, robot)
+        return problem_buffer.getvalue()
+
+    def write_problem(self, problem_file: TextIO, task_goals: Sequence[Predicate],
+                      robot: str=None, statistics: PlanStatistics=None) -> None:
+        '''Writes a PDDL problem description for the given goals and the current
+        state of the knowledge base to the given text stream. The static block
+        is reused if it has not changed since the last call; the dynamic
+        assertions are rendered one by one while walking the knowledge base cursor.
+
+        Keyword arguments:
+        @param problem_file: TextIO -- a text stream (e.g. an open file or an io.StringIO)
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param robot: str -- name of the robot for which the problem is generated
+                             (only used for pruning the problem; default None)
+        @param statistics: PlanStatistics -- statistics of the request (default None)
+
+        '''
+        with self.__time_stage(statistics, 'problem_generation'):
+            static_init_str, static_init_count, \
+                static_obj_types, static_obj_type_str = self.__get_static_block(statistics)
+
+            predicate_assertions = self.kb_interface.iter_predicate_assertions(excluded_names=self.static_assertion_names)
+            fluent_assertions = self.kb_interface.iter_fluent_assertions(excluded_names=self.static_assertion_names)
+            predicate_assertions = self.__time_iterable(statistics, predicate_assertions)
+            fluent_assertions = self.__time_iterable(statistics, fluent_assertions)
+
+            if self.problem_pruner is not None:
+                # the relevant assertions are only known once all of them
+                # have been seen, so the dynamic assertions are read at once
+                static_predicate_assertions, static_fluent_assertions = self.__get_static_assertions()
+                self.write_full_problem(problem_file,
+                                        static_predicate_assertions + list(predicate_assertions),
+                                        static_fluent_assertions + list(fluent_assertions),
+                                        task_goals, robot, statistics)
+                return
+
+            self.__write_problem(problem_file, predicate_assertions, fluent_assertions,
+                                 task_goals, statistics, static_init_str, static_init_count,
+                                 static_obj_types, static_obj_type_str)
+
+    def write_full_problem(self, problem_file: TextIO,
+                           predicate_assertions: Iterable[Predicate],
+                           fluent_assertions: Iterable[Fluent],
+                           task_goals: Sequence[Predicate],
+                           robot: str=None, statistics: PlanStatistics=None) -> None:
+        '''Writes a PDDL problem description generated from the given
+        assertions and goals (without using any cached assertions)
+        to the given text stream; the assertions are pruned first
+        if the builder has a problem pruner.
+
+        Keyword arguments:
+        @param problem_file: TextIO -- a text stream (e.g. an open file or an io.StringIO)
+        @param predicate_assertions: Iterable[Predicate] -- predicate assertions
+        @param fluent_assertions: Iterable[Fluent] -- fluent assertions
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param robot: str -- name of the robot for which the problem is generated
+                             (only used for pruning the problem; default None)
+        @param statistics: PlanStatistics -- statistics of the request (default None)
+
+        '''
+        with self.__time_stage(statistics, 'problem_generation'):
+            if self.problem_pruner is not None:
+                predicate_assertions, fluent_assertions = self.problem_pruner.prune(predicate_assertions,
+                                                                                    fluent_assertions,
+                                                                                    task_goals, robot)
+            self.__write_problem(problem_file, predicate_assertions,
+                                 fluent_assertions, task_goals, statistics)
+
+    def __get_static_block(self, statistics: PlanStatistics=None) -> Tuple[str, int, ObjectTypeRegistry, str]:
+        '''Returns the rendered static assertions, their number, the objects
+        appearing in them, and the rendered object types;
+        the static block is regenerated if the static assertions have changed.
+
+        Keyword arguments:
+        @param statistics: PlanStatistics -- statistics of the request (default None)
+
+        '''
+        with self.__time_stage(statistics, 'kb_read'):
+            static_version = self.kb_interface.get_kb_version(self.static_assertion_names)
+        with self.__lock:
+            if static_version != self.__static_version:
+                predicate_assertions = []
+                fluent_assertions = []
+                with self.__time_stage(statistics, 'kb_read'):
+                    for assertion_name in self.static_assertion_names:
+                        predicate_assertions.extend(self.kb_interface.get_predicate_assertions(assertion_name))
+                        fluent_assertions.extend(self.kb_interface.get_fluent_assertions(assertion_name))
+
+                init_buffer = io.StringIO()
+                obj_types = ObjectTypeRegistry()
+                init_count = self.__write_assertions(init_buffer, predicate_assertions,
+                                                     fluent_assertions, obj_types)
+                obj_type_buffer = io.StringIO()
+                self.__write_obj_types(obj_type_buffer, obj_types)
+
+                self.__static_init_str = init_buffer.getvalue()
+                self.__static_obj_types = obj_types
+                self.__static_obj_type_str = obj_type_buffer.getvalue()
+                self.__static_init_count = init_count
+                self.__static_assertions = (predicate_assertions, fluent_assertions)
+                self.__static_version = static_version
+            return self.__static_init_str, self.__static_init_count, \
+                self.__static_obj_types, self.__static_obj_type_str
+
+    def __get_static_assertions(self) -> Tuple[list, list]:
+        '''Returns the static predicate and fluent assertions (as of the last
+        call of "__get_static_block") as a (predicates, fluents) tuple.
+        '''
+        with self.__lock:
+            predicate_assertions, fluent_assertions = self.__static_assertions
+            return list(predicate_assertions), list(fluent_assertions)
+
+    def __write_problem(self, problem_file: TextIO,
+                        predicate_assertions: Iterable[Predicate],
+                        fluent_assertions: Iterable[Fluent],
+                        task_goals: Sequence[Predicate],
+                        statistics: PlanStatistics=None,
+                        static_init_str: str='',
+                        static_init_count: int=0,
+                        static_obj_types: ObjectTypeRegistry=None,
+                        static_obj_type_str: str='') -> None:
+        '''Writes a problem description of the form
+        (define (problem problem-name)
+            (:domain domain-name)
+            (:objects
+                ...
+            )
+            (:init
+                ...
+            )
+            (:goal
+                ...
+            )
+        )
+        to the given text stream.
+
+        The :objects section precedes the :init section, but the objects are
+        only known once all assertions have been seen; the :init entries are
+        thus first written to a spooled buffer (which moves to a temporary
+        file once it exceeds "init_buffer_size" characters), such that
+        the rendered assertions are never held in a single string.
+
+        Keyword arguments:
+        @param problem_file: TextIO -- a text stream
+        @param predicate_assertions: Iterable[Predicate] -- predicate assertions
+        @param fluent_assertions: Iterable[Fluent] -- fluent assertions
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param statistics: PlanStatistics -- statistics in which the problem size is recorded
+                                             (default None)
+        @param static_init_str: str -- rendered :init entries of the static assertions
+        @param static_init_count: int -- number of static :init entries
+        @param static_obj_types: ObjectTypeRegistry -- objects appearing in the static assertions
+        @param static_obj_type_str: str -- rendered :objects entries of the static assertions
+
+        '''
+        with tempfile.SpooledTemporaryFile(max_size=self.init_buffer_size,
+                                           mode='w+') as init_buffer:
+            obj_types = ObjectTypeRegistry()
+            init_count = self.__write_assertions(init_buffer, predicate_assertions,
+                                                 fluent_assertions, obj_types)
+
+            problem_file.write('(define (problem ropod)\n')
+            problem_file.write('    (:domain {0})\n'.format(self.domain_name))
+
+            # objects that already appear in the static part are not declared again
+            problem_file.write('    (:objects\n')
+            problem_file.write(static_obj_type_str)
+            obj_count = self.__write_obj_types(problem_file, obj_types, static_obj_types)
+            problem_file.write('    )\n\n')
+
+            problem_file.write('    (:init\n')
+            problem_file.write(static_init_str)
+            init_buffer.seek(0)
+            shutil.copyfileobj(init_buffer, problem_file)
+            problem_file.write('\n    )\n\n')
+
+        # we write the planning goals in the form
+        # (:goal
+        #     (and
+        #         (predicate_1_name param_1 param_2 ... param_n)
+        #         ...
+        #         (predicate_n_name param_1 param_2 ... param_n)
+        #     )
+        # )
+        problem_file.write('    (:goal\n        (and\n')
+        for task_goal in task_goals:
+            goal_predicate, goal_params = task_goal.name, task_goal.params
+            problem_file.write('            ({0} {1})\n'.format(goal_predicate,
+                                                               ' '.join([param.value for param in goal_params])))
+        problem_file.write('        )\n    )\n')
+        problem_file.write(')\n')
+
+        if statistics is not None:
+            statistics.problem_size = {'objects': obj_count + (len(static_obj_types) if static_obj_types else 0),
+                                       'init_atoms': init_count + static_init_count}
+
+    def __build_problem(self, predicate_assertions: Iterable[Predicate],
+                        fluent_assertions: Iterable[Fluent],
+                        task_goals: Sequence[Predicate],
+                        statistics: PlanStatistics=None) -> PDDLProblem:
+        '''Returns a PDDLProblem with the atoms of the given assertions
+        and goals (with all names converted to small letters).
+
+        Keyword arguments:
+        @param predicate_assertions: Iterable[Predicate] -- predicate assertions
+        @param fluent_assertions: Iterable[Fluent] -- fluent assertions
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param statistics: PlanStatistics -- statistics in which the problem size is recorded
+                                             (default None)
+
+        '''
+        problem = PDDLProblem()
+        problem.name = 'ropod'
+        problem.domain_name = self.domain_name.lower()
+
+        obj_types = ObjectTypeRegistry()
+        for assertion in predicate_assertions:
+            atom = self.knowledge_model.get_predicate_atom(assertion, obj_types)
+            problem.init.add(self.__to_lower(atom))
+
+        for assertion in fluent_assertions:
+            atom = self.knowledge_model.get_fluent_atom(assertion, obj_types)
+            if self.knowledge_model.is_numeric_fluent(assertion.name):
+                problem.numeric_init[self.__to_lower(atom)] = str(assertion.value).lower()
+            else:
+                problem.init.add(self.__to_lower(atom))
+
+        for obj_type, objects in obj_types.items():
+            for obj in objects:
+                problem.objects[obj.lower()] = obj_type.lower()
+
+        for task_goal in task_goals:
+            problem.goals.append(self.__to_lower([task_goal.name] +
+                                                 [param.value for param in task_goal.params]))
+
+        if statistics is not None:
+            statistics.problem_size = {'objects': len(obj_types),
+                                       'init_atoms': len(problem.init) + len(problem.numeric_init)}
+        return problem
+
+    @staticmethod
+    def __to_lower(atom: Sequence) -> tuple:
+        '''Returns the given atom as a tuple of strings in small letters.
+
+        Keyword arguments:
+        @param atom: Sequence -- an atom of the form (name, arg_1, ..., arg_n)
+
+        '''
+        return tuple([str(arg).lower() for arg in atom])
+
+    def __write_assertions(self, init_file: TextIO,
+                           predicate_assertions: Iterable[Predicate],
+                           fluent_assertions: Iterable[Fluent],
+                           obj_types: ObjectTypeRegistry) -> int:
+        '''Writes the :init entries for the given assertions to the given text stream,
+        registers the objects appearing in the assertions in "obj_types", and
+        returns the number of written entries.
+
+        Keyword arguments:
+        @param init_file: TextIO -- a text stream
+        @param predicate_assertions: Iterable[Predicate] -- predicate assertions
+        @param fluent_assertions: Iterable[Fluent] -- fluent assertions
+        @param obj_types: ObjectTypeRegistry -- object type accumulator
+
+        '''
+        # we generate strings from the predicate assertions of the form
+        # (predicate_name param_1 param_2 ... param_n)
+        init_count = 0
+        for assertion in predicate_assertions:
+            init_file.write(self.knowledge_model.render_predicate(assertion, obj_types))
+            init_count += 1
+
+        # for numeric fluents, we generate strings of the form
+        # (= (fluent_name param_1 param_2 ... param_n) fluent_value); otherwise,
+        # we generate strings of the form
+        # (fluent_name param_1 param_2 ... param_n fluent_value)
+        for assertion in fluent_assertions:
+            init_file.write(self.knowledge_model.render_fluent(assertion, obj_types))
+            init_count += 1
+        return init_count
+
+    def __write_obj_types(self, obj_type_file: TextIO, obj_types: ObjectTypeRegistry,
+                          excluded_obj_types: ObjectTypeRegistry=None) -> int:
+        '''Writes the :objects entries for the given object types to the given
+        text stream, namely lines of the form "obj_11 obj_12 - type_1",
+        and returns the number of written objects.
+
+        Keyword arguments:
+        @param obj_type_file: TextIO -- a text stream
+        @param obj_types: ObjectTypeRegistry -- objects grouped by type
+        @param excluded_obj_types: ObjectTypeRegistry -- objects that should not
+                                                         be written (default None)
+
+        '''
+        obj_count = 0
+        for obj_type, objects in obj_types.items():
+            if excluded_obj_types is not None:
+                objects = [obj for obj in objects
+                           if not excluded_obj_types.contains(obj_type, obj)]
+            if objects:
+                obj_type_file.write('        {0} - {1}\n'.format(' '.join(objects), obj_type))
+                obj_count += len(objects)
+        return obj_count
+
+    @staticmethod
+    def __time_stage(statistics: PlanStatistics, stage: str):
+        '''Returns a context manager timing the given stage
+        (a null context if no statistics are collected).
+
+        Keyword arguments:
+        @param statistics: PlanStatistics -- statistics of the request (may be None)
+        @param stage: str -- name of a stage
+
+        '''
+        if statistics is None:
+            return contextlib.nullcontext()
+        return statistics.time_stage(stage)
+
+    @staticmethod
+    def __time_iterable(statistics: PlanStatistics, iterable: Iterable) -> Iterable:
+        '''Returns the given iterable of knowledge base assertions, timing the
+        retrieval of its items as "kb_read" if statistics are collected.
+
+        Keyword arguments:
+        @param statistics: PlanStatistics -- statistics of the request (may be None)
+        @param iterable: Iterable -- assertions read from the knowledge base
+
+        '''
+        if statistics is None:
+            return iterable
+        return statistics.time_iterable('kb_read', iterable)
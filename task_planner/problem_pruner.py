@@ -0,0 +1,209 @@
+import logging
+from collections import deque
+from typing import Tuple, Sequence, Iterable
+
+from task_planner.knowledge_base_interface import Predicate, Fluent
+from task_planner.knowledge_models import PDDLKnowledgeModel
+
+
+class ProblemPruner(object):
+    '''Removes the assertions that are irrelevant for a planning request
+    before the problem is rendered, such that the planner does not have to
+    ground the actions of other robots, other loads, and every location in
+    the building.
+
+    The objects are classified by their types in the planning domain (see
+    PDDLKnowledgeModel). Starting from the requesting robot and the objects
+    in the goals, an object is relevant if it is:
+    * a robot or load in the goals, the requesting robot, or a load that
+      a relevant robot refers to (e.g. through a "holding" assertion)
+    * a location or elevator that a relevant robot or load refers to
+      (e.g. its current location) or that appears in the goals
+    * an elevator connecting the floors of the relevant locations
+      (the floors along the shortest elevator paths between them),
+      together with the elevator locations on these floors
+    Assertions are kept only if all of their robots, loads, locations,
+    and elevators are relevant; objects of other types (e.g. floors) are
+    never pruned on their own, so they disappear with the assertions
+    they appear in. If the floors of the relevant locations are not
+    connected, the assertions are returned unpruned.
+
+    Constructor arguments:
+    @param knowledge_model -- mapping between assertions and domain predicates
+    '''
+    robot_type = 'robot'
+    load_type = 'load'
+    location_type = 'location'
+    elevator_type = 'elevator'
+    floor_type = 'floor'
+
+    def __init__(self, knowledge_model: PDDLKnowledgeModel):
+        self.knowledge_model = knowledge_model
+        self.logger = logging.getLogger('task.planner.problem_pruner')
+
+    def prune(self, predicate_assertions: Iterable[Predicate],
+              fluent_assertions: Iterable[Fluent],
+              task_goals: Sequence[Predicate],
+              robot: str=None) -> Tuple[list, list]:
+        '''Returns the predicate and fluent assertions that are relevant
+        for the given goals and robot as a (predicates, fluents) tuple.
+
+        Keyword arguments:
+        @param predicate_assertions: Iterable[Predicate] -- predicate assertions
+        @param fluent_assertions: Iterable[Fluent] -- fluent assertions
+        @param task_goals: Sequence[Predicate] -- planning goals
+        @param robot: str -- name of the robot for which a plan is requested
+                             (default None, in which case all robots are relevant)
+
+        '''
+        predicates = [(assertion, self.knowledge_model.get_predicate_args(assertion))
+                      for assertion in predicate_assertions]
+        fluents = [(assertion, self.knowledge_model.get_fluent_args(assertion))
+                   for assertion in fluent_assertions]
+        goal_args = [typed_arg for goal in task_goals
+                     for typed_arg in self.knowledge_model.get_predicate_args(goal)]
+
+        relevant_objects = self.get_relevant_objects([typed_args for _, typed_args in predicates + fluents],
+                                                     goal_args, robot)
+        if relevant_objects is None:
+            self.logger.debug('The floors of the relevant locations are not connected; not pruning')
+            return [assertion for assertion, _ in predicates], [assertion for assertion, _ in fluents]
+
+        pruned_predicates = [assertion for assertion, typed_args in predicates
+                             if self.__is_relevant(typed_args, relevant_objects)]
+        pruned_fluents = [assertion for assertion, typed_args in fluents
+                          if self.__is_relevant(typed_args, relevant_objects)]
+        self.logger.debug('Pruned the problem from %d to %d assertions',
+                          len(predicates) + len(fluents), len(pruned_predicates) + len(pruned_fluents))
+        return pruned_predicates, pruned_fluents
+
+    def get_relevant_objects(self, assertion_args: Sequence[list],
+                             goal_args: Sequence[tuple], robot: str=None) -> dict:
+        '''Returns a dictionary mapping the robot, load, location, and elevator
+        types to sets of relevant objects or None if the floors of the relevant
+        locations are not connected by elevators.
+
+        Keyword arguments:
+        @param assertion_args: Sequence[list] -- (type, object) pairs of each assertion
+        @param goal_args: Sequence[tuple] -- (type, object) pairs of the goals
+        @param robot: str -- name of the robot for which a plan is requested
+                             (default None, in which case all robots are relevant)
+
+        '''
+        # objects referred to by each robot and load, floors of the locations,
+        # and locations of the elevators
+        links = {}
+        location_floors = {}
+        elevator_locations = {}
+        for typed_args in assertion_args:
+            typed_args = [typed_arg for typed_arg in typed_args if typed_arg is not None]
+            for owner in typed_args:
+                if owner[0] in (self.robot_type, self.load_type):
+                    links.setdefault(owner, set()).update(typed_args)
+            types = [obj_type for obj_type, _ in typed_args]
+            objects = dict(typed_args)
+            if sorted(types) == sorted([self.location_type, self.floor_type]):
+                location_floors.setdefault(objects[self.location_type], set()).add(objects[self.floor_type])
+            elif sorted(types) == sorted([self.elevator_type, self.location_type]):
+                elevator_locations.setdefault(objects[self.elevator_type], set()).add(objects[self.location_type])
+
+        relevant_objects = {obj_type: set() for obj_type in (self.robot_type, self.load_type,
+                                                              self.location_type, self.elevator_type)}
+        floors = set()
+        for obj_type, obj in goal_args:
+            if obj_type in relevant_objects:
+                relevant_objects[obj_type].add(obj)
+            elif obj_type == self.floor_type:
+                floors.add(obj)
+
+        if robot is not None:
+            relevant_objects[self.robot_type].add(robot)
+        else:
+            relevant_objects[self.robot_type].update([obj for obj_type, obj in links
+                                                      if obj_type == self.robot_type])
+
+        # loads are relevant if a relevant robot refers to them
+        for bot in list(relevant_objects[self.robot_type]):
+            relevant_objects[self.load_type].update([obj for obj_type, obj in links.get((self.robot_type, bot), [])
+                                                     if obj_type == self.load_type])
+
+        owners = [(self.robot_type, bot) for bot in relevant_objects[self.robot_type]] + \
+                 [(self.load_type, load) for load in relevant_objects[self.load_type]]
+        for owner in owners:
+            for obj_type, obj in links.get(owner, []):
+                if obj_type in (self.location_type, self.elevator_type):
+                    relevant_objects[obj_type].add(obj)
+                elif obj_type == self.floor_type:
+                    floors.add(obj)
+
+        for location in relevant_objects[self.location_type]:
+            floors.update(location_floors.get(location, []))
+
+        elevator_floors = {elevator: set([floor for location in locations
+                                          for floor in location_floors.get(location, [])])
+                           for elevator, locations in elevator_locations.items()}
+        if len(floors) > 1:
+            floors = self.__get_connecting_floors(floors, elevator_floors)
+            if floors is None:
+                return None
+            relevant_objects[self.elevator_type].update([elevator for elevator, served_floors in elevator_floors.items()
+                                                         if len(served_floors & floors) > 1])
+
+        # only the elevator locations on the relevant floors are needed
+        for elevator in relevant_objects[self.elevator_type]:
+            for location in elevator_locations.get(elevator, []):
+                location_floor = location_floors.get(location)
+                if not location_floor or location_floor & floors:
+                    relevant_objects[self.location_type].add(location)
+        return relevant_objects
+
+    def __is_relevant(self, typed_args: list, relevant_objects: dict) -> bool:
+        '''Returns True if all robots, loads, locations, and elevators
+        among the given objects are relevant.
+
+        Keyword arguments:
+        @param typed_args: list -- (type, object) pairs of an assertion
+        @param relevant_objects: dict -- relevant objects by type
+
+        '''
+        for typed_arg in typed_args:
+            if typed_arg is None:
+                continue
+            obj_type, obj = typed_arg
+            if obj_type in relevant_objects and obj not in relevant_objects[obj_type]:
+                return False
+        return True
+
+    @staticmethod
+    def __get_connecting_floors(floors: set, elevator_floors: dict) -> set:
+        '''Returns the floors along the shortest elevator paths from one of the
+        given floors to the others or None if some of the floors cannot be reached.
+
+        Keyword arguments:
+        @param floors: set -- floors that have to be connected
+        @param elevator_floors: dict -- a dictionary mapping elevators to the floors they serve
+
+        '''
+        neighbours = {}
+        for served_floors in elevator_floors.values():
+            for floor in served_floors:
+                neighbours.setdefault(floor, set()).update(served_floors - {floor})
+
+        start_floor = sorted(floors)[0]
+        parents = {start_floor: None}
+        queue = deque([start_floor])
+        while queue:
+            floor = queue.popleft()
+            for neighbour in sorted(neighbours.get(floor, [])):
+                if neighbour not in parents:
+                    parents[neighbour] = floor
+                    queue.append(neighbour)
+
+        connecting_floors = set()
+        for floor in floors:
+            if floor not in parents:
+                return None
+            while floor is not None and floor not in connecting_floors:
+                connecting_floors.add(floor)
+                floor = parents[floor]
+        return connecting_floors
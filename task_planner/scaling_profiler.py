@@ -0,0 +1,459 @@
+import os
+import io
+import json
+import time
+import math
+import pstats
+import shutil
+import logging
+import cProfile
+import tempfile
+import tracemalloc
+from typing import Callable, Sequence, Tuple
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+from task_planner.knowledge_base_interface import KnowledgeBaseInterface, Predicate, Fluent
+from task_planner.planner_interface import TaskPlannerInterface
+from task_planner.synthetic_hospital import SyntheticHospital
+
+
+class ScalingProfiler(object):
+    '''Measures how the Python side of a planner interface scales with the size
+    of the knowledge base, namely the problem generation ("generate_problem_file")
+    and the plan parsing ("parse_plan"), without running the external planner.
+
+    The operations are run on knowledge base snapshots of increasing size (either
+    synthetic ones, see "get_synthetic_snapshots", or ones recorded with
+    "write_snapshot"). For each snapshot, an operation is timed (the minimum over
+    the repetitions is taken), profiled, and run with tracemalloc for measuring
+    its peak memory usage. The plans that are parsed go through the locations
+    of the snapshot and have a length proportional to the size of the snapshot.
+    A growth exponent is then fitted to the times and memory usages at the
+    larger half of the sizes (where constant overheads no longer dominate), so
+    that an exponent above "growth_threshold" indicates super-linear growth;
+    with cProfile, the functions whose own time grows super-linearly are listed
+    as well (e.g. functions with membership checks on lists).
+
+    "parse_plan" reads the floors of the plan locations from the knowledge base,
+    so their "location_floor" fluents are written to the knowledge base of the
+    planner before the plans are parsed; afterwards, the added fluents are removed
+    and the previous values of the changed fluents are restored.
+
+    Constructor arguments:
+    @param planner -- a LAMAInterface, MetricFFInterface, or NativePlannerInterface
+    @param profiler -- "cprofile", "pyinstrument", or None (in which case the
+                       operations are only timed and traced)
+    @param output_dir -- directory to which the profiles are written (as
+                         "<operation>_<assertion count>.prof" files for cProfile,
+                         which can be read with pstats, and as HTML files for
+                         pyinstrument); default None, in which case no profiles are written
+    @param repetitions -- number of timed runs of each operation per snapshot
+    @param plan_length_ratio -- number of plan actions per snapshot assertion
+    @param growth_threshold -- growth exponent above which growth is reported as super-linear
+    @param min_time_share -- minimum share of the profiled time of an operation (at the
+                             largest size) that a function needs to have to be reported
+    '''
+    operations = ('generate_problem_file', 'parse_plan')
+    profilers = ('cprofile', 'pyinstrument')
+    allocation_site_count = 10
+
+    def __init__(self, planner: TaskPlannerInterface, profiler: str='cprofile',
+                 output_dir: str=None, repetitions: int=3,
+                 plan_length_ratio: float=0.01, growth_threshold: float=1.2,
+                 min_time_share: float=0.05):
+        if profiler is not None and profiler not in self.profilers:
+            raise ValueError('Unknown profiler {0}; expected one of {1}'.format(profiler,
+                                                                              self.profilers))
+        if profiler == 'pyinstrument' and pyinstrument is None:
+            raise ImportError('Profiling with pyinstrument requires the pyinstrument package')
+
+        self.planner = planner
+        self.profiler = profiler
+        self.output_dir = output_dir
+        self.repetitions = repetitions
+        self.plan_length_ratio = plan_length_ratio
+        self.growth_threshold = growth_threshold
+        self.min_time_share = min_time_share
+        self.logger = logging.getLogger('task.planner')
+
+    def profile(self, snapshots: Sequence[Tuple[list, list]], task_goals: list=None) -> dict:
+        '''Profiles the operations on the given snapshots and returns a report
+        with the measurements for each snapshot size and the fitted growth exponents.
+
+        Keyword arguments:
+        @param snapshots: Sequence[Tuple[list, list]] -- (predicate assertions, fluent assertions)
+                                                         pairs of Predicate and Fluent objects
+        @param task_goals: list -- a list of Predicate objects used as goals of the
+                                   generated problems (default None, in which case
+                                   a load of each snapshot is brought to another location)
+
+        '''
+        snapshots = sorted(snapshots, key=lambda snapshot: len(snapshot[0]) + len(snapshot[1]))
+        measurements = {operation: [] for operation in self.operations}
+        work_dir = tempfile.mkdtemp()
+        try:
+            for predicates, fluents in snapshots:
+                assertion_count = len(predicates) + len(fluents)
+                self.logger.info('Profiling a snapshot with %d assertions', assertion_count)
+                goals = task_goals if task_goals is not None else self.__get_goals(fluents)
+                measurement = self.__measure('generate_problem_file', assertion_count,
+                                             lambda: lambda: self.planner.generate_problem_file(predicates,
+                                                                                               fluents,
+                                                                                               goals),
+                                             os.remove)
+                measurements['generate_problem_file'].append(measurement)
+
+                action_strings, robot, location_floors = self.__get_plan(fluents, assertion_count)
+                added_floors, changed_floors = self.__write_fluents(location_floors)
+                try:
+                    measurement = self.__measure('parse_plan', assertion_count,
+                                                 self.__get_plan_parser(action_strings, robot, work_dir))
+                finally:
+                    self.__restore_fluents(added_floors, changed_floors)
+                measurement['plan_length'] = len(action_strings)
+                measurements['parse_plan'].append(measurement)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        report = {'engine': self.planner.engine_name,
+                  'profiler': self.profiler,
+                  'growth_threshold': self.growth_threshold,
+                  'operations': {}}
+        for operation, operation_measurements in measurements.items():
+            report['operations'][operation] = self.__get_operation_report(operation,
+                                                                          operation_measurements)
+        return report
+
+    @staticmethod
+    def get_synthetic_snapshots(assertion_counts: Sequence[int]=(100, 1000, 10000, 100000),
+                                seed: int=0) -> Sequence[Tuple[list, list]]:
+        '''Returns snapshots of synthetic hospitals (see SyntheticHospital)
+        with approximately the given numbers of assertions.
+
+        Keyword arguments:
+        @param assertion_counts: Sequence[int] -- sizes of the snapshots
+        @param seed: int -- seed of the hospitals
+
+        '''
+        snapshots = []
+        for assertion_count in assertion_counts:
+            hospital = SyntheticHospital.from_assertion_count(assertion_count, seed=seed)
+            snapshots.append(([Predicate.from_tuple(predicate) for predicate in hospital.get_predicates()],
+                              [Fluent.from_tuple(fluent) for fluent in hospital.get_fluents()]))
+        return snapshots
+
+    @staticmethod
+    def write_snapshot(kb_interface: KnowledgeBaseInterface, snapshot_file_name: str) -> None:
+        '''Records the assertions of a knowledge base in a JSON file.
+
+        Keyword arguments:
+        @param kb_interface: KnowledgeBaseInterface -- interface of the knowledge base
+        @param snapshot_file_name: str -- path of the snapshot file
+
+        '''
+        snapshot = {'predicates': [predicate.to_dict() for predicate in kb_interface.get_predicate_assertions()],
+                    'fluents': [fluent.to_dict() for fluent in kb_interface.get_fluent_assertions()]}
+        with open(snapshot_file_name, 'w') as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+
+    @staticmethod
+    def read_snapshot(snapshot_file_name: str) -> Tuple[list, list]:
+        '''Returns the (predicate assertions, fluent assertions) pair
+        recorded in a snapshot file (see "write_snapshot").
+
+        Keyword arguments:
+        @param snapshot_file_name: str -- path of the snapshot file
+
+        '''
+        with open(snapshot_file_name, 'r') as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        return ([Predicate.from_dict(predicate) for predicate in snapshot['predicates']],
+                [Fluent.from_dict(fluent) for fluent in snapshot['fluents']])
+
+    @staticmethod
+    def get_growth_exponent(sizes: Sequence[float], values: Sequence[float]) -> float:
+        '''Returns the exponent b of a power law a * size^b fitted (by least
+        squares in log-log space) to the values at the larger half of the sizes
+        (including the median size); returns None if fewer than two positive
+        values remain.
+
+        Keyword arguments:
+        @param sizes: Sequence[float] -- problem sizes in increasing order
+        @param values: Sequence[float] -- values (e.g. times) measured at the sizes
+
+        '''
+        points = [(size, value) for size, value in zip(sizes, values)
+                  if size > 0 and value is not None and value > 0]
+        points = points[(len(points) - 1) // 2:]
+        if len(points) < 2:
+            return None
+
+        log_sizes = [math.log(size) for size, _ in points]
+        log_values = [math.log(value) for _, value in points]
+        mean_log_size = sum(log_sizes) / len(log_sizes)
+        mean_log_value = sum(log_values) / len(log_values)
+        size_variance = sum([(log_size - mean_log_size)**2 for log_size in log_sizes])
+        if size_variance == 0.:
+            return None
+        covariance = sum([(log_size - mean_log_size) * (log_value - mean_log_value)
+                          for log_size, log_value in zip(log_sizes, log_values)])
+        return covariance / size_variance
+
+    def __measure(self, operation: str, assertion_count: int,
+                  prepare: Callable[[], Callable], cleanup: Callable=None) -> dict:
+        '''Times, profiles, and traces an operation on a snapshot and returns the measurements.
+
+        Keyword arguments:
+        @param operation: str -- name of the operation
+        @param assertion_count: int -- number of assertions of the snapshot
+        @param prepare: Callable[[], Callable] -- a function that prepares a run of the
+                                                  operation and returns a function running it
+        @param cleanup: Callable -- a function called with the result of each run (default None)
+
+        '''
+        def run(wrapper=None):
+            operation_run = prepare()
+            start_time = time.perf_counter()
+            if wrapper is None:
+                result = operation_run()
+            else:
+                result = wrapper(operation_run)
+            duration = time.perf_counter() - start_time
+            if cleanup is not None:
+                cleanup(result)
+            return duration
+
+        measurement = {'assertion_count': assertion_count,
+                       'time': min([run() for _ in range(self.repetitions)])}
+
+        function_times = {}
+        if self.profiler == 'cprofile':
+            profile = cProfile.Profile()
+            run(profile.runcall)
+            stats = pstats.Stats(profile, stream=io.StringIO())
+            function_times = {pstats.func_std_string(function): function_stats[2]
+                              for function, function_stats in stats.stats.items()}
+            if self.output_dir is not None:
+                stats.dump_stats(self.__get_output_file_name(operation, assertion_count, 'prof'))
+        elif self.profiler == 'pyinstrument':
+            profiler = pyinstrument.Profiler()
+            run(lambda operation_run: self.__run_profiler(profiler, operation_run))
+            if self.output_dir is not None:
+                with open(self.__get_output_file_name(operation, assertion_count, 'html'), 'w') as output_file:
+                    output_file.write(profiler.output_html())
+        measurement['function_times'] = function_times
+
+        tracemalloc.start()
+        try:
+            run()
+            measurement['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        finally:
+            tracemalloc.stop()
+        measurement['retained_allocations'] = [{'location': str(statistic.traceback),
+                                                'size': statistic.size,
+                                                'count': statistic.count}
+                                               for statistic in snapshot.statistics('lineno')[:self.allocation_site_count]]
+        return measurement
+
+    def __get_operation_report(self, operation: str, measurements: Sequence[dict]) -> dict:
+        '''Returns the report of an operation, which contains the measurements
+        (without the function times), the growth exponents of the time and the
+        peak memory, and the functions whose own time grows super-linearly.
+
+        Keyword arguments:
+        @param operation: str -- name of the operation
+        @param measurements: Sequence[dict] -- measurements of the operation
+                                               in increasing order of size
+
+        '''
+        sizes = [measurement['assertion_count'] for measurement in measurements]
+        time_exponent = self.get_growth_exponent(sizes, [measurement['time'] for measurement in measurements])
+        memory_exponent = self.get_growth_exponent(sizes, [measurement['peak_memory'] for measurement in measurements])
+
+        super_linear_functions = []
+        if measurements and measurements[-1]['function_times']:
+            largest_size_times = measurements[-1]['function_times']
+            total_time = sum(largest_size_times.values())
+            for function, function_time in largest_size_times.items():
+                if function_time < self.min_time_share * total_time:
+                    continue
+                exponent = self.get_growth_exponent(sizes, [measurement['function_times'].get(function)
+                                                            for measurement in measurements])
+                if exponent is not None and exponent > self.growth_threshold:
+                    super_linear_functions.append({'function': function,
+                                                   'exponent': exponent,
+                                                   'time': function_time})
+            super_linear_functions.sort(key=lambda function: function['time'], reverse=True)
+
+        super_linear = time_exponent is not None and time_exponent > self.growth_threshold
+        if super_linear:
+            self.logger.warning('The time of %s grows super-linearly (exponent %.2f)',
+                                operation, time_exponent)
+        for function in super_linear_functions:
+            self.logger.warning('The time of %s in %s grows super-linearly (exponent %.2f)',
+                                function['function'], operation, function['exponent'])
+
+        return {'sizes': [{key: value for key, value in measurement.items() if key != 'function_times'}
+                          for measurement in measurements],
+                'time_exponent': time_exponent,
+                'memory_exponent': memory_exponent,
+                'super_linear': super_linear,
+                'super_linear_functions': super_linear_functions}
+
+    def __get_plan_parser(self, action_strings: Sequence[str], robot: str,
+                          work_dir: str) -> Callable[[], Callable]:
+        '''Returns a function that writes the given plan in the format of the
+        planner (if the planner parses plan files) and returns a function that
+        parses the plan with the "parse_plan" method of the planner.
+
+        Keyword arguments:
+        @param action_strings: Sequence[str] -- a plan as a list of "(action_name arg_1 ... arg_n)" strings
+        @param robot: str -- name of the robot executing the plan
+        @param work_dir: str -- directory in which plan files are written
+
+        '''
+        task = 'profiling'
+        engine = self.planner.engine_name
+        if engine == 'lama':
+            def prepare():
+                plan_file_name = os.path.join(work_dir, '{0}.1'.format(self.planner._plan_file_name))
+                with open(plan_file_name, 'w') as plan_file:
+                    for action_string in action_strings:
+                        plan_file.write('{0}\n'.format(action_string))
+                    plan_file.write('; cost = {0} (unit cost)\n'.format(len(action_strings)))
+                return lambda: self.planner.parse_plan(task, robot, work_dir)
+            return prepare
+
+        if engine == 'metric_ff':
+            output_file_name = os.path.join(work_dir, 'metric_ff_output.txt')
+            with open(output_file_name, 'w') as output_file:
+                output_file.write('ff: found legal plan as follows\n')
+                for i, action_string in enumerate(action_strings):
+                    output_file.write('{0} {1:4d}: {2}\n'.format('step' if i == 0 else '    ', i,
+                                                                 action_string[1:-1].upper()))
+                output_file.write('\n')
+            return lambda: lambda: self.planner.parse_plan(output_file_name, task, robot)
+
+        if engine == 'native':
+            return lambda: lambda: self.planner.parse_plan(action_strings, task, robot)
+
+        raise ValueError('Plans of the {0} planner cannot be profiled'.format(engine))
+
+    def __get_plan(self, fluents: Sequence[Fluent], assertion_count: int) -> Tuple[list, str, list]:
+        '''Returns a plan in which a robot moves between the locations of a snapshot,
+        the robot executing the plan, and the "location_floor" fluents of the visited
+        locations (as tuples). The plan length is proportional to the snapshot size.
+
+        Keyword arguments:
+        @param fluents: Sequence[Fluent] -- fluent assertions of the snapshot
+        @param assertion_count: int -- number of assertions of the snapshot
+
+        '''
+        location_floors = [(fluent.params[0].value, fluent.value) for fluent in fluents
+                           if fluent.name == 'location_floor']
+        if not location_floors:
+            raise ValueError('The snapshot does not contain any location_floor assertions')
+        robot = self.__get_fluent_param(fluents, 'robot_at', 'robot0')
+        load = self.__get_fluent_param(fluents, 'load_at', 'load0')
+
+        plan_length = max(1, int(assertion_count * self.plan_length_ratio))
+        action_strings = []
+        for i in range(plan_length):
+            origin, origin_floor = location_floors[i % len(location_floors)]
+            destination, destination_floor = location_floors[(i + 1) % len(location_floors)]
+            action_strings.append('(goto {0} {1} {2} {3} {4} {5})'.format(robot, origin, destination,
+                                                                          origin_floor, destination_floor,
+                                                                          load).lower())
+
+        # the planners convert the location names back to upper case
+        visited_locations = location_floors[:plan_length + 1]
+        return action_strings, robot, [('location_floor', [('loc', location.upper())], floor)
+                                       for location, floor in visited_locations]
+
+    def __write_fluents(self, fluents: Sequence[tuple]) -> Tuple[list, list]:
+        '''Writes the given fluents (which all have the same name) to the knowledge
+        base of the planner and returns the fluents that did not exist before and the
+        previous values of the fluents whose values were changed (as fluent tuples),
+        such that the knowledge base can be restored with "__restore_fluents".
+
+        Keyword arguments:
+        @param fluents: Sequence[tuple] -- (name, [parameters], value) tuples
+
+        '''
+        if not fluents:
+            return [], []
+
+        previous_values = self.planner.kb_interface.get_fluent_values(fluents[0][0],
+                                                                      [params for _, params, _ in fluents])
+        added_fluents = []
+        changed_fluents = []
+        for (name, params, value), previous_value in zip(fluents, previous_values):
+            if previous_value is None:
+                added_fluents.append((name, params, value))
+            elif previous_value != value:
+                changed_fluents.append((name, params, previous_value))
+                self.planner.kb_interface.update_fluent((name, params, value))
+        self.planner.kb_interface.insert_fluents(added_fluents)
+        return added_fluents, changed_fluents
+
+    def __restore_fluents(self, added_fluents: Sequence[tuple],
+                          changed_fluents: Sequence[tuple]) -> None:
+        '''Removes the given added fluents from the knowledge base of the planner
+        and restores the previous values of the given changed fluents.
+
+        Keyword arguments:
+        @param added_fluents: Sequence[tuple] -- fluents that did not exist before
+        @param changed_fluents: Sequence[tuple] -- fluents with their previous values
+
+        '''
+        self.planner.kb_interface.remove_fluents(added_fluents)
+        for fluent in changed_fluents:
+            self.planner.kb_interface.update_fluent(fluent)
+
+    def __get_goals(self, fluents: Sequence[Fluent]) -> list:
+        '''Returns goals for a snapshot, namely to bring the first load
+        to the last location of the snapshot (no goals if the snapshot
+        does not contain any loads).
+
+        Keyword arguments:
+        @param fluents: Sequence[Fluent] -- fluent assertions of the snapshot
+
+        '''
+        load = self.__get_fluent_param(fluents, 'load_at')
+        locations = [fluent.params[0].value for fluent in fluents if fluent.name == 'location_floor']
+        if load is None or not locations:
+            return []
+        return [Predicate.from_tuple(('load_at', [('load', load), ('loc', locations[-1])]))]
+
+    def __get_output_file_name(self, operation: str, assertion_count: int, extension: str) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, '{0}_{1}.{2}'.format(operation, assertion_count, extension))
+
+    @staticmethod
+    def __get_fluent_param(fluents: Sequence[Fluent], fluent_name: str, default: str=None) -> str:
+        '''Returns the value of the first parameter of the first
+        assertion of the given fluent (the default if there is none).
+
+        Keyword arguments:
+        @param fluents: Sequence[Fluent] -- fluent assertions
+        @param fluent_name: str -- name of a fluent
+        @param default: str -- value returned if the fluent has no assertions
+
+        '''
+        for fluent in fluents:
+            if fluent.name == fluent_name and fluent.params:
+                return fluent.params[0].value
+        return default
+
+    @staticmethod
+    def __run_profiler(profiler, operation_run: Callable):
+        profiler.start()
+        try:
+            return operation_run()
+        finally:
+            profiler.stop()
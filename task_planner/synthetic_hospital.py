@@ -0,0 +1,170 @@
+import random
+from typing import Tuple, Sequence
+
+from ropod.structs.task import TaskRequest
+
+from task_planner.knowledge_base_interface import KnowledgeBaseInterface
+
+
+class SyntheticHospital(object):
+    '''A randomly generated hospital for the "hospital_transportation" domain,
+    which can be used for populating a knowledge base with buildings of
+    arbitrary size (e.g. for benchmarking the planners).
+
+    Each floor ("floor0", "floor1", ...) has the given number of locations
+    ("LOC_<floor>_<idx>"); each elevator ("elevator<idx>") serves all floors
+    through one elevator location per floor ("ELEVATOR_<elevator>_<floor>").
+    The robots ("robot<idx>") and loads ("load<idx>") are placed at random
+    locations; the placement and the generated requests only depend on the seed.
+
+    Constructor arguments:
+    @param floor_count -- number of floors
+    @param locations_per_floor -- number of locations on each floor (excluding the elevator locations)
+    @param elevator_count -- number of elevators
+    @param robot_count -- number of robots
+    @param load_count -- number of loads
+    @param seed -- seed of the random placement of the robots and loads
+    '''
+    def __init__(self, floor_count: int=5, locations_per_floor: int=20,
+                 elevator_count: int=1, robot_count: int=1, load_count: int=1,
+                 seed: int=0):
+        self.floor_count = floor_count
+        self.locations_per_floor = locations_per_floor
+        self.elevator_count = elevator_count
+        self.robot_count = robot_count
+        self.load_count = load_count
+        self.seed = seed
+
+        self.floors = ['floor{0}'.format(floor) for floor in range(floor_count)]
+        self.locations = ['LOC_{0}_{1}'.format(floor, idx)
+                          for floor in range(floor_count)
+                          for idx in range(locations_per_floor)]
+        self.elevators = ['elevator{0}'.format(idx) for idx in range(elevator_count)]
+        self.robots = ['robot{0}'.format(idx) for idx in range(robot_count)]
+        self.loads = ['load{0}'.format(idx) for idx in range(load_count)]
+
+        rng = random.Random(seed)
+        self.robot_locations = {robot: rng.choice(self.locations) for robot in self.robots}
+        self.load_locations = {load: rng.choice(self.locations) for load in self.loads}
+
+    @staticmethod
+    def from_assertion_count(assertion_count: int, floor_count: int=10,
+                             elevator_count: int=2, robot_count: int=5,
+                             load_count: int=10, seed: int=0) -> 'SyntheticHospital':
+        '''Returns a hospital with approximately the given number of assertions,
+        which is reached by choosing the number of locations per floor
+        (at least one location is placed on each floor).
+
+        Keyword arguments:
+        @param assertion_count: int -- desired number of assertions
+        @param floor_count: int -- number of floors
+        @param elevator_count: int -- number of elevators
+        @param robot_count: int -- number of robots
+        @param load_count: int -- number of loads
+        @param seed: int -- seed of the random placement of the robots and loads
+
+        '''
+        # assertions that do not depend on the number of locations per floor
+        fixed_count = (3 * robot_count + 2 * elevator_count * (floor_count + 1) +
+                       2 * load_count)
+        locations_per_floor = max(1, (assertion_count - fixed_count) // floor_count)
+        return SyntheticHospital(floor_count, locations_per_floor, elevator_count,
+                                 robot_count, load_count, seed)
+
+    def get_predicates(self) -> list:
+        '''Returns the predicate assertions of the hospital as
+        (predicate_name, [(param_name, param_value), ...]) tuples.
+        '''
+        predicates = [('empty_gripper', [('bot', robot)]) for robot in self.robots]
+        predicates.extend([('elevator_at', [('elevator', elevator),
+                                            ('loc', self.__get_elevator_location(elevator, floor))])
+                           for elevator in self.elevators
+                           for floor in self.floors])
+        return predicates
+
+    def get_fluents(self) -> list:
+        '''Returns the fluent assertions of the hospital as
+        (fluent_name, [(param_name, param_value), ...], value) tuples.
+        '''
+        fluents = [('location_floor', [('loc', location)], self.get_location_floor(location))
+                   for location in self.locations]
+        fluents.extend([('location_floor', [('loc', self.__get_elevator_location(elevator, floor))], floor)
+                        for elevator in self.elevators
+                        for floor in self.floors])
+        # as in the real environment, the elevator floors are initially unknown
+        for elevator in self.elevators:
+            fluents.append(('elevator_floor', [('elevator', elevator)], 'unknown'))
+            fluents.append(('destination_floor', [('elevator', elevator)], 'unknown'))
+        for robot, location in self.robot_locations.items():
+            fluents.append(('robot_at', [('bot', robot)], location))
+            fluents.append(('robot_floor', [('bot', robot)], self.get_location_floor(location)))
+        for load, location in self.load_locations.items():
+            fluents.append(('load_at', [('load', load)], location))
+            fluents.append(('load_floor', [('load', load)], self.get_location_floor(location)))
+        return fluents
+
+    def get_assertion_count(self) -> int:
+        '''Returns the number of assertions of the hospital.
+        '''
+        return len(self.get_predicates()) + len(self.get_fluents())
+
+    def populate(self, kb_interface: KnowledgeBaseInterface) -> None:
+        '''Inserts the assertions of the hospital into the given knowledge base.
+
+        Keyword arguments:
+        @param kb_interface: KnowledgeBaseInterface -- interface of the knowledge base
+
+        '''
+        kb_interface.insert_facts(self.get_predicates())
+        kb_interface.insert_fluents(self.get_fluents())
+
+    def get_requests(self, request_count: int,
+                     seed: int=None) -> Sequence[Tuple[TaskRequest, str, list]]:
+        '''Returns random transportation requests, each of which is a
+        (task_request, robot, task_goals) tuple, where the task goals are
+        to bring a load to another location and to release it afterwards.
+
+        Keyword arguments:
+        @param request_count: int -- number of requests
+        @param seed: int -- seed of the random requests (default None,
+                            in which case the seed of the hospital is used)
+
+        '''
+        rng = random.Random(seed if seed is not None else self.seed)
+        requests = []
+        for _ in range(request_count):
+            robot = rng.choice(self.robots)
+            load = rng.choice(self.loads)
+            destination = rng.choice([location for location in self.locations
+                                      if location != self.load_locations[load]])
+
+            task_request = TaskRequest()
+            task_request.load_type = 'mobidik'
+            task_request.load_id = load
+            task_goals = [('load_at', [('load', load), ('loc', destination)]),
+                          ('empty_gripper', [('bot', robot)])]
+            requests.append((task_request, robot, task_goals))
+        return requests
+
+    def get_location_floor(self, location: str) -> str:
+        '''Returns the floor of a location of the hospital
+        (excluding the elevator locations).
+
+        Keyword arguments:
+        @param location: str -- name of a location
+
+        '''
+        return 'floor{0}'.format(location.split('_')[1])
+
+    def to_dict(self) -> dict:
+        return {'floor_count': self.floor_count,
+                'locations_per_floor': self.locations_per_floor,
+                'elevator_count': self.elevator_count,
+                'robot_count': self.robot_count,
+                'load_count': self.load_count,
+                'seed': self.seed,
+                'assertion_count': self.get_assertion_count()}
+
+    @staticmethod
+    def __get_elevator_location(elevator: str, floor: str) -> str:
+        return 'ELEVATOR_{0}_{1}'.format(elevator[len('elevator'):], floor[len('floor'):])
@@ -0,0 +1,207 @@
+import re
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+from task_planner.plan_cache import DomainHashes
+
+
+class SASTask(object):
+    '''A translated (SAS+) planning task whose goal section can be replaced.
+
+    @param prefix -- the task description preceding the goal section
+    @param suffix -- the task description following the goal section
+    @param atom_values -- a dictionary mapping atoms (of the form "predicate(arg_1, ..., arg_n)")
+                          to the (variable, value) pairs by which they are represented
+    '''
+    def __init__(self, prefix: str, suffix: str, atom_values: dict):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.atom_values = atom_values
+
+    @staticmethod
+    def from_str(sas_str: str):
+        '''Returns an SASTask object for the given translator output
+        or None if the output does not contain a goal section.
+
+        Keyword arguments:
+        @param sas_str: str -- contents of a SAS+ file written by the Fast Downward translator
+
+        '''
+        goal_start_idx = sas_str.find('begin_goal\n')
+        goal_end_idx = sas_str.find('end_goal\n')
+        if goal_start_idx == -1 or goal_end_idx == -1:
+            return None
+
+        # variables have the form
+        # begin_variable / name / axiom layer / number of values / values / end_variable
+        atom_values = {}
+        lines = sas_str[:goal_start_idx].split('\n')
+        variable_idx = 0
+        line_idx = 0
+        while line_idx < len(lines):
+            if lines[line_idx] == 'begin_variable':
+                value_count = int(lines[line_idx+3])
+                for value_idx in range(value_count):
+                    value = lines[line_idx+4+value_idx]
+                    if value.startswith('Atom '):
+                        atom_values[value[5:]] = (variable_idx, value_idx)
+                variable_idx += 1
+                line_idx += 4 + value_count
+            else:
+                line_idx += 1
+
+        return SASTask(sas_str[:goal_start_idx],
+                       sas_str[goal_end_idx+len('end_goal\n'):],
+                       atom_values)
+
+    def get_task_str(self, goal_atoms: list) -> str:
+        '''Returns the task description with the given goals or None if
+        the goals cannot be expressed with the variables of the task.
+
+        Keyword arguments:
+        @param goal_atoms: list -- goal atoms of the form "predicate(arg_1, ..., arg_n)"
+
+        '''
+        goal_values = {}
+        for goal_atom in goal_atoms:
+            if goal_atom not in self.atom_values:
+                return None
+            variable, value = self.atom_values[goal_atom]
+            if goal_values.get(variable, value) != value:
+                return None
+            goal_values[variable] = value
+
+        goal_lines = ['{0} {1}'.format(variable, value) for variable, value in sorted(goal_values.items())]
+        return '{0}begin_goal\n{1}\n{2}\nend_goal\n{3}'.format(self.prefix, len(goal_lines),
+                                                               '\n'.join(goal_lines), self.suffix)
+
+
+class TranslationCache(object):
+    '''A cache of Fast Downward translations of planning problems.
+
+    Translations are keyed by a hash of the domain file and of the problem
+    without its goals (namely of its objects and of both the static and the
+    dynamic part of the initial state), so a cached translation is reused
+    for problems that only differ in their goals and is invalidated whenever
+    the domain or the initial state change. For the translations to be reusable
+    for other goals, the problems have to be translated with relevance analysis
+    turned off (see "translate_options"); the goal section of a cached
+    translation is then replaced with the goals of the new problem.
+
+    Constructor arguments:
+    @param max_size -- maximum number of cached translations
+    '''
+    translate_options = ['--keep-unimportant-variables']
+
+    def __init__(self, max_size: int=16):
+        self.max_size = max_size
+        self.logger = logging.getLogger('task.planner.translation_cache')
+
+        self.__lock = threading.Lock()
+        self.__tasks = OrderedDict()
+        self.__domain_hashes = DomainHashes()
+        self.hits = 0
+        self.misses = 0
+
+    def get_domain_hash(self, domain_file_name: str) -> str:
+        '''Returns a hash of the contents of the given domain file (see DomainHashes).
+
+        Keyword arguments:
+        @param domain_file_name: str -- path of a PDDL domain file
+
+        '''
+        return self.__domain_hashes.get(domain_file_name)
+
+    def get_problem_key(self, domain_file_name: str, problem_file_name: str) -> tuple:
+        '''Returns a (key, goal atoms) tuple for the given problem file; the key
+        is a hash of the domain and of the problem without its goals, while the
+        goal atoms are strings of the form "predicate(arg_1, ..., arg_n)", as
+        used by the translator (only conjunctive goals are supported).
+
+        Keyword arguments:
+        @param domain_file_name: str -- path of a PDDL domain file
+        @param problem_file_name: str -- path of a PDDL problem file
+
+        '''
+        with open(problem_file_name, 'r') as problem_file:
+            problem_str = problem_file.read().lower()
+        goal_idx = problem_str.find('(:goal')
+
+        problem_hash = hashlib.sha256(self.get_domain_hash(domain_file_name).encode('utf-8'))
+        problem_hash.update(problem_str[:goal_idx].encode('utf-8'))
+
+        goal_atoms = []
+        for atom in re.findall(r'\(([^()]+)\)', problem_str[goal_idx:]):
+            atom_tokens = atom.split()
+            if atom_tokens[0] not in (':goal', 'and'):
+                goal_atoms.append('{0}({1})'.format(atom_tokens[0], ', '.join(atom_tokens[1:])))
+        return problem_hash.hexdigest(), goal_atoms
+
+    def write_task(self, key: str, goal_atoms: list, sas_file_name: str) -> bool:
+        '''Writes the cached translation stored under the given key with the given
+        goals to a SAS+ file. Returns False if no translation is cached under the key
+        or if the goals cannot be expressed with the variables of the translation.
+
+        Keyword arguments:
+        @param key: str -- a key returned by "get_problem_key"
+        @param goal_atoms: list -- goal atoms returned by "get_problem_key"
+        @param sas_file_name: str -- path of the SAS+ file to write
+
+        '''
+        with self.__lock:
+            task = self.__tasks.get(key)
+            if task is not None:
+                self.__tasks.move_to_end(key)
+
+        task_str = task.get_task_str(goal_atoms) if task is not None else None
+        with self.__lock:
+            if task_str is None:
+                self.misses += 1
+                return False
+            self.hits += 1
+
+        with open(sas_file_name, 'w') as sas_file:
+            sas_file.write(task_str)
+        return True
+
+    def put(self, key: str, goal_atoms: list, sas_file_name: str) -> bool:
+        '''Caches the translation in the given SAS+ file under the given key.
+        The translation is not cached (and False is returned) if the file
+        does not exist or if the goals it was translated for are not represented
+        by its variables (e.g. if the translator has found the goals to be
+        unreachable and written a trivially unsolvable task).
+
+        Keyword arguments:
+        @param key: str -- a key returned by "get_problem_key"
+        @param goal_atoms: list -- goal atoms returned by "get_problem_key"
+        @param sas_file_name: str -- path of a SAS+ file written by the translator
+
+        '''
+        try:
+            with open(sas_file_name, 'r') as sas_file:
+                task = SASTask.from_str(sas_file.read())
+        except FileNotFoundError:
+            return False
+
+        if task is None or task.get_task_str(goal_atoms) is None:
+            self.logger.debug('Not caching a translation that does not represent its goals')
+            return False
+
+        with self.__lock:
+            self.__tasks[key] = task
+            self.__tasks.move_to_end(key)
+            while len(self.__tasks) > self.max_size:
+                self.__tasks.popitem(last=False)
+        return True
+
+    def clear(self) -> None:
+        '''Removes all translations from the cache.
+        '''
+        with self.__lock:
+            self.__tasks.clear()
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__tasks)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+'''A stand-in for Fast Downward used by the concurrency tests. Usage:
+
+fake_lama_planner.py --plan-file PLAN-FILE [--delay SECONDS] [--pid-file PID-FILE]
+                     [--plan-count N] [--plan-interval SECONDS] [--linger SECONDS]
+                     [--allocate MEGABYTES] [--truncate] DOMAIN PROBLEM
+fake_lama_planner.py --plan-file PLAN-FILE [...] SAS-FILE
+fake_lama_planner.py --sas-file SAS-FILE --translate DOMAIN PROBLEM [--translate-options ...]
+
+Writes a plan that delivers the load from the "load_at" goal of the problem
+to the goal location; like Fast Downward, it writes intermediate files to its
+working directory and (after a short delay) one or more numbered plan files.
+If a delay is given, the planner starts a child process (as Fast Downward
+does for its search component) and waits for the given number of seconds
+before writing the plans; the process IDs of the planner and its child are
+written to the given PID file (without a delay, only the process ID of the
+planner is written). As with an anytime search, the plans can be written
+one by one ("--plan-interval") and the planner can keep running after
+writing its last plan ("--linger"). Before searching, the planner can
+allocate a given amount of memory ("--allocate"), e.g. for testing memory limits.
+The last plan file can be left without its cost line ("--truncate"), as if
+the planner had been killed while writing it.
+
+As with the Fast Downward driver, the problem can also be translated
+separately ("--translate"), in which case a SAS+ file with one variable
+per load (whose values are the locations of the load) is written, and
+the search can be run on a previously translated SAS+ file.
+'''
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import subprocess
+
+def write_sas_file(problem, sas_file_name):
+    '''Writes a SAS+ task in which the location of each load is a variable.
+    '''
+    # like Fast Downward, the translator converts all names to small letters
+    problem = problem.lower()
+    objects = problem[problem.find('(:objects'):problem.find('(:init')]
+    objects_by_type = {}
+    for names, obj_type in re.findall(r'^\s*([^()\n]+?)\s+-\s+(\S+)\s*$', objects, re.M):
+        objects_by_type.setdefault(obj_type, []).extend(names.split())
+    init = dict(re.findall(r'\(load_at (\S+) (\S+)\)', problem[problem.find('(:init'):problem.find('(:goal')]))
+    goals = dict(re.findall(r'\(load_at (\S+) (\S+)\)', problem[problem.find('(:goal'):]))
+
+    # the objects of the load_at assertions are not necessarily declared
+    locations = sorted(set(objects_by_type.get('location', [])) | set(init.values()) | set(goals.values()))
+    loads = sorted(set(objects_by_type.get('load', [])) | set(init) | set(goals))
+
+    with open(sas_file_name, 'w') as sas_file:
+        sas_file.write('begin_version\n3\nend_version\nbegin_metric\n0\nend_metric\n')
+        sas_file.write('{0}\n'.format(len(loads)))
+        for var_idx, load in enumerate(loads):
+            sas_file.write('begin_variable\nvar{0}\n-1\n{1}\n'.format(var_idx, len(locations)+1))
+            for location in locations:
+                sas_file.write('Atom load_at({0}, {1})\n'.format(load, location))
+            sas_file.write('<none of those>\nend_variable\n')
+        sas_file.write('0\nbegin_state\n')
+        for load in loads:
+            location = init.get(load)
+            sas_file.write('{0}\n'.format(locations.index(location) if location in locations else len(locations)))
+        sas_file.write('end_state\nbegin_goal\n{0}\n'.format(len(goals)))
+        for load, location in goals.items():
+            sas_file.write('{0} {1}\n'.format(loads.index(load), locations.index(location)))
+        sas_file.write('end_goal\n0\n0\n')
+
+def read_sas_goal(sas_file_name):
+    '''Returns the (load, destination) pair of the first goal of a SAS+ task.
+    '''
+    with open(sas_file_name, 'r') as sas_file:
+        sas = sas_file.read()
+    variable_values = [re.findall(r'^Atom load_at\((\S+), (\S+)\)$', variable, re.M)
+                       for variable in sas.split('begin_variable')[1:]]
+    goal_lines = sas[sas.find('begin_goal'):sas.find('end_goal')].split('\n')
+    var_idx, value_idx = [int(x) for x in goal_lines[2].split()]
+    return variable_values[var_idx][value_idx]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plan-file', default=None)
+    parser.add_argument('--sas-file', default='output.sas')
+    parser.add_argument('--translate', action='store_true')
+    parser.add_argument('--translate-options', action='store_true')
+    parser.add_argument('--delay', type=float, default=0.)
+    parser.add_argument('--pid-file', default=None)
+    parser.add_argument('--plan-count', type=int, default=None)
+    parser.add_argument('--plan-interval', type=float, default=0.)
+    parser.add_argument('--linger', type=float, default=0.)
+    parser.add_argument('--allocate', type=int, default=0)
+    parser.add_argument('--truncate', action='store_true')
+    parser.add_argument('filenames', nargs='+')
+    # the translator options are not interpreted
+    args, _ = parser.parse_known_args()
+
+    if args.filenames[-1].endswith('.sas'):
+        load, destination = read_sas_goal(args.filenames[-1])
+        sas_file_name = None
+    else:
+        with open(args.filenames[-1], 'r') as problem_file:
+            problem = problem_file.read()
+        if args.translate:
+            write_sas_file(problem, args.sas_file)
+            sys.exit(0)
+
+        goal = problem[problem.find('(:goal'):]
+        load, destination = re.search(r'\(load_at (\S+) (\S+)\)', goal).groups()
+
+        # concurrent planner runs in a shared working directory
+        # would find each other's intermediate files here
+        sas_file_name = 'output.sas'
+        if os.path.exists(sas_file_name):
+            sys.exit('output.sas found in the working directory')
+        with open(sas_file_name, 'w') as sas_file:
+            sas_file.write(load)
+
+    # the memory is touched so that it counts towards the resident set size
+    memory = bytearray(b'\x01') * (args.allocate * 1024 * 1024)
+
+    if args.delay > 0.:
+        child = subprocess.Popen(['sleep', str(args.delay)])
+        if args.pid_file:
+            with open(args.pid_file, 'w') as pid_file:
+                pid_file.write('{0} {1}'.format(os.getpid(), child.pid))
+        child.wait()
+    else:
+        if args.pid_file:
+            with open(args.pid_file, 'w') as pid_file:
+                pid_file.write(str(os.getpid()))
+        time.sleep(random.uniform(0., 0.05))
+
+    if sas_file_name is not None:
+        with open(sas_file_name, 'r') as sas_file:
+            if sas_file.read() != load:
+                sys.exit('output.sas was overwritten by another planner run')
+
+    plan_count = args.plan_count or random.randint(1, 3)
+    for plan_idx in range(1, plan_count+1):
+        if plan_idx > 1:
+            time.sleep(args.plan_interval)
+        with open('{0}.{1}'.format(args.plan_file, plan_idx), 'w') as plan_file:
+            plan_file.write('(dock frank {0} pickup floor0 floor0)\n'.format(load))
+            plan_file.write('(goto frank pickup {0} floor0 floor0 {1})\n'.format(destination, load))
+            # later plans are shorter, as with an anytime search
+            if plan_idx < plan_count:
+                plan_file.write('(undock frank {0})\n'.format(load))
+            if plan_idx < plan_count or not args.truncate:
+                plan_file.write('; cost = {0} (unit cost)\n'.format(3 - int(plan_idx == plan_count)))
+
+    # an anytime search keeps looking for better plans until its time limit
+    time.sleep(args.linger)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+'''A stand-in for Metric-FF used by the Metric-FF tests. Usage:
+
+fake_metric_ff_planner.py -o DOMAIN -f PROBLEM [--stall SECONDS] [--linger SECONDS]
+
+Prints (like Metric-FF) a plan that delivers the load from the "load_at"
+goal of the problem to the goal location, followed by planning statistics,
+to its standard output; if the problem has no "load_at" goal, no plan is found.
+The planner can stop for the given number of seconds after printing the first
+action of the plan ("--stall") or after printing its output ("--linger").
+'''
+
+import re
+import sys
+import time
+import argparse
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', dest='domain', required=True)
+    parser.add_argument('-f', dest='problem', required=True)
+    parser.add_argument('--stall', type=float, default=0.)
+    parser.add_argument('--linger', type=float, default=0.)
+    args = parser.parse_args()
+
+    with open(args.problem, 'r') as problem_file:
+        problem = problem_file.read()
+    goal = re.search(r'\(load_at (\S+) (\S+)\)', problem[problem.find('(:goal'):])
+
+    print('\nff: parsing domain file')
+    print('domain \'HOSPITAL-TRANSPORTATION\' defined')
+    print(' ... done.\n')
+    if goal is None:
+        print('ff: goal can be simplified to FALSE. No plan will solve it\n')
+        sys.exit(0)
+
+    load, destination = [name.upper() for name in goal.groups()]
+    print('ff: found legal plan as follows')
+    print('step    0: DOCK FRANK {0} PICKUP FLOOR0 FLOOR0'.format(load), flush=True)
+    time.sleep(args.stall)
+    print('        1: GOTO FRANK PICKUP {0} FLOOR0 FLOOR0 {1}'.format(destination, load))
+    print('        2: UNDOCK FRANK {0}'.format(load))
+    print('')
+    print('time spent:    0.00 seconds instantiating 12 easy, 0 hard action templates')
+    print('               0.00 seconds total time\n', flush=True)
+    time.sleep(args.linger)
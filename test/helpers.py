@@ -0,0 +1,98 @@
+'''Helper functions shared by the tests.
+'''
+
+import os
+import time
+import functools
+import unittest
+from unittest import mock
+import pymongo as pm
+
+from task_planner.knowledge_base_interface import MongoClientPool
+
+try:
+    import mongomock
+    from mongomock.store import ServerStore
+except ImportError:
+    mongomock = None
+
+def process_alive(pid: int, timeout: float=5.) -> bool:
+    '''Returns True if the process with the given ID is still running after
+    the given number of seconds. Signals are delivered asynchronously,
+    so killed processes are given some time to terminate.
+
+    Keyword arguments:
+    @param pid: int -- a process ID
+    @param timeout: float -- time (in seconds) the process is given to terminate
+
+    '''
+    end_time = time.time() + timeout
+    while True:
+        try:
+            # reaped processes no longer exist; killed children of the
+            # (also killed) planner are zombies until they are reaped by init
+            with open('/proc/{0}/stat'.format(pid), 'r') as stat_file:
+                if stat_file.read().split(')')[-1].split()[0] == 'Z':
+                    return False
+        except (FileNotFoundError, ProcessLookupError):
+            return False
+        if time.time() > end_time:
+            return True
+        time.sleep(0.05)
+
+def get_db_host_and_port():
+    '''Returns the host and port of the MongoDB server used by the tests,
+    which can be set through the DB_HOST and DB_PORT environment variables.
+    '''
+    host = 'localhost'
+    port = 27017
+    if 'DB_HOST' in os.environ:
+        host = os.environ['DB_HOST']
+    if 'DB_PORT' in os.environ:
+        port = int(os.environ['DB_PORT'])
+    return (host, port)
+
+def server_available(host: str, port: int) -> bool:
+    '''Returns True if a MongoDB server is reachable at the given host and port.
+
+    Keyword arguments:
+    @param host: str -- host name of the MongoDB server
+    @param port: int -- port of the MongoDB server
+
+    '''
+    client = pm.MongoClient(host=host, port=port, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command('ping')
+        return True
+    except pm.errors.PyMongoError:
+        return False
+    finally:
+        client.close()
+
+class KnowledgeBaseTestCase(unittest.TestCase):
+    '''A test case that uses a local MongoDB server if one is reachable and
+    mongomock as a stand-in otherwise (the tests are skipped if neither is
+    available). All mock clients share a store, so that the data survives the
+    recreation of clients. The database "test_kb_name" is dropped after the
+    tests of the class have been run.
+    '''
+    test_kb_name = 'test_kb'
+
+    @classmethod
+    def setUpClass(self):
+        self.host, self.port = get_db_host_and_port()
+        self.client_patch = None
+        if not server_available(self.host, self.port):
+            if mongomock is None:
+                raise unittest.SkipTest('Neither MongoDB nor mongomock are available')
+            mock_client = functools.partial(mongomock.MongoClient, _store=ServerStore())
+            self.client_patch = mock.patch('task_planner.knowledge_base_interface.pm.MongoClient',
+                                           mock_client)
+            self.client_patch.start()
+
+    @classmethod
+    def tearDownClass(self):
+        MongoClientPool.get_client(self.host, self.port).drop_database(self.test_kb_name)
+        MongoClientPool.close_all()
+        if self.client_patch is not None:
+            self.client_patch.stop()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import os
+import unittest
+
+from task_planner.pddl_parser import PDDLDomain, PDDLProblem
+from task_planner.plan_validator import PlanValidator
+from task_planner.heuristic_search import GBFSPlanner
+
+class HeuristicSearchTest(unittest.TestCase):
+    def setUp(self):
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        main_dir = os.path.dirname(code_dir)
+        self.domain = PDDLDomain.from_file(os.path.join(main_dir, 'config/task_domains/agaplesion/hospital_transportation.pddl'))
+        self.problem_dir = os.path.join(main_dir, 'config/sample_problems')
+
+    def test_sample_problems(self):
+        planner = GBFSPlanner(self.domain)
+        validator = PlanValidator(self.domain)
+        for problem_file_name in os.listdir(self.problem_dir):
+            problem = PDDLProblem.from_file(os.path.join(self.problem_dir, problem_file_name))
+            plan = planner.solve(problem)
+            assert plan is not None
+            assert validator.validate(problem, plan)
+
+        problem = PDDLProblem.from_file(os.path.join(self.problem_dir, 'sample_mobidik_problem_robot_cart_same_floor.pddl'))
+        assert planner.solve(problem) == ['(goto frank charging_station pickup_location floor0 floor0 mobidik)',
+                                          '(dock frank mobidik pickup_location floor0 floor0)',
+                                          '(goto frank pickup_location delivery_location floor0 floor0 mobidik)',
+                                          '(undock frank mobidik)']
+
+    def test_unsolvable_problems(self):
+        with open(os.path.join(self.problem_dir, 'sample_mobidik_problem_robot_cart_diff_floors.pddl'), 'r') as problem_file:
+            problem_str = problem_file.read()
+
+        # without elevators, the load cannot be brought to another floor
+        problem = PDDLProblem.from_str(problem_str.replace('(elevator_at toma_elevator', '(location_floor toma_elevator'))
+        assert GBFSPlanner(self.domain).solve(problem) is None
+
+        # the search gives up once the expansion limit is reached
+        problem = PDDLProblem.from_str(problem_str)
+        assert GBFSPlanner(self.domain, max_expansions=2).solve(problem) is None
+
+    def test_numeric_domains(self):
+        domain_str = '''(define (domain counter)
+            (:requirements :typing :fluents)
+            (:types counter)
+            (:functions (value ?c - counter))
+            (:action increment
+                :parameters (?c - counter)
+                :precondition (< (value ?c) 10)
+                :effect (increase (value ?c) 1)))'''
+        with self.assertRaises(ValueError):
+            GBFSPlanner(PDDLDomain.from_str(domain_str))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import time
+import logging
+import unittest
+
+from task_planner.knowledge_base_interface import KnowledgeBaseInterface, MongoClientPool
+from helpers import KnowledgeBaseTestCase
+
+class KnowledgeBaseBenchmark(KnowledgeBaseTestCase):
+    '''Measures the throughput of knowledge base operations with a pooled client
+    and with a new client created for each operation (the behaviour of the interface
+    before the introduction of MongoClientPool). A local MongoDB server is used
+    if one is reachable; otherwise, mongomock is used as a stand-in.
+    '''
+    test_kb_name = 'test_kb_benchmark'
+    operation_count = 200
+
+    @classmethod
+    def setUpClass(self):
+        super(KnowledgeBaseBenchmark, self).setUpClass()
+        MongoClientPool.close_all()
+        self.kb_interface = KnowledgeBaseInterface(self.test_kb_name, host=self.host, port=self.port)
+        self.fluents = [('location_floor', [('loc', 'LOCATION_{0}'.format(i))], 'floor0')
+                        for i in range(20)]
+        self.kb_interface.insert_fluents(self.fluents)
+
+    def test_pooled_client_throughput(self):
+        per_call_ops = self._measure_ops_per_second(reset_pool=True)
+        pooled_ops = self._measure_ops_per_second(reset_pool=False)
+        logging.getLogger('task.planner.benchmark').info('get_fluent_value: %.1f ops/s with a client per call, '
+                                                         '%.1f ops/s with a pooled client',
+                                                         per_call_ops, pooled_ops)
+
+        # creating a mongomock client does not involve any network handshakes,
+        # so the difference is only meaningful against a real server
+        if self.client_patch is None:
+            assert pooled_ops > per_call_ops
+
+    def _measure_ops_per_second(self, reset_pool: bool) -> float:
+        start_time = time.perf_counter()
+        for i in range(self.operation_count):
+            if reset_pool:
+                MongoClientPool.close_all()
+            fluent = self.fluents[i % len(self.fluents)]
+            assert self.kb_interface.get_fluent_value(fluent[0:2]) == 'floor0'
+        return self.operation_count / (time.perf_counter() - start_time)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import time
+import unittest
+from unittest import mock
+
+from task_planner.knowledge_base_interface import KnowledgeBaseInterface, MongoClientPool
+from helpers import KnowledgeBaseTestCase
+
+class KnowledgeBaseCacheTest(KnowledgeBaseTestCase):
+    '''Tests the knowledge base interface with an in-process cache. Without change
+    streams (e.g. on mongomock or a standalone server), writes of other interfaces
+    are only noticed through the version polling fallback.
+    '''
+    test_kb_name = 'test_kb_cache'
+
+    def setUp(self):
+        MongoClientPool.get_client(self.host, self.port)[self.test_kb_name]['knowledge_base'].delete_many({})
+        self.kb_interface = KnowledgeBaseInterface(self.test_kb_name, host=self.host, port=self.port)
+        self.kb_interface.insert_fluents([('location_floor', [('loc', 'ROOM_1')], 'floor0'),
+                                          ('location_floor', [('loc', 'ROOM_2')], 'floor1')])
+
+    def test_own_writes(self):
+        # the version is not polled, so the writes are only
+        # visible if the cache is patched by the interface
+        cached_interface = KnowledgeBaseInterface(self.test_kb_name, host=self.host, port=self.port,
+                                                  cached=True, cache_poll_interval=1000.)
+        assert cached_interface.get_fluent_value(('location_floor', [('loc', 'ROOM_1')])) == 'floor0'
+
+        assert cached_interface.insert_facts([('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')])])
+        assert cached_interface.insert_fluents([('location_floor', [('loc', 'ROOM_1')], 'floor2')])
+        assert cached_interface.get_fluent_value(('location_floor', [('loc', 'ROOM_1')])) == 'floor2'
+        assert [predicate.to_tuple() for predicate in cached_interface.get_predicate_assertions('robot_at')] == \
+            [('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')])]
+
+        assert cached_interface.remove_facts([('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')])])
+        assert cached_interface.remove_fluents([('location_floor', [('loc', 'ROOM_2')], 'floor1')])
+        assert cached_interface.get_predicate_assertions('robot_at') == []
+        assert cached_interface.get_fluent_value(('location_floor', [('loc', 'ROOM_2')])) is None
+        assert cached_interface.get_fluent_names() == ['location_floor']
+
+    def test_polling_invalidation(self):
+        poll_interval = 0.2
+        cached_interface = KnowledgeBaseInterface(self.test_kb_name, host=self.host, port=self.port,
+                                                  cached=True, cache_poll_interval=poll_interval)
+        assert cached_interface.get_fluent_value(('location_floor', [('loc', 'ROOM_1')])) == 'floor0'
+
+        # a write of another interface increments the version stamp,
+        # so the snapshot is reloaded after the next version check
+        self.kb_interface.insert_fluents([('location_floor', [('loc', 'ROOM_1')], 'floor3')])
+        self.kb_interface.insert_facts([('robot_at', [('bot', 'frank'), ('loc', 'ROOM_2')])])
+        time.sleep(poll_interval * 1.5)
+        assert cached_interface.get_fluent_value(('location_floor', [('loc', 'ROOM_1')])) == 'floor3'
+        assert [predicate.to_tuple() for predicate in cached_interface.get_predicate_assertions('robot_at')] == \
+            [('robot_at', [('bot', 'frank'), ('loc', 'ROOM_2')])]
+
+    def test_interleaved_writes(self):
+        cached_interface = KnowledgeBaseInterface(self.test_kb_name, host=self.host, port=self.port,
+                                                  cached=True, cache_poll_interval=1000.)
+        assert cached_interface.get_fluent_value(('location_floor', [('loc', 'ROOM_1')])) == 'floor0'
+
+        # the version after the interface's own write reveals the
+        # write of the other interface, so the snapshot is reloaded
+        self.kb_interface.insert_fluents([('location_floor', [('loc', 'ROOM_2')], 'floor3')])
+        cached_interface.insert_fluents([('location_floor', [('loc', 'ROOM_1')], 'floor4')])
+        assert cached_interface.get_fluent_values('location_floor', [[('loc', 'ROOM_1')],
+                                                                     [('loc', 'ROOM_2')]]) == ['floor4', 'floor3']
+
+    def test_fluent_values_from_cache(self):
+        cached_interface = KnowledgeBaseInterface(self.test_kb_name, host=self.host, port=self.port,
+                                                  cached=True, cache_poll_interval=1000.)
+        fluent_params = [[('loc', 'ROOM_2')], [('loc', 'ROOM_3')], [('loc', 'ROOM_1')]]
+        assert cached_interface.get_fluent_values('location_floor', fluent_params) == ['floor1', None, 'floor0']
+
+        # once the snapshot is loaded, the collection is no longer queried
+        with mock.patch.object(cached_interface, '_KnowledgeBaseInterface__get_kb_collection',
+                               side_effect=AssertionError('The collection was queried')):
+            assert cached_interface.get_fluent_values('location_floor', fluent_params) == ['floor1', None, 'floor0']
+            assert cached_interface.get_fluent_value(('location_floor', [('loc', 'ROOM_1')])) == 'floor0'
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import unittest
+import pymongo as pm
+
+from task_planner.knowledge_base_interface import AssertionTypes, KnowledgeBaseInterface, MongoClientPool
+from helpers import KnowledgeBaseTestCase
+
+class KnowledgeBaseInterfaceTest(KnowledgeBaseTestCase):
+    '''Tests the bulk writes of the knowledge base interface; the stored
+    documents are checked directly in the knowledge base collection.
+    '''
+    test_kb_name = 'test_kb_interface'
+
+    @classmethod
+    def setUpClass(self):
+        super(KnowledgeBaseInterfaceTest, self).setUpClass()
+        self.kb_interface = KnowledgeBaseInterface(self.test_kb_name, host=self.host, port=self.port)
+
+    def setUp(self):
+        self.collection = self._get_collection('knowledge_base')
+        self.collection.delete_many({})
+
+    def test_insert_facts(self):
+        facts = [('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')]),
+                 ('empty_gripper', [('bot', 'frank')])]
+        assert self.kb_interface.insert_facts(facts)
+
+        documents = {item['key']: item for item in self.collection.find({})}
+        assert set(documents.keys()) == {'robot_at(bot=frank,loc=ROOM_1)',
+                                         'empty_gripper(bot=frank)'}
+        robot_at = documents['robot_at(bot=frank,loc=ROOM_1)']
+        assert robot_at['name'] == 'robot_at'
+        assert robot_at['type'] == AssertionTypes.PREDICATE
+        assert robot_at['params'] == [{'name': 'bot', 'value': 'frank'},
+                                      {'name': 'loc', 'value': 'ROOM_1'}]
+
+    def test_insert_existing_facts(self):
+        fact = ('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')])
+        assert self.kb_interface.insert_facts([fact])
+
+        # the parameter order does not change the assertion key,
+        # so the fact is recognised as existing and not inserted again
+        reordered_fact = ('robot_at', [('loc', 'ROOM_1'), ('bot', 'frank')])
+        with self.assertLogs('task.planner.kb.interface', level='WARNING') as logs:
+            assert self.kb_interface.insert_facts([reordered_fact])
+        assert any('Predicate robot_at already exists' in line for line in logs.output)
+        assert self.collection.count_documents({}) == 1
+
+    def test_insert_repeated_facts(self):
+        fact = ('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')])
+        with self.assertLogs('task.planner.kb.interface', level='WARNING') as logs:
+            assert self.kb_interface.insert_facts([fact, fact])
+        assert any('robot_at(bot=frank,loc=ROOM_1) is repeated' in line for line in logs.output)
+        assert self.collection.count_documents({}) == 1
+
+    def test_insert_fluents(self):
+        fluents = [('location_floor', [('loc', 'ROOM_1')], 'floor0'),
+                   ('location_floor', [('loc', 'ROOM_2')], 'floor1')]
+        assert self.kb_interface.insert_fluents(fluents)
+
+        documents = {item['key']: item for item in self.collection.find({})}
+        assert set(documents.keys()) == {'location_floor(loc=ROOM_1)',
+                                         'location_floor(loc=ROOM_2)'}
+        assert documents['location_floor(loc=ROOM_1)']['type'] == AssertionTypes.FLUENT
+        assert documents['location_floor(loc=ROOM_1)']['value'] == 'floor0'
+        assert documents['location_floor(loc=ROOM_2)']['value'] == 'floor1'
+
+    def test_insert_existing_fluents(self):
+        assert self.kb_interface.insert_fluents([('location_floor', [('loc', 'ROOM_1')], 'floor0')])
+
+        # an existing fluent is replaced, so its value is updated
+        with self.assertLogs('task.planner.kb.interface', level='WARNING') as logs:
+            assert self.kb_interface.insert_fluents([('location_floor', [('loc', 'ROOM_1')], 'floor2')])
+        assert any('Fluent location_floor already exists' in line for line in logs.output)
+
+        documents = list(self.collection.find({}))
+        assert len(documents) == 1
+        assert documents[0]['key'] == 'location_floor(loc=ROOM_1)'
+        assert documents[0]['value'] == 'floor2'
+
+    def test_insert_repeated_fluents(self):
+        # the last value of a repeated fluent is kept
+        fluents = [('location_floor', [('loc', 'ROOM_1')], 'floor0'),
+                   ('location_floor', [('loc', 'ROOM_1')], 'floor1')]
+        with self.assertLogs('task.planner.kb.interface', level='WARNING') as logs:
+            assert self.kb_interface.insert_fluents(fluents)
+        assert any('location_floor(loc=ROOM_1) is repeated' in line for line in logs.output)
+
+        documents = list(self.collection.find({}))
+        assert len(documents) == 1
+        assert documents[0]['value'] == 'floor1'
+
+    def test_remove_facts(self):
+        facts = [('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')]),
+                 ('robot_at', [('bot', 'frank'), ('loc', 'ROOM_2')])]
+        assert self.kb_interface.insert_facts(facts)
+
+        # assertions are removed by their key, which does not depend on the parameter order
+        assert self.kb_interface.remove_facts([('robot_at', [('loc', 'ROOM_1'), ('bot', 'frank')])])
+        keys = [item['key'] for item in self.collection.find({})]
+        assert keys == ['robot_at(bot=frank,loc=ROOM_2)']
+
+        with self.assertLogs('task.planner.kb.interface', level='WARNING') as logs:
+            assert self.kb_interface.remove_facts([('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')])])
+        assert any('Predicate robot_at does not exist' in line for line in logs.output)
+        assert self.collection.count_documents({}) == 1
+
+    def test_remove_fluents(self):
+        fluents = [('location_floor', [('loc', 'ROOM_1')], 'floor0'),
+                   ('location_floor', [('loc', 'ROOM_2')], 'floor1')]
+        assert self.kb_interface.insert_fluents(fluents)
+
+        # the fluent value is not part of the key, so it does not have to match
+        assert self.kb_interface.remove_fluents([('location_floor', [('loc', 'ROOM_1')], 'floor5')])
+        keys = [item['key'] for item in self.collection.find({})]
+        assert keys == ['location_floor(loc=ROOM_2)']
+
+        with self.assertLogs('task.planner.kb.interface', level='WARNING') as logs:
+            assert self.kb_interface.remove_fluents([('location_floor', [('loc', 'ROOM_1')], 'floor0')])
+        assert any('Fluent location_floor does not exist' in line for line in logs.output)
+        assert self.collection.count_documents({}) == 1
+
+    def test_predicates_and_fluents_with_the_same_key(self):
+        # the key is only unique per assertion type
+        assert self.kb_interface.insert_facts([('door_open', [('door', 'DOOR_1')])])
+        assert self.kb_interface.insert_fluents([('door_open', [('door', 'DOOR_1')], 1)])
+        assert self.collection.count_documents({'key': 'door_open(door=DOOR_1)'}) == 2
+
+        assert self.kb_interface.remove_facts([('door_open', [('door', 'DOOR_1')])])
+        documents = list(self.collection.find({}))
+        assert len(documents) == 1
+        assert documents[0]['type'] == AssertionTypes.FLUENT
+
+    def _get_collection(self, collection_name: str):
+        return MongoClientPool.get_client(self.host, self.port)[self.test_kb_name][collection_name]
+
+class KnowledgeBaseIndexTest(KnowledgeBaseTestCase):
+    '''Tests the creation of the knowledge base indexes, including the assignment of
+    keys to documents stored before the introduction of assertion keys. Indexes are
+    only created once per collection, so each test uses a separate database.
+    '''
+    test_kb_name = 'test_kb_index'
+
+    def setUp(self):
+        self.kb_name = '{0}_{1}'.format(self.test_kb_name, self._testMethodName)
+        self.collection = MongoClientPool.get_client(self.host, self.port)[self.kb_name]['knowledge_base']
+        self.collection.delete_many({})
+
+    def tearDown(self):
+        MongoClientPool.get_client(self.host, self.port).drop_database(self.kb_name)
+
+    def test_legacy_key_backfill(self):
+        self.collection.insert_many([self._get_legacy_document('robot_at', [('loc', 'ROOM_1'), ('bot', 'frank')]),
+                                     self._get_legacy_document('location_floor', [('loc', 'ROOM_1')], 'floor0')])
+        kb_interface = KnowledgeBaseInterface(self.kb_name, host=self.host, port=self.port)
+
+        # the first access to the collection adds keys to the legacy documents,
+        # which can then be found with point queries
+        assert kb_interface.get_fluent_value(('location_floor', [('loc', 'ROOM_1')])) == 'floor0'
+        keys = {item['key'] for item in self.collection.find({})}
+        assert keys == {'robot_at(bot=frank,loc=ROOM_1)', 'location_floor(loc=ROOM_1)'}
+
+        assert kb_interface.remove_facts([('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')])])
+        assert self.collection.count_documents({'name': 'robot_at'}) == 0
+
+    def test_legacy_duplicate_removal(self):
+        self.collection.insert_many([self._get_legacy_document('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')]),
+                                     self._get_legacy_document('robot_at', [('loc', 'ROOM_1'), ('bot', 'frank')]),
+                                     self._get_legacy_document('location_floor', [('loc', 'ROOM_1')], 'floor0')])
+
+        # a keyed copy of a legacy assertion, e.g. written by an updated
+        # interface before the indexes were created, takes precedence
+        keyed_document = self._get_legacy_document('location_floor', [('loc', 'ROOM_1')], 'floor1')
+        keyed_document['key'] = 'location_floor(loc=ROOM_1)'
+        self.collection.insert_one(keyed_document)
+
+        kb_interface = KnowledgeBaseInterface(self.kb_name, host=self.host, port=self.port)
+        with self.assertLogs('task.planner.kb.interface', level='WARNING') as logs:
+            assert kb_interface.get_fluent_value(('location_floor', [('loc', 'ROOM_1')])) == 'floor1'
+        assert any('Removing 2 repeated assertions' in line for line in logs.output)
+
+        documents = list(self.collection.find({}))
+        assert sorted(item['key'] for item in documents) == ['location_floor(loc=ROOM_1)',
+                                                             'robot_at(bot=frank,loc=ROOM_1)']
+        assert self._get_unique_index_keys() == [('type', 1), ('key', 1)]
+
+    def test_unique_index(self):
+        kb_interface = KnowledgeBaseInterface(self.kb_name, host=self.host, port=self.port)
+        assert kb_interface.insert_facts([('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')])])
+        assert self._get_unique_index_keys() == [('type', 1), ('key', 1)]
+
+        duplicate_document = self._get_legacy_document('robot_at', [('bot', 'frank'), ('loc', 'ROOM_1')])
+        duplicate_document['key'] = 'robot_at(bot=frank,loc=ROOM_1)'
+        with self.assertRaises(pm.errors.DuplicateKeyError):
+            self.collection.insert_one(duplicate_document)
+
+    def _get_legacy_document(self, name: str, params: list, value=None) -> dict:
+        document = {'name': name,
+                    'params': [{'name': param_name, 'value': param_value}
+                               for param_name, param_value in params]}
+        if value is None:
+            document['type'] = AssertionTypes.PREDICATE
+        else:
+            document['type'] = AssertionTypes.FLUENT
+            document['value'] = value
+        return document
+
+    def _get_unique_index_keys(self) -> list:
+        unique_indexes = [index['key'] for index in self.collection.index_information().values()
+                          if index.get('unique', False)]
+        assert len(unique_indexes) == 1
+        return [tuple(key) for key in unique_indexes[0]]
+
+if __name__ == '__main__':
+    unittest.main()
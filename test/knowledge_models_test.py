@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import os
+import unittest
+
+from task_planner.knowledge_base_interface import Predicate, Fluent
+from task_planner.pddl_parser import PDDLDomain
+from task_planner.knowledge_models import ObjectTypeRegistry, PDDLKnowledgeModel
+
+class KnowledgeModelTest(unittest.TestCase):
+    def setUp(self):
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        main_dir = os.path.dirname(code_dir)
+        domain_file = os.path.join(main_dir, 'config/task_domains/agaplesion/hospital_transportation.pddl')
+        self.knowledge_model = PDDLKnowledgeModel.from_domain_file(domain_file)
+
+    def test_predicate_rendering(self):
+        obj_types = ObjectTypeRegistry()
+        predicate = Predicate.from_tuple(('elevator_at', [('loc', 'ELEVATOR0'),
+                                                          ('elevator', 'toma_elevator')]))
+        assertion_str = self.knowledge_model.render_predicate(predicate, obj_types)
+        assert assertion_str.strip() == '(elevator_at toma_elevator ELEVATOR0)'
+        assert obj_types.contains('elevator', 'toma_elevator')
+        assert obj_types.contains('location', 'ELEVATOR0')
+
+    def test_object_fluent_rendering(self):
+        obj_types = ObjectTypeRegistry()
+        fluent = Fluent.from_tuple(('robot_at', [('bot', 'frank')], 'CHARGING_STATION'))
+        assertion_str = self.knowledge_model.render_fluent(fluent, obj_types)
+        assert assertion_str.strip() == '(robot_at frank CHARGING_STATION)'
+        assert obj_types.get_objects('robot') == ['frank']
+        assert obj_types.get_objects('location') == ['CHARGING_STATION']
+
+    def test_numeric_fluent_rendering(self):
+        domain_str = '''
+            (define (domain numeric-test)
+                (:requirements :typing :fluents)
+                (:types robot location - object)
+                (:predicates (robot_at ?bot - robot ?loc - location))
+                (:functions (battery_level ?bot - robot) - number)
+            )
+        '''
+        knowledge_model = PDDLKnowledgeModel.from_domain(PDDLDomain.from_str(domain_str))
+        obj_types = ObjectTypeRegistry()
+        fluent = Fluent.from_tuple(('battery_level', [('bot', 'frank')], 80))
+        assertion_str = knowledge_model.render_fluent(fluent, obj_types)
+        assert assertion_str.strip() == '(= (battery_level frank) 80)'
+        assert obj_types.get_objects('robot') == ['frank']
+
+    def test_missing_parameter(self):
+        obj_types = ObjectTypeRegistry()
+        predicate = Predicate.from_tuple(('elevator_at', [('elevator', 'toma_elevator')]))
+        with self.assertRaises(ValueError) as context:
+            self.knowledge_model.render_predicate(predicate, obj_types)
+        assert 'elevator_at(elevator=toma_elevator)' in str(context.exception)
+        assert 'missing the parameter(s) loc' in str(context.exception)
+
+if __name__ == '__main__':
+    unittest.main()
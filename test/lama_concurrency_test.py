@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import asyncio
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from ropod.structs.task import TaskRequest
+from task_planner.lama_interface import LAMAInterface
+from task_planner.translation_cache import TranslationCache
+from task_planner.plan_cache import PlanCache
+from task_planner.plan_templates import PlanTemplateLibrary
+from task_planner.pddl_parser import PDDLDomain
+from helpers import KnowledgeBaseTestCase, process_alive
+
+class LamaConcurrencyTest(KnowledgeBaseTestCase):
+    '''Runs concurrent planning requests through a single LAMAInterface
+    and checks that every request receives its own plan; the anytime mode
+    and the reuse of cached plans are also tested here. Fast Downward is
+    replaced by test/fake_lama_planner.py; a local MongoDB server is used
+    if one is reachable and mongomock otherwise.
+    '''
+    test_kb_name = 'test_lama_concurrency'
+    request_count = 32
+
+    @classmethod
+    def setUpClass(self):
+        super(LamaConcurrencyTest, self).setUpClass()
+
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        main_dir = os.path.dirname(code_dir)
+        domain_file = os.path.join(main_dir, 'config/task_domains/agaplesion/hospital_transportation.pddl')
+        planner_cmd = '{0} {1} --plan-file PLAN-FILE DOMAIN PROBLEM'.format(sys.executable,
+                                                                           os.path.join(code_dir, 'fake_lama_planner.py'))
+        self.plan_file_path = tempfile.mkdtemp()
+        self.planner_interface = LAMAInterface(self.test_kb_name, domain_file,
+                                               planner_cmd, self.plan_file_path,
+                                               host=self.host, port=self.port)
+
+        # a planner that takes longer than the tests are willing to wait
+        self.pid_file = os.path.join(self.plan_file_path, 'planner.pid')
+        slow_planner_cmd = planner_cmd.replace('--plan-file',
+                                               '--delay 60 --pid-file {0} --plan-file'.format(self.pid_file))
+        self.slow_planner_interface = LAMAInterface(self.test_kb_name, domain_file,
+                                                    slow_planner_cmd, self.plan_file_path,
+                                                    host=self.host, port=self.port)
+
+        # a planner that writes three improving plans and then keeps searching
+        self.anytime_pid_file = os.path.join(self.plan_file_path, 'anytime_planner.pid')
+        anytime_planner_cmd = planner_cmd.replace('--plan-file',
+                                                  '--plan-count 3 --plan-interval 0.2 --linger 60 '
+                                                  '--pid-file {0} --plan-file'.format(self.anytime_pid_file))
+        self.anytime_planner_interface = LAMAInterface(self.test_kb_name, domain_file,
+                                                       anytime_planner_cmd, self.plan_file_path,
+                                                       host=self.host, port=self.port)
+
+        # a planner that translates problems separately and reuses the translations
+        self.translation_cache = TranslationCache()
+        self.translating_planner_interface = LAMAInterface(self.test_kb_name, domain_file,
+                                                           planner_cmd, self.plan_file_path,
+                                                           translation_cache=self.translation_cache,
+                                                           host=self.host, port=self.port)
+
+        # planners with a time limit and a memory limit
+        self.timeout_pid_file = os.path.join(self.plan_file_path, 'timeout_planner.pid')
+        timeout_planner_cmd = planner_cmd.replace('--plan-file',
+                                                  '--delay 60 --pid-file {0} --plan-file'.format(self.timeout_pid_file))
+        self.timeout_planner_interface = LAMAInterface(self.test_kb_name, domain_file,
+                                                       timeout_planner_cmd, self.plan_file_path,
+                                                       planner_timeout=1.,
+                                                       host=self.host, port=self.port)
+        memory_planner_cmd = planner_cmd.replace('--plan-file', '--allocate 512 --plan-file')
+        self.memory_planner_interface = LAMAInterface(self.test_kb_name, domain_file,
+                                                      memory_planner_cmd, self.plan_file_path,
+                                                      planner_memory_limit=256 * 1024 * 1024,
+                                                      host=self.host, port=self.port)
+
+        # a planner whose last plan file is incomplete
+        self.truncating_planner_cmd = planner_cmd.replace('--plan-file', '--truncate --plan-file')
+        self.domain_file = domain_file
+
+        # a planner that reuses cached plans and plan templates for pruned problems
+        self.reuse_pid_file = os.path.join(self.plan_file_path, 'reuse_planner.pid')
+        reuse_planner_cmd = planner_cmd.replace('--plan-file',
+                                                '--pid-file {0} --plan-file'.format(self.reuse_pid_file))
+        self.plan_cache = PlanCache()
+        self.plan_templates = PlanTemplateLibrary(PDDLDomain.from_file(domain_file))
+        self.reuse_planner_interface = LAMAInterface(self.test_kb_name, domain_file,
+                                                     reuse_planner_cmd, self.plan_file_path,
+                                                     plan_cache=self.plan_cache,
+                                                     plan_templates=self.plan_templates,
+                                                     prune_problems=True,
+                                                     host=self.host, port=self.port)
+
+        self.planner_interface.kb_interface.insert_fluents([('location_floor', [('loc', 'PICKUP')], 'floor0')])
+        self.planner_interface.kb_interface.insert_fluents([('location_floor',
+                                                             [('loc', 'DELIVERY_{0}'.format(i))],
+                                                             'floor{0}'.format(i % 5))
+                                                            for i in range(self.request_count)])
+
+    @classmethod
+    def tearDownClass(self):
+        super(LamaConcurrencyTest, self).tearDownClass()
+        shutil.rmtree(self.plan_file_path, ignore_errors=True)
+
+    def test_concurrent_requests(self):
+        with ThreadPoolExecutor(max_workers=self.request_count) as executor:
+            results = list(executor.map(self._plan, range(self.request_count)))
+
+        for i, (plan_found, plan) in enumerate(results):
+            assert plan_found
+            # the shortest plan of each request ends with the delivery
+            assert [action.type for action in plan] == ['DOCK', 'GOTO']
+            assert plan[-1].areas[0].name == 'DELIVERY_{0}'.format(i)
+            assert plan[-1].areas[0].floor_number == i % 5
+
+        # all request directories are removed
+        assert not os.listdir(self.plan_file_path)
+
+    def test_concurrent_async_requests(self):
+        async def plan_all():
+            return await asyncio.gather(*[self._plan_async(i) for i in range(self.request_count)])
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = loop.run_until_complete(plan_all())
+        finally:
+            loop.close()
+
+        for i, (plan_found, plan) in enumerate(results):
+            assert plan_found
+            assert plan[-1].areas[0].name == 'DELIVERY_{0}'.format(i)
+            assert plan[-1].areas[0].floor_number == i % 5
+        assert not os.listdir(self.plan_file_path)
+
+    def test_async_request_cancellation(self):
+        async def plan_and_cancel():
+            task_request = TaskRequest()
+            task_request.load_type = 'mobidik'
+            task_goals = [('load_at', [('load', 'load_0'), ('loc', 'DELIVERY_0')])]
+            plan_task = asyncio.ensure_future(self.slow_planner_interface.plan_async(task_request,
+                                                                                      'frank',
+                                                                                      task_goals))
+            while not os.path.exists(self.pid_file):
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+            plan_task.cancel()
+            try:
+                await plan_task
+            except asyncio.CancelledError:
+                return True
+            return False
+
+        loop = asyncio.new_event_loop()
+        try:
+            start_time = time.time()
+            cancelled = loop.run_until_complete(asyncio.wait_for(plan_and_cancel(), 30))
+            elapsed_time = time.time() - start_time
+        finally:
+            loop.close()
+
+        with open(self.pid_file, 'r') as pid_file:
+            pids = [int(pid) for pid in pid_file.read().split()]
+        os.remove(self.pid_file)
+
+        assert cancelled
+        assert elapsed_time < 30
+        # both the planner and its child process are killed
+        for pid in pids:
+            assert not process_alive(pid)
+        assert not os.listdir(self.plan_file_path)
+
+    def test_anytime_first_plan(self):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        task_goals = [('load_at', [('load', 'load_1'), ('loc', 'DELIVERY_1')])]
+
+        start_time = time.time()
+        result = self.anytime_planner_interface.plan_anytime(task_request, 'frank', task_goals)
+        elapsed_time = time.time() - start_time
+        plan_found, plan = result
+
+        # the first plan is returned without waiting for the planner to finish
+        assert plan_found
+        assert result.resource_usage is not None
+        assert result.resource_usage.wall_time > 0
+        assert not result.resource_usage.timed_out
+        assert [action.type for action in plan] == ['DOCK', 'GOTO', 'UNDOCK']
+        assert plan[1].areas[0].floor_number == 1
+        assert elapsed_time < 30
+        self._check_anytime_planner_killed()
+
+    def test_anytime_improving_plans(self):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        task_goals = [('load_at', [('load', 'load_2'), ('loc', 'DELIVERY_2')])]
+
+        plan_costs = []
+        plan_found, plan = self.anytime_planner_interface.plan_anytime(task_request, 'frank', task_goals,
+                                                                       stop_condition=lambda plan, cost, elapsed_time: cost <= 2,
+                                                                       plan_callback=lambda plan, cost: plan_costs.append(cost))
+        assert plan_found
+        assert [action.type for action in plan] == ['DOCK', 'GOTO']
+        assert plan_costs == [3, 3, 2]
+        self._check_anytime_planner_killed()
+
+        # the plans can also be consumed as they are found
+        async def get_first_plans():
+            plans = []
+            plan_generator = self.anytime_planner_interface.iter_plans_async(task_request, 'frank', task_goals)
+            async for plan_cost, plan in plan_generator:
+                plans.append((plan_cost, plan))
+                if len(plans) == 2:
+                    break
+            await plan_generator.aclose()
+            return plans
+
+        loop = asyncio.new_event_loop()
+        try:
+            plans = loop.run_until_complete(asyncio.wait_for(get_first_plans(), 30))
+        finally:
+            loop.close()
+        assert [plan_cost for plan_cost, _ in plans] == [3, 3]
+        self._check_anytime_planner_killed()
+
+    def test_cached_translations(self):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        for i in range(3):
+            task_goals = [('load_at', [('load', 'load_0'), ('loc', 'DELIVERY_{0}'.format(i))])]
+            plan_found, plan = self.translating_planner_interface.plan(task_request, 'frank', task_goals)
+            assert plan_found
+            assert plan[-1].areas[0].name == 'DELIVERY_{0}'.format(i)
+
+        async def plan_async():
+            task_goals = [('load_at', [('load', 'load_0'), ('loc', 'DELIVERY_3')])]
+            return await self.translating_planner_interface.plan_async(task_request, 'frank', task_goals)
+
+        loop = asyncio.new_event_loop()
+        try:
+            plan_found, plan = loop.run_until_complete(plan_async())
+        finally:
+            loop.close()
+        assert plan_found
+        assert plan[-1].areas[0].name == 'DELIVERY_3'
+
+        # the problem is only translated for the first request
+        assert self.translation_cache.misses == 1
+        assert self.translation_cache.hits == 3
+        assert not os.listdir(self.plan_file_path)
+
+    def test_resource_usage(self):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        task_goals = [('load_at', [('load', 'load_0'), ('loc', 'DELIVERY_0')])]
+
+        result = self.planner_interface.plan(task_request, 'frank', task_goals)
+        assert result.plan_found
+        usage = result.resource_usage
+        assert usage.exit_status == 0
+        assert not usage.timed_out
+        assert usage.wall_time > 0.
+        assert usage.user_time + usage.system_time > 0.
+        assert usage.peak_rss > 0
+
+        # the stages of the request and the problem size are reported
+        assert result.engine == 'lama'
+        assert result.plan_cost == 2
+        assert set(result.stage_timings) == set(['kb_read', 'problem_generation', 'planner_startup',
+                                                 'search', 'plan_parsing', 'floor_resolution'])
+        assert result.stage_timings['search'] >= usage.wall_time
+        assert result.problem_size['init_atoms'] == self.request_count + 1
+        assert result.problem_size['objects'] > 0
+
+        # the planner is killed once it exceeds its time limit
+        for run_async in (False, True):
+            start_time = time.time()
+            if run_async:
+                loop = asyncio.new_event_loop()
+                try:
+                    result = loop.run_until_complete(self.timeout_planner_interface.plan_async(task_request, 'frank',
+                                                                                               task_goals))
+                finally:
+                    loop.close()
+            else:
+                result = self.timeout_planner_interface.plan(task_request, 'frank', task_goals)
+            elapsed_time = time.time() - start_time
+
+            plan_found, plan = result
+            assert not plan_found
+            assert result.resource_usage.timed_out
+            assert result.resource_usage.exit_status == -9
+            assert elapsed_time < 30
+
+            with open(self.timeout_pid_file, 'r') as pid_file:
+                pids = [int(pid) for pid in pid_file.read().split()]
+            os.remove(self.timeout_pid_file)
+            for pid in pids:
+                assert not process_alive(pid)
+            assert not os.listdir(self.plan_file_path)
+
+        # the planner fails if it exceeds its memory limit
+        result = self.memory_planner_interface.plan(task_request, 'frank', task_goals)
+        assert not result.plan_found
+        assert result.resource_usage.exit_status != 0
+        assert not result.resource_usage.timed_out
+        assert result.resource_usage.peak_rss < 256 * 1024 * 1024
+        assert not os.listdir(self.plan_file_path)
+
+    def test_truncated_plan_file(self):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        task_goals = [('load_at', [('load', 'load_1'), ('loc', 'DELIVERY_1')])]
+
+        # the incomplete last plan is skipped, so the complete first plan is returned
+        planner_interface = LAMAInterface(self.test_kb_name, self.domain_file,
+                                          self.truncating_planner_cmd.replace('--truncate', '--truncate --plan-count 2'),
+                                          self.plan_file_path, host=self.host, port=self.port)
+        result = planner_interface.plan(task_request, 'frank', task_goals)
+        plan_found, plan = result
+        assert plan_found
+        assert [action.type for action in plan] == ['DOCK', 'GOTO', 'UNDOCK']
+        assert result.plan_cost == 3
+        assert not os.listdir(self.plan_file_path)
+
+        # no plan is found if the only plan file is incomplete
+        planner_interface = LAMAInterface(self.test_kb_name, self.domain_file,
+                                          self.truncating_planner_cmd.replace('--truncate', '--truncate --plan-count 1'),
+                                          self.plan_file_path, host=self.host, port=self.port)
+        plan_found, plan = planner_interface.plan(task_request, 'frank', task_goals)
+        assert not plan_found
+        assert not plan
+        assert not os.listdir(self.plan_file_path)
+
+    def test_memory_limit_concurrent_starts(self):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        task_goals = [('load_at', [('load', 'load_4'), ('loc', 'DELIVERY_4')])]
+
+        # the limit is set in the planner processes without a preexec_fn,
+        # so planners can be started from several threads; without prlimit,
+        # the limit is set by the Python shim
+        for prlimit_cmd in (shutil.which('prlimit'), None):
+            with mock.patch('task_planner.planner_interface.shutil.which', return_value=prlimit_cmd), \
+                 ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(lambda _: self.memory_planner_interface.plan(task_request, 'frank',
+                                                                                         task_goals),
+                                            range(4)))
+            for result in results:
+                assert not result.plan_found
+                assert result.resource_usage.exit_status != 0
+                assert result.resource_usage.peak_rss < 256 * 1024 * 1024
+        assert not os.listdir(self.plan_file_path)
+
+    def test_plan_reuse(self):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        task_goals = [('load_at', [('load', 'load_5'), ('loc', 'DELIVERY_5')])]
+
+        result = self.reuse_planner_interface.plan(task_request, 'frank', task_goals)
+        assert result.plan_found
+        assert result.resource_usage is not None
+        assert os.path.exists(self.reuse_pid_file)
+        os.remove(self.reuse_pid_file)
+
+        # an identical request is answered from the plan cache (both through
+        # "plan" and "plan_async") without starting the planner
+        cached_result = self.reuse_planner_interface.plan(task_request, 'frank', task_goals)
+        loop = asyncio.new_event_loop()
+        try:
+            async_cached_result = loop.run_until_complete(self.reuse_planner_interface.plan_async(task_request, 'frank',
+                                                                                                  task_goals))
+        finally:
+            loop.close()
+        assert not os.path.exists(self.reuse_pid_file)
+        assert self.plan_cache.hits == 2
+
+        for reused_result in (cached_result, async_cached_result):
+            assert reused_result.plan_found
+            assert reused_result.resource_usage is None
+            assert [action.type for action in reused_result.plan] == [action.type for action in result.plan]
+            assert reused_result.plan[-1].areas[0].name == 'DELIVERY_5'
+
+            # the actions of a reused plan have their own IDs
+            assert not set(action.id for action in reused_result.plan) & set(action.id for action in result.plan)
+        assert not set(action.id for action in cached_result.plan) & set(action.id for action in async_cached_result.plan)
+        assert not os.listdir(self.plan_file_path)
+
+    def _check_anytime_planner_killed(self):
+        with open(self.anytime_pid_file, 'r') as pid_file:
+            pids = [int(pid) for pid in pid_file.read().split()]
+        os.remove(self.anytime_pid_file)
+        for pid in pids:
+            assert not process_alive(pid)
+        assert not os.listdir(self.plan_file_path)
+
+    def _plan(self, request_idx):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        task_goals = [('load_at', [('load', 'load_{0}'.format(request_idx)),
+                                   ('loc', 'DELIVERY_{0}'.format(request_idx))])]
+        return self.planner_interface.plan(task_request, 'frank', task_goals)
+
+    async def _plan_async(self, request_idx):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        task_goals = [('load_at', [('load', 'load_{0}'.format(request_idx)),
+                                   ('loc', 'DELIVERY_{0}'.format(request_idx))])]
+        return await self.planner_interface.plan_async(task_request, 'frank', task_goals)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,7 +27,7 @@ class LamaPlannerTest(unittest.TestCase):
         plan_file_path = planner_config_params['plan_file_path']
         self.planner_interface = LAMAInterface(self.test_kb_name, domain_file,
                                                planner_cmd, plan_file_path,
-                                               debug=True)
+                                               debug=True, host=host, port=port)
 
     @classmethod
     def tearDownClass(self):
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+from ropod.structs.task import TaskRequest
+from task_planner.metric_ff_interface import MetricFFInterface
+from helpers import KnowledgeBaseTestCase
+
+class MetricFFTest(KnowledgeBaseTestCase):
+    '''Tests that the Metric-FF output is parsed from a pipe; Metric-FF
+    is replaced by test/fake_metric_ff_planner.py. A local MongoDB server
+    is used if one is reachable and mongomock otherwise.
+    '''
+    test_kb_name = 'test_metric_ff'
+    task_goals = [('load_at', [('load', 'mobidik'), ('loc', 'DELIVERY')])]
+
+    @classmethod
+    def setUpClass(self):
+        super(MetricFFTest, self).setUpClass()
+
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        main_dir = os.path.dirname(code_dir)
+        self.domain_file = os.path.join(main_dir, 'config/task_domains/agaplesion/hospital_transportation.pddl')
+        self.planner_cmd = '{0} {1} -o DOMAIN -f PROBLEM'.format(sys.executable,
+                                                                os.path.join(code_dir, 'fake_metric_ff_planner.py'))
+        self.plan_file_path = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(self):
+        super(MetricFFTest, self).tearDownClass()
+        shutil.rmtree(self.plan_file_path, ignore_errors=True)
+
+    def test_piped_output(self):
+        planner = self._get_planner()
+        plan_found, plan = planner.plan(self._get_task_request(), 'frank', self.task_goals)
+        assert plan_found
+        assert [action.type for action in plan] == ['DOCK', 'GOTO', 'UNDOCK']
+        assert plan[1].areas[0].name == 'DELIVERY'
+
+        loop = asyncio.new_event_loop()
+        try:
+            plan_found, plan = loop.run_until_complete(planner.plan_async(self._get_task_request(),
+                                                                          'frank', self.task_goals))
+        finally:
+            loop.close()
+        assert plan_found
+        assert [action.type for action in plan] == ['DOCK', 'GOTO', 'UNDOCK']
+
+        # without a load_at goal, the fake planner does not find a plan
+        plan_found, plan = planner.plan(self._get_task_request(), 'frank',
+                                        [('empty_gripper', [('bot', 'frank')])])
+        assert not plan_found
+        assert not plan
+
+        # no plan files are written
+        assert not os.listdir(self.plan_file_path)
+
+    def test_debug_output(self):
+        planner = self._get_planner(debug=True)
+        plan_found, plan = planner.plan(self._get_task_request(), 'frank', self.task_goals)
+        assert plan_found
+
+        # in debug mode, the planner output is kept in the request directory
+        request_dirs = os.listdir(self.plan_file_path)
+        assert len(request_dirs) == 1
+        plan_file_name = os.path.join(self.plan_file_path, request_dirs[0], 'plan.txt')
+        plan_found, file_plan = planner.parse_plan(plan_file_name, 'mobidik', 'frank')
+        assert plan_found
+        assert [action.type for action in file_plan] == [action.type for action in plan]
+        shutil.rmtree(os.path.join(self.plan_file_path, request_dirs[0]))
+
+    def test_planner_timeout(self):
+        result = self._get_planner().plan(self._get_task_request(), 'frank', self.task_goals)
+        assert result.resource_usage.exit_status == 0
+        assert not result.resource_usage.timed_out
+        assert result.engine == 'metric_ff'
+        assert result.plan_cost == 3
+        assert set(result.stage_timings) == set(['kb_read', 'problem_generation', 'planner_startup',
+                                                 'search', 'plan_parsing', 'floor_resolution'])
+
+        # a plan that has been printed completely is used even if the planner is killed
+        planner = self._get_planner(planner_cmd=self.planner_cmd + ' --linger 60', planner_timeout=1.)
+        start_time = time.time()
+        result = planner.plan(self._get_task_request(), 'frank', self.task_goals)
+        assert time.time() - start_time < 30
+        assert result.plan_found
+        assert [action.type for action in result.plan] == ['DOCK', 'GOTO', 'UNDOCK']
+        assert result.resource_usage.timed_out
+
+        # an incomplete plan is discarded
+        planner = self._get_planner(planner_cmd=self.planner_cmd + ' --stall 60', planner_timeout=1.)
+        loop = asyncio.new_event_loop()
+        try:
+            result = loop.run_until_complete(planner.plan_async(self._get_task_request(),
+                                                                'frank', self.task_goals))
+        finally:
+            loop.close()
+        assert not result.plan_found
+        assert not result.plan
+        assert result.resource_usage.timed_out
+        assert result.resource_usage.exit_status == -9
+        assert not os.listdir(self.plan_file_path)
+
+    def test_relative_executable(self):
+        # the planner runs in the request directory, so an executable given relative
+        # to the current working directory is resolved when the interface is created
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        relative_path = os.path.join(os.curdir, os.path.relpath(os.path.join(code_dir, 'fake_metric_ff_planner.py')))
+        planner = self._get_planner(planner_cmd='{0} -o DOMAIN -f PROBLEM'.format(relative_path))
+        assert planner.planner_cmd.split()[0] == os.path.join(code_dir, 'fake_metric_ff_planner.py')
+
+        plan_found, plan = planner.plan(self._get_task_request(), 'frank', self.task_goals)
+        assert plan_found
+        assert [action.type for action in plan] == ['DOCK', 'GOTO', 'UNDOCK']
+
+        # executables without a path are looked up in PATH
+        planner = self._get_planner(planner_cmd='sh -c true DOMAIN PROBLEM')
+        assert planner.planner_cmd.split()[0] == shutil.which('sh')
+
+    def test_problem_file_backend(self):
+        # problem files are written to the directory of the I/O backend
+        planner = self._get_planner(io_backend='memory')
+        problem_file = planner.generate_problem_file([], [], planner.get_goal_predicates(self.task_goals))
+        try:
+            assert os.path.dirname(problem_file) == planner.io_dir
+            assert planner.io_dir != os.path.abspath(self.plan_file_path)
+        finally:
+            os.remove(problem_file)
+        assert not os.listdir(self.plan_file_path)
+
+        planner = self._get_planner()
+        problem_file = planner.generate_problem_file([], [], planner.get_goal_predicates(self.task_goals))
+        assert os.path.dirname(problem_file) == os.path.abspath(self.plan_file_path)
+        os.remove(problem_file)
+
+    def _get_planner(self, debug=False, planner_cmd=None, planner_timeout=None, io_backend='disk'):
+        return MetricFFInterface(self.test_kb_name, self.domain_file,
+                                 planner_cmd or self.planner_cmd,
+                                 self.plan_file_path, debug=debug,
+                                 io_backend=io_backend,
+                                 planner_timeout=planner_timeout,
+                                 host=self.host, port=self.port)
+
+    def _get_task_request(self):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        return task_request
+
+if __name__ == '__main__':
+    unittest.main()
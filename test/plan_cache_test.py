@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import gc
+import os
+import time
+import weakref
+import shutil
+import tempfile
+import unittest
+import threading
+
+from task_planner.plan_cache import PlanCache
+from task_planner.translation_cache import TranslationCache
+
+class Action(object):
+    '''A minimal stand-in for ropod.structs.action.Action.
+    '''
+    def __init__(self, action_id, action_type):
+        self.id = action_id
+        self.type = action_type
+
+class PlanCacheTest(unittest.TestCase):
+    problem = '''(define (problem ropod)
+    (:domain hospital-transportation)
+    (:objects
+        PICKUP DELIVERY - location
+        floor0 - floor
+        frank - robot
+    )
+
+    (:init
+        (location_floor PICKUP floor0)
+        (location_floor DELIVERY floor0)
+        (robot_at frank PICKUP)
+
+    )
+
+    (:goal
+        (and
+            (robot_at frank DELIVERY)
+        )
+    )
+)
+'''
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.domain_hash = 'domain'
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_problem_keys(self):
+        plan_cache = PlanCache()
+        key = self._get_key(plan_cache, self.problem)
+
+        # the order of objects and assertions does not matter
+        reordered_problem = self.problem.replace('PICKUP DELIVERY - location', 'DELIVERY PICKUP - location')
+        reordered_problem = reordered_problem.replace('''        (location_floor PICKUP floor0)
+        (location_floor DELIVERY floor0)''', '''        (location_floor DELIVERY floor0)
+        (location_floor PICKUP floor0)''')
+        assert self._get_key(plan_cache, reordered_problem) == key
+
+        # but the state, the goals, and the domain do
+        assert self._get_key(plan_cache, self.problem.replace('(robot_at frank PICKUP)',
+                                                              '(robot_at frank DELIVERY)')) != key
+        assert self._get_key(plan_cache, self.problem.replace('(robot_at frank DELIVERY)',
+                                                              '(robot_at frank PICKUP)')) != key
+        assert plan_cache.get_problem_key('other_domain', self._write_problem(self.problem)) != key
+
+    def test_cached_plans(self):
+        plan_cache = PlanCache()
+        key = self._get_key(plan_cache, self.problem)
+        assert plan_cache.get(key) is None
+
+        plan = [Action('1', 'GOTO'), Action('2', 'DOCK')]
+        plan_cache.put(key, plan)
+        cached_plan = plan_cache.get(key)
+        assert [action.type for action in cached_plan] == ['GOTO', 'DOCK']
+
+        # the cached plan is a copy with new action IDs
+        assert [action.id for action in cached_plan] != ['1', '2']
+        assert cached_plan[0] is not plan[0]
+        assert plan_cache.hits == 1 and plan_cache.misses == 1
+
+    def test_eviction(self):
+        plan_cache = PlanCache(max_size=2, ttl=0.1)
+        plan_cache.put('a', [Action('1', 'GOTO')])
+        plan_cache.put('b', [Action('2', 'GOTO')])
+        plan_cache.get('a')
+        plan_cache.put('c', [Action('3', 'GOTO')])
+
+        # "b" is the least recently used plan
+        assert plan_cache.get('b') is None
+        assert plan_cache.get('a') is not None
+        assert len(plan_cache) == 2
+
+        time.sleep(0.15)
+        assert plan_cache.get('a') is None
+        assert plan_cache.get('c') is None
+
+    def test_persistence(self):
+        persistence_file = os.path.join(self.test_dir, 'plans.pkl')
+        plan_cache = PlanCache(persistence_file=persistence_file, save_interval=60.)
+        plan_cache.put('a', [Action('1', 'GOTO')])
+
+        # the cache is saved in the background, or when it is flushed
+        assert not os.path.exists(persistence_file)
+        plan_cache.flush()
+
+        restored_plan_cache = PlanCache(persistence_file=persistence_file)
+        assert len(restored_plan_cache) == 1
+        assert [action.type for action in restored_plan_cache.get('a')] == ['GOTO']
+
+    def test_batched_saves(self):
+        persistence_file = os.path.join(self.test_dir, 'plans.pkl')
+        plan_cache = PlanCache(persistence_file=persistence_file, save_interval=0.2)
+        plan_cache.put('a', [Action('1', 'GOTO')])
+        plan_cache.put('b', [Action('2', 'GOTO')])
+
+        # the plans stored within the save interval are written at once
+        start_time = time.time()
+        while not os.path.exists(persistence_file) and time.time() - start_time < 5:
+            time.sleep(0.05)
+        assert len(PlanCache(persistence_file=persistence_file)) == 2
+
+    def test_close(self):
+        persistence_file = os.path.join(self.test_dir, 'plans.pkl')
+        plan_cache = PlanCache(persistence_file=persistence_file, save_interval=60.)
+        plan_cache.put('a', [Action('1', 'GOTO')])
+        save_timers = [thread for thread in threading.enumerate() if isinstance(thread, threading.Timer)]
+        assert save_timers
+
+        # closing the cache saves it and stops the scheduled save
+        plan_cache.close()
+        assert len(PlanCache(persistence_file=persistence_file)) == 1
+        for save_timer in save_timers:
+            save_timer.join(1.)
+            assert not save_timer.is_alive()
+
+    def test_cache_lifetime(self):
+        # persisted caches are not kept alive by the exit handler
+        persistence_file = os.path.join(self.test_dir, 'plans.pkl')
+        plan_cache_ref = weakref.ref(PlanCache(persistence_file=persistence_file))
+        gc.collect()
+        assert plan_cache_ref() is None
+
+    def test_domain_hash(self):
+        domain_file_name = os.path.join(self.test_dir, 'domain.pddl')
+        with open(domain_file_name, 'w') as domain_file:
+            domain_file.write('(define (domain a))')
+        plan_cache = PlanCache()
+        domain_hash = plan_cache.get_domain_hash(domain_file_name)
+        assert plan_cache.get_domain_hash(domain_file_name) == domain_hash
+
+        # the hash is recomputed when the domain file changes
+        with open(domain_file_name, 'w') as domain_file:
+            domain_file.write('(define (domain ab))')
+        assert plan_cache.get_domain_hash(domain_file_name) != domain_hash
+
+        # the plan and translation caches share the domain hashing
+        assert TranslationCache().get_domain_hash(domain_file_name) == \
+            plan_cache.get_domain_hash(domain_file_name)
+
+    def _get_key(self, plan_cache, problem):
+        return plan_cache.get_problem_key(self.domain_hash, self._write_problem(problem))
+
+    def _write_problem(self, problem):
+        problem_file_name = os.path.join(self.test_dir, 'problem.pddl')
+        with open(problem_file_name, 'w') as problem_file:
+            problem_file.write(problem)
+        return problem_file_name
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+import time
+import unittest
+
+from task_planner.plan_result import PlanResult, PlanStatistics, ResourceUsage
+from task_planner.plan_metrics import PrometheusExporter, OpenTelemetryExporter
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    TracerProvider = None
+
+class PlanMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.result = PlanResult(True, ['action_1', 'action_2'],
+                                 ResourceUsage(0, True, 1.5, 1.25, 0.25, 2**20, 0.01),
+                                 'lama', 2.,
+                                 {'kb_read': 0.01, 'problem_generation': 0.02, 'search': 1.5},
+                                 {'objects': 12, 'init_atoms': 34})
+
+    def test_stage_statistics(self):
+        statistics = PlanStatistics()
+        with statistics.time_stage('problem_generation'):
+            time.sleep(0.05)
+            # the time spent in nested stages is not counted twice
+            with statistics.time_stage('kb_read'):
+                time.sleep(0.1)
+            for _ in statistics.time_iterable('kb_read', self.__slow_items(2, 0.05)):
+                time.sleep(0.05)
+
+        assert 0.2 <= statistics.stage_timings['kb_read'] < 0.3
+        assert 0.15 <= statistics.stage_timings['problem_generation'] < 0.25
+
+        statistics.add_planner_usage(ResourceUsage(0, wall_time=2., startup_time=0.5))
+        assert statistics.stage_timings['planner_startup'] == 0.5
+        assert statistics.stage_timings['search'] == 2.
+
+        # the results can still be unpacked as (plan_found, plan) tuples
+        plan_found, plan = self.result
+        assert plan_found
+        assert plan == ['action_1', 'action_2']
+        assert self.result.to_dict()['plan_length'] == 2
+
+    @unittest.skipIf(prometheus_client is None, 'prometheus_client is not available')
+    def test_prometheus_exporter(self):
+        registry = prometheus_client.CollectorRegistry()
+        exporter = PrometheusExporter(registry)
+        exporter.export(self.result)
+        exporter.export(PlanResult(False, [], engine='lama'))
+
+        assert registry.get_sample_value('task_planner_plan_requests_total',
+                                         {'engine': 'lama', 'plan_found': 'true'}) == 1.
+        assert registry.get_sample_value('task_planner_plan_requests_total',
+                                         {'engine': 'lama', 'plan_found': 'false'}) == 1.
+        assert registry.get_sample_value('task_planner_planner_timeouts_total',
+                                         {'engine': 'lama'}) == 1.
+        assert registry.get_sample_value('task_planner_plan_stage_seconds_sum',
+                                         {'engine': 'lama', 'stage': 'search'}) == 1.5
+        assert registry.get_sample_value('task_planner_plan_problem_objects_sum') == 12.
+        assert registry.get_sample_value('task_planner_plan_cost_count') == 1.
+        assert registry.get_sample_value('task_planner_planner_cpu_seconds_total',
+                                         {'engine': 'lama'}) == 1.5
+
+    @unittest.skipIf(TracerProvider is None, 'the OpenTelemetry SDK is not available')
+    def test_opentelemetry_exporter(self):
+        span_exporter = InMemorySpanExporter()
+        tracer_provider = TracerProvider()
+        tracer_provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+        OpenTelemetryExporter(tracer_provider.get_tracer('test')).export(self.result)
+
+        spans = {span.name: span for span in span_exporter.get_finished_spans()}
+        assert sorted(spans) == ['kb_read', 'plan', 'problem_generation', 'search']
+        assert spans['plan'].attributes['planner.engine'] == 'lama'
+        assert spans['plan'].attributes['planner.problem.init_atoms'] == 34
+        assert spans['plan'].attributes['planner.timed_out']
+        for stage in ('kb_read', 'problem_generation', 'search'):
+            assert spans[stage].parent.span_id == spans['plan'].context.span_id
+        assert abs((spans['search'].end_time - spans['search'].start_time) / 1e9 - 1.5) < 1e-3
+
+    def __slow_items(self, item_count, delay):
+        for i in range(item_count):
+            time.sleep(delay)
+            yield i
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import os
+import unittest
+
+from task_planner.pddl_parser import PDDLDomain, PDDLProblem
+from task_planner.plan_validator import PlanValidator
+from task_planner.plan_templates import PlanTemplateLibrary
+
+class PlanTemplatesTest(unittest.TestCase):
+    # a plan for sample_mobidik_problem_robot_cart_diff_floors.pddl
+    plan = ['(goto frank somewhere_on_floor1 elevator1 floor1 floor1 mobidik)',
+            '(request_elevator frank elevator1 elevator0 toma_elevator floor1 floor1 floor0 unknown)',
+            '(wait_for_elevator frank toma_elevator elevator1)',
+            '(enter_elevator frank elevator1 toma_elevator mobidik)',
+            '(ride_elevator frank toma_elevator floor0)',
+            '(wait_for_elevator frank toma_elevator elevator0)',
+            '(exit_elevator frank elevator0 toma_elevator mobidik floor0 floor0)',
+            '(goto frank elevator0 pickup_location floor0 floor0 mobidik)',
+            '(dock frank mobidik pickup_location floor0 floor0)',
+            '(goto frank pickup_location elevator0 floor0 floor0 mobidik)',
+            '(request_elevator frank elevator0 elevator2 toma_elevator floor0 floor0 floor2 floor0)',
+            '(wait_for_elevator frank toma_elevator elevator0)',
+            '(enter_elevator frank elevator0 toma_elevator mobidik)',
+            '(ride_elevator frank toma_elevator floor2)',
+            '(wait_for_elevator frank toma_elevator elevator2)',
+            '(exit_elevator frank elevator2 toma_elevator mobidik floor2 floor2)',
+            '(goto frank elevator2 delivery_location floor2 floor2 mobidik)',
+            '(undock frank mobidik)']
+
+    renamed_objects = [('frank', 'susan'), ('mobidik', 'cart7'),
+                       ('pickup_location', 'ward_a'), ('delivery_location', 'lab_b'),
+                       ('toma_elevator', 'lift_x')]
+
+    def setUp(self):
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        main_dir = os.path.dirname(code_dir)
+        self.domain = PDDLDomain.from_file(os.path.join(main_dir, 'config/task_domains/agaplesion/hospital_transportation.pddl'))
+        with open(os.path.join(main_dir, 'config/sample_problems/sample_mobidik_problem_robot_cart_diff_floors.pddl'), 'r') as problem_file:
+            self.problem_str = problem_file.read()
+        self.problem = PDDLProblem.from_str(self.problem_str)
+
+    def test_validator(self):
+        validator = PlanValidator(self.domain)
+        assert validator.validate(self.problem, self.plan)
+
+        # plans that do not reach the goals or whose
+        # preconditions are not satisfied are invalid
+        assert not validator.validate(self.problem, self.plan[:-1])
+        assert not validator.validate(self.problem, self.plan[1:])
+        assert not validator.validate(self.problem, ['(undock frank pickup_location)'])
+
+        required_atoms = validator.get_required_atoms(self.problem, self.plan)
+        assert ('robot_at', 'frank', 'somewhere_on_floor1') in required_atoms
+        assert ('load_at', 'mobidik', 'pickup_location') in required_atoms
+
+        # atoms produced by the plan are not required
+        assert ('robot_floor', 'frank', 'floor0') not in required_atoms
+        assert validator.get_required_atoms(self.problem, self.plan[1:]) is None
+
+    def test_template_instantiation(self):
+        template_library = PlanTemplateLibrary(self.domain)
+        assert template_library.add(self.problem, self.plan)
+        assert not template_library.add(self.problem, self.plan[1:])
+        assert len(template_library) == 1
+
+        # a problem that only differs in the object names
+        renamed_problem_str = self.problem_str
+        for old_name, new_name in self.renamed_objects:
+            renamed_problem_str = renamed_problem_str.replace(old_name, new_name)
+        renamed_problem = PDDLProblem.from_str(renamed_problem_str)
+
+        plan = template_library.instantiate(renamed_problem)
+        expected_plan = []
+        for action_string in self.plan:
+            for old_name, new_name in self.renamed_objects:
+                action_string = action_string.replace(old_name, new_name)
+            expected_plan.append(action_string)
+        assert plan == expected_plan
+        assert PlanValidator(self.domain).validate(renamed_problem, plan)
+
+        # a problem in which the goal location is on another
+        # floor cannot be solved with the same plan
+        other_problem = PDDLProblem.from_str(renamed_problem_str.replace('(load_at cart7 lab_b)',
+                                                                         '(load_at cart7 charging_station)'))
+        assert template_library.instantiate(other_problem) is None
+        assert template_library.hits == 1
+        assert template_library.misses == 1
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import time
+import asyncio
+import threading
+import unittest
+from concurrent.futures import wait
+
+from task_planner.planner_pool import PlannerPool, DeadlineExceededError
+
+class FakePlanner(object):
+    '''A planner stand-in that records the order in which requests are planned
+    and the maximum number of concurrently running requests.
+    '''
+    def __init__(self, planning_time=0.05):
+        self.planning_time = planning_time
+        self.planned_robots = []
+        self.cancelled_robots = []
+        self.running_count = 0
+        self.max_running_count = 0
+        self.lock = threading.Lock()
+
+    async def plan_async(self, task_request, robot, task_goals):
+        with self.lock:
+            self.planned_robots.append(robot)
+            self.running_count += 1
+            self.max_running_count = max(self.max_running_count, self.running_count)
+        try:
+            await asyncio.sleep(task_request.get('planning_time', self.planning_time))
+        except asyncio.CancelledError:
+            self.cancelled_robots.append(robot)
+            raise
+        finally:
+            with self.lock:
+                self.running_count -= 1
+        if task_request.get('fail', False):
+            raise RuntimeError('planner failure')
+        return True, [robot]
+
+class PlannerPoolTest(unittest.TestCase):
+    def test_bounded_concurrency(self):
+        planner = FakePlanner()
+        pool = PlannerPool(planner, max_concurrency=3)
+        futures = [pool.submit({}, 'robot_{0}'.format(i), []) for i in range(12)]
+        wait(futures, timeout=10)
+        pool.shutdown()
+
+        assert [future.result() for future in futures] == [(True, ['robot_{0}'.format(i)])
+                                                            for i in range(12)]
+        assert planner.max_running_count == 3
+
+        metrics = pool.get_metrics()
+        assert metrics['submitted'] == 12
+        assert metrics['completed'] == 12
+        assert metrics['queued'] == 0 and metrics['running'] == 0
+        assert metrics['run_time']['mean'] >= planner.planning_time
+        assert metrics['queue_wait_time']['max'] >= planner.planning_time
+
+    def test_priorities(self):
+        planner = FakePlanner()
+        pool = PlannerPool(planner, max_concurrency=1)
+
+        # the first request occupies the only worker while the others are queued
+        blocking_future = pool.submit({'planning_time': 0.2}, 'blocking', [])
+        time.sleep(0.05)
+        futures = [pool.submit({}, 'low', [], priority=5),
+                   pool.submit({}, 'high', [], priority=0),
+                   pool.submit({}, 'medium_1', [], priority=2),
+                   pool.submit({}, 'medium_2', [], priority=2)]
+        wait([blocking_future] + futures, timeout=10)
+        pool.shutdown()
+
+        assert planner.planned_robots == ['blocking', 'high', 'medium_1', 'medium_2', 'low']
+
+    def test_deadlines(self):
+        planner = FakePlanner()
+        pool = PlannerPool(planner, max_concurrency=1)
+
+        running_future = pool.submit({'planning_time': 5.}, 'running', [], timeout=0.2)
+        queued_future = pool.submit({}, 'queued', [], timeout=0.1)
+        wait([running_future, queued_future], timeout=10)
+        pool.shutdown()
+
+        # the running request is cancelled and the queued one is never planned
+        self.assertRaises(DeadlineExceededError, running_future.result)
+        self.assertRaises(DeadlineExceededError, queued_future.result)
+        assert planner.cancelled_robots == ['running']
+        assert planner.planned_robots == ['running']
+        assert pool.get_metrics()['expired'] == 2
+
+    def test_failures_and_cancellation(self):
+        planner = FakePlanner()
+        pool = PlannerPool(planner, max_concurrency=1)
+
+        failing_future = pool.submit({'fail': True}, 'failing', [])
+        cancelled_future = pool.submit({}, 'cancelled', [])
+        assert cancelled_future.cancel()
+        pool.shutdown()
+
+        self.assertRaises(RuntimeError, failing_future.result)
+        assert planner.planned_robots == ['failing']
+        metrics = pool.get_metrics()
+        assert metrics['failed'] == 1
+        assert metrics['cancelled'] == 1
+        self.assertRaises(RuntimeError, pool.submit, {}, 'late', [])
+
+if __name__ == '__main__':
+    unittest.main()
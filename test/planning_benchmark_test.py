@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from task_planner.synthetic_hospital import SyntheticHospital
+from task_planner.planning_benchmark import PlanningBenchmark
+from task_planner.pddl_parser import PDDLProblem
+from task_planner.native_interface import NativePlannerInterface
+from task_planner.plan_result import PlanResult
+from helpers import KnowledgeBaseTestCase
+
+class PlanningBenchmarkTest(KnowledgeBaseTestCase):
+    '''Benchmarks the native planner and (with test/fake_lama_planner.py and
+    test/fake_metric_ff_planner.py standing in for the external planners)
+    LAMA and Metric-FF on a small synthetic hospital. A local MongoDB server
+    is used if one is reachable and mongomock otherwise.
+    '''
+    test_kb_name = 'test_planning_benchmark'
+    @classmethod
+    def setUpClass(self):
+        super(PlanningBenchmarkTest, self).setUpClass()
+
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        main_dir = os.path.dirname(code_dir)
+        self.domain_file = os.path.join(main_dir, 'config/task_domains/agaplesion/hospital_transportation.pddl')
+        self.plan_file_path = tempfile.mkdtemp()
+        lama_cmd = '{0} {1} --plan-file PLAN-FILE DOMAIN PROBLEM'.format(sys.executable,
+                                                                        os.path.join(code_dir, 'fake_lama_planner.py'))
+        metric_ff_cmd = '{0} {1} -o DOMAIN -f PROBLEM'.format(sys.executable,
+                                                             os.path.join(code_dir, 'fake_metric_ff_planner.py'))
+        common_config = {'domain_file': self.domain_file, 'plan_file_path': self.plan_file_path,
+                         'host': self.host, 'port': self.port}
+
+        # the Metric-FF planner is given by its class path, as new backends would be
+        self.planners = {
+            'native': PlanningBenchmark.get_planner('native', self.test_kb_name, common_config),
+            'lama': PlanningBenchmark.get_planner('lama', self.test_kb_name,
+                                                  dict(common_config, planner_cmd=lama_cmd)),
+            'ff': PlanningBenchmark.get_planner('ff', self.test_kb_name,
+                                                dict(common_config, planner_cmd=metric_ff_cmd,
+                                                     planner_name='task_planner.metric_ff_interface.MetricFFInterface'))
+        }
+
+        self.hospital = SyntheticHospital(floor_count=2, locations_per_floor=2,
+                                          elevator_count=2, robot_count=1, load_count=2)
+        self.hospital.populate(self.planners['native'].kb_interface)
+
+    @classmethod
+    def tearDownClass(self):
+        super(PlanningBenchmarkTest, self).tearDownClass()
+        shutil.rmtree(self.plan_file_path, ignore_errors=True)
+
+    def test_synthetic_hospital(self):
+        hospital = SyntheticHospital(floor_count=3, locations_per_floor=4, elevator_count=2,
+                                     robot_count=3, load_count=5, seed=42)
+        assert len(hospital.locations) == 12
+        assert hospital.get_assertion_count() == 3 + 2*3 + 12 + 2*3 + 2*2 + 2*3 + 2*5
+
+        # the hospitals and requests only depend on the seed
+        assert hospital.get_fluents() == SyntheticHospital(3, 4, 2, 3, 5, seed=42).get_fluents()
+        requests = [(robot, goals) for _, robot, goals in hospital.get_requests(10)]
+        assert requests == [(robot, goals) for _, robot, goals in hospital.get_requests(10)]
+        for _, goals in requests:
+            load, destination = [value for _, value in goals[0][1]]
+            assert destination != hospital.load_locations[load]
+
+        # the generated problems contain the whole hospital
+        _, robot, task_goals = self.hospital.get_requests(1)[0]
+        planner = self.planners['native']
+        problem = PDDLProblem.from_str(planner.problem_builder.get_problem_str(planner.get_goal_predicates(task_goals),
+                                                                               robot))
+        locations = [obj for obj, obj_type in problem.objects.items() if obj_type == 'location']
+        assert len(locations) == 2*2 + 2*2
+
+    def test_benchmark_report(self):
+        benchmark = PlanningBenchmark(self.hospital, request_count=3, warmup_count=1)
+        report = benchmark.run(self.planners)
+
+        # the report can be stored as JSON
+        report = json.loads(json.dumps(report))
+        assert report['hospital']['floor_count'] == 2
+        assert sorted(report['planners']) == ['ff', 'lama', 'native']
+        for name, engine in (('native', 'native'), ('lama', 'lama'), ('ff', 'metric_ff')):
+            planner_report = report['planners'][name]
+            assert planner_report['engines'] == [engine]
+            assert planner_report['success_rate'] == 1.
+            latency = planner_report['latency']
+            assert 0. < latency['p50'] <= latency['p90'] <= latency['p99'] <= latency['max']
+            assert planner_report['plan_length']['mean'] > 0
+            assert 'search' in planner_report['stage_timings']
+            assert planner_report['problem_init_atoms']['max'] == self.hospital.get_assertion_count()
+
+        # only the external planners report the memory of the planner processes
+        assert report['planners']['native']['planner_peak_rss'] is None
+        assert report['planners']['lama']['planner_peak_rss'] > 0
+
+    def test_native_fallback_timings(self):
+        # the search fails immediately, so the request is passed on to the fallback planner
+        fallback_result = PlanResult(True, [], engine='lama', stage_timings={'search': 1.})
+        fallback_planner = mock.Mock(plan=mock.Mock(return_value=fallback_result))
+        planner = NativePlannerInterface(self.test_kb_name, self.domain_file, self.plan_file_path,
+                                         fallback_planner=fallback_planner, max_expansions=0,
+                                         host=self.host, port=self.port)
+        task_request, robot, task_goals = self.hospital.get_requests(1)[0]
+        result = planner.plan(task_request, robot, task_goals)
+
+        # the durations of the native stages are added to those of the fallback planner
+        assert result is fallback_result
+        assert result.engine == 'lama'
+        assert result.stage_timings['search'] > 1.
+        assert 'problem_generation' in result.stage_timings
+
+    def test_percentiles(self):
+        values = [4., 1., 3., 2., 5.]
+        assert PlanningBenchmark.get_percentile(values, 50) == 3.
+        assert PlanningBenchmark.get_percentile(values, 90) == 4.6
+        assert PlanningBenchmark.get_percentile(values, 100) == 5.
+        assert PlanningBenchmark.get_percentile([1.], 99) == 1.
+
+if __name__ == '__main__':
+    unittest.main()
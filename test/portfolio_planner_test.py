@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+from ropod.structs.task import TaskRequest
+from task_planner.lama_interface import LAMAInterface
+from task_planner.portfolio_planner import PortfolioPlanner
+from helpers import KnowledgeBaseTestCase, process_alive
+
+class FakePlanner(object):
+    '''A planner that returns a plan of the given length after the given delay.
+    '''
+    def __init__(self, delay, plan_length):
+        self.delay = delay
+        self.plan_length = plan_length
+
+    async def solve_problem_async(self, problem_file, work_dir, task, robot):
+        await asyncio.sleep(self.delay)
+        return self.plan_length > 0, ['action'] * self.plan_length
+
+class WaitingPlanner(object):
+    '''A planner that runs another planner once the given file exists.
+    '''
+    def __init__(self, planner, file_name):
+        self.planner = planner
+        self.file_name = file_name
+
+    async def solve_problem_async(self, problem_file, work_dir, task, robot):
+        while not os.path.exists(self.file_name):
+            await asyncio.sleep(0.05)
+        return await self.planner.solve_problem_async(problem_file, work_dir, task, robot)
+
+class PortfolioPlannerTest(KnowledgeBaseTestCase):
+    '''Races planners against each other; Fast Downward is replaced by
+    test/fake_lama_planner.py. A local MongoDB server is used if one
+    is reachable and mongomock otherwise.
+    '''
+    test_kb_name = 'test_portfolio_planner'
+    task_goals = [('load_at', [('load', 'mobidik'), ('loc', 'DELIVERY')])]
+
+    @classmethod
+    def setUpClass(self):
+        super(PortfolioPlannerTest, self).setUpClass()
+
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        main_dir = os.path.dirname(code_dir)
+        self.domain_file = os.path.join(main_dir, 'config/task_domains/agaplesion/hospital_transportation.pddl')
+        self.plan_file_path = tempfile.mkdtemp()
+        self.pid_file = os.path.join(self.plan_file_path, 'planner.pid')
+
+        planner_cmd = '{0} {1} --plan-file PLAN-FILE DOMAIN PROBLEM'.format(sys.executable,
+                                                                           os.path.join(code_dir, 'fake_lama_planner.py'))
+        slow_planner_cmd = planner_cmd.replace('--plan-file',
+                                               '--delay 60 --pid-file {0} --plan-file'.format(self.pid_file))
+        self.fast_planner = LAMAInterface(self.test_kb_name, self.domain_file,
+                                          planner_cmd, self.plan_file_path,
+                                          host=self.host, port=self.port)
+        self.slow_planner = LAMAInterface(self.test_kb_name, self.domain_file,
+                                          slow_planner_cmd, self.plan_file_path,
+                                          host=self.host, port=self.port)
+        self.fast_planner.kb_interface.insert_fluents([('location_floor', [('loc', 'PICKUP')], 'floor0'),
+                                                       ('location_floor', [('loc', 'DELIVERY')], 'floor1')])
+
+    @classmethod
+    def tearDownClass(self):
+        super(PortfolioPlannerTest, self).tearDownClass()
+        shutil.rmtree(self.plan_file_path, ignore_errors=True)
+
+    def test_first_plan(self):
+        # the fast planner only starts once the slow planner has started its child process
+        portfolio = self._get_portfolio({'lama_fast': WaitingPlanner(self.fast_planner, self.pid_file),
+                                         'lama_slow': self.slow_planner})
+
+        start_time = time.time()
+        plan_found, plan = portfolio.plan(self._get_task_request(), 'frank', self.task_goals)
+        elapsed_time = time.time() - start_time
+
+        assert plan_found
+        assert [action.type for action in plan] == ['DOCK', 'GOTO']
+        assert plan[-1].areas[0].name == 'DELIVERY'
+        assert plan[-1].areas[0].floor_number == 1
+        assert elapsed_time < 30
+
+        # the slow planner and its child process are killed
+        with open(self.pid_file, 'r') as pid_file:
+            pids = [int(pid) for pid in pid_file.read().split()]
+        os.remove(self.pid_file)
+        for pid in pids:
+            assert not process_alive(pid)
+
+        statistics = portfolio.get_engine_statistics()
+        assert statistics['lama_fast']['wins'] == 1
+        assert statistics['lama_fast']['plans_found'] == 1
+        assert statistics['lama_slow']['wins'] == 0
+        assert statistics['lama_slow']['cancelled'] == 1
+        assert not os.listdir(self.plan_file_path)
+
+    def test_best_plan(self):
+        planners = {'first': FakePlanner(0., 3), 'best': FakePlanner(0.2, 2),
+                    'none': FakePlanner(0., 0), 'late': FakePlanner(60., 1)}
+
+        # the shortest plan found before the deadline is returned
+        portfolio = self._get_portfolio(planners, best_plan_timeout=1.)
+        start_time = time.time()
+        plan_found, plan = portfolio.plan(self._get_task_request(), 'frank', self.task_goals)
+        assert plan_found
+        assert len(plan) == 2
+        assert time.time() - start_time < 30
+
+        statistics = portfolio.get_engine_statistics()
+        assert statistics['best']['wins'] == 1
+        assert statistics['first']['plans_found'] == 1
+        assert statistics['none']['plans_found'] == 0
+        assert statistics['late']['cancelled'] == 1
+
+        # without a deadline, the first plan is returned
+        portfolio = self._get_portfolio(planners)
+        plan_found, plan = portfolio.plan(self._get_task_request(), 'frank', self.task_goals)
+        assert plan_found
+        assert len(plan) == 3
+        assert portfolio.get_engine_statistics()['first']['wins'] == 1
+
+        # no plan is found if no planner finds one
+        portfolio = self._get_portfolio({'none': FakePlanner(0., 0)})
+        plan_found, plan = portfolio.plan(self._get_task_request(), 'frank', self.task_goals)
+        assert not plan_found
+        assert not plan
+
+    def _get_portfolio(self, planners, best_plan_timeout=None):
+        return PortfolioPlanner(self.test_kb_name, self.domain_file, planners,
+                                self.plan_file_path, best_plan_timeout=best_plan_timeout,
+                                host=self.host, port=self.port)
+
+    def _get_task_request(self):
+        task_request = TaskRequest()
+        task_request.load_type = 'mobidik'
+        return task_request
+
+if __name__ == '__main__':
+    unittest.main()
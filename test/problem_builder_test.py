@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import io
+import unittest
+from unittest import mock
+
+from task_planner.knowledge_base_interface import KnowledgeBaseInterface, MongoClientPool, Predicate, Fluent
+from task_planner.problem_builder import PDDLProblemBuilder
+from task_planner.pddl_parser import PDDLProblem
+from task_planner.plan_result import PlanStatistics
+from helpers import KnowledgeBaseTestCase
+
+class ProblemBuilderTest(unittest.TestCase):
+    location_count = 1000
+
+    def setUp(self):
+        self.predicates = [Predicate.from_tuple(('empty_gripper', [('bot', 'frank')]))]
+        self.fluents = [Fluent.from_tuple(('robot_at', [('bot', 'frank')], 'LOCATION_0'))]
+        self.fluents.extend([Fluent.from_tuple(('location_floor',
+                                                [('loc', 'LOCATION_{0}'.format(i))],
+                                                'floor{0}'.format(i % 10)))
+                             for i in range(self.location_count)])
+        self.goals = [Predicate.from_tuple(('robot_at', [('bot', 'frank'), ('loc', 'LOCATION_1')]))]
+
+    def test_problem_structure(self):
+        problem_builder = PDDLProblemBuilder('hospital-transportation', None)
+        problem_str = problem_builder.generate_problem_str(self.predicates, self.fluents, self.goals)
+        lines = problem_str.split('\n')
+
+        assert lines[0] == '(define (problem ropod)'
+        assert lines[1] == '    (:domain hospital-transportation)'
+        assert '        frank - robot' in lines
+        assert '        (empty_gripper frank)' in lines
+        assert '        (robot_at frank LOCATION_0)' in lines
+        assert '            (robot_at frank LOCATION_1)' in lines
+
+        # the objects are declared before the initial state
+        assert lines.index('    (:objects') < lines.index('    (:init')
+        assert lines.index('    (:init') < lines.index('    (:goal')
+        assert len([line for line in lines if 'location_floor' in line]) == self.location_count
+
+    def test_spilled_init_buffer(self):
+        problem_builder = PDDLProblemBuilder('hospital-transportation', None)
+        problem_str = problem_builder.generate_problem_str(self.predicates, self.fluents, self.goals)
+
+        # the assertions are streamed from a generator and the rendered
+        # :init entries are spilled to a temporary file almost immediately
+        problem_builder.init_buffer_size = 64
+        problem_file = io.StringIO()
+        problem_builder.write_full_problem(problem_file, iter(self.predicates),
+                                           (fluent for fluent in self.fluents),
+                                           self.goals)
+        assert problem_file.getvalue() == problem_str
+
+class StaticBlockTest(KnowledgeBaseTestCase):
+    '''Tests the reuse of the rendered static assertions (location_floor
+    and elevator_at) between problems generated from the knowledge base.
+    '''
+    test_kb_name = 'test_kb_static_block'
+
+    def setUp(self):
+        MongoClientPool.get_client(self.host, self.port)[self.test_kb_name]['knowledge_base'].delete_many({})
+        self.kb_interface = KnowledgeBaseInterface(self.test_kb_name, host=self.host, port=self.port)
+        self.kb_interface.insert_facts([('empty_gripper', [('bot', 'frank')]),
+                                        ('elevator_at', [('elevator', 'ELEVATOR_0'), ('loc', 'ELEVATOR_0_0')])])
+        self.kb_interface.insert_fluents([('robot_at', [('bot', 'frank')], 'LOCATION_0'),
+                                          ('location_floor', [('loc', 'LOCATION_0')], 'floor0'),
+                                          ('location_floor', [('loc', 'LOCATION_1')], 'floor1')])
+        self.goals = [Predicate.from_tuple(('robot_at', [('bot', 'frank'), ('loc', 'LOCATION_1')]))]
+        self.problem_builder = PDDLProblemBuilder('hospital-transportation', self.kb_interface)
+
+    def test_static_block_reuse(self):
+        problem_str = self.problem_builder.get_problem_str(self.goals)
+        assert '        (location_floor LOCATION_1 floor1)' in problem_str
+
+        # writes of dynamic assertions do not invalidate the static block
+        self.kb_interface.update_fluent(('robot_at', [('bot', 'frank')], 'LOCATION_1'))
+        with mock.patch.object(self.kb_interface, 'get_fluent_assertions',
+                               wraps=self.kb_interface.get_fluent_assertions) as static_fluent_read, \
+             mock.patch.object(self.kb_interface, 'get_predicate_assertions',
+                               wraps=self.kb_interface.get_predicate_assertions) as static_predicate_read:
+            problem_str = self.problem_builder.get_problem_str(self.goals)
+            problem_str_again = self.problem_builder.get_problem_str(self.goals)
+        assert not static_fluent_read.called
+        assert not static_predicate_read.called
+        assert problem_str == problem_str_again
+        assert '        (robot_at frank LOCATION_1)' in problem_str
+        assert '        (location_floor LOCATION_1 floor1)' in problem_str
+        assert '        (elevator_at ELEVATOR_0 ELEVATOR_0_0)' in problem_str
+
+    def test_static_block_regeneration(self):
+        problem_str = self.problem_builder.get_problem_str(self.goals)
+        assert 'LOCATION_2' not in problem_str
+
+        self.kb_interface.insert_fluents([('location_floor', [('loc', 'LOCATION_2')], 'floor2')])
+        problem_str = self.problem_builder.get_problem_str(self.goals)
+        assert '        (location_floor LOCATION_2 floor2)' in problem_str
+        assert 'LOCATION_2 - location' in problem_str
+
+        self.kb_interface.remove_facts([('elevator_at', [('elevator', 'ELEVATOR_0'), ('loc', 'ELEVATOR_0_0')])])
+        self.kb_interface.insert_facts([('elevator_at', [('elevator', 'ELEVATOR_0'), ('loc', 'ELEVATOR_0_1')])])
+        problem_str = self.problem_builder.get_problem_str(self.goals)
+        assert '        (elevator_at ELEVATOR_0 ELEVATOR_0_1)' in problem_str
+        assert 'ELEVATOR_0_0' not in problem_str
+
+        # the regenerated problem matches one generated without the static block
+        full_problem_str = self.problem_builder.generate_problem_str(self.kb_interface.get_predicate_assertions(),
+                                                                     self.kb_interface.get_fluent_assertions(),
+                                                                     self.goals)
+        assert sorted(problem_str.split('\n')) == sorted(full_problem_str.split('\n'))
+
+    def test_problem_from_assertions(self):
+        # the problem built from the assertions matches the parsed problem description
+        self.kb_interface.insert_facts([('elevator_at', [('elevator', 'ELEVATOR_0'), ('loc', 'ELEVATOR_0_1')])])
+        statistics = PlanStatistics()
+        problem = self.problem_builder.get_problem(self.goals, statistics=statistics)
+        parsed_problem = PDDLProblem.from_str(self.problem_builder.get_problem_str(self.goals))
+        assert problem.name == parsed_problem.name
+        assert problem.domain_name == parsed_problem.domain_name
+        assert problem.objects == parsed_problem.objects
+        assert problem.init == parsed_problem.init
+        assert problem.numeric_init == parsed_problem.numeric_init
+        assert problem.goals == parsed_problem.goals == [('robot_at', 'frank', 'location_1')]
+        assert ('location_floor', 'location_1', 'floor1') in problem.init
+        assert statistics.problem_size == {'objects': 8, 'init_atoms': 6}
+        assert 'problem_generation' in statistics.stage_timings
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import os
+import unittest
+
+from task_planner.knowledge_base_interface import Predicate, Fluent
+from task_planner.knowledge_models import PDDLKnowledgeModel
+from task_planner.problem_builder import PDDLProblemBuilder
+from task_planner.problem_pruner import ProblemPruner
+from task_planner.pddl_parser import PDDLDomain, PDDLProblem
+from task_planner.plan_validator import PlanValidator
+from task_planner.heuristic_search import GBFSPlanner
+
+class ProblemPrunerTest(unittest.TestCase):
+    floor_count = 5
+    locations_per_floor = 20
+
+    def setUp(self):
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        main_dir = os.path.dirname(code_dir)
+        self.domain = PDDLDomain.from_file(os.path.join(main_dir, 'config/task_domains/agaplesion/hospital_transportation.pddl'))
+        self.knowledge_model = PDDLKnowledgeModel.from_domain(self.domain)
+
+        # the main elevator serves all floors, while a second
+        # elevator only connects the two topmost floors
+        self.fluents = []
+        for floor in range(self.floor_count):
+            self.fluents.extend([Fluent.from_tuple(('location_floor', [('loc', 'LOC_{0}_{1}'.format(floor, i))],
+                                                    'floor{0}'.format(floor)))
+                                 for i in range(self.locations_per_floor)])
+            self.fluents.append(Fluent.from_tuple(('location_floor', [('loc', 'ELEVATOR_{0}'.format(floor))],
+                                                   'floor{0}'.format(floor))))
+        self.fluents.extend([Fluent.from_tuple(('robot_at', [('bot', 'frank')], 'LOC_0_0')),
+                             Fluent.from_tuple(('robot_floor', [('bot', 'frank')], 'floor0')),
+                             Fluent.from_tuple(('robot_at', [('bot', 'ash')], 'LOC_2_5')),
+                             Fluent.from_tuple(('robot_floor', [('bot', 'ash')], 'floor2')),
+                             Fluent.from_tuple(('load_at', [('load', 'mobidik')], 'LOC_0_1')),
+                             Fluent.from_tuple(('load_floor', [('load', 'mobidik')], 'floor0')),
+                             Fluent.from_tuple(('load_at', [('load', 'cart')], 'LOC_4_3')),
+                             Fluent.from_tuple(('load_floor', [('load', 'cart')], 'floor4')),
+                             Fluent.from_tuple(('elevator_floor', [('elevator', 'main_elevator')], 'unknown')),
+                             Fluent.from_tuple(('destination_floor', [('elevator', 'main_elevator')], 'unknown'))])
+
+        self.predicates = [Predicate.from_tuple(('empty_gripper', [('bot', 'frank')])),
+                           Predicate.from_tuple(('empty_gripper', [('bot', 'ash')]))]
+        self.predicates.extend([Predicate.from_tuple(('elevator_at', [('elevator', 'main_elevator'),
+                                                                      ('loc', 'ELEVATOR_{0}'.format(floor))]))
+                                for floor in range(self.floor_count)])
+        self.predicates.extend([Predicate.from_tuple(('elevator_at', [('elevator', 'top_elevator'),
+                                                                      ('loc', 'LOC_{0}_0'.format(floor))]))
+                                for floor in (3, 4)])
+
+    def test_relevant_objects(self):
+        pruner = ProblemPruner(self.knowledge_model)
+        goals = [Predicate.from_tuple(('load_at', [('load', 'mobidik'), ('loc', 'LOC_1_2')]))]
+        predicates, fluents = pruner.prune(self.predicates, self.fluents, goals, 'frank')
+
+        objects = set([obj for assertion in predicates for obj in self._get_objects(pruner, assertion)] +
+                      [obj for assertion in fluents for obj in self._get_objects(pruner, assertion, True)])
+        assert objects == set(['frank', 'mobidik', 'main_elevator', 'LOC_0_0', 'LOC_0_1', 'LOC_1_2',
+                               'ELEVATOR_0', 'ELEVATOR_1', 'floor0', 'floor1', 'unknown'])
+        assert len(predicates) + len(fluents) < (len(self.predicates) + len(self.fluents)) / 5
+
+        # on a single floor, no elevators are needed
+        goals = [Predicate.from_tuple(('load_at', [('load', 'mobidik'), ('loc', 'LOC_0_2')]))]
+        predicates, fluents = pruner.prune(self.predicates, self.fluents, goals, 'frank')
+        assert not [assertion for assertion in predicates if assertion.name == 'elevator_at']
+
+        # the topmost floors are connected by the second elevator
+        goals = [Predicate.from_tuple(('load_at', [('load', 'cart'), ('loc', 'LOC_3_1')]))]
+        predicates, fluents = pruner.prune(self.predicates, self.fluents, goals, 'ash')
+        elevators = set([assertion.params[0].value for assertion in predicates if assertion.name == 'elevator_at'])
+        assert elevators == set(['main_elevator', 'top_elevator'])
+
+        # without a robot, all robots are relevant
+        predicates, fluents = pruner.prune(self.predicates, self.fluents, goals)
+        assert len([assertion for assertion in predicates if assertion.name == 'empty_gripper']) == 2
+
+        # nothing is pruned if the floors are not connected
+        goals = [Predicate.from_tuple(('load_at', [('load', 'mobidik'), ('loc', 'LOC_1_2')]))]
+        predicates, fluents = pruner.prune(self.predicates[:2], self.fluents, goals, 'frank')
+        assert len(predicates) == 2 and len(fluents) == len(self.fluents)
+
+    def test_pruned_problems(self):
+        pruner = ProblemPruner(self.knowledge_model)
+        problem_builder = PDDLProblemBuilder(self.domain.name, None, knowledge_model=self.knowledge_model,
+                                             problem_pruner=pruner)
+        goals = [Predicate.from_tuple(('load_at', [('load', 'mobidik'), ('loc', 'LOC_1_2')]))]
+        problem = PDDLProblem.from_str(problem_builder.generate_problem_str(self.predicates, self.fluents,
+                                                                           goals, 'frank'))
+        assert [obj for obj, obj_type in problem.objects.items() if obj_type == 'robot'] == ['frank']
+
+        # plans for the pruned problem are valid in the full problem
+        plan = GBFSPlanner(self.domain).solve(problem)
+        assert plan is not None
+        problem_builder.problem_pruner = None
+        full_problem = PDDLProblem.from_str(problem_builder.generate_problem_str(self.predicates, self.fluents,
+                                                                                goals, 'frank'))
+        assert PlanValidator(self.domain).validate(full_problem, plan)
+
+    def _get_objects(self, pruner, assertion, fluent=False):
+        if fluent:
+            typed_args = pruner.knowledge_model.get_fluent_args(assertion)
+        else:
+            typed_args = pruner.knowledge_model.get_predicate_args(assertion)
+        return [obj for _, obj in typed_args]
+
+if __name__ == '__main__':
+    unittest.main()
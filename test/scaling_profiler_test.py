@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from task_planner.lama_interface import LAMAInterface
+from task_planner.synthetic_hospital import SyntheticHospital
+from task_planner.scaling_profiler import ScalingProfiler
+from helpers import KnowledgeBaseTestCase
+
+def get_locations_quadratic(fluents: list) -> list:
+    '''Collects the locations of the given fluents with list membership checks.
+    '''
+    locations = []
+    for fluent in fluents:
+        if fluent.params[0].value not in locations:
+            locations.append(fluent.params[0].value)
+    return locations
+
+class ScalingProfilerTest(KnowledgeBaseTestCase):
+    '''Profiles the problem generation and plan parsing of a LAMAInterface
+    on small synthetic snapshots (without running a planner). A local MongoDB
+    server is used if one is reachable and mongomock otherwise.
+    '''
+    test_kb_name = 'test_scaling_profiler'
+    sizes = (250, 1000, 4000)
+
+    @classmethod
+    def setUpClass(self):
+        super(ScalingProfilerTest, self).setUpClass()
+
+        code_dir = os.path.abspath(os.path.dirname(__file__))
+        main_dir = os.path.dirname(code_dir)
+        domain_file = os.path.join(main_dir, 'config/task_domains/agaplesion/hospital_transportation.pddl')
+        self.plan_file_path = tempfile.mkdtemp()
+        self.planner_interface = LAMAInterface(self.test_kb_name, domain_file, '',
+                                               self.plan_file_path,
+                                               host=self.host, port=self.port)
+        self.snapshots = ScalingProfiler.get_synthetic_snapshots(self.sizes)
+
+    @classmethod
+    def tearDownClass(self):
+        super(ScalingProfilerTest, self).tearDownClass()
+        shutil.rmtree(self.plan_file_path, ignore_errors=True)
+
+    def test_growth_exponent(self):
+        sizes = [10, 100, 1000, 10000]
+        assert abs(ScalingProfiler.get_growth_exponent(sizes, [2*size for size in sizes]) - 1.) < 1e-9
+        assert abs(ScalingProfiler.get_growth_exponent(sizes, [size**2 for size in sizes]) - 2.) < 1e-9
+
+        # constant overheads at small sizes are ignored
+        times = [1., 1., 10., 100.]
+        assert abs(ScalingProfiler.get_growth_exponent(sizes, times) - 1.) < 1e-9
+        assert ScalingProfiler.get_growth_exponent([10], [1.]) is None
+
+    def test_scaling_report(self):
+        # a floor of a visited location that already is in the knowledge base
+        visited_location = [fluent.params[0].value for fluent in self.snapshots[0][1]
+                            if fluent.name == 'location_floor'][0].upper()
+        existing_floor = ('location_floor', [('loc', visited_location)], 'floor99')
+        self.planner_interface.kb_interface.insert_fluents([existing_floor])
+
+        profile_dir = tempfile.mkdtemp()
+        try:
+            profiler = ScalingProfiler(self.planner_interface, output_dir=profile_dir, repetitions=1)
+            report = profiler.profile(self.snapshots)
+            profile_files = os.listdir(profile_dir)
+        finally:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+        assert report['engine'] == 'lama'
+        for operation in ScalingProfiler.operations:
+            operation_report = report['operations'][operation]
+            assert [size['assertion_count'] for size in operation_report['sizes']] == \
+                [len(predicates) + len(fluents) for predicates, fluents in self.snapshots]
+            for size in operation_report['sizes']:
+                assert size['time'] > 0. and size['peak_memory'] > 0
+            assert operation_report['time_exponent'] is not None
+            assert '{0}_{1}.prof'.format(operation, operation_report['sizes'][-1]['assertion_count']) in profile_files
+        assert [size['plan_length'] for size in report['operations']['parse_plan']['sizes']] == [2, 9, 39]
+
+        # the problems and plans are removed, as are the floors written for the plans,
+        # while the floors that were already in the knowledge base are restored
+        assert not os.listdir(self.plan_file_path)
+        location_floors = self.planner_interface.kb_interface.get_fluent_assertions('location_floor')
+        assert [fluent.to_tuple() for fluent in location_floors] == [existing_floor]
+        self.planner_interface.kb_interface.remove_fluents([existing_floor])
+
+    def test_super_linear_growth(self):
+        generate_problem_file = self.planner_interface.generate_problem_file
+        def generate_problem_file_quadratic(predicates, fluents, task_goals):
+            get_locations_quadratic(fluents)
+            return generate_problem_file(predicates, fluents, task_goals)
+
+        with mock.patch.object(self.planner_interface, 'generate_problem_file',
+                               generate_problem_file_quadratic):
+            report = ScalingProfiler(self.planner_interface, repetitions=1).profile(self.snapshots)
+
+        operation_report = report['operations']['generate_problem_file']
+        assert operation_report['super_linear']
+        functions = [function['function'] for function in operation_report['super_linear_functions']]
+        assert any(['get_locations_quadratic' in function for function in functions])
+
+    def test_snapshots(self):
+        hospital = SyntheticHospital(floor_count=2, locations_per_floor=3)
+        hospital.populate(self.planner_interface.kb_interface)
+        snapshot_dir = tempfile.mkdtemp()
+        try:
+            snapshot_file_name = os.path.join(snapshot_dir, 'snapshot.json')
+            ScalingProfiler.write_snapshot(self.planner_interface.kb_interface, snapshot_file_name)
+            predicates, fluents = ScalingProfiler.read_snapshot(snapshot_file_name)
+        finally:
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            self.planner_interface.kb_interface.remove_facts(hospital.get_predicates())
+            self.planner_interface.kb_interface.remove_fluents(hospital.get_fluents())
+
+        assert sorted([predicate.to_tuple() for predicate in predicates]) == sorted(hospital.get_predicates())
+        assert sorted([fluent.to_tuple() for fluent in fluents]) == sorted(hospital.get_fluents())
+
+        # the hospitals are scaled through the number of locations per floor
+        hospital = SyntheticHospital.from_assertion_count(1000)
+        assert abs(hospital.get_assertion_count() - 1000) < hospital.floor_count
+
+if __name__ == '__main__':
+    unittest.main()
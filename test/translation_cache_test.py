@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from task_planner.translation_cache import SASTask, TranslationCache
+
+class TranslationCacheTest(unittest.TestCase):
+    problem = '''(define (problem ropod)
+    (:domain hospital-transportation)
+    (:objects
+        PICKUP DELIVERY - location
+        mobidik - load
+    )
+
+    (:init
+        (load_at mobidik PICKUP)
+    )
+
+    (:goal
+        (and
+            (load_at mobidik DELIVERY)
+        )
+    )
+)
+'''
+
+    sas = '''begin_version
+3
+end_version
+begin_metric
+0
+end_metric
+2
+begin_variable
+var0
+-1
+3
+Atom load_at(mobidik, pickup)
+Atom load_at(mobidik, delivery)
+<none of those>
+end_variable
+begin_variable
+var1
+-1
+2
+Atom empty_gripper(frank)
+NegatedAtom empty_gripper(frank)
+end_variable
+0
+begin_state
+0
+0
+end_state
+begin_goal
+1
+0 1
+end_goal
+0
+0
+'''
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.domain_file = os.path.join(self.test_dir, 'domain.pddl')
+        with open(self.domain_file, 'w') as domain_file:
+            domain_file.write('(define (domain hospital-transportation))')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_problem_keys(self):
+        translation_cache = TranslationCache()
+        key, goal_atoms = self._get_key(translation_cache, self.problem)
+        assert goal_atoms == ['load_at(mobidik, delivery)']
+
+        # the goals do not change the key
+        other_goal_key, goal_atoms = self._get_key(translation_cache,
+                                                   self.problem.replace('(load_at mobidik DELIVERY)',
+                                                                        '(load_at mobidik PICKUP)'))
+        assert other_goal_key == key
+        assert goal_atoms == ['load_at(mobidik, pickup)']
+
+        # but the initial state and the domain do
+        assert self._get_key(translation_cache, self.problem.replace('(load_at mobidik PICKUP)',
+                                                                     '(load_at mobidik DELIVERY)'))[0] != key
+        with open(self.domain_file, 'a') as domain_file:
+            domain_file.write('\n')
+        assert self._get_key(translation_cache, self.problem)[0] != key
+
+    def test_cached_translations(self):
+        translation_cache = TranslationCache(max_size=1)
+        key, goal_atoms = self._get_key(translation_cache, self.problem)
+        sas_file_name = os.path.join(self.test_dir, 'output.sas')
+        assert not translation_cache.write_task(key, goal_atoms, sas_file_name)
+
+        with open(sas_file_name, 'w') as sas_file:
+            sas_file.write(self.sas)
+        assert translation_cache.put(key, goal_atoms, sas_file_name)
+
+        # only the goal section of the cached translation is replaced
+        assert translation_cache.write_task(key, ['load_at(mobidik, pickup)', 'empty_gripper(frank)'],
+                                            sas_file_name)
+        with open(sas_file_name, 'r') as sas_file:
+            assert sas_file.read() == self.sas.replace('begin_goal\n1\n0 1\n', 'begin_goal\n2\n0 0\n1 0\n')
+
+        # goals that are not represented by the variables of the translation cannot be set
+        assert not translation_cache.write_task(key, ['load_at(mobidik, charging)'], sas_file_name)
+        assert not translation_cache.write_task(key, ['load_at(mobidik, pickup)',
+                                                      'load_at(mobidik, delivery)'], sas_file_name)
+        assert translation_cache.hits == 1 and translation_cache.misses == 3
+
+        # translations that do not represent their own goals are not cached
+        with open(sas_file_name, 'w') as sas_file:
+            sas_file.write(self.sas.replace('Atom load_at(mobidik, delivery)', 'Atom load_at(mobidik, charging)'))
+        assert not translation_cache.put('other_key', goal_atoms, sas_file_name)
+        assert not translation_cache.put('other_key', goal_atoms, os.path.join(self.test_dir, 'missing.sas'))
+
+        # the least recently used translation is removed once the cache is full
+        with open(sas_file_name, 'w') as sas_file:
+            sas_file.write(self.sas)
+        assert translation_cache.put('other_key', goal_atoms, sas_file_name)
+        assert len(translation_cache) == 1
+        assert not translation_cache.write_task(key, goal_atoms, sas_file_name)
+
+    def test_sas_tasks(self):
+        task = SASTask.from_str(self.sas)
+        assert task.atom_values == {'load_at(mobidik, pickup)': (0, 0),
+                                    'load_at(mobidik, delivery)': (0, 1),
+                                    'empty_gripper(frank)': (1, 0)}
+        assert task.get_task_str(['load_at(mobidik, delivery)']) == self.sas
+        assert SASTask.from_str('begin_version\n3\nend_version\n') is None
+
+    def _get_key(self, translation_cache, problem):
+        problem_file_name = os.path.join(self.test_dir, 'problem.pddl')
+        with open(problem_file_name, 'w') as problem_file:
+            problem_file.write(problem)
+        return translation_cache.get_problem_key(self.domain_file, problem_file_name)
+
+if __name__ == '__main__':
+    unittest.main()